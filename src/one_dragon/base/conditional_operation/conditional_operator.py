@@ -1,14 +1,16 @@
 import time
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, Future
 
-from threading import Lock
-from typing import Optional, Callable, List
+from threading import Condition, RLock
+from typing import Optional, Callable, List, Deque
 
 from one_dragon.base.conditional_operation.atomic_op import AtomicOp
 from one_dragon.base.conditional_operation.operation_def import OperationDef
 from one_dragon.base.conditional_operation.operation_task import OperationTask
 from one_dragon.base.conditional_operation.operation_template import OperationTemplate
 from one_dragon.base.conditional_operation.scene_handler import SceneHandler
+from one_dragon.base.conditional_operation.state_handler import StateHandler
 from one_dragon.base.conditional_operation.state_handler_template import StateHandlerTemplate
 from one_dragon.base.conditional_operation.state_recorder import StateRecorder, StateRecord
 from one_dragon.base.conditional_operation.utils import construct_scene_handler
@@ -19,6 +21,9 @@ from one_dragon.utils.log_utils import log
 
 _od_conditional_op_executor = ThreadPoolExecutor(thread_name_prefix='od_conditional_op', max_workers=32)
 
+_MAX_DISPATCH_WAIT_SECONDS: float = 1  # 调度线程最长的等待时间 兜底不通过 update_state 修改的状态
+_TIME_BOUNDARY_DELAY_SECONDS: float = 0.001  # 时间区间边界之后再唤醒 保证越过边界
+
 
 class ConditionalOperator(YamlConfig):
 
@@ -37,9 +42,13 @@ class ConditionalOperator(YamlConfig):
         self.trigger_scene_handler: dict[str, SceneHandler] = {}  # 需要状态触发的场景处理
         self.last_trigger_time: dict[int, float] = {}  # 各handler最后一次的触发时间
         self.normal_scene_handler: Optional[SceneHandler] = None  # 不需要状态触发的场景处理
+        self._recorder_2_handlers: dict[int, List[StateHandler]] = {}  # 状态记录器id -> 依赖该状态的处理器 状态变化时只让这些处理器重新判断
         self.is_running: bool = False  # 整体是否正在运行
 
-        self._task_lock: Lock = Lock()
+        self._task_lock: RLock = RLock()  # 可重入 任务瞬间完成时 add_done_callback 会在持锁线程里直接回调
+        self._dispatch_condition: Condition = Condition(self._task_lock)  # 与任务锁共用 用于唤醒调度线程
+        self._dispatch_round: int = 0  # 每次开始运行时加1 旧的调度线程发现轮次变化后退出
+        self._pending_trigger_states: Deque[str] = deque()  # 等待调度线程处理的触发状态
         self.running_task: Optional[OperationTask] = None  # 正在运行的任务
         self.running_task_cnt: AtomicInt = AtomicInt()
 
@@ -78,8 +87,28 @@ class ConditionalOperator(YamlConfig):
             else:
                 self.normal_scene_handler = handler
 
+        self._build_state_index()
         self._inited = True
 
+    def _build_state_index(self) -> None:
+        """
+        建立 状态记录器 -> 依赖该状态的处理器 的反向索引 并开启处理器的判断结果缓存
+        :return:
+        """
+        self._recorder_2_handlers = {}
+        scene_handler_list: List[SceneHandler] = list(self.trigger_scene_handler.values())
+        if self.normal_scene_handler is not None:
+            scene_handler_list.append(self.normal_scene_handler)
+
+        visited: set[int] = set()  # 多个触发器共用同一个场景处理器
+        for scene_handler in scene_handler_list:
+            if id(scene_handler) in visited:
+                continue
+            visited.add(id(scene_handler))
+            for state_handler in scene_handler.state_handlers:
+                state_handler.enable_verdict_cache()
+                state_handler.build_state_index(self._recorder_2_handlers)
+
     def dispose(self) -> None:
         """
         销毁 要对子模块进行完全销毁
@@ -100,58 +129,93 @@ class ConditionalOperator(YamlConfig):
         if not self._inited:
             log.error('自动指令 [ %s ] 未完成初始化 无法运行', self.module_name)
             return False
-        if self.is_running:
-            return False
 
-        self.is_running = True
-        self.running_task_cnt.set(0)  # 每次重置计数器 防止有bug导致无法正常运行
+        with self._task_lock:
+            if self.is_running:
+                return False
 
-        if self.normal_scene_handler is not None:
-            future: Future = _od_conditional_op_executor.submit(self._normal_scene_loop)
-            future.add_done_callback(thread_utils.handle_future_result)
+            self.is_running = True
+            self.running_task_cnt.set(0)  # 每次重置计数器 防止有bug导致无法正常运行
+            self._pending_trigger_states.clear()
+            self._dispatch_round += 1
+            dispatch_round = self._dispatch_round
+
+        future: Future = _od_conditional_op_executor.submit(self._dispatch_loop, dispatch_round)
+        future.add_done_callback(thread_utils.handle_future_result)
 
         return True
 
-    def _normal_scene_loop(self) -> None:
+    def _dispatch_loop(self, dispatch_round: int) -> None:
         """
-        主循环
+        调度主循环 只在以下情况唤醒
+        1. 有状态更新
+        2. 任务完成或被打断
+        3. 无触发器场景的冷却时间结束 或 状态判断的时间区间边界到达
+        :param dispatch_round: 开始运行时的轮次
         :return:
         """
+        with self._dispatch_condition:
+            while self.is_running and self._dispatch_round == dispatch_round:
+                # 优先处理状态触发的场景
+                while len(self._pending_trigger_states) > 0:
+                    state_name = self._pending_trigger_states.popleft()
+                    try:
+                        self._trigger_scene_in_lock(state_name)
+                    except Exception:
+                        log.error('自动指令 [ %s ] 触发场景 %s 出错', self.module_name, state_name, exc_info=True)
+
+                to_wait = _MAX_DISPATCH_WAIT_SECONDS
+                if self.normal_scene_handler is not None and self.running_task_cnt.get() == 0:
+                    try:
+                        next_time = self._run_normal_scene_in_lock()
+                    except Exception:
+                        log.error('自动指令 [ %s ] 主循环出错', self.module_name, exc_info=True)
+                        next_time = None
+                    if next_time is not None:
+                        to_wait = min(to_wait, max(0.0, next_time - time.time()) + _TIME_BOUNDARY_DELAY_SECONDS)
+
+                if len(self._pending_trigger_states) > 0:
+                    continue
+
+                self._dispatch_condition.wait(to_wait)
+
+    def _run_normal_scene_in_lock(self) -> Optional[float]:
+        """
+        尝试运行无触发器的场景 调用前需要持有 self._task_lock
+        :return: 下一次需要再判断的时间 为空时代表只需要等状态更新或任务完成
+        """
         normal_handler_id = id(self.normal_scene_handler)
-        while self.is_running:
-            if self.running_task_cnt.get() > 0:
-                # 有其它场景在运行 等待
-                time.sleep(0.02)
-            else:
-                # log.debug('开始等待新的主循环')
-                to_sleep: Optional[float] = None
-
-                # 上锁后确保运行状态不会被篡改
-                with self._task_lock:
-                    if not self.is_running:
-                        # 已经被stop_running中断了 不继续
-                        break
-
-                    trigger_time = time.time()
-                    last_trigger_time = self.last_trigger_time.get(normal_handler_id, 0)
-                    past_time = trigger_time - last_trigger_time
-                    if past_time < self.normal_scene_handler.interval_seconds:
-                        to_sleep = self.normal_scene_handler.interval_seconds - past_time
-                    else:
-                        new_task = self.normal_scene_handler.get_operations(trigger_time)
-                        if new_task is not None:
-                            log.debug(f'当前场景 主循环 当前条件 {new_task.expr_display}')
-                            self.running_task = new_task
-                            self.last_trigger_time[normal_handler_id] = trigger_time
-                            self.running_task_cnt.inc()
-                            future = self.running_task.run_async()
-                            future.add_done_callback(self._on_task_done)
-
-                if to_sleep is not None:
-                    # 等待时间不能写在锁里 要尽快释放锁
-                    time.sleep(to_sleep)
-                else:  # 没有命中的状态 或者 提交执行了 那就自旋等待
-                    time.sleep(0.02)
+        trigger_time = time.time()
+        last_trigger_time = self.last_trigger_time.get(normal_handler_id, 0)
+        past_time = trigger_time - last_trigger_time
+        if past_time < self.normal_scene_handler.interval_seconds:
+            return last_trigger_time + self.normal_scene_handler.interval_seconds
+
+        new_task = self.normal_scene_handler.get_operations(trigger_time)
+        if new_task is None:
+            # 没有命中的状态 等到状态判断的时间区间边界再看
+            return self.normal_scene_handler.get_next_change_time(trigger_time)
+
+        log.debug(f'当前场景 主循环 当前条件 {new_task.expr_display}')
+        self.running_task = new_task
+        self.last_trigger_time[normal_handler_id] = trigger_time
+        self.running_task_cnt.inc()
+        future = self.running_task.run_async()
+        future.add_done_callback(self._on_task_done)
+        return None
+
+    def _notify_trigger(self, state_name: Optional[str] = None) -> None:
+        """
+        通知调度线程
+        :param state_name: 需要触发场景的状态 为空时只代表状态有变化
+        :return:
+        """
+        with self._dispatch_condition:
+            if not self.is_running:
+                return
+            if state_name is not None and state_name in self.trigger_scene_handler:
+                self._pending_trigger_states.append(state_name)
+            self._dispatch_condition.notify()
 
     def _trigger_scene(self, state_name: str) -> None:
         """
@@ -159,53 +223,60 @@ class ConditionalOperator(YamlConfig):
         :param state_name: 触发的状态
         :return:
         """
+        with self._task_lock:
+            self._trigger_scene_in_lock(state_name)
+
+    def _trigger_scene_in_lock(self, state_name: str) -> None:
+        """
+        触发对应的场景 调用前需要持有 self._task_lock
+        :param state_name: 触发的状态
+        :return:
+        """
         if state_name not in self.trigger_scene_handler:
             return
         handler = self.trigger_scene_handler[state_name]
         trigger_handler_id = id(handler)
 
-        # 上锁后确保运行状态不会被篡改
-        with self._task_lock:
-            if not self.is_running:
-                # 已经被stop_running中断了 不继续
-                return
+        if not self.is_running:
+            # 已经被stop_running中断了 不继续
+            return
 
-            trigger_time: float = time.time()  # 这里不应该使用事件发生时间 而是应该使用当前的实际操作时间
-            last_trigger_time = self.last_trigger_time.get(trigger_handler_id, 0)
-            if trigger_time - last_trigger_time < handler.interval_seconds:  # 冷却时间没过 不触发
-                return
+        trigger_time: float = time.time()  # 这里不应该使用事件发生时间 而是应该使用当前的实际操作时间
+        last_trigger_time = self.last_trigger_time.get(trigger_handler_id, 0)
+        if trigger_time - last_trigger_time < handler.interval_seconds:  # 冷却时间没过 不触发
+            return
 
-            new_task = handler.get_operations(trigger_time)
-            # 若new_task为空，即无匹配state，则不打断当前task
-            if new_task is None:
-                return
+        new_task = handler.get_operations(trigger_time)
+        # 若new_task为空，即无匹配state，则不打断当前task
+        if new_task is None:
+            return
 
-            can_interrupt: bool = False
-            if self.running_task is not None:
-                old_priority = self.running_task.priority
-                new_priority = new_task.priority
-                if old_priority is None:  # 当前运行场景可随意打断
-                    can_interrupt = True
-                elif new_priority is not None and new_priority > old_priority:  # 新触发场景优先级更高
-                    can_interrupt = True
-            else:
+        can_interrupt: bool = False
+        if self.running_task is not None:
+            old_priority = self.running_task.priority
+            new_priority = new_task.priority
+            if old_priority is None:  # 当前运行场景可随意打断
+                can_interrupt = True
+            elif new_priority is not None and new_priority > old_priority:  # 新触发场景优先级更高
                 can_interrupt = True
+        else:
+            can_interrupt = True
 
-            if not can_interrupt:  # 当前运行场景无法被打断
-                return
+        if not can_interrupt:  # 当前运行场景无法被打断
+            return
 
-            # 必须要先增加计算器 避免无触发场景的循环进行
-            self.running_task_cnt.inc()
-            # 停止已有的操作
-            self._stop_running_task()
+        # 必须要先增加计算器 避免无触发场景的循环进行
+        self.running_task_cnt.inc()
+        # 停止已有的操作
+        self._stop_running_task()
 
-            log.debug(f'当前场景 {state_name} 当前条件 {new_task.expr_display}')
+        log.debug(f'当前场景 {state_name} 当前条件 {new_task.expr_display}')
 
-            new_task.set_trigger(state_name)
-            self.running_task = new_task
-            self.last_trigger_time[trigger_handler_id] = trigger_time
-            future = self.running_task.run_async()
-            future.add_done_callback(self._on_task_done)
+        new_task.set_trigger(state_name)
+        self.running_task = new_task
+        self.last_trigger_time[trigger_handler_id] = trigger_time
+        future = self.running_task.run_async()
+        future.add_done_callback(self._on_task_done)
 
     def stop_running(self) -> None:
         """
@@ -215,7 +286,9 @@ class ConditionalOperator(YamlConfig):
         # 上锁后停止 上锁后确保运行状态不会被篡改
         with self._task_lock:
             self.is_running = False
+            self._pending_trigger_states.clear()
             self._stop_running_task()
+            self._dispatch_condition.notify_all()
 
     def _stop_running_task(self) -> None:
         """
@@ -229,6 +302,7 @@ class ConditionalOperator(YamlConfig):
                 # 如果 finish=True 则计数器已经在 _on_task_done 减少了 这里就不减了
                 # 如果 finish=False 则代表还有操作在继续。在这里要减少计数器而不是等_on_task_done 让无触发器场景尽早运行
                 self.running_task_cnt.dec()
+                self._dispatch_condition.notify()
 
     def _on_task_done(self, future: Future) -> None:
         """
@@ -242,6 +316,7 @@ class ConditionalOperator(YamlConfig):
                     self.running_task.priority = None
             except Exception:  # run_async里有callback打印日志
                 pass
+            self._dispatch_condition.notify()
 
     def get_usage_states(self) -> set[str]:
         """
@@ -275,10 +350,8 @@ class ConditionalOperator(YamlConfig):
         if state_recorder is None:
             return
 
-        # 再去触发具体的场景 由自己的线程处理
-        if not state_record.is_clear:
-            future: Future = _od_conditional_op_executor.submit(self._trigger_scene, state_recorder.state_name)
-            future.add_done_callback(thread_utils.handle_future_result)
+        # 再去触发具体的场景 由调度线程处理
+        self._notify_trigger(None if state_record.is_clear else state_recorder.state_name)
 
     def batch_update_states(self, state_records: List[StateRecord]) -> None:
         """
@@ -293,9 +366,9 @@ class ConditionalOperator(YamlConfig):
         top_priority_handler: Optional[SceneHandler] = None
         top_priority_state: Optional[str] = None
 
-        for state_record in state_records:
+        state_recorder_list = self._update_state_recorders(state_records)
+        for state_record, state_recorder in zip(state_records, state_recorder_list):
             state_name = state_record.state_name
-            state_recorder = self._update_state_recorder(state_record)
             if state_recorder is None:
                 continue
             if state_record.is_clear:
@@ -320,10 +393,9 @@ class ConditionalOperator(YamlConfig):
                 top_priority_handler = handler
                 top_priority_state = state_name
 
-        # 触发具体的场景 由自己的线程处理
+        # 触发具体的场景 由调度线程处理
         if top_priority_state is not None:
-            future: Future = _od_conditional_op_executor.submit(self._trigger_scene, top_priority_state)
-            future.add_done_callback(thread_utils.handle_future_result)
+            self._notify_trigger(top_priority_state)
         else:
             # 没有场景需要触发 看是否需要打断当前操作
             with self._task_lock:
@@ -336,6 +408,17 @@ class ConditionalOperator(YamlConfig):
                         log.debug('复合中断条件满足，执行中断')
                 if interrupt:
                     self._stop_running_task()
+                # 状态有变化 无触发器场景可能需要重新判断
+                if self.is_running:
+                    self._dispatch_condition.notify()
+
+    def _update_state_recorders(self, state_records: List[StateRecord]) -> List[Optional[StateRecorder]]:
+        """
+        批量更新状态记录 子类可以改为一次性更新
+        :param state_records: 状态记录列表
+        :return: 每个状态记录对应的状态记录器 不存在时为None
+        """
+        return [self._update_state_recorder(i) for i in state_records]
 
     def _update_state_recorder(self, new_record: StateRecord) -> Optional[StateRecorder]:
         """
@@ -357,5 +440,20 @@ class ConditionalOperator(YamlConfig):
                     if mutex_recorder is None:
                         continue
                     mutex_recorder.clear_state_record()
+                    self._invalidate_state_handlers(mutex_recorder)
+
+        self._invalidate_state_handlers(recorder)
 
         return recorder
+
+    def _invalidate_state_handlers(self, recorder: StateRecorder) -> None:
+        """
+        状态变化后 使依赖该状态的处理器的判断结果缓存失效
+        :param recorder: 发生变化的状态记录器
+        :return:
+        """
+        handler_list = self._recorder_2_handlers.get(id(recorder))
+        if handler_list is None:
+            return
+        for handler in handler_list:
+            handler.invalidate_verdict()
@@ -1,7 +1,8 @@
 from enum import Enum
-from typing import Optional, Callable
+from typing import Optional, Callable, List
 
 from one_dragon.base.conditional_operation.state_recorder import StateRecorder
+from one_dragon.base.conditional_operation.state_store import StateStoreRecorder
 from one_dragon.utils.log_utils import log
 
 
@@ -57,44 +58,100 @@ class StateCalNode:
         self.state_value_range_min: int = state_value_range_min
         self.state_value_range_max: int = state_value_range_max
 
+        self._compiled: Optional[Callable[[float], bool]] = None  # 编译后的判断函数 第一次判断时生成
+
     def in_time_range(self, now: float) -> bool:
         """
         根据当前时间 判断是否在状态的生效时间范围内
         :param now: 当前时间
         :return:
         """
+        if self._compiled is None:
+            self._compiled = self.compile()
+        return self._compiled(now)
+
+    def compile(self) -> Callable[[float], bool]:
+        """
+        将判断树编译成嵌套的闭包 运行时不再需要判断节点类型和运算符
+        状态记录器的值在判断时才读取 因此编译后状态变化依然生效
+        :return: 判断函数 入参为当前时间
+        """
         if self.node_type == StateCalNodeType.OP:
+            left = self.left_child.compile()
+            if self.op_type == StateCalOpType.NOT:
+                return lambda now: not left(now)
+            right = self.right_child.compile()
             if self.op_type == StateCalOpType.AND:
-                return self.left_child.in_time_range(now) and self.right_child.in_time_range(now)
+                return lambda now: left(now) and right(now)
             elif self.op_type == StateCalOpType.OR:
-                return self.left_child.in_time_range(now) or self.right_child.in_time_range(now)
-            elif self.op_type == StateCalOpType.NOT:
-                return not self.left_child.in_time_range(now)
+                return lambda now: left(now) or right(now)
         elif self.node_type == StateCalNodeType.STATE:
-            diff = now - self.state_recorder.last_record_time
-            # log.debug('状态 [ %s ] 距离上次 %.2f, 要求区间 [%.2f, %.2f]' % (
-            #     self.state_recorder.state_name,
-            #     999 if diff > 999 else diff,
-            #     self.state_time_range_min,
-            #     self.state_time_range_max
-            # ))
-            time_valid = self.state_time_range_min <= diff <= self.state_time_range_max
-            value_valid = True
-            if self.state_value_range_min is not None and self.state_value_range_max is not None:
-                # log.debug('状态 [ %s ] 当前值 %s, 值要求区间 [%d, %d]' % (
-                #     self.state_recorder.state_name,
-                #     self.state_recorder.last_value,
-                #     self.state_value_range_min,
-                #     self.state_value_range_max
-                # ))
-                if self.state_recorder.last_value is None:
-                    value_valid = False
-                else:
-                    value_valid = self.state_value_range_min <= self.state_recorder.last_value <= self.state_value_range_max
-
-            return time_valid and value_valid
+            recorder = self.state_recorder
+            time_min = self.state_time_range_min
+            time_max = self.state_time_range_max
+            value_min = self.state_value_range_min
+            value_max = self.state_value_range_max
+            with_value = value_min is not None and value_max is not None
+
+            if isinstance(recorder, StateStoreRecorder):
+                # 状态存储中的列不会被替换 直接按下标读取 省去属性访问
+                record_time_list = recorder.store.last_record_time
+                value_list = recorder.store.last_value
+                state_id = recorder.state_id
+                if not with_value:
+                    return lambda now: time_min <= now - record_time_list[state_id] <= time_max
+
+                def _store_state_with_value(now: float) -> bool:
+                    if not time_min <= now - record_time_list[state_id] <= time_max:
+                        return False
+                    value = value_list[state_id]
+                    return value is not None and value_min <= value <= value_max
+
+                return _store_state_with_value
+
+            if not with_value:
+                return lambda now: time_min <= now - recorder.last_record_time <= time_max
+
+            def _state_with_value(now: float) -> bool:
+                if not time_min <= now - recorder.last_record_time <= time_max:
+                    return False
+                value = recorder.last_value
+                return value is not None and value_min <= value <= value_max
+
+            return _state_with_value
         elif self.node_type == StateCalNodeType.TRUE:
-            return True
+            return lambda now: True
+
+        return lambda now: None
+
+    def get_next_change_time(self, now: float) -> Optional[float]:
+        """
+        在状态没有新记录的情况下 计算判断结果下一次可能变化的时间
+        即各个状态的时间区间 在当前时间之后最早的边界
+        :param now: 当前时间
+        :return: 下一次可能变化的时间 不会因时间变化时返回None
+        """
+        if self.node_type == StateCalNodeType.OP:
+            left_time = self.left_child.get_next_change_time(now)
+            if self.op_type == StateCalOpType.NOT:
+                return left_time
+            right_time = self.right_child.get_next_change_time(now)
+            if left_time is None:
+                return right_time
+            if right_time is None:
+                return left_time
+            return min(left_time, right_time)
+        elif self.node_type == StateCalNodeType.STATE:
+            last_record_time = self.state_recorder.last_record_time
+            if last_record_time <= 0:  # 没有触发过或者被清除了 只有新记录才会改变
+                return None
+            # 进入区间的时间 和 离开区间的时间
+            for boundary in (last_record_time + self.state_time_range_min, last_record_time + self.state_time_range_max):
+                if boundary > now:
+                    return boundary
+            return None
+        else:
+            return None
 
     def get_usage_states(self) -> set[str]:
         """
@@ -110,6 +167,20 @@ class StateCalNode:
             states = states.union(self.right_child.get_usage_states())
         return states
 
+    def get_usage_state_recorders(self) -> List[StateRecorder]:
+        """
+        获取使用的状态记录器
+        :return:
+        """
+        recorders: List[StateRecorder] = []
+        if self.state_recorder is not None:
+            recorders.append(self.state_recorder)
+        if self.left_child is not None:
+            recorders.extend(self.left_child.get_usage_state_recorders())
+        if self.right_child is not None:
+            recorders.extend(self.right_child.get_usage_state_recorders())
+        return recorders
+
     def dispose(self) -> None:
         """
         销毁时 将子节点都销毁了
@@ -270,7 +341,9 @@ def construct_state_cal_tree(expr_str: str, state_getter: Callable[[str], StateR
     if len(node_stack) > 1:
         raise ValueError('有多段表达式 未使用运算符连接')
     else:
-        return node_stack[0]
+        root = node_stack[0]
+        root._compiled = root.compile()  # 构造时就编译好 判断时直接调用闭包
+        return root
 
 
 def __debug():
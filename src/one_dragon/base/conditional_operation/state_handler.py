@@ -1,4 +1,5 @@
-from typing import List, Optional, Set
+import threading
+from typing import List, Optional, Set, Tuple
 
 from one_dragon.base.conditional_operation.atomic_op import AtomicOp
 from one_dragon.base.conditional_operation.operation_task import OperationTask
@@ -31,6 +32,12 @@ class StateHandler:
         self.operations: List[AtomicOp] = operations
         self.interrupt_cal_tree: StateCalNode = interrupt_cal_tree
 
+        # 判断结果缓存 开启后 在依赖的状态没有变化、且没有到达下一个时间区间边界前 直接复用上次的判断结果
+        self._verdict_cache_enabled: bool = False
+        self._verdict: Optional[Tuple[bool, float, float]] = None  # (判断结果, 判断的时间, 有效时间) 整体替换 读取时不会读到一半
+        self._verdict_version: int = 0  # 每次依赖状态变化时加1 用于丢弃判断过程中状态发生变化的结果
+        self._verdict_lock = threading.Lock()  # 保证 比较版本+写入缓存 与 使缓存失效 不会交错
+
     def _merge_interrupt_trees(self, task_interrupt_tree: Optional[StateCalNode],
                               self_interrupt_tree: Optional[StateCalNode]) -> Optional[StateCalNode]:
        """
@@ -59,7 +66,7 @@ class StateHandler:
         :param trigger_time:
         :return:
         """
-        if self.state_cal_tree.in_time_range(trigger_time):
+        if self._in_time_range(trigger_time):
             if self.sub_handlers is not None and len(self.sub_handlers) > 0:
                 for sub_handler in self.sub_handlers:
                     task = sub_handler.get_operations(trigger_time)
@@ -83,6 +90,80 @@ class StateHandler:
 
         return None
 
+    def _in_time_range(self, now: float) -> bool:
+        """
+        判断自身的状态条件是否满足 开启缓存时优先使用缓存
+        :param now: 当前时间
+        :return:
+        """
+        if not self._verdict_cache_enabled:
+            return self.state_cal_tree.in_time_range(now)
+
+        cached = self._verdict
+        if cached is not None and cached[1] <= now < cached[2]:
+            return cached[0]
+
+        version = self._verdict_version
+        verdict = self.state_cal_tree.in_time_range(now)
+        next_change_time = self.state_cal_tree.get_next_change_time(now)
+        valid_until = next_change_time if next_change_time is not None else float('inf')
+        with self._verdict_lock:
+            if version == self._verdict_version:  # 判断过程中依赖的状态没有变化 才能缓存
+                self._verdict = (verdict, now, valid_until)
+        return verdict
+
+    def enable_verdict_cache(self) -> None:
+        """
+        开启判断结果缓存 包括子处理器
+        开启后 依赖的状态变化时 需要调用 invalidate_verdict 使缓存失效
+        :return:
+        """
+        self._verdict_cache_enabled = True
+        self.invalidate_verdict()
+        if self.sub_handlers is not None:
+            for sub in self.sub_handlers:
+                sub.enable_verdict_cache()
+
+    def invalidate_verdict(self) -> None:
+        """
+        依赖的状态发生变化 使判断结果缓存失效
+        :return:
+        """
+        with self._verdict_lock:
+            self._verdict_version += 1
+            self._verdict = None
+
+    def build_state_index(self, recorder_2_handlers: dict[int, List['StateHandler']]) -> None:
+        """
+        建立 状态记录器 -> 依赖该状态的处理器 的反向索引 包括子处理器
+        :param recorder_2_handlers: 索引 key为状态记录器的id 会直接往里面添加
+        :return:
+        """
+        if self.state_cal_tree is not None:
+            for recorder in self.state_cal_tree.get_usage_state_recorders():
+                handler_list = recorder_2_handlers.setdefault(id(recorder), [])
+                if self not in handler_list:
+                    handler_list.append(self)
+        if self.sub_handlers is not None:
+            for sub in self.sub_handlers:
+                sub.build_state_index(recorder_2_handlers)
+
+    def get_next_change_time(self, now: float) -> Optional[float]:
+        """
+        在状态没有新记录的情况下 计算判断结果下一次可能变化的时间
+        :param now: 当前时间
+        :return: 下一次可能变化的时间 不会因时间变化时返回None
+        """
+        result: Optional[float] = None
+        if self.state_cal_tree is not None:
+            result = self.state_cal_tree.get_next_change_time(now)
+        if self.sub_handlers is not None:
+            for sub in self.sub_handlers:
+                sub_time = sub.get_next_change_time(now)
+                if sub_time is not None and (result is None or sub_time < result):
+                    result = sub_time
+        return result
+
     def get_usage_states(self) -> set[str]:
         """
         获取使用的状态
@@ -0,0 +1,197 @@
+import threading
+
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from one_dragon.base.conditional_operation.state_recorder import StateRecord, StateRecorder
+
+
+class StateStore:
+
+    def __init__(self):
+        """
+        列式的状态存储 所有状态的 上次记录时间 和 上次记录值 分别存放在一个列表中 下标为状态id
+        互斥状态在登记时预先转换为下标 批量更新时在一次加锁内完成
+
+        列使用 list 而不是 numpy 数组
+        自动战斗每次批量更新只有几个到十几个状态 numpy 的调用开销比逐个赋值还要大
+        而且 list 扩容时对象不变 编译后的状态判断可以直接持有列的引用
+        需要整体计算时 使用 to_numpy 获取快照
+        """
+        self._lock = threading.Lock()
+        self._name_2_id: Dict[str, int] = {}
+        self.state_names: List[str] = []
+        self._mutex_ids: List[Tuple[int, ...]] = []  # 每个状态的互斥状态下标 没有时为空
+        self._mutex_registered: List[bool] = []  # 是否已经登记过互斥列表
+
+        self.last_record_time: List[float] = []  # -1代表还没有触发过 0代表被清除
+        self.last_value: List[Optional[int]] = []
+
+    @property
+    def state_cnt(self) -> int:
+        return len(self.state_names)
+
+    def get_state_id(self, state_name: str) -> Optional[int]:
+        """
+        :param state_name: 状态名称
+        :return: 状态id 未登记时返回None
+        """
+        return self._name_2_id.get(state_name)
+
+    def intern(self, state_name: str, mutex_list: Optional[List[str]] = None) -> int:
+        """
+        登记一个状态 已经登记过的直接返回id
+        :param state_name: 状态名称
+        :param mutex_list: 互斥的状态 只在第一次传入时生效
+        :return: 状态id
+        """
+        has_mutex = mutex_list is not None and len(mutex_list) > 0
+        state_id = self._name_2_id.get(state_name)
+        if state_id is not None and (not has_mutex or self._mutex_registered[state_id]):
+            return state_id
+
+        with self._lock:
+            state_id = self._intern_in_lock(state_name)
+            # 可能之前作为其它状态的互斥状态登记过 这时候还没有互斥列表
+            if has_mutex and not self._mutex_registered[state_id]:
+                self._mutex_ids[state_id] = tuple(self._intern_in_lock(i) for i in mutex_list)
+                self._mutex_registered[state_id] = True
+            return state_id
+
+    def _intern_in_lock(self, state_name: str) -> int:
+        state_id = self._name_2_id.get(state_name)
+        if state_id is not None:
+            return state_id
+
+        state_id = len(self.state_names)
+        self.state_names.append(state_name)
+        self._mutex_ids.append(())
+        self._mutex_registered.append(False)
+        self.last_record_time.append(-1)
+        self.last_value.append(None)
+        # 各列写入完成后 名称才可见
+        self._name_2_id[state_name] = state_id
+        return state_id
+
+    def get_mutex_ids(self, state_id: int) -> Tuple[int, ...]:
+        return self._mutex_ids[state_id]
+
+    def update(self, state_id: int, record: StateRecord) -> None:
+        """
+        更新单个状态 与 StateRecorder.update_state_record 一致 不处理互斥
+        """
+        with self._lock:
+            self._update_in_lock(state_id, record)
+
+    def clear(self, state_id: int) -> None:
+        """
+        清除单个状态 与 StateRecorder.clear_state_record 一致
+        """
+        with self._lock:
+            self._clear_in_lock(state_id)
+
+    def _update_in_lock(self, state_id: int, record: StateRecord) -> None:
+        if record.trigger_time_add is None or record.trigger_time_add == 0:
+            self.last_record_time[state_id] = record.trigger_time
+        elif self.last_record_time[state_id] != -1:  # 如果是不存在的状态则不做任何处理
+            self.last_record_time[state_id] -= record.trigger_time_add
+
+        value = self.last_value[state_id]
+        if value is None:
+            value = 0
+        if record.value is not None:
+            value = record.value
+        if record.value_add is not None:
+            value += record.value_add
+        self.last_value[state_id] = value
+
+    def _clear_in_lock(self, state_id: int) -> None:
+        if self.last_record_time[state_id] == -1:
+            # 原来没有出现过的话 就不重置
+            return
+        self.last_record_time[state_id] = 0
+        self.last_value[state_id] = None
+
+    def batch_update(self, state_ids: List[int], records: List[StateRecord]) -> List[int]:
+        """
+        批量更新状态 结果与逐个 更新状态+清除互斥状态 一致
+        整批只加一次锁 互斥状态直接使用预先计算好的下标
+        :param state_ids: 每个记录对应的状态id
+        :param records: 状态记录
+        :return: 可能发生变化的状态id 包括互斥状态 可能有重复
+        """
+        changed_ids: List[int] = list(state_ids)
+        last_record_time = self.last_record_time
+        last_value = self.last_value
+        with self._lock:
+            for state_id, record in zip(state_ids, records):
+                if record.is_clear:
+                    self._clear_in_lock(state_id)
+                    continue
+
+                self._update_in_lock(state_id, record)
+
+                mutex_ids = self._mutex_ids[state_id]
+                for mutex_id in mutex_ids:
+                    if last_record_time[mutex_id] != -1:
+                        last_record_time[mutex_id] = 0
+                        last_value[mutex_id] = None
+                changed_ids.extend(mutex_ids)
+
+        return changed_ids
+
+    def to_numpy(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        获取当前所有状态的快照 用于整体计算或展示
+        :return: 上次记录时间 和 上次记录值 值为空时是nan 下标为状态id
+        """
+        with self._lock:
+            record_time = np.asarray(self.last_record_time, dtype=np.float64)
+            value = np.asarray([np.nan if i is None else i for i in self.last_value], dtype=np.float64)
+        return record_time, value
+
+
+class StateStoreRecorder(StateRecorder):
+
+    def __init__(self, store: StateStore, state_name: str, mutex_list: Optional[List[str]] = None):
+        """
+        状态存储中一个状态的视图 数据都存放在 StateStore 中
+        对外的用法与 StateRecorder 一致
+        :param store: 状态存储
+        :param state_name: 状态名称
+        :param mutex_list: 互斥的状态
+        """
+        # 不调用父类初始化 避免覆盖存储中已有的值
+        self.store: StateStore = store
+        self.state_id: int = store.intern(state_name, mutex_list)
+        self.state_name: str = state_name
+        self.mutex_list: List[str] = mutex_list
+
+    @property
+    def last_record_time(self) -> float:
+        return self.store.last_record_time[self.state_id]
+
+    @last_record_time.setter
+    def last_record_time(self, new_value: float) -> None:
+        self.store.last_record_time[self.state_id] = new_value
+
+    @property
+    def last_value(self) -> Optional[int]:
+        return self.store.last_value[self.state_id]
+
+    @last_value.setter
+    def last_value(self, new_value: Optional[int]) -> None:
+        self.store.last_value[self.state_id] = new_value
+
+    def update_state_record(self, record: StateRecord) -> None:
+        self.store.update(self.state_id, record)
+
+    def clear_state_record(self) -> None:
+        self.store.clear(self.state_id)
+
+    def dispose(self) -> None:
+        """
+        数据在存储中 视图只需要解绑名称
+        """
+        self.state_name = None
+        self.mutex_list = None
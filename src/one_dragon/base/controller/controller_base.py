@@ -1,8 +1,11 @@
+import threading
 import time
+from collections import deque
 
 from cv2.typing import MatLike
-from typing import List
+from typing import Deque, List
 
+from one_dragon.base.controller.screenshot_frame_pool import ScreenshotFramePool
 from one_dragon.base.geometry.point import Point
 
 
@@ -21,9 +24,40 @@ class ControllerBase:
         """
         基础控制器的定义
         """
-        self.screenshot_history: List[ScreenshotWithTime] = []
+        self._screenshot_history_lock = threading.Lock()
+        self.screenshot_history: Deque[ScreenshotWithTime] = deque()  # 环形缓冲 最旧的在左边
         self.screenshot_alive_seconds: float = screenshot_alive_seconds  # 截图在内存的存活时间
         self.max_screenshot_cnt: int = max_screenshot_cnt  # 内存中最多保持的截图数量
+        self.frame_pool: ScreenshotFramePool = ScreenshotFramePool()  # 截图帧缓冲池 由子类在截图时使用
+
+    @property
+    def max_screenshot_cnt(self) -> int:
+        return self._max_screenshot_cnt
+
+    @max_screenshot_cnt.setter
+    def max_screenshot_cnt(self, new_value: int) -> None:
+        """
+        修改最多保持的截图数量 保留最新的截图
+        """
+        self._max_screenshot_cnt = new_value
+        with self._screenshot_history_lock:
+            max_len = new_value if new_value > 0 else 0
+            self.screenshot_history = deque(self.screenshot_history, maxlen=max_len)
+
+    def get_frames_since(self, since_time: float) -> List[ScreenshotWithTime]:
+        """
+        获取某个时间之后的截图历史 返回的是历史中的原对象 不做复制 使用方不应修改图片
+        :param since_time: 时间 只返回截图时间大于该值的
+        :return: 按截图时间升序的截图
+        """
+        with self._screenshot_history_lock:
+            result: List[ScreenshotWithTime] = []
+            for item in reversed(self.screenshot_history):
+                if item.create_time <= since_time:
+                    break
+                result.append(item)
+        result.reverse()
+        return result
 
     def init_before_context_run(self) -> bool:
         """
@@ -62,13 +96,12 @@ class ControllerBase:
         fix_screen = self.fill_uid_black(screen)
 
         if self.max_screenshot_cnt > 0:
-            self.screenshot_history.append(ScreenshotWithTime(fix_screen, screenshot_time))
-            while len(self.screenshot_history) > self.max_screenshot_cnt:
-                self.screenshot_history.pop(0)
+            with self._screenshot_history_lock:
+                history = self.screenshot_history
+                history.append(ScreenshotWithTime(fix_screen, screenshot_time))  # deque有maxlen 超出数量时自动丢弃最旧的
 
-            while (len(self.screenshot_history) > 0
-                and screenshot_time - self.screenshot_history[0].create_time > self.screenshot_alive_seconds):
-                self.screenshot_history.pop(0)
+                while len(history) > 0 and screenshot_time - history[0].create_time > self.screenshot_alive_seconds:
+                    history.popleft()
 
         return screenshot_time, fix_screen
 
@@ -137,11 +137,11 @@ class PcControllerBase(ControllerBase):
                 try:
                     import mss
                     with mss.mss() as sct:
-                        screenshot = cv2.cvtColor(np.array(sct.grab(monitor)), cv2.COLOR_BGRA2RGB)
+                        return self._convert_mss_screenshot(sct.grab(monitor))
                 except Exception:
-                    pass
+                    return None
             else:
-                screenshot = cv2.cvtColor(np.array(self.sct.grab(monitor)), cv2.COLOR_BGRA2RGB)
+                return self._convert_mss_screenshot(self.sct.grab(monitor))
         else:
             img: Image = pyautogui.screenshot(region=(left, top, width, height))
             screenshot = np.array(img)
@@ -153,6 +153,24 @@ class PcControllerBase(ControllerBase):
 
         return result
 
+    def _convert_mss_screenshot(self, shot) -> MatLike:
+        """
+        将mss的截图转化为RGB图片 并缩放到默认分辨率
+        直接在mss的原始数据上建立视图 转换结果写入帧缓冲池 避免中间的内存分配和复制
+        :param shot: mss的截图结果
+        :return: 截图
+        """
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape((shot.height, shot.width, 4))
+        if self.game_win.is_win_scale:
+            rgb = self.frame_pool.acquire((shot.height, shot.width, 3))
+            cv2.cvtColor(bgra, cv2.COLOR_BGRA2RGB, dst=rgb)
+            result = self.frame_pool.acquire((self.standard_height, self.standard_width, 3))
+            cv2.resize(rgb, (self.standard_width, self.standard_height), dst=result)
+        else:
+            result = self.frame_pool.acquire((shot.height, shot.width, 3))
+            cv2.cvtColor(bgra, cv2.COLOR_BGRA2RGB, dst=result)
+        return result
+
     def scroll(self, down: int, pos: Point = None):
         """
         向下滚动
@@ -0,0 +1,60 @@
+import sys
+import threading
+
+import numpy as np
+from typing import Dict, List, Tuple
+
+
+class ScreenshotFramePool:
+
+    def __init__(self, max_frame_per_shape: int = 8):
+        """
+        截图帧缓冲池 复用同尺寸的图片内存 减少每帧截图的内存分配
+
+        只有当池外已经没有任何引用时(包括截图历史、上下文中保存的截图、截图的切片视图等) 缓冲区才会被复用
+        因此拿到截图的一方无需关心复用 正常持有引用即可保证内容不被覆盖
+        :param max_frame_per_shape: 每种尺寸最多保留的缓冲区数量 超过后直接分配新内存 不再入池
+        """
+        self.max_frame_per_shape: int = max_frame_per_shape
+        self._frame_map: Dict[Tuple[Tuple[int, ...], str], List[np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        获取一个可写入的缓冲区 内容未初始化
+        :param shape: 图片形状
+        :param dtype: 数据类型
+        :return: 缓冲区
+        """
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            frame_list = self._frame_map.get(key)
+            if frame_list is None:
+                frame_list = []
+                self._frame_map[key] = frame_list
+
+            for i in range(len(frame_list)):
+                # 引用只有 列表本身 + getrefcount的参数 说明池外已经没人使用
+                if sys.getrefcount(frame_list[i]) <= 2:
+                    return frame_list[i]
+
+            frame = np.empty(key[0], dtype=dtype)
+            if len(frame_list) < self.max_frame_per_shape:
+                frame_list.append(frame)
+            return frame
+
+    def clear(self) -> None:
+        """
+        释放池中的所有缓冲区
+        :return:
+        """
+        with self._lock:
+            self._frame_map.clear()
+
+    @property
+    def frame_cnt(self) -> int:
+        """
+        :return: 池中的缓冲区数量
+        """
+        with self._lock:
+            return sum(len(i) for i in self._frame_map.values())
@@ -1,6 +1,7 @@
 # coding: utf-8
 import os
-from typing import List, Dict, Type
+import threading
+from typing import List, Dict, Tuple, Type
 
 import cv2
 import numpy as np
@@ -17,6 +18,7 @@ from one_dragon.base.cv_process.steps import (
 )
 from one_dragon.base.operation.one_dragon_context import OneDragonContext
 from one_dragon.utils import os_utils
+from one_dragon.utils.log_utils import log
 
 
 class CvService:
@@ -61,6 +63,10 @@ class CvService:
             'OCR识别': CvStepOcr,
         }
 
+        # 已编译的流水线 key=流水线名称 value=(文件修改时间, 流水线) 文件修改后自动重新加载
+        self._pipeline_cache: Dict[str, Tuple[float, CvPipeline]] = {}
+        self._pipeline_cache_lock = threading.Lock()
+
         if not os.path.exists(self.PIPELINE_DIR):
             os.makedirs(self.PIPELINE_DIR)
         if not os.path.exists(self.TEMPLATE_DIR):
@@ -74,7 +80,7 @@ class CvService:
         :param debug_mode: 是否为调试模式
         :return: 包含所有结果的上下文
         """
-        pipeline = self.load_pipeline(pipeline_name)
+        pipeline = self.get_pipeline(pipeline_name)
         if pipeline is None:
             ctx = CvPipelineContext(image, service=self, debug_mode=debug_mode)
             ctx.error_str = f"流水线 {pipeline_name} 加载失败"
@@ -82,6 +88,41 @@ class CvService:
 
         return pipeline.execute(image, service=self, debug_mode=debug_mode)
 
+    def get_pipeline(self, name: str) -> CvPipeline | None:
+        """
+        获取已编译的流水线 优先使用缓存 文件有修改时重新加载
+        返回的流水线是共用的 不应该修改 需要编辑时使用 load_pipeline
+        :param name: 流水线名称
+        """
+        file_path = os.path.join(self.PIPELINE_DIR, f"{name}.yml")
+        try:
+            mtime = os.path.getmtime(file_path)
+        except OSError:
+            self._pipeline_cache.pop(name, None)
+            return None
+
+        cache = self._pipeline_cache.get(name)
+        if cache is not None and cache[0] == mtime:
+            return cache[1]
+
+        with self._pipeline_cache_lock:
+            cache = self._pipeline_cache.get(name)
+            if cache is not None and cache[0] == mtime:
+                return cache[1]
+
+            pipeline = self.load_pipeline(name)
+            if pipeline is not None:
+                self._pipeline_cache[name] = (mtime, pipeline)
+            return pipeline
+
+    def warmup(self) -> None:
+        """
+        预加载所有流水线 避免第一次运行时才解析文件
+        """
+        for name in self.get_pipeline_names():
+            if self.get_pipeline(name) is None:
+                log.error(f'流水线 {name} 加载失败')
+
     def get_pipeline_names(self) -> List[str]:
         """
         获取所有已保存流水线的名称
@@ -106,12 +147,13 @@ class CvService:
         file_path = os.path.join(self.PIPELINE_DIR, f"{name}.yml")
         with open(file_path, 'w', encoding='utf-8') as f:
             yaml.dump(data_to_save, f, allow_unicode=True, sort_keys=False)
+        self._pipeline_cache.pop(name, None)
 
         return True
 
     def load_pipeline(self, name: str) -> CvPipeline | None:
         """
-        从文件加载流水线
+        从文件加载流水线 每次都返回新的实例
         :param name: 流水线名称
         """
         file_path = os.path.join(self.PIPELINE_DIR, f"{name}.yml")
@@ -146,6 +188,7 @@ class CvService:
         file_path = os.path.join(self.PIPELINE_DIR, f"{name}.yml")
         if os.path.exists(file_path):
             os.remove(file_path)
+        self._pipeline_cache.pop(name, None)
 
     def rename_pipeline(self, old_name: str, new_name: str):
         """
@@ -161,6 +204,8 @@ class CvService:
 
         if os.path.exists(old_file_path) and not os.path.exists(new_file_path):
             os.rename(old_file_path, new_file_path)
+        self._pipeline_cache.pop(old_name, None)
+        self._pipeline_cache.pop(new_name, None)
 
     def get_template_names(self) -> List[str]:
         """
@@ -14,7 +14,9 @@ class CvPipelineContext:
         self.source_image: np.ndarray = source_image  # 原始输入图像 (只读)
         self.service: 'CvService' = service
         self.debug_mode: bool = debug_mode  # 是否为调试模式
-        self.display_image: np.ndarray = source_image.copy()  # 用于UI显示的主图像，可被修改
+        # 用于UI显示的主图像，可被修改
+        # 非调试模式下先直接引用原图 步骤需要原地修改时再复制 见 make_display_image_writable
+        self.display_image: np.ndarray = source_image.copy() if debug_mode else source_image
         self.crop_offset: tuple[int, int] = (0, 0)  # display_image 左上角相对于 source_image 的坐标偏移
         self.mask_image: np.ndarray = None  # 二值掩码图像
         self.contours: List[np.ndarray] = []  # 检测到的轮廓列表
@@ -50,6 +52,13 @@ class CvPipelineContext:
     def ocr(self):
         return self.service.ocr if self.service else None
 
+    def make_display_image_writable(self) -> None:
+        """
+        保证 display_image 不与原图共享内存 在原地修改 display_image 前调用
+        """
+        if np.may_share_memory(self.display_image, self.source_image):
+            self.display_image = self.display_image.copy()
+
     def get_absolute_rects(self) -> List[tuple[int, int, int, int]]:
         """
         获取所有轮廓的绝对坐标矩形框(x1, y1, x2, y2格式)
@@ -48,6 +48,7 @@ class CvTemplateMatchingStep(CvStep):
             bottom_right = (top_left[0] + w, top_left[1] + h)
             
             # 在显示图像上绘制矩形
+            context.make_display_image_writable()
             cv2.rectangle(context.display_image, top_left, bottom_right, (0, 255, 255), 2)
             context.analysis_results.append(f"找到匹配，置信度 {max_val:.4f} at {top_left}")
         else:
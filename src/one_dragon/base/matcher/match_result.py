@@ -1,9 +1,21 @@
 from typing import List, Optional, Any
 
+import numpy as np
+
 from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
 
 
+# 匹配结果的紧凑存储格式 用于批量产生的结果 按需再转成 MatchResult
+MATCH_RESULT_DTYPE = np.dtype([
+    ('confidence', np.float32),
+    ('x', np.int32),
+    ('y', np.int32),
+    ('w', np.int32),
+    ('h', np.int32),
+])
+
+
 class MatchResult:
 
     def __init__(self, c, x, y, w, h, template_scale: float = 1, data: Any = None):
@@ -48,8 +60,77 @@ class MatchResultList:
         多个识别结果的组合 适用于一张图中有多个目标结果
         """
         self.only_best: bool = only_best
-        self.arr: List[MatchResult] = []
-        self.max: Optional[MatchResult] = None
+        self._arr: List[MatchResult] = []
+        self._max: Optional[MatchResult] = None
+        self._data: Optional[np.ndarray] = None  # 还没转换成 MatchResult 的原始数据
+
+    @classmethod
+    def from_array(cls, data: np.ndarray, only_best: bool = False) -> "MatchResultList":
+        """
+        使用 MATCH_RESULT_DTYPE 的结构化数组构建 只有在访问具体结果时才会创建 MatchResult
+        :param data: 结构化数组 调用方需保证已经完成合并
+        :param only_best: 只保留最好的结果
+        :return:
+        """
+        mrl = cls(only_best=only_best)
+        if len(data) == 0:
+            return mrl
+        if only_best:
+            data = data[[int(np.argmax(data['confidence']))]]
+        mrl._data = data
+        return mrl
+
+    @staticmethod
+    def _to_match_result(item) -> MatchResult:
+        return MatchResult(item['confidence'], item['x'], item['y'], item['w'], item['h'])
+
+    def _materialize(self) -> None:
+        """
+        把原始数据转换成 MatchResult 已经创建过的最大值对象会被复用
+        """
+        data = self._data
+        if data is None:
+            return
+        self._data = None
+        max_idx = int(np.argmax(data['confidence']))
+        arr: List[MatchResult] = []
+        for idx, item in enumerate(data):
+            if idx == max_idx and self._max is not None:
+                arr.append(self._max)
+            else:
+                arr.append(self._to_match_result(item))
+        self._arr = arr
+        self._max = arr[max_idx]
+
+    @property
+    def arr(self) -> List[MatchResult]:
+        self._materialize()
+        return self._arr
+
+    @arr.setter
+    def arr(self, value: List[MatchResult]) -> None:
+        self._data = None
+        self._arr = value
+
+    @property
+    def max(self) -> Optional[MatchResult]:
+        if self._data is not None and self._max is None:
+            self._max = self._to_match_result(self._data[int(np.argmax(self._data['confidence']))])
+        return self._max
+
+    @max.setter
+    def max(self, value: Optional[MatchResult]) -> None:
+        self._materialize()
+        self._max = value
+
+    @property
+    def data(self) -> np.ndarray:
+        """
+        :return: 所有结果的结构化数组 MATCH_RESULT_DTYPE
+        """
+        if self._data is not None:
+            return self._data
+        return np.array([(i.confidence, i.x, i.y, i.w, i.h) for i in self._arr], dtype=MATCH_RESULT_DTYPE)
 
     def __repr__(self):
         return '[%s]' % ', '.join(str(i) for i in self.arr)
@@ -67,6 +148,8 @@ class MatchResultList:
             raise StopIteration
 
     def __len__(self):
+        if self._data is not None:
+            return len(self._data)
         return len(self.arr)
 
     def append(self, a: MatchResult, auto_merge: bool = True, merge_distance: float = 10):
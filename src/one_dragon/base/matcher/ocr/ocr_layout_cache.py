@@ -0,0 +1,193 @@
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+from cv2.typing import MatLike
+
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.base.matcher.match_result import MatchResult, MatchResultList
+from one_dragon.base.matcher.ocr.ocr_matcher import OcrMatcher
+
+
+@dataclass
+class OcrLayoutEntry:
+    """文本布局缓存条目"""
+    image_shape: tuple  # 检测时的图片形状 形状变化后布局失效
+    rect_list: List[Rect]  # 检测到的文本框
+    confident_miss_cnt: int = 0  # 连续可信但不满足判断的次数
+
+
+@dataclass
+class OcrLayoutStats:
+    """文本布局缓存统计"""
+    skip: int = 0  # 跳过检测 直接识别成功的次数
+    fallback: int = 0  # 有布局 但识别结果不可信 或连续多次不满足判断 回退到检测的次数
+    confident_miss: int = 0  # 跳过检测 识别结果可信但不满足判断 直接作为不匹配返回的次数
+    detect: int = 0  # 运行检测的次数 包括回退
+    entry_cnt: int = 0  # 当前缓存的布局数量
+
+    @property
+    def skip_rate(self) -> float:
+        skip = self.skip + self.confident_miss
+        total = skip + self.detect
+        return 0 if total == 0 else skip / total
+
+
+class OcrLayoutCache:
+    """
+    文本布局缓存 用于文本位置固定的区域
+    区域第一次检测并判断成功后 记录检测到的文本框位置
+    之后只对这些位置运行识别模型 跳过最耗时的检测模型
+    识别置信度下降时 回退到完整的检测+识别
+    所有文本框都可信但不满足判断时 通常只是当前不在这个画面 直接作为不匹配返回 不再检测
+    代价是文本换了位置时 可能要连续 recheck_after_miss 次才会重新检测 期间判断为不匹配
+    """
+
+    def __init__(self, ocr_matcher: OcrMatcher, min_confidence: float = 0.8, recheck_after_miss: int = 10):
+        """
+        :param ocr_matcher: OCR匹配器
+        :param min_confidence: 跳过检测时 所有文本框的识别置信度都不低于这个值才采用
+        :param recheck_after_miss: 连续多少次可信但不满足判断后 重新检测一次 用于发现文本位置的变化
+        """
+        self.ocr_matcher: OcrMatcher = ocr_matcher
+        self.min_confidence: float = min_confidence
+        self.recheck_after_miss: int = recheck_after_miss
+
+        # 使用弱引用 画面配置重新加载后 旧区域的布局自动释放
+        self._layout: weakref.WeakKeyDictionary[Any, OcrLayoutEntry] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats = OcrLayoutStats()
+
+    def run_ocr(
+            self,
+            key: Any,
+            image: MatLike,
+            is_valid: Callable[[dict[str, MatchResultList]], bool],
+    ) -> dict[str, MatchResultList]:
+        """
+        对一个区域的图片进行OCR 有布局时跳过检测
+        :param key: 区域 通常是 ScreenArea
+        :param image: 区域的图片
+        :param is_valid: 判断识别结果是否满足要求 满足时才记录布局或采用跳过检测的结果
+        :return: {key_word: []} 与 OcrMatcher.run_ocr 一致
+        """
+        return self.run_ocr_batch([key], [image], [is_valid])[0]
+
+    def run_ocr_batch(
+            self,
+            key_list: List[Any],
+            image_list: List[MatLike],
+            is_valid_list: List[Callable[[dict[str, MatchResultList]], bool]],
+    ) -> List[dict[str, MatchResultList]]:
+        """
+        对多个区域的图片进行OCR 有布局的区域一起识别 需要检测的区域一起检测
+        :param key_list: 区域列表
+        :param image_list: 每个区域的图片
+        :param is_valid_list: 每个区域判断识别结果是否满足要求的方法
+        :return: 每个区域的 {key_word: []}
+        """
+        result_list: List[Optional[dict[str, MatchResultList]]] = [None] * len(key_list)
+
+        cached_idx_list: List[int] = []
+        cached_entry_list: List[OcrLayoutEntry] = []
+        with self._lock:
+            for idx, (key, image) in enumerate(zip(key_list, image_list)):
+                entry = self._layout.get(key)
+                if entry is not None and entry.image_shape == image.shape:
+                    cached_idx_list.append(idx)
+                    cached_entry_list.append(entry)
+
+        skip_cnt: int = 0
+        fallback_cnt: int = 0
+        confident_miss_cnt: int = 0
+        if len(cached_idx_list) > 0:
+            rec_result_list = self.ocr_matcher.run_ocr_in_rects_batch(
+                [image_list[i] for i in cached_idx_list], [i.rect_list for i in cached_entry_list]
+            )
+            if rec_result_list is not None:
+                for idx, entry, rec_result in zip(cached_idx_list, cached_entry_list, rec_result_list):
+                    result_map = self._to_result_map(entry.rect_list, rec_result)
+                    if result_map is None:
+                        fallback_cnt += 1
+                        continue
+
+                    if is_valid_list[idx](result_map):
+                        entry.confident_miss_cnt = 0
+                        result_list[idx] = result_map
+                        skip_cnt += 1
+                        continue
+
+                    entry.confident_miss_cnt += 1
+                    if entry.confident_miss_cnt >= self.recheck_after_miss:
+                        entry.confident_miss_cnt = 0
+                        fallback_cnt += 1
+                    else:
+                        result_list[idx] = result_map
+                        confident_miss_cnt += 1
+
+        detect_idx_list: List[int] = [i for i in range(len(key_list)) if result_list[i] is None]
+        if len(detect_idx_list) > 0:
+            detect_result_list = self.ocr_matcher.run_ocr_batch([image_list[i] for i in detect_idx_list])
+        else:
+            detect_result_list = []
+
+        to_update: List[Tuple[Any, OcrLayoutEntry]] = []
+        for idx, result_map in zip(detect_idx_list, detect_result_list):
+            result_list[idx] = result_map
+            # 检测后仍不满足时 可能只是当前不在这个画面 保留原来的布局
+            if is_valid_list[idx](result_map):
+                to_update.append((key_list[idx], self._to_layout_entry(image_list[idx], result_map)))
+
+        with self._lock:
+            for key, entry in to_update:
+                self._layout[key] = entry
+            self._stats.skip += skip_cnt
+            self._stats.fallback += fallback_cnt
+            self._stats.confident_miss += confident_miss_cnt
+            self._stats.detect += len(detect_idx_list)
+
+        return result_list
+
+    def _to_result_map(self, rect_list: List[Rect],
+                       rec_result: List[Tuple[str, float]]) -> Optional[dict[str, MatchResultList]]:
+        """
+        将跳过检测的识别结果转换成 {key_word: []}
+        :return: 有文本框置信度过低时返回None
+        """
+        if len(rec_result) != len(rect_list):
+            return None
+        result_map: dict[str, MatchResultList] = {}
+        for rect, (text, score) in zip(rect_list, rec_result):
+            if score < self.min_confidence:
+                return None
+            if text not in result_map:
+                result_map[text] = MatchResultList(only_best=False)
+            result_map[text].append(MatchResult(score, rect.x1, rect.y1, rect.width, rect.height, data=text))
+        return result_map
+
+    @staticmethod
+    def _to_layout_entry(image: MatLike, result_map: dict[str, MatchResultList]) -> OcrLayoutEntry:
+        rect_list: List[Rect] = []
+        for mrl in result_map.values():
+            for mr in mrl:
+                rect_list.append(mr.rect)
+        return OcrLayoutEntry(image_shape=image.shape, rect_list=rect_list)
+
+    def get_stats(self) -> OcrLayoutStats:
+        """
+        :return: 统计信息的快照
+        """
+        with self._lock:
+            return OcrLayoutStats(
+                skip=self._stats.skip,
+                fallback=self._stats.fallback,
+                confident_miss=self._stats.confident_miss,
+                detect=self._stats.detect,
+                entry_cnt=len(self._layout),
+            )
+
+    def clear(self) -> None:
+        """清空所有布局"""
+        with self._lock:
+            self._layout.clear()
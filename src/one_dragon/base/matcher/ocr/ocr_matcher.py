@@ -1,6 +1,7 @@
 from cv2.typing import MatLike
-from typing import Optional, Callable
+from typing import Optional, Callable, List, Tuple
 
+from one_dragon.base.geometry.rectangle import Rect
 from one_dragon.base.matcher.match_result import MatchResultList
 from one_dragon.base.matcher.ocr.ocr_match_result import OcrMatchResult
 
@@ -33,6 +34,39 @@ class OcrMatcher:
         """
         pass
 
+    def run_ocr_single_line_batch(self, image_list: List[MatLike], threshold: float = 0) -> List[str]:
+        """
+        多张单行文本图片一起识别 结果与逐张调用 run_ocr_single_line(strict_one_line=True) 一致
+        子类可以合并成一次模型调用 默认逐张识别
+        :param image_list: 图片列表
+        :param threshold: 阈值
+        :return: 每张图片的识别结果 顺序与传入一致
+        """
+        return [self.run_ocr_single_line(image, threshold) for image in image_list]
+
+    def run_ocr_batch(self, image_list: List[MatLike], threshold: float = 0,
+                      merge_line_distance: float = -1) -> List[dict[str, MatchResultList]]:
+        """
+        多张图片一起OCR 结果与逐张调用 run_ocr 一致
+        子类可以合并成一次模型调用 默认逐张识别
+        :param image_list: 图片列表
+        :param threshold: 匹配阈值
+        :param merge_line_distance: 多少行距内合并结果 -1为不合并
+        :return: 每张图片的 {key_word: []} 顺序与传入一致
+        """
+        return [self.run_ocr(image, threshold, merge_line_distance=merge_line_distance) for image in image_list]
+
+    def run_ocr_in_rects_batch(self, image_list: List[MatLike],
+                               rect_list_list: List[List[Rect]]) -> Optional[List[List[Tuple[str, float]]]]:
+        """
+        跳过检测模型 直接识别每张图片中给定位置的文本 裁剪方式与检测后的裁剪一致
+        用于文本位置固定的区域 见 OcrLayoutCache
+        :param image_list: 图片列表
+        :param rect_list_list: 每张图片中需要识别的位置
+        :return: 每张图片中每个位置的 (文本, 置信度) 不支持时返回None
+        """
+        return None
+
     def run_ocr(self, image: MatLike, threshold: float = None,
                 merge_line_distance: float = -1) -> dict[str, MatchResultList]:
         """
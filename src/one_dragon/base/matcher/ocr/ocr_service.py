@@ -1,4 +1,7 @@
+import hashlib
+import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 
 import cv2
@@ -18,59 +21,141 @@ from one_dragon.utils.log_utils import log
 @dataclass(frozen=True)
 class OcrCacheEntry:
     """OCR缓存条目"""
-    image_id: int  # 图片在内存中的ID
-    image: MatLike  # 将图片也缓存起来 防止旧图片没引用被回收 导致出现新图片ID与旧图片重复
+    cache_key: tuple  # 缓存键 (图片摘要, 颜色范围)
+    image: MatLike  # 原图 用于判断子区域是否未变化
     ocr_result_list: list[OcrMatchResult]  # OCR识别结果
     create_time: float  # 创建时间
     color_range: list[list[int]] | None  # 颜色范围
+    nbytes: int  # 缓存占用的字节数
+
+
+@dataclass
+class OcrCacheStats:
+    """OCR缓存统计"""
+    hit: int = 0  # 整图命中次数
+    sub_rect_hit: int = 0  # 子区域未变化而复用的次数
+    miss: int = 0  # 未命中次数
+    evict: int = 0  # 淘汰次数
+    entry_cnt: int = 0  # 当前缓存条目数
+    total_bytes: int = 0  # 当前缓存占用字节数
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hit + self.sub_rect_hit + self.miss
+        return 0 if total == 0 else (self.hit + self.sub_rect_hit) / total
 
 
 class OcrService:
     """
     OCR服务
-    - 提供缓存
+    - 提供缓存 按图片内容摘要+颜色范围缓存 相同画面的不同截图对象也能命中
+    - 提供子区域复用 只识别某个区域时 如果该区域与上一帧相比没有变化 则直接复用上一帧的结果
     - 提供并发识别 (未实现)
 
     缺点：
     - 全图识别后，识别得到的文本无法按选定区域进行精准切割。
       - 例如 [图标]真实文本，会将图标错误识别成某些文本拼在一起，无法通过选择区域精准识别真实文本部分.
     """
-    
-    def __init__(self, ocr_matcher: OcrMatcher, max_cache_size: int = 5):
+
+    def __init__(
+            self,
+            ocr_matcher: OcrMatcher,
+            max_cache_size: int = 5,
+            max_cache_bytes: int = 64 * 1024 * 1024,
+            digest_stride: int = 1,
+            reuse_sub_rect: bool = True,
+    ):
         """
         初始化OCR服务
-        
+
         Args:
             ocr_matcher: OCR匹配器实例
             max_cache_size: 最大缓存条目数
+            max_cache_bytes: 缓存最多占用的字节数 主要是缓存的原图
+            digest_stride: 计算图片摘要时的降采样步长 1为使用全图 越大越快但越容易把细微变化视为相同画面
+                大于1时 落在采样点之间的细小文字变化(例如 -/+ l/i) 会命中其他画面的结果 默认使用全图
+                同一个图片对象的摘要只计算一次
+            reuse_sub_rect: 指定区域识别时 区域内容未变化是否复用上一帧的结果
         """
         self.ocr_matcher = ocr_matcher
         self.max_cache_size = max_cache_size
-        
-        # 缓存存储：key=图片ID，value为缓存条目
-        self._cache: dict[int, list[OcrCacheEntry]] = {}
-        self._cache_list: list[OcrCacheEntry] = []
+        self.max_cache_bytes = max_cache_bytes
+        self.digest_stride = max(1, digest_stride)
+        self.reuse_sub_rect = reuse_sub_rect
+
+        # 缓存存储：key=(图片摘要, 颜色范围) value=缓存条目 按使用时间排序 最近使用的在末尾
+        self._cache: OrderedDict[tuple, OcrCacheEntry] = OrderedDict()
+        self._cache_bytes: int = 0
+        self._cache_lock = threading.Lock()
+        self._stats = OcrCacheStats()
+
+        # 图片摘要的缓存：key=id(图片) value=(图片, 摘要) 持有图片引用 保证id在缓存期间不会被复用
+        # 同一帧截图通常会被多个识别方法使用 只需计算一次摘要
+        self._digest_cache: OrderedDict[int, tuple[MatLike, bytes]] = OrderedDict()
+
+    def _get_image_digest(self, image: MatLike) -> bytes:
+        """
+        获取图片内容摘要 同一个图片对象只计算一次
+        因此传入的图片在识别后不应该原地修改
+
+        Args:
+            image: 输入图片
+
+        Returns:
+            摘要
+        """
+        key = id(image)
+        with self._cache_lock:
+            cached = self._digest_cache.get(key)
+            if cached is not None and cached[0] is image:
+                self._digest_cache.move_to_end(key)
+                return cached[1]
+
+        digest = self._cal_image_digest(image)
+        with self._cache_lock:
+            self._digest_cache[key] = (image, digest)
+            self._digest_cache.move_to_end(key)
+            while len(self._digest_cache) > self.max_cache_size:
+                self._digest_cache.popitem(last=False)
+        return digest
+
+    def _cal_image_digest(self, image: MatLike) -> bytes:
+        """
+        计算图片内容摘要
+
+        Args:
+            image: 输入图片
+
+        Returns:
+            摘要
+        """
+        if self.digest_stride > 1:
+            image = image[::self.digest_stride, ::self.digest_stride]
+        image = np.ascontiguousarray(image)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(str((image.shape, image.dtype.str)).encode())
+        h.update(image.data)
+        return h.digest()
+
+    @staticmethod
+    def _get_color_range_key(color_range: list[list[int]] | None) -> tuple | None:
+        if color_range is None:
+            return None
+        return tuple(tuple(i) for i in color_range)
 
     def _clean_expired_cache(self) -> None:
         """
-        清除过期缓存
+        按条目数和占用字节数淘汰最久未使用的缓存 需要在持有锁时调用
         Returns:
 
         """
-        while len(self._cache_list) > self.max_cache_size:
-            oldest_entry = self._cache_list.pop(0)
-            image_id = oldest_entry.image_id
-
-            if image_id in self._cache:
-                # 从与 image_id 关联的列表中移除特定的条目
-                try:
-                    self._cache[image_id].remove(oldest_entry)
-                    # 如果这个 image_id 的列表现在为空，则从字典中移除该键
-                    if not self._cache[image_id]:
-                        self._cache.pop(image_id)
-                except ValueError:
-                    # 在罕见的并发场景下，如果条目已经被移除，可能会发生这种情况，但可以安全地忽略。
-                    pass
+        while len(self._cache) > 0 and (
+                len(self._cache) > self.max_cache_size
+                or self._cache_bytes > self.max_cache_bytes
+        ):
+            _, oldest_entry = self._cache.popitem(last=False)
+            self._cache_bytes -= oldest_entry.nbytes
+            self._stats.evict += 1
 
     def _apply_color_filter(self, image: MatLike, color_range: list[list[int]]) -> MatLike:
         """
@@ -92,28 +177,55 @@ class OcrService:
         return cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
 
     def _get_ocr_result_list_from_cache(
+            self,
+            cache_key: tuple,
+    ) -> OcrCacheEntry | None:
+        """
+        从缓存中获取OCR结果 需要在持有锁时调用
+        Args:
+            cache_key: 缓存键
+
+        Returns:
+            缓存条目
+        """
+        cache_entry = self._cache.get(cache_key)
+        if cache_entry is not None:
+            self._cache.move_to_end(cache_key)
+        return cache_entry
+
+    def _get_sub_rect_entry_from_cache(
             self,
             image: MatLike,
-            color_range: list[list[int]] | None = None,
+            color_range: list[list[int]] | None,
+            rect: Rect,
     ) -> OcrCacheEntry | None:
         """
-        从缓存中获取OCR结果
+        找最近一个同尺寸、同颜色范围 且指定区域内容完全一致的缓存 需要在持有锁时调用
         Args:
             image: 输入图片
-            color_range: 颜色范围过滤 [[lower], [upper]]
+            color_range: 颜色范围过滤
+            rect: 识别的区域
 
         Returns:
             缓存条目
         """
-        image_id = id(image)
-        cache_list = self._cache.get(image_id)
-        if cache_list is None:
+        x1, y1 = max(0, rect.x1), max(0, rect.y1)
+        x2, y2 = min(image.shape[1], rect.x2), min(image.shape[0], rect.y2)
+        if x1 >= x2 or y1 >= y2:
             return None
-
-        for cache_entry in cache_list:
-            # Python 的列表 == 操作符会自动处理嵌套结构和值的比较 包括None
-            if cache_entry.color_range == color_range:
+        part = image[y1:y2, x1:x2]
+
+        for cache_key in reversed(self._cache):
+            cache_entry = self._cache[cache_key]
+            if cache_entry.color_range != color_range:
+                continue
+            if cache_entry.image.shape != image.shape or cache_entry.image.dtype != image.dtype:
+                continue
+            if np.array_equal(cache_entry.image[y1:y2, x1:x2], part):
+                self._cache.move_to_end(cache_key)
                 return cache_entry
+            # 只比较最近的一帧 更早的画面通常已经过时
+            break
 
         return None
 
@@ -139,12 +251,16 @@ class OcrService:
             ocr_result_list: OCR识别结果列表
         """
         # 生成缓存键
-        image_id = id(image)
+        cache_key = (self._get_image_digest(image), self._get_color_range_key(color_range))
 
-        cache_entity = self._get_ocr_result_list_from_cache(
-            image=image,
-            color_range=color_range,
-        )
+        with self._cache_lock:
+            cache_entity = self._get_ocr_result_list_from_cache(cache_key)
+            if cache_entity is not None:
+                self._stats.hit += 1
+            elif rect is not None and self.reuse_sub_rect:
+                cache_entity = self._get_sub_rect_entry_from_cache(image, color_range, rect)
+                if cache_entity is not None:
+                    self._stats.sub_rect_hit += 1
 
         # 检查缓存
         if cache_entity is not None:
@@ -158,17 +274,21 @@ class OcrService:
 
             # 存储到缓存
             cache_entry = OcrCacheEntry(
+                cache_key=cache_key,
+                image=image,
                 ocr_result_list=ocr_result_list,
                 create_time=time.time(),
                 color_range=color_range,
-                image_id=image_id,
-                image=image,
+                nbytes=image.nbytes,
             )
-            if image_id not in self._cache:
-                self._cache[image_id] = []
-            self._cache[image_id].append(cache_entry)
-            self._cache_list.append(cache_entry)
-            self._clean_expired_cache()
+            with self._cache_lock:
+                self._stats.miss += 1
+                old_entry = self._cache.pop(cache_key, None)
+                if old_entry is not None:
+                    self._cache_bytes -= old_entry.nbytes
+                self._cache[cache_key] = cache_entry
+                self._cache_bytes += cache_entry.nbytes
+                self._clean_expired_cache()
 
         if rect is not None:
             # 过滤出指定区域内的结果
@@ -262,7 +382,27 @@ class OcrService:
         target_idx = str_utils.find_best_match_by_difflib(target_word, ocr_word_list, cutoff=threshold)
         return target_idx is not None and target_idx >= 0
 
+    def get_cache_stats(self) -> OcrCacheStats:
+        """
+        获取缓存统计
+
+        Returns:
+            统计信息的快照
+        """
+        with self._cache_lock:
+            return OcrCacheStats(
+                hit=self._stats.hit,
+                sub_rect_hit=self._stats.sub_rect_hit,
+                miss=self._stats.miss,
+                evict=self._stats.evict,
+                entry_cnt=len(self._cache),
+                total_bytes=self._cache_bytes,
+            )
+
     def clear_cache(self) -> None:
         """清空所有缓存"""
-        self._cache.clear()
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+            self._digest_cache.clear()
         log.debug("OCR缓存已清空")
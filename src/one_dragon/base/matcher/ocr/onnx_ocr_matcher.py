@@ -1,14 +1,17 @@
 import os
 import time
 from logging import DEBUG
-from typing import Callable, List, Optional
+from typing import Callable, List, Optional, Tuple
 
+import numpy as np
 from cv2.typing import MatLike
 
+from one_dragon.base.geometry.rectangle import Rect
 from one_dragon.base.matcher.match_result import MatchResult, MatchResultList
 from one_dragon.base.matcher.ocr import ocr_utils
 from one_dragon.base.matcher.ocr.ocr_match_result import OcrMatchResult
 from one_dragon.base.matcher.ocr.ocr_matcher import OcrMatcher
+from one_dragon.base.operation import operation_profiler
 from one_dragon.base.web.common_downloader import CommonDownloaderParam
 from one_dragon.base.web.zip_downloader import ZipDownloader
 from one_dragon.utils import os_utils
@@ -190,6 +193,20 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
         self._loading = False
         return True
 
+    def _model_ocr(self, image: MatLike, **kwargs) -> list:
+        """
+        调用模型识别单张图片 记录耗时
+        """
+        with operation_profiler.get_profiler().section('ocr'):
+            return self._model.ocr(image, **kwargs)
+
+    def _model_ocr_batch(self, image_list: List[MatLike], **kwargs) -> list:
+        """
+        调用模型批量识别 记录耗时
+        """
+        with operation_profiler.get_profiler().section('ocr', 'ocr_batch'):
+            return self._model.ocr_batch(image_list, **kwargs)
+
     def run_ocr_single_line(self, image: MatLike, threshold: float = 0, strict_one_line: bool = True) -> str:
         """
         单行文本识别 手动合成一行 按匹配结果从左到右 从上到下
@@ -222,7 +239,7 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
             return {}
         start_time = time.time()
         result_map: dict = {}
-        scan_result_list: list = self._model.ocr(
+        scan_result_list: list = self._model_ocr(
             image,
             det=True,
             rec=True,
@@ -232,7 +249,51 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
             log.debug('OCR结果 %s 耗时 %.2f', result_map.keys(), time.time() - start_time)
             return result_map
 
-        scan_result = scan_result_list[0]
+        result_map = self._to_result_map(scan_result_list[0], threshold, merge_line_distance)
+        log.debug('OCR结果 %s 耗时 %.2f', result_map.keys(), time.time() - start_time)
+        return result_map
+
+    def run_ocr_batch(self, image_list: List[MatLike], threshold: float = 0,
+                      merge_line_distance: float = -1) -> List[dict[str, MatchResultList]]:
+        """
+        多张图片一起OCR 检测模型逐张运行 识别模型把所有文本框按宽高比分组后批量运行
+        :param image_list: 图片列表
+        :param threshold: 匹配阈值
+        :param merge_line_distance: 多少行距内合并结果 -1为不合并
+        :return: 每张图片的 {key_word: []} 顺序与传入一致
+        """
+        if len(image_list) == 0:
+            return []
+        if self._model is None and not self.init_model():
+            return [{} for _ in image_list]
+        start_time = time.time()
+        valid_idx_list = [i for i, image in enumerate(image_list) if image is not None]
+        if len(valid_idx_list) < len(image_list):
+            log.warning('OCR输入的图片为None')
+
+        result_list: List[dict[str, MatchResultList]] = [{} for _ in image_list]
+        scan_result_list: list = self._model_ocr_batch(
+            [image_list[i] for i in valid_idx_list],
+            det=True,
+            cls=self._ocr_param.use_angle_cls
+        )
+        for idx, scan_result in zip(valid_idx_list, scan_result_list):
+            result_list[idx] = self._to_result_map(scan_result, threshold, merge_line_distance)
+
+        if log.isEnabledFor(DEBUG):
+            log.debug('批量OCR结果 %s 耗时 %.2f', [list(i.keys()) for i in result_list], time.time() - start_time)
+        return result_list
+
+    def _to_result_map(self, scan_result: list, threshold: float,
+                       merge_line_distance: float) -> dict[str, MatchResultList]:
+        """
+        将单张图片的识别结果转换为 {key_word: []}
+        :param scan_result: 单张图片的识别结果 [[文本框, (文本, 分数)]]
+        :param threshold: 匹配阈值
+        :param merge_line_distance: 多少行距内合并结果 -1为不合并
+        :return:
+        """
+        result_map: dict = {}
         for anchor in scan_result:
             anchor_position = anchor[0]
             anchor_text = anchor[1][0]
@@ -251,7 +312,6 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
         if merge_line_distance != -1:
             result_map = ocr_utils.merge_ocr_result_to_multiple_line(result_map, join_space=True,
                                                                      merge_line_distance=merge_line_distance)
-        log.debug('OCR结果 %s 耗时 %.2f', result_map.keys(), time.time() - start_time)
         return result_map
 
     def _run_ocr_without_det(self, image: MatLike, threshold: float = 0) -> str:
@@ -265,7 +325,7 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
         if self._model is None and not self.init_model():
             return ""
         start_time = time.time()
-        scan_result: list = self._model.ocr(
+        scan_result: list = self._model_ocr(
             image,
             det=False,
             rec=True,
@@ -281,6 +341,56 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
         log.debug('OCR结果 %s 耗时 %.2f', scan_result, time.time() - start_time)
         return img_result[0][0]
 
+    def run_ocr_single_line_batch(self, image_list: List[MatLike], threshold: float = 0) -> List[str]:
+        """
+        多张单行文本图片一起识别 不使用检测模型
+        所有图片按宽高比分组 每组只调用一次识别模型
+        :param image_list: 图片列表
+        :param threshold: 匹配阈值
+        :return: 每张图片的识别结果 低于阈值时为空字符串 顺序与传入一致
+        """
+        if len(image_list) == 0:
+            return []
+        if self._model is None and not self.init_model():
+            return ['' for _ in image_list]
+        start_time = time.time()
+        rec_res: list = self._model_ocr_batch(
+            image_list,
+            det=False,
+            cls=self._ocr_param.use_angle_cls
+        )
+        result_list: List[str] = [text if score >= threshold else '' for text, score in rec_res]
+        log.debug('批量OCR结果 %s 耗时 %.2f', result_list, time.time() - start_time)
+        return result_list
+
+    def run_ocr_in_rects_batch(self, image_list: List[MatLike],
+                               rect_list_list: List[List[Rect]]) -> Optional[List[List[Tuple[str, float]]]]:
+        """
+        跳过检测模型 直接识别每张图片中给定位置的文本
+        按检测框的方式裁剪 所有位置一起送入识别模型
+        :param image_list: 图片列表
+        :param rect_list_list: 每张图片中需要识别的位置
+        :return: 每张图片中每个位置的 (文本, 置信度)
+        """
+        if self._model is None and not self.init_model():
+            return None
+        from onnxocr.utils import get_rotate_crop_image
+
+        crop_list = []
+        for image, rect_list in zip(image_list, rect_list_list):
+            for rect in rect_list:
+                box = np.float32([[rect.x1, rect.y1], [rect.x2, rect.y1], [rect.x2, rect.y2], [rect.x1, rect.y2]])
+                crop_list.append(get_rotate_crop_image(image, box))
+
+        rec_res: list = self._model_ocr_batch(crop_list, det=False, cls=self._ocr_param.use_angle_cls)
+
+        result_list: List[List[Tuple[str, float]]] = []
+        start_idx = 0
+        for rect_list in rect_list_list:
+            result_list.append([(text, score) for text, score in rec_res[start_idx:start_idx + len(rect_list)]])
+            start_idx += len(rect_list)
+        return result_list
+
     def match_words(
             self,
             image: MatLike, words: List[str],
@@ -303,24 +413,26 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
         """
         all_match_result: dict = self.run_ocr(image, threshold, merge_line_distance=merge_line_distance)
         match_key = set()
-        for k in all_match_result.keys():
-            for w in words:
-                ocr_result: str = k
-                ocr_target = gt(w, 'ocr')
-                if ignore_case:
-                    ocr_result = ocr_result.lower()
-                    ocr_target = ocr_target.lower()
+        key_list: List[str] = list(all_match_result.keys())
+        ocr_result_list: List[str] = [k.lower() for k in key_list] if ignore_case else key_list
+        for w in words:
+            ocr_target = gt(w, 'ocr')
+            if ignore_case:
+                ocr_target = ocr_target.lower()
+
+            if not same_word and lcs_percent != -1:
+                # 一个关键词 同时判断所有OCR结果
+                match_list = str_utils.find_by_lcs_list(ocr_target, ocr_result_list, percent=lcs_percent)
+                match_key.update(k for k, matched in zip(key_list, match_list) if matched)
+                continue
 
+            for k, ocr_result in zip(key_list, ocr_result_list):
                 if same_word:
                     if ocr_result == ocr_target:
                         match_key.add(k)
                 else:
-                    if lcs_percent == -1:
-                        if ocr_result.find(ocr_target) != -1:
-                            match_key.add(k)
-                    else:
-                        if str_utils.find_by_lcs(ocr_target, ocr_result, percent=lcs_percent):
-                            match_key.add(k)
+                    if ocr_result.find(ocr_target) != -1:
+                        match_key.add(k)
 
         return {key: all_match_result[key] for key in match_key if key in all_match_result}
 
@@ -340,7 +452,7 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
         start_time = time.time()
         ocr_result_list: list[OcrMatchResult] = []
 
-        scan_result_list: list = self._model.ocr(image, cls=False)
+        scan_result_list: list = self._model_ocr(image, cls=False)
         if len(scan_result_list) == 0:
             log.debug('OCR结果 [] 耗时 %.2f', time.time() - start_time)
             return ocr_result_list
@@ -1,19 +1,108 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
 import cv2
+import numpy as np
 from cv2.typing import MatLike
-from typing import Optional
 
 from one_dragon.base.matcher.match_result import MatchResultList, MatchResult
+from one_dragon.base.operation import operation_profiler
 from one_dragon.base.screen.template_info import TemplateInfo
 from one_dragon.base.screen.template_loader import TemplateLoader
 from one_dragon.utils import cv2_utils
 from one_dragon.utils.log_utils import log
 
 
+class _TemplateGroup:
+
+    def __init__(self, idx_list: list[int], template_list: list[TemplateInfo],
+                 image_list: list[MatLike], mask: Optional[MatLike]):
+        """
+        一组尺寸相同、掩码相同的模板 预先按掩码做零均值处理 用于批量匹配
+        匹配结果与 cv2.TM_CCOEFF_NORMED 带掩码时一致
+        :param idx_list: 模板在请求列表中的下标
+        :param template_list: 模板
+        :param image_list: 模板图片
+        :param mask: 共用的掩码
+        """
+        self.idx_list: list[int] = idx_list
+        self.template_list: list[TemplateInfo] = template_list
+
+        images = np.stack(image_list).astype(np.float32)
+        if images.ndim == 3:
+            images = images[:, :, :, np.newaxis]
+        self.k, self.h, self.w, self.c = images.shape
+
+        if mask is None:
+            self.mask = np.ones((self.h, self.w), dtype=np.float32)
+        else:
+            self.mask = (mask > 0).astype(np.float32)
+        self.mask_cnt: float = float(self.mask.sum())
+
+        mask_4d = self.mask[np.newaxis, :, :, np.newaxis]
+        mean = (images * mask_4d).sum(axis=(1, 2)) / max(self.mask_cnt, 1)
+        # (k, c, h, w) 掩码内零均值的模板
+        self.zero_mean_template = ((images - mean[:, np.newaxis, np.newaxis, :]) * mask_4d).transpose(0, 3, 1, 2)
+        self.template_norm = (self.zero_mean_template ** 2).sum(axis=(1, 2, 3))
+
+        # key=dft尺寸 value=模板频谱的共轭
+        self._spectrum_cache: dict[tuple[int, int], np.ndarray] = {}
+
+    def _get_spectrum(self, dft_size: tuple[int, int]) -> np.ndarray:
+        spectrum = self._spectrum_cache.get(dft_size)
+        if spectrum is None:
+            spectrum = np.conj(np.fft.rfft2(self.zero_mean_template, s=dft_size))
+            self._spectrum_cache[dft_size] = spectrum
+        return spectrum
+
+    def match(self, source: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        对所有模板进行一次批量匹配
+        :param source: (h, w, c) float32 的原图
+        :return: 每个模板的最高分数、横坐标、纵坐标
+        """
+        sh, sw = source.shape[:2]
+        rh, rw = sh - self.h + 1, sw - self.w + 1
+
+        # 原图在掩码窗口内的 和 与 平方和 所有模板共用
+        window_sum = np.stack([
+            cv2.matchTemplate(np.ascontiguousarray(source[:, :, i]), self.mask, cv2.TM_CCORR)
+            for i in range(self.c)
+        ])
+        window_sq_sum = cv2.matchTemplate((source * source).sum(axis=2), self.mask, cv2.TM_CCORR)
+        source_norm = window_sq_sum - (window_sum ** 2).sum(axis=0) / max(self.mask_cnt, 1)
+
+        # 频域上一次算出所有模板的互相关
+        dft_size = (cv2.getOptimalDFTSize(sh), cv2.getOptimalDFTSize(sw))
+        source_spectrum = np.fft.rfft2(source.transpose(2, 0, 1), s=dft_size)
+        cross = (source_spectrum[np.newaxis] * self._get_spectrum(dft_size)).sum(axis=1)
+        numerator = np.fft.irfft2(cross, s=dft_size)[:, :rh, :rw]
+
+        denominator = source_norm[np.newaxis] * self.template_norm[:, np.newaxis, np.newaxis]
+        # 纯色窗口无法计算相关系数 当作不匹配
+        score = np.where(denominator > 1e-6, numerator / np.sqrt(np.maximum(denominator, 1e-6)), -1)
+
+        flat = score.reshape(self.k, -1)
+        best_idx = flat.argmax(axis=1)
+        best_score = flat[np.arange(self.k), best_idx]
+        return best_score, best_idx % rw, best_idx // rw
+
+
 class TemplateMatcher:
 
-    def __init__(self, template_loader: TemplateLoader):
+    def __init__(self, template_loader: TemplateLoader, max_group_cache_size: int = 64):
         self.template_loader: TemplateLoader = template_loader
 
+        # 批量匹配用的模板分组缓存 key=(模板子文件夹, 模板id列表, 模板类型, 是否忽略模板掩码)
+        # value=(当时加载的模板 用于判断模板是否被重新加载, 模板分组)
+        self._group_cache: OrderedDict[tuple, tuple[list[Optional[TemplateInfo]], list[_TemplateGroup]]] = OrderedDict()
+        self._group_cache_lock = threading.Lock()
+        self.max_group_cache_size: int = max_group_cache_size
+
+        # match_best_of 上次命中的模板下标 key与分组缓存一致 下次优先单独匹配这个模板
+        self._last_hit_idx: OrderedDict[tuple, int] = OrderedDict()
+
     def match_template(self, source: MatLike,
                        template_sub_dir: str,
                        template_id: str,
@@ -46,8 +135,9 @@ class TemplateMatcher:
             mask_usage = cv2.bitwise_or(mask_usage, template.mask) if mask_usage is not None else template.mask
         if mask is not None:
             mask_usage = cv2.bitwise_or(mask_usage, mask) if mask_usage is not None else mask
-        return cv2_utils.match_template(source, template.get_image(template_type), threshold, mask=mask_usage,
-                                        only_best=only_best, ignore_inf=ignore_inf)
+        with operation_profiler.get_profiler().section('template', 'match_template'):
+            return cv2_utils.match_template(source, template.get_image(template_type), threshold, mask=mask_usage,
+                                            only_best=only_best, ignore_inf=ignore_inf)
 
     def match_one_by_feature(self, source: MatLike,
                              template_sub_dir: str,
@@ -64,16 +154,214 @@ class TemplateMatcher:
         @param knn_distance_percent: 越小要求匹配程度越高
         @return:
         """
-        source_kps, source_desc = cv2_utils.feature_detect_and_compute(source, source_mask)
         template = self.template_loader.get_template(template_sub_dir, template_id)
         if template is None:
             return None
-        template_kps, template_desc = template.features
-
-        return cv2_utils.feature_match_for_one(
-            source_kps, source_desc,
-            template_kps, template_desc,
-            template_width=template.raw.shape[1], template_height=template.raw.shape[0],
-            source_mask=source_mask,
-            knn_distance_percent=knn_distance_percent
-        )
+
+        with operation_profiler.get_profiler().section('template', 'match_one_by_feature'):
+            source_kps, source_desc = cv2_utils.feature_detect_and_compute(source, source_mask)
+            template_kps, template_desc = template.features
+
+            return cv2_utils.feature_match_for_one(
+                source_kps, source_desc,
+                template_kps, template_desc,
+                template_width=template.raw.shape[1], template_height=template.raw.shape[0],
+                source_mask=source_mask,
+                knn_distance_percent=knn_distance_percent
+            )
+
+    def _get_template_group_list(self, template_sub_dir: str,
+                                 template_id_list: list[str],
+                                 template_type: str,
+                                 ignore_template_mask: bool) -> list[_TemplateGroup]:
+        """
+        获取批量匹配用的模板分组 按尺寸和掩码分组 分组顺序按组内第一个模板在请求列表中的位置
+        模板重新加载后会自动重建
+        """
+        template_list: list[Optional[TemplateInfo]] = [
+            self.template_loader.get_template(template_sub_dir, template_id)
+            for template_id in template_id_list
+        ]
+
+        key = (template_sub_dir, tuple(template_id_list), template_type, ignore_template_mask)
+        with self._group_cache_lock:
+            cache_value = self._group_cache.get(key)
+            if cache_value is not None and all(a is b for a, b in zip(cache_value[0], template_list)):
+                self._group_cache.move_to_end(key)
+                return cache_value[1]
+
+        group_map: dict[tuple, tuple[list[int], list[TemplateInfo], list[MatLike], Optional[MatLike]]] = {}
+        for idx, template in enumerate(template_list):
+            if template is None:
+                log.error('未加载模板 %s' % template_id_list[idx])
+                continue
+            image = template.get_image(template_type)
+            if image is None:
+                continue
+            mask = None if ignore_template_mask else template.mask
+            group_key = (image.shape, None if mask is None else mask.tobytes())
+            if group_key not in group_map:
+                group_map[group_key] = ([], [], [], mask)
+            group_map[group_key][0].append(idx)
+            group_map[group_key][1].append(template)
+            group_map[group_key][2].append(image)
+
+        group_list = [
+            _TemplateGroup(idx_list, group_template_list, image_list, mask)
+            for idx_list, group_template_list, image_list, mask in group_map.values()
+        ]
+
+        with self._group_cache_lock:
+            self._group_cache[key] = (template_list, group_list)
+            while len(self._group_cache) > self.max_group_cache_size:
+                self._group_cache.popitem(last=False)
+
+        return group_list
+
+    def _match_single(self, source: MatLike,
+                      template_sub_dir: str,
+                      template_id: str,
+                      template_type: str,
+                      threshold: float,
+                      ignore_template_mask: bool) -> Optional[MatchResult]:
+        """
+        单独匹配一个模板 用于 match_best_of 先尝试上次命中的模板
+        :return: 超过阈值时返回匹配结果
+        """
+        template = self.template_loader.get_template(template_sub_dir, template_id)
+        if template is None:
+            log.error('未加载模板 %s' % template_id)
+            return None
+        image = template.get_image(template_type)
+        if image is None or image.shape[0] > source.shape[0] or image.shape[1] > source.shape[1]:
+            return None
+        if image.ndim != source.ndim or (image.ndim == 3 and image.shape[2] != source.shape[2]):
+            log.error('原图与模板的通道数不一致 %s' % template_sub_dir)
+            return None
+
+        return self.match_template(source, template_sub_dir, template_id, template_type=template_type,
+                                   threshold=threshold, ignore_template_mask=ignore_template_mask).max
+
+    def _match_batch(self, source: MatLike,
+                     template_sub_dir: str,
+                     template_id_list: list[str],
+                     template_type: str,
+                     threshold: float,
+                     ignore_template_mask: bool,
+                     first_over_threshold: bool) -> tuple[Optional[int], Optional[MatchResult]]:
+        """
+        批量匹配一组候选模板 参数含义与 match_best_of 一致
+        :return: 匹配到的模板在列表中的下标 和 匹配结果
+        """
+        if len(template_id_list) == 0:
+            return None, None
+
+        group_list = self._get_template_group_list(template_sub_dir, template_id_list,
+                                                   template_type, ignore_template_mask)
+
+        source_float: Optional[np.ndarray] = None
+        score_list: list[Optional[MatchResult]] = [None] * len(template_id_list)
+        evaluated: list[bool] = [False] * len(template_id_list)
+        for group in group_list:
+            if group.h > source.shape[0] or group.w > source.shape[1]:
+                for idx in group.idx_list:
+                    evaluated[idx] = True
+                continue
+
+            if source_float is None:
+                source_float = source.astype(np.float32)
+                if source_float.ndim == 2:
+                    source_float = source_float[:, :, np.newaxis]
+            if source_float.shape[2] != group.c:
+                log.error('原图与模板的通道数不一致 %s' % template_sub_dir)
+                for idx in group.idx_list:
+                    evaluated[idx] = True
+                continue
+
+            with operation_profiler.get_profiler().section('template', 'match_best_of'):
+                best_score, best_x, best_y = group.match(source_float)
+            for i, idx in enumerate(group.idx_list):
+                evaluated[idx] = True
+                if best_score[i] >= threshold:
+                    score_list[idx] = MatchResult(best_score[i], best_x[i], best_y[i], group.w, group.h)
+
+            if first_over_threshold:
+                for idx in range(len(template_id_list)):
+                    if not evaluated[idx]:  # 前面还有未计算的更高优先级模板
+                        break
+                    if score_list[idx] is not None:
+                        return idx, score_list[idx]
+
+        best_idx: Optional[int] = None
+        for idx, mr in enumerate(score_list):
+            if mr is None:
+                continue
+            if best_idx is None or mr.confidence > score_list[best_idx].confidence:
+                best_idx = idx
+
+        if best_idx is None:
+            return None, None
+        return best_idx, score_list[best_idx]
+
+    def match_best_of(self, source: MatLike,
+                      template_sub_dir: str,
+                      template_id_list: list[str],
+                      template_type: str = 'raw',
+                      threshold: float = 0.5,
+                      ignore_template_mask: bool = False,
+                      first_over_threshold: bool = True) -> tuple[Optional[str], Optional[MatchResult]]:
+        """
+        在原图中 批量匹配一组候选模板 结果与逐个调用 match_template 一致
+        同尺寸同掩码的模板会预先归一化并叠在一起 在频域上一次算完
+        first_over_threshold 时 先单独匹配上次命中的模板(没有时为第一个) 命中且没有更高优先级的模板时 不需要批量匹配
+        :param source: 原图
+        :param template_sub_dir: 模板的子文件夹
+        :param template_id_list: 候选模板id 按优先级排序
+        :param template_type: 模板类型
+        :param threshold: 匹配阈值
+        :param ignore_template_mask: 是否忽略模板自身的掩码
+        :param first_over_threshold: True 时返回优先级最高的超过阈值的模板 一旦确定就不再计算后续分组
+                                     False 时返回分数最高的模板
+        :return: 匹配到的模板id 和 匹配结果
+        """
+        if len(template_id_list) == 0:
+            return None, None
+
+        if not first_over_threshold:
+            best_idx, best_mr = self._match_batch(source, template_sub_dir, template_id_list, template_type,
+                                                  threshold, ignore_template_mask, False)
+            if best_idx is None:
+                return None, None
+            return template_id_list[best_idx], best_mr
+
+        key = (template_sub_dir, tuple(template_id_list), template_type, ignore_template_mask)
+        with self._group_cache_lock:
+            probe_idx = self._last_hit_idx.get(key, 0)
+
+        best_idx: Optional[int] = None
+        best_mr = self._match_single(source, template_sub_dir, template_id_list[probe_idx], template_type,
+                                     threshold, ignore_template_mask)
+        if best_mr is not None:
+            best_idx = probe_idx
+            if probe_idx > 0:  # 还需要确认更高优先级的模板都没有命中
+                higher_idx, higher_mr = self._match_batch(source, template_sub_dir, template_id_list[:probe_idx],
+                                                          template_type, threshold, ignore_template_mask, True)
+                if higher_idx is not None:
+                    best_idx, best_mr = higher_idx, higher_mr
+        else:
+            rest_id_list = template_id_list[:probe_idx] + template_id_list[probe_idx + 1:]
+            best_idx, best_mr = self._match_batch(source, template_sub_dir, rest_id_list,
+                                                  template_type, threshold, ignore_template_mask, True)
+            if best_idx is not None and best_idx >= probe_idx:
+                best_idx += 1
+
+        if best_idx is None:
+            return None, None
+
+        with self._group_cache_lock:
+            self._last_hit_idx[key] = best_idx
+            self._last_hit_idx.move_to_end(key)
+            while len(self._last_hit_idx) > self.max_group_cache_size:
+                self._last_hit_idx.popitem(last=False)
+
+        return template_id_list[best_idx], best_mr
@@ -9,17 +9,17 @@ import hmac
 import json
 import re
 import smtplib
-import threading
 import time
 import urllib.parse
+from concurrent import futures
 from email.header import Header
 from email.mime.text import MIMEText
 from email.utils import formataddr
 from io import BytesIO
 from typing import TYPE_CHECKING, Optional
 
-import requests
-
+from one_dragon.base.notify.push_dispatcher import PushImage, http_post, http_request, push_dispatcher, \
+    push_token_cache
 from one_dragon.utils.log_utils import log
 
 if TYPE_CHECKING:
@@ -89,7 +89,7 @@ class Push():
         headers = {"Content-Type": "application/json;charset=utf-8"}
 
         try:
-            response = requests.post(
+            response = http_post(
                 url=url, data=json.dumps(data), headers=headers, timeout=15
             ).json()
 
@@ -131,7 +131,7 @@ class Push():
         data = {"msgtype": "text", "text": {"content": f"{title}\n{content}"}}
 
         try:
-            response = requests.post(
+            response = http_post(
                 url=url, data=json.dumps(data), headers=headers, timeout=15
             ).json()
 
@@ -154,18 +154,21 @@ class Push():
         app_id = self.get_config("FS_APPID")
         app_secret = self.get_config("FS_APPSECRET")
         if image and app_id and app_secret and app_id != "" and app_secret != "":
-            image.seek(0)
-            # 获取飞书自建应用的tenant_access_token
-            auth_endpoint = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-            auth_headers = {
-                "Content-Type": "application/json; charset=utf-8"
-            }
-            auth_response = requests.post(auth_endpoint, headers=auth_headers, json={
-                "app_id": app_id,
-                "app_secret": app_secret
-            })
-            auth_response.raise_for_status()
-            tenant_access_token = auth_response.json()["tenant_access_token"]
+            # 获取飞书自建应用的tenant_access_token 有效期内复用
+            def fetch_tenant_access_token():
+                auth_endpoint = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
+                auth_headers = {
+                    "Content-Type": "application/json; charset=utf-8"
+                }
+                auth_response = http_post(auth_endpoint, headers=auth_headers, json={
+                    "app_id": app_id,
+                    "app_secret": app_secret
+                })
+                auth_response.raise_for_status()
+                auth_data = auth_response.json()
+                return auth_data["tenant_access_token"], auth_data.get("expire", 0)
+
+            tenant_access_token = push_token_cache.get(("feishu", app_id, app_secret), fetch_tenant_access_token)
             # 上传图片并获取图片的image_key
             image_endpoint = "https://open.feishu.cn/open-apis/im/v1/images"
             image_headers = {
@@ -175,7 +178,7 @@ class Push():
                 'image': ('image.jpg', image.getvalue(), 'image/jpeg'),
                 'image_type': (None, 'message')
             }
-            image_response = requests.post(image_endpoint , headers=image_headers, files=files)
+            image_response = http_post(image_endpoint , headers=image_headers, files=files)
             if (image_response.status_code % 100 != 2):
                 log.error(image_response.text)
                 image_response.raise_for_status()
@@ -210,7 +213,7 @@ class Push():
             }
 
         url = f'https://open.feishu.cn/open-apis/bot/v2/hook/{self.get_config("FS_KEY")}'
-        response = requests.post(url, data=json.dumps(data)).json()
+        response = http_post(url, data=json.dumps(data)).json()
 
         if response.get("StatusCode") == 0 or response.get("code") == 0:
             self.log_info("飞书 推送成功！")
@@ -237,9 +240,7 @@ class Push():
         headers = {'Content-Type': "application/json"}
         message = [{"type": "text", "data": {"text": f"{title}\n{content}"}}]
         if image:
-            image.seek(0)
-            image_base64 = base64.b64encode(image.getvalue()).decode('utf-8')
-            message.append({"type": "image", "data": {"file": f'base64://{image_base64}'}})
+            message.append({"type": "image", "data": {"file": f'base64://{PushImage.of(image).base64}'}})
         data_private = {"message": message}
         data_group = {"message": message}
 
@@ -249,7 +250,7 @@ class Push():
         if user_id != "":
             data_private["message_type"] = "private"
             data_private["user_id"] = user_id
-            response_private = requests.post(url, data=json.dumps(data_private), headers=headers).json()
+            response_private = http_post(url, data=json.dumps(data_private), headers=headers).json()
 
             if response_private["status"] == "ok":
                 self.log_info("OneBot 私聊推送成功！")
@@ -259,7 +260,7 @@ class Push():
         if group_id != "":
             data_group["message_type"] = "group"
             data_group["group_id"] = group_id
-            response_group = requests.post(url, data=json.dumps(data_group), headers=headers).json()
+            response_group = http_post(url, data=json.dumps(data_group), headers=headers).json()
 
             if response_group["status"] == "ok":
                 self.log_info("OneBot 群聊推送成功！")
@@ -281,7 +282,7 @@ class Push():
             "message": content,
             "priority": self.get_config("GOTIFY_PRIORITY"),
         }
-        response = requests.post(url, data=data).json()
+        response = http_post(url, data=data).json()
 
         if response.get("id"):
             self.log_info("gotify 推送成功！")
@@ -300,7 +301,7 @@ class Push():
         url = f'https://push.hellyw.com/{self.get_config("IGOT_PUSH_KEY")}'
         data = {"title": title, "content": content}
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
-        response = requests.post(url, data=data, headers=headers).json()
+        response = http_post(url, data=data, headers=headers).json()
 
         if response["ret"] == 0:
             self.log_info("iGot 推送成功！")
@@ -325,7 +326,7 @@ class Push():
         else:
             url = f'https://sctapi.ftqq.com/{self.get_config("SERVERCHAN_PUSH_KEY")}.send'
 
-        response = requests.post(url, data=data).json()
+        response = http_post(url, data=data).json()
 
         if response.get("errno") == 0 or response.get("code") == 0:
             self.log_info("Server 酱 推送成功！")
@@ -350,7 +351,7 @@ class Push():
         if self.get_config("DEER_URL"):
             url = self.get_config("DEER_URL")
 
-        response = requests.post(url, data=data).json()
+        response = http_post(url, data=data).json()
 
         if len(response.get("content").get("result")) > 0:
             self.log_info("PushDeer 推送成功！")
@@ -367,7 +368,7 @@ class Push():
         self.log_info("chat 服务启动")
         data = "payload=" + json.dumps({"text": title + "\n" + content})
         url = self.get_config("CHAT_URL") + self.get_config("CHAT_TOKEN")
-        response = requests.post(url, data=data)
+        response = http_post(url, data=data)
 
         if response.status_code == 200:
             self.log_info("Chat 推送成功！")
@@ -399,7 +400,7 @@ class Push():
         }
         body = json.dumps(data).encode(encoding="utf-8")
         headers = {"Content-Type": "application/json"}
-        response = requests.post(url=url, data=body, headers=headers).json()
+        response = http_post(url=url, data=body, headers=headers).json()
 
         code = response["code"]
         if code == 200:
@@ -413,7 +414,7 @@ class Push():
         else:
             url_old = "http://pushplus.hxtrip.com/send"
             headers["Accept"] = "application/json"
-            response = requests.post(url=url_old, data=body, headers=headers).json()
+            response = http_post(url=url_old, data=body, headers=headers).json()
 
             if response["code"] == 200:
                 self.log_info("PUSHPLUS(hxtrip) 推送成功！")
@@ -445,7 +446,7 @@ class Push():
         }
         body = json.dumps(data).encode(encoding="utf-8")
         headers = {"Content-Type": "application/json"}
-        response = requests.post(url=url, data=body, headers=headers).json()
+        response = http_post(url=url, data=body, headers=headers).json()
 
         if response["code"] == 200:
             self.log_info("微加机器人 推送成功！")
@@ -463,7 +464,7 @@ class Push():
 
         url = f'https://qmsg.zendee.cn/{self.get_config("QMSG_TYPE")}/{self.get_config("QMSG_KEY")}'
         payload = {"msg": f'{title}\n{content.replace("----", "-")}'.encode("utf-8")}
-        response = requests.post(url=url, params=payload).json()
+        response = http_post(url=url, params=payload).json()
 
         if response["code"] == 0:
             self.log_info("qmsg 推送成功！")
@@ -515,20 +516,38 @@ class Push():
             self.AGENTID = agentid
             self.ORIGIN = origin
 
-        def get_access_token(self):
+        def get_token_key(self):
+            return "wecom", self.ORIGIN, self.CORPID, self.CORPSECRET
+
+        def fetch_access_token(self):
             url = f"{self.ORIGIN}/cgi-bin/gettoken"
             values = {
                 "corpid": self.CORPID,
                 "corpsecret": self.CORPSECRET,
             }
-            req = requests.post(url, params=values)
+            req = http_post(url, params=values)
             data = json.loads(req.text)
-            return data["access_token"]
+            return data["access_token"], data.get("expires_in", 0)
+
+        def get_access_token(self):
+            # access_token 有效期内复用 不需要每次推送都重新获取
+            return push_token_cache.get(self.get_token_key(), self.fetch_access_token)
+
+        def post_message(self, send_values):
+            send_msges = bytes(json.dumps(send_values), "utf-8")
+            respone = None
+            for _ in range(2):
+                send_url = (
+                    f"{self.ORIGIN}/cgi-bin/message/send?access_token={self.get_access_token()}"
+                )
+                respone = http_post(send_url, data=send_msges).json()
+                # access_token 失效时 重新获取后再试一次
+                if respone.get("errcode") not in (40001, 40014, 42001):
+                    break
+                push_token_cache.invalidate(self.get_token_key())
+            return respone["errmsg"]
 
         def send_text(self, message, touser="@all"):
-            send_url = (
-                f"{self.ORIGIN}/cgi-bin/message/send?access_token={self.get_access_token()}"
-            )
             send_values = {
                 "touser": touser,
                 "msgtype": "text",
@@ -536,15 +555,9 @@ class Push():
                 "text": {"content": message},
                 "safe": "0",
             }
-            send_msges = bytes(json.dumps(send_values), "utf-8")
-            respone = requests.post(send_url, send_msges)
-            respone = respone.json()
-            return respone["errmsg"]
+            return self.post_message(send_values)
 
         def send_mpnews(self, title, message, media_id, touser="@all"):
-            send_url = (
-                f"{self.ORIGIN}/cgi-bin/message/send?access_token={self.get_access_token()}"
-            )
             send_values = {
                 "touser": touser,
                 "msgtype": "mpnews",
@@ -562,10 +575,7 @@ class Push():
                     ]
                 },
             }
-            send_msges = bytes(json.dumps(send_values), "utf-8")
-            respone = requests.post(send_url, send_msges)
-            respone = respone.json()
-            return respone["errmsg"]
+            return self.post_message(send_values)
 
 
 
@@ -583,7 +593,7 @@ class Push():
         url = f"{origin}/cgi-bin/webhook/send?key={self.get_config('QYWX_KEY')}"
         headers = {"Content-Type": "application/json;charset=utf-8"}
         data = {"msgtype": "text", "text": {"content": f"{title}\n{content}"}}
-        response = requests.post(
+        response = http_post(
             url=url, data=json.dumps(data), headers=headers, timeout=15
         ).json()
 
@@ -607,14 +617,20 @@ class Push():
             "User-Agent": "OneDragon"
         }
 
-        create_dm_url = f"{base_url}/users/@me/channels"
-        dm_headers = headers.copy()
-        dm_headers["Content-Type"] = "application/json"
-        dm_payload = json.dumps({"recipient_id": self.get_config('DISCORD_USER_ID')})
-        response = requests.post(create_dm_url, headers=dm_headers, data=dm_payload, timeout=15)
-        response.raise_for_status()
-        channel_id = response.json().get("id")
+        # 私聊频道不会变化 建立后复用
+        def fetch_dm_channel_id():
+            create_dm_url = f"{base_url}/users/@me/channels"
+            dm_headers = headers.copy()
+            dm_headers["Content-Type"] = "application/json"
+            dm_payload = json.dumps({"recipient_id": self.get_config('DISCORD_USER_ID')})
+            response = http_post(create_dm_url, headers=dm_headers, data=dm_payload, timeout=15)
+            response.raise_for_status()
+            return response.json().get("id"), 24 * 3600
+
+        channel_key = ("discord", self.get_config('DISCORD_BOT_TOKEN'), self.get_config('DISCORD_USER_ID'))
+        channel_id = push_token_cache.get(channel_key, fetch_dm_channel_id)
         if not channel_id or channel_id == "":
+            push_token_cache.invalidate(channel_key)
             self.log_error(f"Discord 私聊频道建立失败")
             return
 
@@ -623,8 +639,7 @@ class Push():
 
         files = None
         if image:
-            image.seek(0)
-            files = {'file': ('image.png', image, 'image/png')}
+            files = {'file': ('image.png', image.getvalue(), 'image/png')}
             data = {'payload_json': json.dumps(message_payload_dict)}
             if "Content-Type" in headers:
                 del headers["Content-Type"]
@@ -632,7 +647,7 @@ class Push():
             headers["Content-Type"] = "application/json"
             data = json.dumps(message_payload_dict)
 
-        response = requests.post(message_url, headers=headers, data=data, files=files, timeout=30)
+        response = http_post(message_url, headers=headers, data=data, files=files, timeout=30)
         response.raise_for_status()
         self.log_info("Discord Bot 推送成功！")
 
@@ -677,7 +692,7 @@ class Push():
                 'chat_id': (None, str(self.get_config("TG_USER_ID"))),
                 'caption': (None, f"{title}\n{content}")
             }
-            response = requests.post(photo_url, files=files, proxies=proxies).json()
+            response = http_post(photo_url, files=files, proxies=proxies).json()
         else:
             # 发送消息
             headers = {"Content-Type": "application/x-www-form-urlencoded"}
@@ -686,7 +701,7 @@ class Push():
                 "text": f"{title}\n{content}",
             }
 
-            response = requests.post(
+            response = http_post(
                 url=url, headers=headers, params=payload, proxies=proxies
             ).json()
 
@@ -720,7 +735,7 @@ class Push():
             }
         body = json.dumps(data).encode(encoding="utf-8")
         headers = {"Content-Type": "application/json"}
-        response = requests.post(url=url, data=body, headers=headers).json()
+        response = http_post(url=url, data=body, headers=headers).json()
         if response["code"] == 0:
             self.log_info("智能微秘书 推送成功！")
         else:
@@ -792,7 +807,7 @@ class Push():
             "date": self.get_config("date") if self.get_config("date") else "",
             "type": self.get_config("type") if self.get_config("type") else "",
         }
-        response = requests.post(url, data=data)
+        response = http_post(url, data=data)
 
         if response.status_code == 200 and response.text == "success":
             self.log_info("PushMe 推送成功！")
@@ -830,7 +845,7 @@ class Push():
                         }
                     ],
                 }
-                response = requests.post(url, headers=headers, data=json.dumps(data))
+                response = http_post(url, headers=headers, data=json.dumps(data))
                 if response.status_code == 200:
                     if chat_type == 1:
                         self.log_info(f"QQ个人消息:{ids}推送成功！")
@@ -877,7 +892,7 @@ class Push():
             headers['Actions'] = encode_rfc2047(self.get_config("NTFY_ACTIONS"))
 
         url = self.get_config("NTFY_URL") + "/" + self.get_config("NTFY_TOPIC")
-        response = requests.post(url, data=data, headers=headers)
+        response = http_post(url, data=data, headers=headers)
         if response.status_code == 200:  # 使用 response.status_code 进行检查
             self.log_info("Ntfy 推送成功！")
         else:
@@ -931,7 +946,7 @@ class Push():
         }
 
         headers = {"Content-Type": "application/json"}
-        response = requests.post(url=url, json=data, headers=headers).json()
+        response = http_post(url=url, json=data, headers=headers).json()
 
         if response.get("code") == 1000:
             self.log_info("wxpusher 推送成功！")
@@ -973,8 +988,7 @@ class Push():
         if "$image" in body:
             image_base64 = ""
             if image:
-                image.seek(0)
-                image_base64 = base64.b64encode(image.getvalue()).decode('utf-8')
+                image_base64 = PushImage.of(image).base64
             body = body.replace("$image", image_base64)
 
         # 解析 headers 字符串为字典
@@ -996,7 +1010,7 @@ class Push():
         self.log_info(f"请求头: {headers}")
         self.log_info(f"请求体: {body}")
 
-        response = requests.request(
+        response = http_request(
             method=method,
             url=url,
             headers=headers,
@@ -1109,18 +1123,30 @@ class Push():
         # 遥测埋点：记录推送方法使用情况
         self._track_push_usage(notify_function, test_method)
 
+        # 图片只读取和编码一次 所有渠道共用
+        image = PushImage.of(image)
+
         # 如果是测试模式，直接在主线程中执行，这样异常可以被前端捕获
         if test_method:
             for mode in notify_function:
                 mode(title, content, image)
         else:
-            # 正常推送使用多线程
-            ts = [
-                threading.Thread(target=mode, args=(title, content, image), name=mode.__name__)
+            # 正常推送交给共用的线程池 多个实例同时推送时 同一渠道的消息会合并成一条
+            config_key = self._get_config_key()
+            future_list = [
+                push_dispatcher.submit((mode.__name__, title, config_key), mode, title, content, image)
                 for mode in notify_function
             ]
-            [t.start() for t in ts]
-            [t.join() for t in ts]
+            futures.wait(future_list)
+
+    def _get_config_key(self) -> str:
+        """
+        推送配置的标识 配置完全相同的实例之间才会合并消息
+        """
+        data = getattr(self.ctx.push_config, 'data', None)
+        if data is None:
+            return str(id(self.ctx.push_config))
+        return json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
 
     def get_specific_notify_function(self, method: str) -> list:
         """获取指定的推送方式函数"""
@@ -0,0 +1,232 @@
+import base64
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from one_dragon.utils.log_utils import log
+
+_push_channel_executor = ThreadPoolExecutor(thread_name_prefix='od_push_channel', max_workers=4)
+
+DEFAULT_TIMEOUT = 30  # 推送请求默认的超时时间 避免一个渠道卡住线程池
+
+
+class PushImage(BytesIO):
+
+    def __init__(self, data: bytes):
+        """
+        推送用的图片 所有渠道共用同一份 base64编码只做一次
+        各渠道应使用 getvalue() 读取内容 不要依赖读写位置
+        :param data: 图片内容
+        """
+        BytesIO.__init__(self, data)
+        self._base64: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def base64(self) -> str:
+        """
+        :return: base64编码后的图片内容
+        """
+        with self._lock:
+            if self._base64 is None:
+                self._base64 = base64.b64encode(self.getvalue()).decode('utf-8')
+            return self._base64
+
+    @staticmethod
+    def of(image: Optional[BytesIO]) -> Optional['PushImage']:
+        """
+        :param image: 图片
+        :return: 可共用的图片 传入None时返回None
+        """
+        if image is None or isinstance(image, PushImage):
+            return image
+        return PushImage(image.getvalue())
+
+
+_session_lock = threading.Lock()
+_host_2_session: Dict[str, requests.Session] = {}
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    按域名复用的会话 保持连接 避免每次推送都重新握手
+    :param url: 请求地址
+    :return: 会话
+    """
+    parts = urlsplit(url)
+    key = f'{parts.scheme}://{parts.netloc}'
+    with _session_lock:
+        session = _host_2_session.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _host_2_session[key] = session
+        return session
+
+
+def http_request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    使用复用的会话发送请求 参数与 requests.request 一致
+    :param method: 请求方法
+    :param url: 请求地址
+    :return: 响应
+    """
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    return get_session(url).request(method, url, **kwargs)
+
+
+def http_post(url: str, **kwargs) -> requests.Response:
+    """
+    使用复用的会话发送POST请求 参数与 requests.post 一致
+    :param url: 请求地址
+    :return: 响应
+    """
+    return http_request('POST', url, **kwargs)
+
+
+class TokenCache:
+
+    def __init__(self, margin_seconds: float = 60):
+        """
+        带过期时间的令牌缓存 例如企业微信的 access_token
+        :param margin_seconds: 提前多久视为过期
+        """
+        self.margin_seconds: float = margin_seconds
+        self._lock = threading.Lock()
+        self._key_2_token: Dict[Tuple, Tuple[str, float]] = {}  # value=(令牌, 过期时间)
+
+    def get(self, key: Tuple, fetcher: Callable[[], Tuple[str, float]]) -> str:
+        """
+        获取令牌 没有或已过期时重新获取
+        :param key: 令牌的唯一标识 例如 (接口地址, 应用ID, 密钥)
+        :param fetcher: 获取令牌的方法 返回 (令牌, 有效秒数)
+        :return: 令牌
+        """
+        with self._lock:
+            cached = self._key_2_token.get(key)
+            if cached is not None and cached[1] > time.monotonic():
+                return cached[0]
+
+        token, expires_in = fetcher()
+        with self._lock:
+            self._key_2_token[key] = (token, time.monotonic() + expires_in - self.margin_seconds)
+        return token
+
+    def invalidate(self, key: Tuple) -> None:
+        """
+        令牌失效时删除 下次重新获取
+        :param key: 令牌的唯一标识
+        """
+        with self._lock:
+            self._key_2_token.pop(key, None)
+
+
+push_token_cache = TokenCache()
+
+
+class _PushBatch:
+
+    def __init__(self, channel: Callable, title: str, content: str, image: Optional[PushImage], due_time: float):
+        self.channel: Callable = channel
+        self.title: str = title
+        self.content_list: List[str] = [content]
+        self.image: Optional[PushImage] = image
+        self.due_time: float = due_time
+        self.future: Future = Future()
+
+    def can_merge(self, image: Optional[PushImage]) -> bool:
+        """
+        :param image: 新消息的图片
+        :return: 新消息能否合并到这一批 合并后不能丢失任何一张图片
+        """
+        return image is None or self.image is None or image is self.image
+
+
+class PushDispatcher:
+
+    def __init__(self, coalesce_seconds: float = 1, executor: Optional[ThreadPoolExecutor] = None):
+        """
+        推送分发
+        所有渠道共用一个有上限的线程池
+        同一个渠道在合并窗口内收到的多条消息 合并成一条发送
+        每条推送只能带一张图片 带不同图片的消息不合并 各自作为新的一批发送
+        :param coalesce_seconds: 合并窗口 秒
+        :param executor: 发送使用的线程池
+        """
+        self.coalesce_seconds: float = coalesce_seconds
+        self.executor: ThreadPoolExecutor = executor if executor is not None else _push_channel_executor
+
+        self._condition = threading.Condition()
+        self._key_2_batch: Dict[Tuple, List[_PushBatch]] = {}  # 等待发送的批次 按提交顺序
+        self._scheduler: Optional[threading.Thread] = None
+
+    def submit(self, key: Tuple, channel: Callable, title: str, content: str, image: Optional[PushImage]) -> Future:
+        """
+        提交一条消息
+        :param key: 合并的依据 相同的key在窗口内合并
+        :param channel: 推送方法 参数为 (title, content, image)
+        :param title: 标题
+        :param content: 内容
+        :param image: 图片
+        :return: 所在批次发送完成后结束
+        """
+        with self._condition:
+            batch_list = self._key_2_batch.get(key)
+            if batch_list is not None and batch_list[-1].can_merge(image):  # 只合并到最后一批 保持消息顺序
+                batch = batch_list[-1]
+                batch.content_list.append(content)
+                if image is not None:
+                    batch.image = image
+                return batch.future
+
+            batch = _PushBatch(channel, title, content, image, time.monotonic() + self.coalesce_seconds)
+            self._key_2_batch.setdefault(key, []).append(batch)
+            if self._scheduler is None:
+                self._scheduler = threading.Thread(target=self._schedule, name='od_push_dispatcher', daemon=True)
+                self._scheduler.start()
+            self._condition.notify()
+            return batch.future
+
+    def _schedule(self) -> None:
+        """
+        等待合并窗口结束后 把批次交给线程池发送
+        """
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                due_batch_list: List[_PushBatch] = []
+                for key in list(self._key_2_batch.keys()):
+                    batch_list = self._key_2_batch[key]
+                    while len(batch_list) > 0 and batch_list[0].due_time <= now:
+                        due_batch_list.append(batch_list.pop(0))
+                    if len(batch_list) == 0:
+                        del self._key_2_batch[key]
+                if len(due_batch_list) == 0:
+                    if len(self._key_2_batch) == 0:
+                        self._condition.wait()
+                    else:
+                        self._condition.wait(min(i[0].due_time for i in self._key_2_batch.values()) - now)
+                    continue
+
+            for batch in due_batch_list:
+                self.executor.submit(self._send, batch)
+
+    @staticmethod
+    def _send(batch: _PushBatch) -> None:
+        try:
+            batch.channel(batch.title, '\n'.join(batch.content_list), batch.image)
+            batch.future.set_result(None)
+        except Exception as e:
+            log.error('指令[ 通知 ] %s 推送异常: %s', getattr(batch.channel, '__name__', ''), e)
+            batch.future.set_exception(e)
+
+
+push_dispatcher = PushDispatcher()
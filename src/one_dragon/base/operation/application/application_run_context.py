@@ -1,12 +1,15 @@
+import os
+import time
 from concurrent.futures import ThreadPoolExecutor
 from enum import StrEnum
-from typing import Optional
+from typing import Callable, Optional
 
 from one_dragon.base.controller.controller_base import ControllerBase
 from one_dragon.base.operation.application.application_config import ApplicationConfig
 from one_dragon.base.operation.application.application_factory import ApplicationFactory
 from one_dragon.base.operation.application_base import Application
 from one_dragon.base.operation.application_run_record import AppRunRecord
+from one_dragon.base.operation import operation_profiler
 from one_dragon.base.operation.context_event_bus import ContextEventBus
 from one_dragon.utils import thread_utils
 from one_dragon.utils.log_utils import log
@@ -62,6 +65,7 @@ class ApplicationRunContext:
             thread_name_prefix="one_dragon_app_run_context", max_workers=1
         )
         self._controller: Optional[ControllerBase] = None  # 这个在后续初始化后设置
+        self._profile_dir_getter: Optional[Callable[[], Optional[str]]] = None  # 这个在后续初始化后设置
         self._event_bus: ContextEventBus = ContextEventBus()
 
         # 当前运行的应用
@@ -78,6 +82,18 @@ class ApplicationRunContext:
         """
         self._controller = controller
 
+    def set_profile_dir_getter(self, getter: Callable[[], Optional[str]]):
+        """
+        设置获取性能记录导出目录的方法。
+
+        每次运行应用前调用，返回目录时记录本次运行中每个指令节点的耗时，结束后导出到该目录；
+        返回None时不记录。
+
+        Args:
+            getter: 获取导出目录的方法
+        """
+        self._profile_dir_getter = getter
+
     def registry_application(
         self, factory: ApplicationFactory | list[ApplicationFactory]
     ):
@@ -311,6 +327,10 @@ class ApplicationRunContext:
             log.error("应用 {} 未注册", app_id)
             return False
 
+        profile_dir = self._profile_dir_getter() if self._profile_dir_getter is not None else None
+        if profile_dir is not None:
+            operation_profiler.get_profiler().start(app_id)
+
         try:
             self.current_app_id = app_id
             self.current_instance_idx = instance_idx
@@ -324,9 +344,45 @@ class ApplicationRunContext:
             self.current_app_id = None
             self.current_instance_idx = None
             self.current_group_id = None
+            if profile_dir is not None:
+                operation_profiler.get_profiler().stop()
+                self._export_profile(profile_dir, app_id)
 
         return True
 
+    def _export_profile(self, profile_dir: str, app_id: str) -> None:
+        """
+        导出本次运行的性能记录，并在日志中输出耗时最多的节点。
+
+        同时导出 Chrome trace 和 speedscope 两种格式，
+        分别可以在 https://ui.perfetto.dev 和 https://www.speedscope.app 中打开。
+
+        Args:
+            profile_dir: 导出目录
+            app_id: 应用ID
+        """
+        profiler = operation_profiler.get_profiler()
+        file_prefix = os.path.join(profile_dir, f"{app_id}_{time.strftime('%Y%m%d_%H%M%S')}")
+        try:
+            profiler.export_chrome_trace(f"{file_prefix}.trace.json")
+            profiler.export_speedscope(f"{file_prefix}.speedscope.json")
+            log.info("性能记录已导出 %s", file_prefix)
+        except Exception:
+            log.error("导出性能记录失败", exc_info=True)
+            return
+
+        for stats in profiler.get_node_stats()[:10]:
+            log.info(
+                "耗时 %.1fs %s 节点 %s 轮数 %d 截图 %.1fs OCR %.1fs 模板 %.1fs YOLO %.1fs 等待 %.1fs 重试 %d 次",
+                stats.wall_time, stats.op_name, stats.node_name, stats.round_cnt,
+                stats.screenshot_time, stats.ocr_time, stats.template_time, stats.yolo_time, stats.sleep_time,
+                stats.retry_cnt,
+            )
+        for stats in profiler.get_off_node_stats()[:5]:
+            log.info("耗时 %.1fs 节点外 %s %s 次数 %d", stats.total_time, stats.category, stats.name, stats.cnt)
+        if profiler.dropped_event_cnt > 0:
+            log.warning("性能记录事件过多 丢弃了最早的 %d 个事件", profiler.dropped_event_cnt)
+
     def run_application_async(
         self, app_id: str, instance_idx: int, group_id: str
     ) -> bool:
@@ -12,6 +12,7 @@ from one_dragon.base.config.push_config import PushConfig
 from one_dragon.base.controller.controller_base import ControllerBase
 from one_dragon.base.controller.pc_button.pc_button_listener import PcButtonListener
 from one_dragon.base.matcher.ocr.ocr_matcher import OcrMatcher
+from one_dragon.base.matcher.ocr.ocr_layout_cache import OcrLayoutCache
 from one_dragon.base.matcher.ocr.ocr_service import OcrService
 from one_dragon.base.matcher.ocr.onnx_ocr_matcher import OnnxOcrMatcher, OnnxOcrParam
 from one_dragon.base.matcher.template_matcher import TemplateMatcher
@@ -26,7 +27,7 @@ from one_dragon.base.operation.one_dragon_env_context import (
 )
 from one_dragon.base.screen.screen_loader import ScreenContext
 from one_dragon.base.screen.template_loader import TemplateLoader
-from one_dragon.utils import debug_utils, i18_utils, log_utils, thread_utils
+from one_dragon.utils import debug_utils, i18_utils, log_utils, os_utils, thread_utils
 from one_dragon.utils.i18_utils import gt
 from one_dragon.utils.log_utils import log
 
@@ -84,6 +85,7 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
             )
         )
         self.ocr_service: OcrService | None = None  # 延迟初始化
+        self.ocr_layout_cache: OcrLayoutCache = OcrLayoutCache(ocr_matcher=self.ocr)
         self.controller: ControllerBase = controller
 
         self.keyboard_controller = keyboard.Controller()
@@ -93,6 +95,7 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
 
         # 注册应用
         self.run_context: ApplicationRunContext = ApplicationRunContext()
+        self.run_context.set_profile_dir_getter(self._get_profile_dir)
         self.register_application_factory()
 
     def init_by_config(self) -> None:
@@ -252,6 +255,16 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
             self.ocr_service = OcrService(ocr_matcher=self.ocr)
         else:
             self.ocr_service.ocr_matcher = self.ocr
+        self.ocr_layout_cache.ocr_matcher = self.ocr
+
+    def _get_profile_dir(self) -> Optional[str]:
+        """
+        运行应用时 性能记录的导出目录
+        @return: 未开启性能记录时返回None
+        """
+        if not self.env_config.operation_profile:
+            return None
+        return os_utils.get_path_under_work_dir('.log', 'profile')
 
     def after_app_shutdown(self) -> None:
         """
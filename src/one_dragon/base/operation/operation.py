@@ -17,6 +17,7 @@ from one_dragon.base.matcher.ocr import ocr_utils
 from one_dragon.base.operation.operation_base import OperationBase, OperationResult
 from one_dragon.base.operation.operation_edge import OperationEdge, OperationEdgeDesc
 from one_dragon.base.operation.operation_node import OperationNode
+from one_dragon.base.operation import operation_profiler
 from one_dragon.base.operation.operation_round_result import (
     OperationRoundResult,
     OperationRoundResultEnum,
@@ -423,7 +424,10 @@ class Operation(OperationBase):
                 continue
 
             try:
-                round_result: OperationRoundResult = self._execute_one_round()
+                node_name = 'none' if self._current_node is None else self._current_node.cn
+                with operation_profiler.get_profiler().node_round(self.display_name, node_name) as profile_frame:
+                    round_result: OperationRoundResult = self._execute_one_round()
+                    profile_frame.set_result(round_result)
                 if (self._current_node is None
                         or (self._current_node is not None and not self._current_node.mute)
                 ):
@@ -630,7 +634,8 @@ class Operation(OperationBase):
         Returns:
             np.ndarray: 截图图像。
         """
-        self.last_screenshot_time, self.last_screenshot = self.ctx.controller.screenshot()
+        with operation_profiler.get_profiler().section('screenshot'):
+            self.last_screenshot_time, self.last_screenshot = self.ctx.controller.screenshot()
         return self.last_screenshot
 
     def save_screenshot(self, prefix: Optional[str] = None) -> str:
@@ -757,11 +762,13 @@ class Operation(OperationBase):
             wait_round_time: 等待直到轮次时间达到此值，如果设置了wait则忽略。默认为None。
         """
         if wait is not None and wait > 0:
-            time.sleep(wait)
+            with operation_profiler.get_profiler().section('sleep'):
+                time.sleep(wait)
         elif wait_round_time is not None and wait_round_time > 0:
             to_wait = wait_round_time - (time.time() - self.round_start_time)
             if to_wait > 0:
-                time.sleep(to_wait)
+                with operation_profiler.get_profiler().section('sleep'):
+                    time.sleep(to_wait)
 
     def round_by_op_result(self, op_result: OperationResult, retry_on_fail: bool = False,
                            wait: Optional[float] = None, wait_round_time: Optional[float] = None) -> OperationRoundResult:
@@ -0,0 +1,443 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from one_dragon.base.operation.operation_round_result import OperationRoundResultEnum
+
+
+@dataclass
+class NodeProfileStats:
+    """单个指令节点的耗时统计"""
+
+    op_name: str
+    """指令名称"""
+
+    node_name: str
+    """节点名称"""
+
+    round_cnt: int = 0
+    """运行轮数"""
+
+    wall_time: float = 0
+    """总耗时 包含嵌套指令的耗时"""
+
+    screenshot_time: float = 0
+    """截图耗时"""
+
+    ocr_time: float = 0
+    """OCR耗时"""
+
+    template_time: float = 0
+    """模板匹配耗时"""
+
+    yolo_time: float = 0
+    """YOLO模型耗时"""
+
+    sleep_time: float = 0
+    """轮次结束后等待的耗时"""
+
+    retry_cnt: int = 0
+    """返回重试的次数"""
+
+    wait_cnt: int = 0
+    """返回等待的次数"""
+
+
+@dataclass
+class SectionProfileStats:
+    """不在任何节点中的一类耗时的统计 例如其它线程中的识别"""
+
+    category: str
+    """类型"""
+
+    name: str
+    """名称"""
+
+    cnt: int = 0
+    """次数"""
+
+    total_time: float = 0
+    """总耗时"""
+
+
+SECTION_CATEGORY_LIST: list[str] = ['screenshot', 'ocr', 'template', 'yolo', 'sleep']
+"""会统计到节点上的耗时类型 对应 NodeProfileStats 中的 {category}_time"""
+
+
+class _NullFrame:
+    """未启用时使用的空记录 不做任何事情"""
+
+    def __enter__(self) -> _NullFrame:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+    def set_result(self, result: Any) -> None:
+        pass
+
+
+_NULL_FRAME = _NullFrame()
+
+
+class _ProfileFrame:
+
+    def __init__(self, profiler: OperationProfiler, name: str, category: str,
+                 stats: Optional[NodeProfileStats] = None, args: Optional[dict] = None):
+        """
+        一段耗时的记录 使用 with 包裹需要记录的代码
+
+        Args:
+            profiler: 记录器
+            name: 名称
+            category: 类型 node 或 SECTION_CATEGORY_LIST 中的一个
+            stats: 节点的统计 只有节点才有
+            args: 额外信息 会写入trace事件中
+        """
+        self.profiler: OperationProfiler = profiler
+        self.name: str = name
+        self.category: str = category
+        self.stats: Optional[NodeProfileStats] = stats
+        self.args: Optional[dict] = args
+        self.start_time: float = 0
+
+    def __enter__(self) -> _ProfileFrame:
+        self.start_time = time.perf_counter()
+        self.profiler._push_frame(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.profiler._pop_frame(self, time.perf_counter())
+
+    def set_result(self, result: Any) -> None:
+        """
+        记录节点本轮的返回结果
+
+        Args:
+            result: 本轮的结果 OperationRoundResult
+        """
+        if self.stats is None or result is None:
+            return
+        if result.result == OperationRoundResultEnum.RETRY:
+            self.stats.retry_cnt += 1
+        elif result.result == OperationRoundResultEnum.WAIT:
+            self.stats.wait_cnt += 1
+        if self.args is not None:
+            self.args['result'] = result.result.name
+            self.args['status'] = result.status
+
+
+class OperationProfiler:
+
+    def __init__(self, max_events: int = 200000):
+        """
+        指令性能记录 默认不启用
+        启用后 记录每个节点每一轮的耗时 以及其中截图、OCR、模板匹配、YOLO、等待的耗时
+        嵌套指令的节点在同一个线程中 记录在外层节点的时间范围内
+        不在任何节点中的耗时 (例如其它线程中的识别) 只按类型和名称统计次数和总耗时 不记录事件
+        结果可以导出为 Chrome trace (chrome://tracing 或 https://ui.perfetto.dev) 或 speedscope 文件
+
+        Args:
+            max_events: 最多保留的事件数量 超过后丢弃最早的事件
+        """
+        self._lock = threading.Lock()
+        self.max_events: int = max_events
+        self._local = threading.local()
+
+        self.enabled: bool = False
+        """是否正在记录"""
+
+        self.run_name: str = ''
+        """本次记录的名称"""
+
+        self._start_time: float = 0
+        self._end_time: float = 0
+        self._events: deque[tuple[int, str, str, float, float, Optional[dict]]] = deque(maxlen=max_events)  # (线程, 名称, 类型, 开始, 结束, 额外信息)
+        self._dropped_event_cnt: int = 0
+        self._node_stats: dict[tuple[str, str], NodeProfileStats] = {}
+        self._off_node_stats: dict[tuple[str, str], SectionProfileStats] = {}
+        self._thread_names: dict[int, str] = {}
+
+    def start(self, run_name: str) -> None:
+        """
+        开始记录 清空之前的记录
+
+        Args:
+            run_name: 本次记录的名称 例如应用ID
+        """
+        with self._lock:
+            self.run_name = run_name
+            self._start_time = time.perf_counter()
+            self._end_time = self._start_time
+            self._events = deque(maxlen=self.max_events)
+            self._dropped_event_cnt = 0
+            self._node_stats = {}
+            self._off_node_stats = {}
+            self._thread_names = {}
+            self.enabled = True
+
+    def stop(self) -> None:
+        """
+        停止记录 记录的内容保留到下一次开始
+        """
+        with self._lock:
+            self.enabled = False
+            self._end_time = time.perf_counter()
+
+    def node_round(self, op_name: str, node_name: str) -> _ProfileFrame | _NullFrame:
+        """
+        记录节点的一轮运行
+
+        Args:
+            op_name: 指令名称
+            node_name: 节点名称
+
+        Returns:
+            用 with 包裹这一轮的运行
+        """
+        if not self.enabled:
+            return _NULL_FRAME
+        key = (op_name, node_name)
+        with self._lock:
+            stats = self._node_stats.get(key)
+            if stats is None:
+                stats = NodeProfileStats(op_name=op_name, node_name=node_name)
+                self._node_stats[key] = stats
+        return _ProfileFrame(self, node_name, 'node', stats=stats, args={'op': op_name})
+
+    def section(self, category: str, name: Optional[str] = None) -> _ProfileFrame | _NullFrame:
+        """
+        记录一段特定类型的耗时 会统计到当前线程正在运行的最内层节点上
+
+        Args:
+            category: 类型 SECTION_CATEGORY_LIST 中的一个
+            name: 名称 不传入时使用类型
+
+        Returns:
+            用 with 包裹需要记录的代码
+        """
+        if not self.enabled:
+            return _NULL_FRAME
+        return _ProfileFrame(self, category if name is None else name, category)
+
+    def _get_stack(self) -> list[_ProfileFrame]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = []
+            self._local.stack = stack
+        return stack
+
+    def _push_frame(self, frame: _ProfileFrame) -> None:
+        self._get_stack().append(frame)
+
+    def _pop_frame(self, frame: _ProfileFrame, end_time: float) -> None:
+        stack = self._get_stack()
+        if len(stack) > 0 and stack[-1] is frame:
+            stack.pop()
+        elif frame in stack:  # 异常情况下顺序可能错乱 保证栈能恢复
+            stack.remove(frame)
+
+        usage = end_time - frame.start_time
+        node_frame: Optional[_ProfileFrame] = frame if frame.stats is not None else None
+        in_node: bool = node_frame is not None  # 是否在某个节点中
+        counted_by_outer: bool = False  # 外层有相同类型的记录 由外层统计 避免重复
+        if node_frame is None:
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i].stats is not None:
+                    in_node = True
+                    if not counted_by_outer:
+                        node_frame = stack[i]
+                    break
+                if stack[i].category == frame.category:
+                    counted_by_outer = True
+
+        thread = threading.current_thread()
+        with self._lock:
+            if not self.enabled or frame.start_time < self._start_time:  # 不在记录期间的 不记录
+                return
+            if not in_node:  # 不在节点中的 只做汇总统计
+                if not counted_by_outer:
+                    key = (frame.category, frame.name)
+                    section_stats = self._off_node_stats.get(key)
+                    if section_stats is None:
+                        section_stats = SectionProfileStats(category=frame.category, name=frame.name)
+                        self._off_node_stats[key] = section_stats
+                    section_stats.cnt += 1
+                    section_stats.total_time += usage
+                return
+            self._thread_names[thread.ident] = thread.name
+            if len(self._events) == self._events.maxlen:
+                self._dropped_event_cnt += 1
+            self._events.append((thread.ident, frame.name, frame.category, frame.start_time, end_time, frame.args))
+            if node_frame is None:
+                return
+            stats = node_frame.stats
+            if frame is node_frame:
+                stats.round_cnt += 1
+                stats.wall_time += usage
+            elif frame.category in SECTION_CATEGORY_LIST:
+                attr = f'{frame.category}_time'
+                setattr(stats, attr, getattr(stats, attr) + usage)
+
+    def get_node_stats(self) -> list[NodeProfileStats]:
+        """
+        Returns:
+            各节点的统计 按总耗时从高到低排序
+        """
+        with self._lock:
+            stats_list = list(self._node_stats.values())
+        stats_list.sort(key=lambda i: i.wall_time, reverse=True)
+        return stats_list
+
+    def get_off_node_stats(self) -> list[SectionProfileStats]:
+        """
+        Returns:
+            不在节点中的耗时统计 按总耗时从高到低排序
+        """
+        with self._lock:
+            stats_list = list(self._off_node_stats.values())
+        stats_list.sort(key=lambda i: i.total_time, reverse=True)
+        return stats_list
+
+    @property
+    def dropped_event_cnt(self) -> int:
+        """超过最大数量后丢弃的事件数量"""
+        return self._dropped_event_cnt
+
+    def to_chrome_trace(self) -> dict:
+        """
+        转化成 Chrome trace 事件格式
+
+        Returns:
+            可以直接保存为json的字典
+        """
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+            start_time = self._start_time
+            dropped_event_cnt = self._dropped_event_cnt
+
+        pid = os.getpid()
+        trace_events: list[dict] = []
+        for tid, name in thread_names.items():
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}})
+        for tid, name, category, t1, t2, args in events:
+            event = {
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': round((t1 - start_time) * 1e6, 1),
+                'dur': round((t2 - t1) * 1e6, 1),
+                'pid': pid,
+                'tid': tid,
+            }
+            if args is not None:
+                event['args'] = args
+            trace_events.append(event)
+
+        return {
+            'traceEvents': trace_events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'run_name': self.run_name, 'dropped_event_cnt': dropped_event_cnt},
+        }
+
+    def to_speedscope(self) -> dict:
+        """
+        转化成 speedscope 的文件格式 每个线程一个 evented 类型的 profile
+
+        Returns:
+            可以直接保存为json的字典
+        """
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+            start_time = self._start_time
+            end_time = self._end_time if not self.enabled else time.perf_counter()
+
+        frame_list: list[dict] = []
+        frame_idx_map: dict[str, int] = {}
+        thread_events: dict[int, list] = {}
+        for tid, name, _category, t1, t2, args in events:
+            frame_name = name if args is None or 'op' not in args else f"{args['op']} {name}"
+            idx = frame_idx_map.get(frame_name)
+            if idx is None:
+                idx = len(frame_list)
+                frame_idx_map[frame_name] = idx
+                frame_list.append({'name': frame_name})
+            thread_events.setdefault(tid, []).append((t1 - start_time, t2 - start_time, idx))
+
+        profiles: list[dict] = []
+        for tid, event_list in thread_events.items():
+            # 同一个线程的记录是严格嵌套的 外层的先开始 开始时间相同时外层的结束更晚
+            event_list.sort(key=lambda i: (i[0], -i[1]))
+            open_close: list[dict] = []
+            stack: list[tuple[float, int]] = []
+            for t1, t2, idx in event_list:
+                while len(stack) > 0 and stack[-1][0] <= t1:
+                    close_time, close_idx = stack.pop()
+                    open_close.append({'type': 'C', 'frame': close_idx, 'at': close_time * 1000})
+                open_close.append({'type': 'O', 'frame': idx, 'at': t1 * 1000})
+                stack.append((t2, idx))
+            while len(stack) > 0:
+                close_time, close_idx = stack.pop()
+                open_close.append({'type': 'C', 'frame': close_idx, 'at': close_time * 1000})
+
+            profiles.append({
+                'type': 'evented',
+                'name': thread_names.get(tid, str(tid)),
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': max((end_time - start_time) * 1000, open_close[-1]['at']),
+                'events': open_close,
+            })
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frame_list},
+            'profiles': profiles,
+            'name': self.run_name,
+            'exporter': 'one_dragon',
+        }
+
+    def export_chrome_trace(self, file_path: str) -> None:
+        """
+        导出为 Chrome trace 文件
+
+        Args:
+            file_path: 文件路径
+        """
+        self._save_json(file_path, self.to_chrome_trace())
+
+    def export_speedscope(self, file_path: str) -> None:
+        """
+        导出为 speedscope 文件
+
+        Args:
+            file_path: 文件路径
+        """
+        self._save_json(file_path, self.to_speedscope())
+
+    @staticmethod
+    def _save_json(file_path: str, data: dict) -> None:
+        dir_path = os.path.dirname(file_path)
+        if dir_path != '':
+            os.makedirs(dir_path, exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+
+
+_profiler: OperationProfiler = OperationProfiler()
+
+
+def get_profiler() -> OperationProfiler:
+    """
+    Returns:
+        全局的指令性能记录 所有指令共用
+    """
+    return _profiler
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from enum import Enum
+from functools import partial
 from typing import TYPE_CHECKING, List, Optional
 
 import cv2
@@ -64,25 +65,15 @@ def find_area_in_screen(ctx: OneDragonContext, screen: MatLike, area: ScreenArea
                 color_range=area.color_range,
                 rect=area.rect
             )
+        elif ctx.env_config.ocr_layout_cache:
+            ocr_result_map = ctx.ocr_layout_cache.run_ocr(
+                area, get_text_area_image(screen, area),
+                is_valid=partial(is_text_area_matched, area)
+            )
         else:
-            rect = area.rect
-            part = cv2_utils.crop_image_only(screen, rect)
-
-            if area.color_range is None:
-                to_ocr = part
-            else:
-                mask = cv2.inRange(part,
-                                   np.array(area.color_range[0], dtype=np.uint8),
-                                   np.array(area.color_range[1], dtype=np.uint8))
-                mask = cv2_utils.dilate(mask, 2)
-                to_ocr = cv2.bitwise_and(part, part, mask=mask)
-
-            ocr_result_map = ctx.ocr.run_ocr(to_ocr)
-
-        for ocr_result, mrl in ocr_result_map.items():
-            if str_utils.find_by_lcs(gt(area.text, 'game'), ocr_result, percent=area.lcs_percent):
-                find = True
-                break
+            ocr_result_map = ctx.ocr.run_ocr(get_text_area_image(screen, area))
+
+        find = is_text_area_matched(area, ocr_result_map)
     elif area.is_template_area:
         rect = area.rect
         part = cv2_utils.crop_image_only(screen, rect)
@@ -94,6 +85,35 @@ def find_area_in_screen(ctx: OneDragonContext, screen: MatLike, area: ScreenArea
     return FindAreaResultEnum.TRUE if find else FindAreaResultEnum.FALSE
 
 
+def get_text_area_image(screen: MatLike, area: ScreenArea) -> MatLike:
+    """
+    获取文本区域用于OCR的图片 有颜色范围时只保留范围内的颜色
+    :param screen: 游戏截图
+    :param area: 文本区域
+    :return: 图片
+    """
+    part = cv2_utils.crop_image_only(screen, area.rect)
+    if area.color_range is None:
+        return part
+
+    mask = cv2.inRange(part,
+                       np.array(area.color_range[0], dtype=np.uint8),
+                       np.array(area.color_range[1], dtype=np.uint8))
+    mask = cv2_utils.dilate(mask, 2)
+    return cv2.bitwise_and(part, part, mask=mask)
+
+
+def is_text_area_matched(area: ScreenArea, ocr_result_map: dict) -> bool:
+    """
+    OCR结果中 是否有文本区域的目标文本
+    :param area: 文本区域
+    :param ocr_result_map: 区域的OCR结果
+    :return: 是否匹配
+    """
+    return any(str_utils.find_by_lcs_list(gt(area.text, 'game'), list(ocr_result_map.keys()),
+                                          percent=area.lcs_percent))
+
+
 def find_and_click_area(ctx: OneDragonContext, screen: MatLike, screen_name: str, area_name: str) -> OcrClickResultEnum:
     """
     在一个区域匹配成功后进行点击
@@ -116,8 +136,10 @@ def find_and_click_area(ctx: OneDragonContext, screen: MatLike, screen_name: str
         # cv2_utils.show_image(to_ocr_part, win_name='debug', wait=1)
 
         ocr_result_map = ctx.ocr.run_ocr(to_ocr_part)
-        for ocr_result, mrl in ocr_result_map.items():
-            if str_utils.find_by_lcs(gt(area.text, 'game'), ocr_result, percent=area.lcs_percent):
+        match_list = str_utils.find_by_lcs_list(gt(area.text, 'game'), list(ocr_result_map.keys()),
+                                                percent=area.lcs_percent)
+        for matched, mrl in zip(match_list, ocr_result_map.values()):
+            if matched:
                 to_click = mrl.max.center + area.left_top
                 if ctx.controller.click(to_click, pc_alt=area.pc_alt):
                     return OcrClickResultEnum.OCR_CLICK_SUCCESS
@@ -229,17 +251,46 @@ def is_target_screen(ctx: OneDragonContext, screen: MatLike,
             return False
 
     existed_id_mark: bool = False
-    fit_id_mark: bool = True
+    text_area_list: List[ScreenArea] = []  # 不使用OCR缓存时 文本区域放在模板区域之后识别
     for screen_area in screen_info.area_list:
         if not screen_area.id_mark:
             continue
         existed_id_mark = True
 
+        if screen_area.is_text_area and not ctx.env_config.ocr_cache:
+            text_area_list.append(screen_area)
+            continue
+
         if find_area_in_screen(ctx, screen, screen_area) != FindAreaResultEnum.TRUE:
-            fit_id_mark = False
-            break
+            return False
+
+    if not existed_id_mark:
+        return False
+
+    if len(text_area_list) == 0:
+        return True
+
+    # 大部分调用都不是目标画面 先单独识别第一个区域 不匹配时直接返回 避免对其他区域做检测
+    if find_area_in_screen(ctx, screen, text_area_list[0]) != FindAreaResultEnum.TRUE:
+        return False
+
+    rest_area_list = text_area_list[1:]
+    if len(rest_area_list) == 1:
+        return find_area_in_screen(ctx, screen, rest_area_list[0]) == FindAreaResultEnum.TRUE
+    elif len(rest_area_list) > 1:
+        image_list = [get_text_area_image(screen, i) for i in rest_area_list]
+        if ctx.env_config.ocr_layout_cache:
+            ocr_result_map_list = ctx.ocr_layout_cache.run_ocr_batch(
+                rest_area_list, image_list,
+                [partial(is_text_area_matched, i) for i in rest_area_list]
+            )
+        else:
+            ocr_result_map_list = ctx.ocr.run_ocr_batch(image_list)
+        for area, ocr_result_map in zip(rest_area_list, ocr_result_map_list):
+            if not is_text_area_matched(area, ocr_result_map):
+                return False
 
-    return existed_id_mark and fit_id_mark
+    return True
 
 
 def find_by_ocr(ctx: OneDragonContext, screen: MatLike, target_cn: str,
@@ -276,10 +327,11 @@ def find_by_ocr(ctx: OneDragonContext, screen: MatLike, target_cn: str,
     ocr_result_map = ctx.ocr.run_ocr(to_ocr_part)
 
     to_click: Optional[Point] = None
-    for ocr_result, mrl in ocr_result_map.items():
+    match_list = str_utils.find_by_lcs_list(gt(target_cn, 'game'), list(ocr_result_map.keys()), percent=lcs_percent)
+    for matched, mrl in zip(match_list, ocr_result_map.values()):
         if mrl.max is None:
             continue
-        if str_utils.find_by_lcs(gt(target_cn, 'game'), ocr_result, percent=lcs_percent):
+        if matched:
             to_click = mrl.max.center
             break
 
@@ -494,4 +494,28 @@ class EnvConfig(YamlConfig):
 
     @ocr_cache.setter
     def ocr_cache(self, new_value: bool) -> None:
-        self.update('ocr_cache', new_value, save=True)
\ No newline at end of file
+        self.update('ocr_cache', new_value, save=True)
+
+    @property
+    def ocr_layout_cache(self) -> bool:
+        """
+        Returns:
+            是否启用OCR布局缓存 文本位置固定的区域跳过检测模型
+        """
+        return self.get('ocr_layout_cache', False)
+
+    @ocr_layout_cache.setter
+    def ocr_layout_cache(self, new_value: bool) -> None:
+        self.update('ocr_layout_cache', new_value, save=True)
+
+    @property
+    def operation_profile(self) -> bool:
+        """
+        Returns:
+            是否记录运行时每个指令节点的耗时 运行结束后导出到 .log/profile
+        """
+        return self.get('operation_profile', False)
+
+    @operation_profile.setter
+    def operation_profile(self, new_value: bool) -> None:
+        self.update('operation_profile', new_value, save=True)
\ No newline at end of file
@@ -8,7 +8,7 @@ import numpy as np
 from cv2.typing import MatLike
 
 from one_dragon.base.geometry.rectangle import Rect
-from one_dragon.base.matcher.match_result import MatchResultList, MatchResult
+from one_dragon.base.matcher.match_result import MATCH_RESULT_DTYPE, MatchResultList, MatchResult
 
 feature_detector = cv2.SIFT_create()
 
@@ -177,7 +177,9 @@ def mark_area_as_color(image: MatLike, pos: List, color, new_image: bool = False
 
 def match_template(source: MatLike, template: MatLike, threshold,
                    mask: np.ndarray = None, only_best: bool = True,
-                   ignore_inf: bool = False) -> MatchResultList:
+                   ignore_inf: bool = False,
+                   merge_distance: float = 10,
+                   max_result_cnt: int = 0) -> MatchResultList:
     """
     在原图中匹配模板 注意无法从负偏移量开始匹配 即需要保证目标模板不会在原图边缘位置导致匹配不到
     :param source: 原图
@@ -186,7 +188,9 @@ def match_template(source: MatLike, template: MatLike, threshold,
     :param mask: 掩码
     :param only_best: 只返回最好的结果
     :param ignore_inf: 是否忽略无限大的结果
-    :return: 所有匹配结果
+    :param merge_distance: 返回多个结果时 距离在这个范围内的只保留置信度最高的一个
+    :param max_result_cnt: 返回多个结果时 最多返回多少个 0为不限制
+    :return: 所有匹配结果 返回多个结果时按置信度倒序 置信度相同时按先行后列
     """
     tx, ty = template.shape[1], template.shape[0]
     # 进行模板匹配
@@ -195,18 +199,70 @@ def match_template(source: MatLike, template: MatLike, threshold,
     # show_image(mask, win_name='mask', wait=1)
     result = cv2.matchTemplate(source, template, cv2.TM_CCOEFF_NORMED, mask=mask)
 
-    match_result_list = MatchResultList(only_best=only_best)
-    filtered_locations = np.where(np.logical_and(
-        result >= threshold,
-        np.isfinite(result) if ignore_inf else np.ones_like(result))
-    )  # 过滤低置信度的匹配结果
+    # 过滤无效值 nan 本来就不会通过阈值判断
+    invalid = ~np.isfinite(result) if ignore_inf else np.isnan(result)
+    if invalid.any():
+        result[invalid] = -np.inf
 
-    # 遍历所有匹配结果，并输出位置和置信度
-    for pt in zip(*filtered_locations[::-1]):
-        confidence = result[pt[1], pt[0]]  # 获取置信度
-        match_result_list.append(MatchResult(confidence, pt[0], pt[1], tx, ty))
+    if only_best:
+        match_result_list = MatchResultList(only_best=True)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val >= threshold:
+            match_result_list.append(MatchResult(max_val, max_loc[0], max_loc[1], tx, ty))
+        return match_result_list
 
-    return match_result_list
+    data = find_peaks_with_nms(result, threshold, tx, ty,
+                               merge_distance=merge_distance, max_result_cnt=max_result_cnt)
+    return MatchResultList.from_array(data, only_best=False)
+
+
+def find_peaks_with_nms(result: np.ndarray, threshold: float,
+                        w: int, h: int,
+                        merge_distance: float = 10,
+                        max_result_cnt: int = 0) -> np.ndarray:
+    """
+    从模板匹配的结果图中 找出超过阈值的峰值 并做非极大值抑制
+    :param result: cv2.matchTemplate 的结果
+    :param threshold: 阈值
+    :param w: 模板宽度
+    :param h: 模板高度
+    :param merge_distance: 距离在这个范围内的只保留置信度最高的一个
+    :param max_result_cnt: 最多返回多少个 0为不限制
+    :return: MATCH_RESULT_DTYPE 的结构化数组 按置信度倒序 置信度相同时按先行后列
+    """
+    ys, xs = np.nonzero(result >= threshold)
+    scores = result[ys, xs]
+    order = np.argsort(-scores, kind='stable')
+    ys, xs, scores = ys[order], xs[order], scores[order]
+
+    if merge_distance > 0 and len(scores) > 1:
+        # 贪心抑制 从置信度最高的开始 删除距离在范围内的其它点
+        # 不能先用膨胀只保留局部最大值 被删除的点可能抑制了更远处本该保留的点
+        keep = np.ones(len(scores), dtype=bool)
+        dist_limit = merge_distance ** 2
+        kept_cnt = 0
+        for i in range(len(scores)):
+            if not keep[i]:
+                continue
+            kept_cnt += 1
+            if 0 < max_result_cnt <= kept_cnt:
+                keep[i + 1:] = False  # 已经够数 后面的点不需要再看
+                break
+            later = slice(i + 1, None)
+            near = (xs[later] - xs[i]) ** 2 + (ys[later] - ys[i]) ** 2 <= dist_limit
+            keep[later] &= ~near
+        ys, xs, scores = ys[keep], xs[keep], scores[keep]
+
+    if max_result_cnt > 0:
+        ys, xs, scores = ys[:max_result_cnt], xs[:max_result_cnt], scores[:max_result_cnt]
+
+    data = np.empty(len(scores), dtype=MATCH_RESULT_DTYPE)
+    data['confidence'] = scores
+    data['x'] = xs
+    data['y'] = ys
+    data['w'] = w
+    data['h'] = h
+    return data
 
 
 def concat_vertically(img: MatLike, next_img: MatLike, decision_height: int = 150):
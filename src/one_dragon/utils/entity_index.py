@@ -0,0 +1,195 @@
+import difflib
+from collections import Counter
+from typing import Callable, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+from one_dragon.utils import i18_utils, str_utils
+
+T = TypeVar('T')
+
+
+class EntityIndex(Generic[T]):
+
+    def __init__(
+            self,
+            entity_list: Sequence[T],
+            name_getter: Optional[Callable[[T], str]] = None,
+            gt_model: Optional[str] = 'game',
+            ignore_case: bool = False,
+    ):
+        """
+        游戏实体的名称索引 用于OCR结果与实体的匹配
+        构建时翻译好所有名称 并建立 名称 -> 实体 的字典 和 字符 -> 实体 的倒排索引
+        模糊匹配前先用倒排索引算出 每个实体与OCR结果共有的字符数量
+        这是最长公共子序列长度 和 difflib 匹配字符数 的上界 上界不满足阈值的实体可以直接跳过 不影响匹配结果
+        切换语言后 下一次使用时自动重新构建
+
+        :param entity_list: 实体列表
+        :param name_getter: 获取实体名称的方法 不传入时实体本身就是名称
+        :param gt_model: 翻译名称使用的模块 为None时不翻译
+        :param ignore_case: 匹配时是否忽略大小写
+        """
+        self.entity_list: List[T] = list(entity_list)
+        self.name_list: List[str] = [
+            (name_getter(i) if name_getter is not None else i) or ''
+            for i in self.entity_list
+        ]
+        self.gt_model: Optional[str] = gt_model
+        self.ignore_case: bool = ignore_case
+
+        self.text_list: List[str] = []  # 翻译后的名称
+        self._lang: Optional[str] = None
+        self._match_text_list: List[str] = []  # 用于匹配的名称 忽略大小写时为小写
+        self._name_2_idx: dict[str, int] = {}
+        self._text_2_idx: dict[str, int] = {}
+        self._char_2_idx: dict[str, List[Tuple[int, int]]] = {}  # key=字符 value=[(下标, 出现次数)]
+        self._empty_idx_list: List[int] = []  # 名称为空的下标 不在倒排索引中
+
+        self._build()
+
+    def _build(self) -> None:
+        """
+        按当前语言构建索引
+        """
+        self._lang = i18_utils.get_default_lang()
+        self.text_list = [
+            i18_utils.gt(name, self.gt_model) if self.gt_model is not None else name
+            for name in self.name_list
+        ]
+        self._match_text_list = [i.lower() for i in self.text_list] if self.ignore_case else list(self.text_list)
+
+        self._name_2_idx = {}
+        self._text_2_idx = {}
+        self._char_2_idx = {}
+        self._empty_idx_list = []
+        for idx, name in enumerate(self.name_list):
+            self._name_2_idx.setdefault(name, idx)
+        for idx, text in enumerate(self._match_text_list):
+            self._text_2_idx.setdefault(text, idx)
+            if len(text) == 0:
+                self._empty_idx_list.append(idx)
+            for c, cnt in Counter(text).items():
+                self._char_2_idx.setdefault(c, []).append((idx, cnt))
+
+    def _check_lang(self) -> None:
+        if self.gt_model is not None and self._lang != i18_utils.get_default_lang():
+            self._build()
+
+    def get_by_name(self, name: str) -> Optional[T]:
+        """
+        按原名称获取实体
+        :param name: 原名称
+        :return: 第一个名称完全一致的实体
+        """
+        idx = self._name_2_idx.get(name)
+        return self.entity_list[idx] if idx is not None else None
+
+    def get_idx_by_text(self, text: str) -> Optional[int]:
+        """
+        按翻译后的名称获取实体下标
+        :param text: 翻译后的名称
+        :return: 第一个名称完全一致的实体下标
+        """
+        self._check_lang()
+        if text is None:
+            return None
+        return self._text_2_idx.get(text.lower() if self.ignore_case else text)
+
+    def get_text(self, idx: int) -> str:
+        """
+        :param idx: 实体下标
+        :return: 实体翻译后的名称
+        """
+        self._check_lang()
+        return self.text_list[idx]
+
+    def _get_common_char_cnt(self, text: str) -> dict[int, int]:
+        """
+        每个实体与文本共有的字符数量 考虑字符的出现次数
+        :param text: 匹配文本 忽略大小写时需要已经转成小写
+        :return: key=实体下标 value=共有字符数量 没有共有字符的实体不在结果中
+        """
+        common_cnt: dict[int, int] = {}
+        for c, text_cnt in Counter(text).items():
+            for idx, cnt in self._char_2_idx.get(c, ()):
+                common_cnt[idx] = common_cnt.get(idx, 0) + min(text_cnt, cnt)
+        return common_cnt
+
+    def get_lcs_candidates(self, text: str, percent: float) -> List[int]:
+        """
+        找出可能满足 str_utils.find_by_lcs(实体名称, text, percent) 的实体
+        text 的任何子串 与实体名称的最长公共子序列长度 都不会超过共有字符数量
+        因此返回结果以外的实体 与 text 及其子串的匹配结果一定为 False
+        :param text: OCR结果
+        :param percent: 最长公共子序列长度 需要占 实体名称长度 的百分比
+        :return: 从小到大排序的实体下标
+        """
+        self._check_lang()
+        if text is None or len(text) == 0:
+            return []
+        if percent <= 0:
+            return list(range(len(self.entity_list)))
+
+        common_cnt = self._get_common_char_cnt(text.lower() if self.ignore_case else text)
+        result = [
+            idx for idx, cnt in common_cnt.items()
+            if cnt >= len(self.text_list[idx]) * percent
+        ]
+        result.extend(self._empty_idx_list)
+        result.sort()
+        return result
+
+    def get_close_matches(self, word: str, n: int = 3, cutoff: float = 0.6) -> List[int]:
+        """
+        与 difflib.get_close_matches(word, 所有实体名称, n, cutoff) 结果一致
+        difflib 对每个候选计算的 quick_ratio 只取决于共有字符数量 不满足阈值的实体不需要交给 difflib
+        :param word: OCR结果
+        :param n: 最多返回的数量
+        :param cutoff: 相似度阈值
+        :return: 按相似度从高到低排序的实体下标 名称重复时取第一个
+        """
+        self._check_lang()
+        if self.ignore_case:
+            word = word.lower()
+
+        if cutoff <= 0:
+            candidate_list = list(range(len(self.entity_list)))
+        else:
+            word_len = len(word)
+            candidate_list = [
+                idx for idx, cnt in self._get_common_char_cnt(word).items()
+                if 2.0 * cnt / (len(self._match_text_list[idx]) + word_len) >= cutoff
+            ]
+            if word_len == 0:
+                candidate_list.extend(self._empty_idx_list)
+
+        results = difflib.get_close_matches(word, [self._match_text_list[i] for i in candidate_list], n=n, cutoff=cutoff)
+        return [self._text_2_idx[i] for i in results]
+
+    def find_best_match_by_difflib(self, word: str, cutoff: float = 0.6) -> Optional[int]:
+        """
+        与 str_utils.find_best_match_by_difflib(word, 所有实体名称, cutoff) 结果一致
+        :param word: OCR结果
+        :param cutoff: 相似度阈值
+        :return: 最相近的实体下标
+        """
+        results = self.get_close_matches(word, n=1, cutoff=cutoff)
+        return results[0] if len(results) > 0 else None
+
+    def find_most_similar(self, word_list: List[str]) -> Tuple[Optional[int], Optional[int]]:
+        """
+        与 str_utils.find_most_similar(word_list, 所有实体名称) 结果一致
+        :param word_list: OCR结果列表
+        :return: 最匹配的一组下标 (OCR结果下标, 实体下标)
+        """
+        for word in word_list:
+            entity_idx = self.find_best_match_by_difflib(word)
+            if entity_idx is None:
+                continue
+
+            word_idx = str_utils.find_best_match_by_difflib(self._match_text_list[entity_idx], word_list)
+            if word_idx is None or word_list[word_idx] != word:
+                continue
+
+            return word_list.index(word), entity_idx
+
+        return None, None
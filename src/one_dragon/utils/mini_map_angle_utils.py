@@ -56,6 +56,85 @@ def generate_polar_remap_maps(
     return mx, my
 
 
+@lru_cache
+def generate_polar_remap_maps_in_radius(
+        d: int,
+        angle_resolution: int = 360,
+        radius_range: tuple[float, float] = (0.1, 0.6),
+):
+    """
+    生成只覆盖指定半径范围的坐标映射表
+    计算角度时只使用中间一段半径 直接按这段生成映射表 remap 时就不用展开再裁剪
+
+    Args:
+        d: 原始正方形图像的边长。
+        angle_resolution: 角度映射到横坐标的长度
+        radius_range: 使用的半径范围 与 calculate 中的含义一致
+
+    Returns:
+        mx, my: 用于 cv2.remap 的x, y坐标映射表。
+    """
+    mx, my = generate_polar_remap_maps(d, angle_resolution=angle_resolution)
+    row_start = int(d * radius_range[0])
+    row_end = int(d * radius_range[1])
+    return np.ascontiguousarray(mx[row_start:row_end]), np.ascontiguousarray(my[row_start:row_end])
+
+
+def _extract_boundaries(
+        view_mask: MatLike,
+        scale: int,
+        angle_resolution: int,
+        radius_range: tuple[float, float],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    将小地图视野按角度展开 并找出扇形的左右边界
+
+    Args:
+        view_mask: 小地图视野遮罩 应为正方形
+        scale: 图像的缩放因子
+        angle_resolution: 角度分辨率
+        radius_range: 计算采用的半径范围
+
+    Returns:
+        remap, gradient, l, r: 展开后的图像、梯度、左边界直方图、右边界直方图
+    """
+    d = view_mask.shape[0]  # 获取图像尺寸 即小地图的直径
+
+    # 第二步：坐标变换，将圆形区域展开为矩形
+    # 获取极坐标到直角坐标的映射矩阵 只包含需要的半径范围 避免中心点和边缘的干扰
+    m1, m2 = generate_polar_remap_maps_in_radius(d, angle_resolution=angle_resolution, radius_range=tuple(radius_range))
+
+    # 使用remap将圆形图像按角度展开为矩形
+    # 展开后：行代表半径，列代表角度
+    remap = cv2.remap(view_mask, m1, m2, cv2.INTER_LINEAR).astype(np.float32)
+    # 根据scale参数放大图像，提高角度检测精度
+    if scale != 1:
+        remap = cv2.resize(remap, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+
+    # 第三步：梯度检测，找到视野扇形的边界
+    # 使用Scharr算子计算x方向（角度方向）的梯度 扇形边界处会有强烈的梯度变化
+    gradient = cv2.Scharr(remap, cv2.CV_32F, 1, 0)
+
+    # 第四步：峰值检测，找到扇形的左右边界
+    # 检测正梯度峰值（左边界）和负梯度峰值（右边界） 按角度统计峰值出现次数
+    # ravel() 将2D梯度图展平为1D数组 第1行第2行第3行那样拼接起来
+    l_hist = create_angular_histogram_from_peaks(
+        gradient_signal=gradient.ravel(),
+        angular_resolution=angle_resolution * scale
+    )
+    # 注意：通过给gradient取反，找到负梯度峰值
+    r_hist = create_angular_histogram_from_peaks(
+        gradient_signal=-gradient.ravel(),
+        angular_resolution=angle_resolution * scale
+    )
+
+    # 分离左右边界：只保留左边界强于右边界的位置作为左边界，反之亦然
+    # 这样可以避免同一位置既是左边界又是右边界的情况
+    l, r = np.maximum(l_hist - r_hist, 0), np.maximum(r_hist - l_hist, 0)
+
+    return remap, gradient, l, r
+
+
 def create_angular_histogram_from_peaks(
     gradient_signal: np.ndarray,
     angular_resolution: int,
@@ -224,40 +303,8 @@ def calculate(
                 - 'view_angle': 检测到的角度
                 - 'max_index': 最大响应位置索引
     """
-    d = view_mask.shape[0]  # 获取图像尺寸 即小地图的直径
-
-    # 第二步：坐标变换，将圆形区域展开为矩形
-    # 获取极坐标到直角坐标的映射矩阵
-    m1, m2 = generate_polar_remap_maps(d, angle_resolution=angle_resolution)
-
-    # 使用remap将圆形图像按角度展开为矩形
-    # 展开后：行代表半径，列代表角度 remap.shape=(d, angle_resolution)
-    remap = cv2.remap(view_mask, m1, m2, cv2.INTER_LINEAR)
-    # 只取中间部分，避免中心点和边缘的干扰
-    remap = remap[int(d * radius_range[0]):int(d * radius_range[1])].astype(np.float32)
-    # 根据scale参数放大图像，提高角度检测精度
-    remap = cv2.resize(remap, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
-
-    # 第三步：梯度检测，找到视野扇形的边界
-    # 使用Scharr算子计算x方向（角度方向）的梯度 扇形边界处会有强烈的梯度变化
-    gradient = cv2.Scharr(remap, cv2.CV_32F, 1, 0)
-
-    # 第四步：峰值检测，找到扇形的左右边界
-    # 检测正梯度峰值（左边界）和负梯度峰值（右边界） 按角度统计峰值出现次数
-    # ravel() 将2D梯度图展平为1D数组 第1行第2行第3行那样拼接起来
-    l_hist = create_angular_histogram_from_peaks(
-        gradient_signal=gradient.ravel(),
-        angular_resolution=angle_resolution * scale
-    )
-    # 注意：通过给gradient取反，找到负梯度峰值
-    r_hist = create_angular_histogram_from_peaks(
-        gradient_signal=-gradient.ravel(),
-        angular_resolution=angle_resolution * scale
-    )
-
-    # 分离左右边界：只保留左边界强于右边界的位置作为左边界，反之亦然
-    # 这样可以避免同一位置既是左边界又是右边界的情况
-    l, r = np.maximum(l_hist - r_hist, 0), np.maximum(r_hist - l_hist, 0)
+    # 第二步到第四步：展开为矩形 检测梯度 找到扇形的左右边界
+    remap, gradient, l, r = _extract_boundaries(view_mask, scale, angle_resolution, radius_range)
 
     # 第五步：卷积匹配，寻找最佳的扇形角度
     # 1. 创建用于平滑 r 信号的三角核
@@ -328,6 +375,39 @@ def calculate(
     return degree, steps
 
 
+def calculate_many(
+        view_mask_list: list[MatLike],
+        scale: int = 1,
+        angle_resolution: int = 360,
+        radius_range: tuple[float, float] = (0.1, 0.6),
+        view_angle: int = 90,
+) -> list[float | None]:
+    """
+    批量计算多张小地图的朝向角度 用于离线评估
+    同尺寸的小地图共用同一份映射表
+
+    Args:
+        view_mask_list: 小地图视野遮罩列表
+        scale: 图像的缩放因子
+        angle_resolution: 角度分辨率
+        radius_range: 计算采用的半径范围
+        view_angle: 视野角度
+
+    Returns:
+        每张小地图的角度 无法识别时为None
+    """
+    return [
+        calculate(
+            view_mask,
+            scale=scale,
+            angle_resolution=angle_resolution,
+            radius_range=radius_range,
+            view_angle=view_angle,
+        )[0]
+        for view_mask in view_mask_list
+    ]
+
+
 def calculate_sector_angle(
         view_mask: MatLike,
         scale: int = 1,
@@ -375,40 +455,8 @@ def calculate_sector_angle(
                 - 'left_max_index': 左边界最大响应索引
                 - 'right_max_index': 右边界最大响应索引
     """
-    d = view_mask.shape[0]  # 获取图像尺寸 即小地图的直径
-
-    # 第二步：坐标变换，将圆形区域展开为矩形（与calculate方法相同）
-    # 获取极坐标到直角坐标的映射矩阵
-    m1, m2 = generate_polar_remap_maps(d, angle_resolution=angle_resolution)
-
-    # 使用remap将圆形图像按角度展开为矩形
-    # 展开后：行代表半径，列代表角度 remap.shape=(d, angle_resolution)
-    remap = cv2.remap(view_mask, m1, m2, cv2.INTER_LINEAR)
-    # 只取中间部分，避免中心点和边缘的干扰
-    remap = remap[int(d * radius_range[0]):int(d * radius_range[1])].astype(np.float32)
-    # 根据scale参数放大图像，提高角度检测精度
-    remap = cv2.resize(remap, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
-
-    # 第三步：梯度检测，找到视野扇形的边界（与calculate方法相同）
-    # 使用Scharr算子计算x方向（角度方向）的梯度 扇形边界处会有强烈的梯度变化
-    gradient = cv2.Scharr(remap, cv2.CV_32F, 1, 0)
-
-    # 第四步：峰值检测，找到扇形的左右边界（与calculate方法相同）
-    # 检测正梯度峰值（左边界）和负梯度峰值（右边界） 按角度统计峰值出现次数
-    # ravel() 将2D梯度图展平为1D数组 第1行第2行第3行那样拼接起来
-    l_hist = create_angular_histogram_from_peaks(
-        gradient_signal=gradient.ravel(),
-        angular_resolution=angle_resolution * scale
-    )
-    # 注意：通过给gradient取反，找到负梯度峰值
-    r_hist = create_angular_histogram_from_peaks(
-        gradient_signal=-gradient.ravel(),
-        angular_resolution=angle_resolution * scale
-    )
-
-    # 分离左右边界：只保留左边界强于右边界的位置作为左边界，反之亦然
-    # 这样可以避免同一位置既是左边界又是右边界的情况
-    l, r = np.maximum(l_hist - r_hist, 0), np.maximum(r_hist - l_hist, 0)
+    # 第二步到第四步：展开为矩形 检测梯度 找到扇形的左右边界
+    remap, gradient, l, r = _extract_boundaries(view_mask, scale, angle_resolution, radius_range)
 
     # 第五步：边界平滑和角度计算
     # 对左右边界进行平滑处理，提高检测稳定性
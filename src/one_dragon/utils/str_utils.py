@@ -2,6 +2,7 @@ import difflib
 import re
 from typing import Optional, List, Tuple
 
+from one_dragon.utils import text_match_utils
 from one_dragon.utils.i18_utils import gt
 
 _WITH_CHINESE_PATTERN = re.compile(r'[\u4e00-\u9fff]+')
@@ -44,6 +45,31 @@ def find_by_lcs(source: str, target: str, percent: float = 0.3,
     return common_length >= len(source) * percent
 
 
+def find_by_lcs_list(source: str, target_list: List[str], percent: float = 0.3,
+                     ignore_case: bool = True) -> List[bool]:
+    """
+    find_by_lcs 的批量版本 一个OCR目标 同时判断多个OCR结果
+    所有OCR结果只需要一次位并行计算 结果与逐个调用 find_by_lcs 一致
+    :param source: OCR目标
+    :param target_list: OCR结果列表
+    :param percent: 最长公共子序列长度 需要占 source长度 的百分比
+    :param ignore_case: 是否忽略大小写
+    :return: 每个OCR结果是否包含OCR目标
+    """
+    if source is None or len(source) == 0:
+        return [False for _ in target_list]
+
+    matcher = text_match_utils.TextMatcher(
+        ['' if target is None else target for target in target_list],
+        ignore_case=ignore_case
+    )
+    min_length = len(source) * percent
+    return [
+        len(target) > 0 and common_length >= min_length
+        for target, common_length in zip(matcher.text_list, matcher.lcs_length_list(source))
+    ]
+
+
 def longest_common_subsequence_length(str1: str, str2: str) -> int:
     """
     找两个字符串的最长公共子序列长度
@@ -51,21 +77,7 @@ def longest_common_subsequence_length(str1: str, str2: str) -> int:
     :param str2:
     :return: 长度
     """
-    m = len(str1)
-    n = len(str2)
-
-    # 创建一个二维数组用于存储中间结果
-    dp = [[0] * (n + 1) for _ in range(m + 1)]
-
-    # 动态规划求解
-    for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            if str1[i - 1] == str2[j - 1]:
-                dp[i][j] = dp[i - 1][j - 1] + 1
-            else:
-                dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
-
-    return dp[m][n]
+    return text_match_utils.lcs_length(str1, str2)
 
 
 def get_positive_digits(v: str, err: Optional[int] = None) -> Optional[int]:
@@ -116,8 +128,9 @@ def find_best_match_by_lcs(word: str, target_word_list: List[str],
     target_idx: Optional[int] = None
     target_lcs_percent: Optional[float] = None
 
+    lcs_list = text_match_utils.get_text_matcher(target_word_list).lcs_length_list(word)
     for idx, target_word in enumerate(target_word_list):
-        lcs = longest_common_subsequence_length(word, target_word)
+        lcs = lcs_list[idx]
         if lcs == 0:  # 至少要有一个匹配
             continue
         lcs_percent = lcs * 1.0 / len(target_word)
@@ -178,23 +191,7 @@ def levenshtein_distance(s1: str, s2: str) -> int:
     """
     计算两个字符串之间的 Levenshtein 编辑距离
     """
-    if len(s1) < len(s2):
-        return levenshtein_distance(s2, s1)
-
-    if len(s2) == 0:
-        return len(s1)
-
-    previous_row = range(len(s2) + 1)
-    for i, c1 in enumerate(s1):
-        current_row = [i + 1]
-        for j, c2 in enumerate(s2):
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1
-            substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
-
-    return previous_row[-1]
+    return text_match_utils.levenshtein_distance(s1, s2)
 
 
 def find_best_match_by_similarity(
@@ -215,10 +212,10 @@ def find_best_match_by_similarity(
     best_match = None
     highest_score = -1.0
 
-    for target in target_texts:
+    distance_list = text_match_utils.get_text_matcher([i or '' for i in target_texts]).levenshtein_distance_list(ocr_text)
+    for target, distance in zip(target_texts, distance_list):
         if not target:
             continue
-        distance = levenshtein_distance(ocr_text, target)
         max_len = max(len(ocr_text), len(target))
         if max_len == 0:
             score = 1.0 if distance == 0 else 0.0
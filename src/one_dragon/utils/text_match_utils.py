@@ -0,0 +1,138 @@
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+
+class TextMatcher:
+
+    def __init__(self, text_list: Sequence[str], ignore_case: bool = False):
+        """
+        一个查询文本 对 多个目标文本 的位并行匹配
+        最长公共子序列长度 使用 Allison-Dix / Hyyrö 的算法
+        编辑距离 使用 Myers / Hyyrö 的算法
+
+        所有目标文本的每个字符对应一个二进制位 依次拼接成一个大整数
+        每段之间留一个为0的间隔位 用于吸收加法的进位 不影响相邻的段
+        这样每个查询字符只需要对这个大整数做一组位运算 就能同时更新所有目标文本的结果
+
+        :param text_list: 目标文本列表
+        :param ignore_case: 是否忽略大小写
+        """
+        self.text_list: List[str] = list(text_list)
+        self.ignore_case: bool = ignore_case
+
+        self._len_list: List[int] = []  # 每段的长度
+        self._seg_mask_list: List[int] = []  # 每段的掩码
+        self._char_mask: dict[str, int] = {}  # 每个字符在目标文本中出现的位置
+        self._mask: int = 0  # 所有段的位置 不包含间隔位
+        self._low: int = 0  # 每段的最低位
+
+        offset = 0
+        for text in self.text_list:
+            if ignore_case:
+                text = text.lower()
+            seg_mask = ((1 << len(text)) - 1) << offset
+            self._len_list.append(len(text))
+            self._seg_mask_list.append(seg_mask)
+            self._mask |= seg_mask
+            if len(text) > 0:
+                self._low |= 1 << offset
+            for i, c in enumerate(text):
+                self._char_mask[c] = self._char_mask.get(c, 0) | (1 << (offset + i))
+            offset += len(text) + 1
+
+    def lcs_length_list(self, query: str) -> List[int]:
+        """
+        查询文本 与 每个目标文本 的最长公共子序列长度
+        :param query: 查询文本
+        :return: 与目标文本列表一一对应的长度
+        """
+        if self.ignore_case:
+            query = query.lower()
+        mask = self._mask
+        char_mask = self._char_mask
+
+        # v中为0的位 表示目标文本中对应的字符已在公共子序列中
+        v = mask
+        for c in query:
+            u = v & char_mask.get(c, 0)
+            # u是v的子集 减法不会借位 加法进位到间隔位后停止
+            v = ((v + u) | (v - u)) & mask
+
+        return [
+            seg_len - (v & seg_mask).bit_count()
+            for seg_len, seg_mask in zip(self._len_list, self._seg_mask_list)
+        ]
+
+    def levenshtein_distance_list(self, query: str) -> List[int]:
+        """
+        查询文本 与 每个目标文本 的编辑距离
+        :param query: 查询文本
+        :return: 与目标文本列表一一对应的编辑距离
+        """
+        if self.ignore_case:
+            query = query.lower()
+        mask = self._mask
+        low = self._low
+        char_mask = self._char_mask
+
+        # 动态规划矩阵中 当前列相邻两行的差值 pv为+1的位置 mv为-1的位置
+        pv = mask
+        mv = 0
+        for c in query:
+            eq = char_mask.get(c, 0)
+            xv = eq | mv
+            xh = ((((eq & pv) + pv) ^ pv) | eq) & mask
+            ph = (mv | ~(xh | pv)) & mask
+            mh = pv & xh
+            # 第0行的横向差值都是+1 移位到间隔位的要去掉 不能进入下一段
+            ph = ((ph << 1) & mask) | low
+            mh = (mh << 1) & mask
+            pv = (mh | ~(xv | ph)) & mask
+            mv = ph & xv
+
+        # 最后一列每段最后一行的值 = 第0行的值(查询文本长度) + 这一段的纵向差值之和
+        query_len = len(query)
+        return [
+            query_len + (pv & seg_mask).bit_count() - (mv & seg_mask).bit_count()
+            for seg_mask in self._seg_mask_list
+        ]
+
+
+@lru_cache(maxsize=128)
+def _get_text_matcher(text_tuple: Tuple[str, ...], ignore_case: bool) -> TextMatcher:
+    return TextMatcher(text_tuple, ignore_case=ignore_case)
+
+
+def get_text_matcher(text_list: Sequence[str], ignore_case: bool = False) -> TextMatcher:
+    """
+    获取目标文本列表对应的匹配器 相同的目标文本列表会复用之前构建的匹配器
+    适合目标文本固定的情况 例如配置中的选项名称
+    :param text_list: 目标文本列表
+    :param ignore_case: 是否忽略大小写
+    :return: 匹配器
+    """
+    return _get_text_matcher(tuple(text_list), ignore_case)
+
+
+def lcs_length(str1: str, str2: str) -> int:
+    """
+    两个字符串的最长公共子序列长度
+    :param str1:
+    :param str2:
+    :return: 长度
+    """
+    if len(str1) < len(str2):  # 较长的作为目标文本 减少循环次数
+        str1, str2 = str2, str1
+    return TextMatcher([str1]).lcs_length_list(str2)[0]
+
+
+def levenshtein_distance(s1: str, s2: str) -> int:
+    """
+    两个字符串之间的 Levenshtein 编辑距离
+    :param s1:
+    :param s2:
+    :return: 编辑距离
+    """
+    if len(s1) < len(s2):  # 较长的作为目标文本 减少循环次数
+        s1, s2 = s2, s1
+    return TextMatcher([s1]).levenshtein_distance_list(s2)[0]
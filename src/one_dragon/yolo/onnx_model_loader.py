@@ -6,6 +6,7 @@ import urllib.request
 import zipfile
 from typing import Optional, List
 
+from one_dragon.yolo import onnx_session_registry
 from one_dragon.yolo.log_utils import log
 
 _GH_PROXY_URL = 'https://ghfast.top'
@@ -22,6 +23,7 @@ class OnnxModelLoader:
                  personal_proxy: Optional[str] = '',
                  gpu: bool = False,
                  backup_model_name: Optional[str] = None,
+                 session_name: Optional[str] = None,
                  ):
         self.model_name: str = model_name
         self.backup_model_name: str = backup_model_name  # 备用模型 默认在本地一定有的模型 在新模型无法下载使用时使用
@@ -32,9 +34,11 @@ class OnnxModelLoader:
         self.gh_proxy_url: str = gh_proxy_url
         self.personal_proxy: Optional[str] = personal_proxy
         self.gpu: bool = gpu  # 是否使用GPU加速
+        self.session_name: Optional[str] = session_name  # 会话名称 用于在 OnnxSessionRegistry 中获取会话配置
 
         # 从模型中读取到的输入输出信息
         self.session: ort.InferenceSession = None
+        self.onnx_path: Optional[str] = None  # 加载的模型文件路径
         self.input_names: List[str] = []
         self.onnx_input_width: int = 0
         self.onnx_input_height: int = 0
@@ -134,13 +138,24 @@ class OnnxModelLoader:
 
         onnx_path = os.path.join(self.model_dir_path, 'model.onnx')
         log.info('加载模型 %s', onnx_path)
-        self.session = ort.InferenceSession(
+        self.onnx_path = onnx_path
+        self.session = onnx_session_registry.get_registry().get_session(
             onnx_path,
-            providers=providers
+            providers=providers,
+            session_name=self.session_name,
         )
         self.get_input_details()
         self.get_output_details()
 
+    def release(self) -> None:
+        """
+        换用其他模型前调用 从会话管理中释放这个模型的会话
+        本对象仍持有会话 正在进行的识别不受影响
+        :return:
+        """
+        if self.onnx_path is not None:
+            onnx_session_registry.get_registry().release(self.onnx_path)
+
     def get_input_details(self):
         model_inputs = self.session.get_inputs()
         self.input_names = [model_inputs[i].name for i in range(len(model_inputs))]
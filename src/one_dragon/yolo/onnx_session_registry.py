@@ -0,0 +1,226 @@
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import onnxruntime as ort
+
+from one_dragon.yolo.log_utils import log
+
+
+@dataclass
+class OnnxSessionBudget:
+    """
+    单个模型的会话配置
+    自动战斗中最多有16个线程同时识别 每个会话都使用默认的线程数(物理核心数)时会严重超额占用CPU
+    """
+    intra_op_threads: int = 0  # 算子内部的线程数 0为使用onnxruntime的默认值
+    inter_op_threads: int = 1  # 算子之间的线程数 顺序执行时不生效
+    allow_spinning: bool = True  # 线程空闲时是否自旋等待 小模型频繁调用时关闭可以减少CPU占用
+    enable_mem_arena: bool = True  # 是否使用内存池 输入尺寸固定时开启更快
+    save_optimized_model: bool = True  # 是否保存优化后的模型 下次直接加载 减少启动时间
+
+
+def _default_budget_map() -> Dict[str, OnnxSessionBudget]:
+    cpu_cnt = os.cpu_count() or 4
+    half = max(1, min(4, cpu_cnt // 2))
+    quarter = max(1, min(2, cpu_cnt // 4))
+    return {
+        'ocr_det': OnnxSessionBudget(intra_op_threads=half),
+        'ocr_rec': OnnxSessionBudget(intra_op_threads=quarter),
+        'ocr_cls': OnnxSessionBudget(intra_op_threads=1, allow_spinning=False),
+        # 闪光识别在战斗中每帧运行 和大量状态判断线程同时进行
+        'flash_classifier': OnnxSessionBudget(intra_op_threads=1, allow_spinning=False),
+        'hollow_event_detector': OnnxSessionBudget(intra_op_threads=half),
+        'lost_void_detector': OnnxSessionBudget(intra_op_threads=half),
+    }
+
+
+class OnnxSessionRegistry:
+
+    def __init__(self):
+        """
+        统一管理所有onnx模型的会话
+        - 相同模型文件和配置的会话只创建一次 多个 OneDragonContext 实例之间共享 InferenceSession.run 是线程安全的
+        - 按模型名称配置线程数 避免多个模型同时运行时超额占用CPU
+        - CPU运行时 保存图优化后的模型 之后直接加载优化后的模型 跳过图优化
+        - 创建会话较慢 只按会话加锁 不阻塞其他模型的获取
+        """
+        self._lock = threading.Lock()
+        self._session_map: Dict[Tuple, ort.InferenceSession] = {}
+        self._creating_lock_map: Dict[Tuple, threading.Lock] = {}  # 正在创建的会话 避免同一个会话被重复创建
+        self._budget_map: Dict[str, OnnxSessionBudget] = _default_budget_map()
+
+    def get_budget(self, session_name: Optional[str]) -> OnnxSessionBudget:
+        """
+        :param session_name: 会话名称 例如 ocr_det
+        :return: 会话配置 没有配置时使用默认值
+        """
+        with self._lock:
+            budget = self._budget_map.get(session_name)
+        return OnnxSessionBudget() if budget is None else budget
+
+    def set_budget(self, session_name: str, budget: OnnxSessionBudget) -> None:
+        """
+        修改会话配置 只对之后创建的会话生效
+        :param session_name: 会话名称
+        :param budget: 会话配置
+        """
+        with self._lock:
+            self._budget_map[session_name] = budget
+
+    def get_session(self, model_path: str, providers: List, session_name: Optional[str] = None) -> ort.InferenceSession:
+        """
+        获取会话 已经创建过的直接返回
+        :param model_path: 模型文件路径
+        :param providers: onnxruntime 的 providers
+        :param session_name: 会话名称 用于获取会话配置
+        :return: 会话
+        """
+        budget = self.get_budget(session_name)
+        key = (os.path.abspath(model_path), str(providers), budget.intra_op_threads, budget.inter_op_threads,
+               budget.allow_spinning, budget.enable_mem_arena)
+        with self._lock:
+            session = self._session_map.get(key)
+            if session is not None:
+                return session
+            creating_lock = self._creating_lock_map.setdefault(key, threading.Lock())
+
+        with creating_lock:
+            with self._lock:  # 等待期间可能已经被其他线程创建好
+                session = self._session_map.get(key)
+            if session is not None:
+                return session
+
+            try:
+                session = self._create_session(model_path, providers, budget)
+                with self._lock:
+                    self._session_map[key] = session
+            finally:
+                with self._lock:
+                    self._creating_lock_map.pop(key, None)
+            return session
+
+    def _create_session(self, model_path: str, providers: List, budget: OnnxSessionBudget) -> ort.InferenceSession:
+        options = ort.SessionOptions()
+        if budget.intra_op_threads > 0:
+            options.intra_op_num_threads = budget.intra_op_threads
+        if budget.inter_op_threads > 0:
+            options.inter_op_num_threads = budget.inter_op_threads
+        options.enable_cpu_mem_arena = budget.enable_mem_arena
+        if not budget.allow_spinning:
+            options.add_session_config_entry('session.intra_op.allow_spinning', '0')
+            options.add_session_config_entry('session.inter_op.allow_spinning', '0')
+
+        # 优化后的模型可能包含特定硬件的算子 只在纯CPU时保存
+        use_cpu_only = all(self._get_provider_name(i) == 'CPUExecutionProvider' for i in providers)
+        optimized_path = self.get_optimized_model_path(model_path) if budget.save_optimized_model and use_cpu_only else None
+
+        if optimized_path is not None:
+            self._remove_stale_optimized_models(optimized_path)
+            if not os.path.exists(optimized_path):
+                self._save_optimized_model(model_path, optimized_path, providers)
+
+        # ORT_ENABLE_ALL 的布局优化只在加载时进行 保存的模型中不包含
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if optimized_path is not None and os.path.exists(optimized_path):
+            try:
+                log.info('加载优化后的模型 %s', optimized_path)
+                return ort.InferenceSession(optimized_path, sess_options=options, providers=providers)
+            except Exception:
+                log.error('加载优化后的模型失败 使用原模型 %s', optimized_path, exc_info=True)
+                self._remove_file(optimized_path)
+
+        return ort.InferenceSession(model_path, sess_options=options, providers=providers)
+
+    def _save_optimized_model(self, model_path: str, optimized_path: str, providers: List) -> None:
+        """
+        保存优化后的模型
+        ORT_ENABLE_ALL 会做与CPU指令集相关的布局优化 保存后换一台机器可能无法使用 因此只保存到 ORT_ENABLE_EXTENDED
+        :param model_path: 原模型路径
+        :param optimized_path: 优化后模型的保存路径
+        :param providers: onnxruntime 的 providers
+        """
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        options.optimized_model_filepath = optimized_path
+        try:
+            ort.InferenceSession(model_path, sess_options=options, providers=providers)
+        except Exception:
+            # 保存失败时(例如目录没有写权限) 不保存优化后的模型
+            log.error('保存优化后的模型失败 %s', optimized_path, exc_info=True)
+            self._remove_file(optimized_path)
+
+    def _remove_stale_optimized_models(self, optimized_path: str) -> None:
+        """
+        删除同一个模型旧的优化模型 原模型或onnxruntime版本变化后 旧文件不会再被使用
+        :param optimized_path: 当前优化后模型的路径
+        """
+        model_dir, file_name = os.path.split(optimized_path)
+        prefix = file_name[:file_name.rindex('.optimized-') + len('.optimized-')]
+        try:
+            file_name_list = os.listdir(model_dir)
+        except OSError:
+            return
+        for i in file_name_list:
+            if i != file_name and i.startswith(prefix) and i.endswith('.onnx'):
+                log.info('删除过期的优化模型 %s', i)
+                self._remove_file(os.path.join(model_dir, i))
+
+    @staticmethod
+    def get_optimized_model_path(model_path: str) -> Optional[str]:
+        """
+        优化后模型的保存路径 放在原模型旁边
+        文件名包含 原模型的大小和修改时间 onnxruntime版本 以及保存时的优化级别 任意一个变化后都会重新优化
+        :param model_path: 原模型路径
+        :return: 原模型不存在时返回None
+        """
+        try:
+            stat = os.stat(model_path)
+        except OSError:
+            return None
+        digest = hashlib.md5(f'{stat.st_size}-{stat.st_mtime_ns}-{ort.__version__}-extended'.encode()).hexdigest()[:12]
+        model_dir, file_name = os.path.split(model_path)
+        name, _ = os.path.splitext(file_name)
+        return os.path.join(model_dir, f'{name}.optimized-{digest}.onnx')
+
+    @staticmethod
+    def _get_provider_name(provider) -> str:
+        return provider[0] if isinstance(provider, tuple) else provider
+
+    @staticmethod
+    def _remove_file(file_path: str) -> None:
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        except OSError:
+            pass
+
+    def release(self, model_path: Optional[str] = None) -> None:
+        """
+        释放会话 正在使用会话的对象仍持有引用 不受影响
+        :param model_path: 模型文件路径 为None时释放全部
+        """
+        with self._lock:
+            if model_path is None:
+                self._session_map.clear()
+                return
+            model_path = os.path.abspath(model_path)
+            for key in [i for i in self._session_map.keys() if i[0] == model_path]:
+                self._session_map.pop(key)
+
+    @property
+    def session_cnt(self) -> int:
+        with self._lock:
+            return len(self._session_map)
+
+
+_registry: OnnxSessionRegistry = OnnxSessionRegistry()
+
+
+def get_registry() -> OnnxSessionRegistry:
+    """
+    :return: 全局的会话管理 所有模型共用
+    """
+    return _registry
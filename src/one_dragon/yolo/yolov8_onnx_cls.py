@@ -60,12 +60,14 @@ class Yolov8Classifier(OnnxModelLoader):
                  gpu: bool = False,
                  backup_model_name: Optional[str] = None,
                  keep_result_seconds: float = 2,
+                 session_name: Optional[str] = None,
                  ):
         """
         :param model_name: 模型名称 在根目录下会有一个以模型名称创建的子文件夹
         :param model_parent_dir_path: 放置所有模型的根目录
         :param gpu: 是否启用GPU加速
         :param keep_result_seconds: 保留多长时间的识别结果
+        :param session_name: 会话名称 用于获取线程数等会话配置
         """
         OnnxModelLoader.__init__(
             self,
@@ -76,7 +78,8 @@ class Yolov8Classifier(OnnxModelLoader):
             gh_proxy_url=gh_proxy_url,
             personal_proxy=personal_proxy,
             gpu=gpu,
-            backup_model_name=backup_model_name
+            backup_model_name=backup_model_name,
+            session_name=session_name,
         )
 
         self.keep_result_seconds: float = keep_result_seconds  # 保留识别结果的秒数
@@ -23,7 +23,8 @@ class Yolov8Detector(OnnxModelLoader):
                  personal_proxy: Optional[str] = None,
                  gpu: bool = False,
                  backup_model_name: Optional[str] = None,
-                 keep_result_seconds: float = 2
+                 keep_result_seconds: float = 2,
+                 session_name: Optional[str] = None,
                  ):
         """
         yolov8 detect 导出 onnx 后使用
@@ -33,6 +34,7 @@ class Yolov8Detector(OnnxModelLoader):
         :param model_parent_dir_path: 放置所有模型的根目录
         :param gpu: 是否启用GPU运算
         :param keep_result_seconds: 保留多长时间的识别结果
+        :param session_name: 会话名称 用于获取线程数等会话配置
         """
         OnnxModelLoader.__init__(
             self,
@@ -43,7 +45,8 @@ class Yolov8Detector(OnnxModelLoader):
             gh_proxy_url=gh_proxy_url,
             personal_proxy=personal_proxy,
             gpu=gpu,
-            backup_model_name=backup_model_name
+            backup_model_name=backup_model_name,
+            session_name=session_name,
         )
 
         self.keep_result_seconds: float = keep_result_seconds  # 保留识别结果的秒数
@@ -59,6 +59,16 @@ class SettingEnvInterface(VerticalScrollInterface):
         )
         basic_group.addSettingCard(self.ocr_cache_opt)
 
+        self.ocr_layout_cache_opt = SwitchSettingCard(
+            icon=FluentIcon.SEARCH, title='OCR布局缓存', content='文本位置固定的区域跳过文字检测(测试中)'
+        )
+        basic_group.addSettingCard(self.ocr_layout_cache_opt)
+
+        self.operation_profile_opt = SwitchSettingCard(
+            icon=FluentIcon.SPEED_HIGH, title='性能记录', content='记录每个节点的耗时 运行结束后导出到 .log/profile'
+        )
+        basic_group.addSettingCard(self.operation_profile_opt)
+
         return basic_group
 
     def _init_code_group(self) -> SettingCardGroup:
@@ -182,6 +192,8 @@ class SettingEnvInterface(VerticalScrollInterface):
         self.debug_opt.init_with_adapter(self.ctx.env_config.get_prop_adapter('is_debug'))
         self.copy_screenshot_opt.init_with_adapter(self.ctx.env_config.get_prop_adapter('copy_screenshot'))
         self.ocr_cache_opt.init_with_adapter(self.ctx.env_config.get_prop_adapter('ocr_cache'))
+        self.ocr_layout_cache_opt.init_with_adapter(self.ctx.env_config.get_prop_adapter('ocr_layout_cache'))
+        self.operation_profile_opt.init_with_adapter(self.ctx.env_config.get_prop_adapter('operation_profile'))
 
         self.key_start_running_input.init_with_adapter(self.ctx.env_config.get_prop_adapter('key_start_running'))
         self.key_stop_running_input.init_with_adapter(self.ctx.env_config.get_prop_adapter('key_stop_running'))
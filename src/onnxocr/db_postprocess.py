@@ -105,6 +105,11 @@ class DBPostProcess(object):
         '''
         _bitmap: single map with shape (1, H, W),
                 whose values are binarized as {0, 1}
+
+        最小外接矩形是轴对齐整数矩形时(横排文字的绝大多数情况) 走快速路径
+        - 分数直接对矩形切片求平均 不再为每个框分配掩码
+        - 扩张后的框按 pyclipper 的结果解析计算 批量完成 不再调用 shapely 和 pyclipper
+        其余的框仍逐个使用原来的方法
         '''
 
         bitmap = _bitmap
@@ -119,35 +124,145 @@ class DBPostProcess(object):
 
         num_contours = min(len(contours), self.max_candidates)
 
-        boxes = []
-        scores = []
+        box_list = []  # (轮廓下标, 框, 分数)
+        fast_index_list = []
+        fast_rect_list = []  # 轴对齐的最小外接矩形 [x0, y0, x1, y1]
         for index in range(num_contours):
             contour = contours[index]
-            points, sside = self.get_mini_boxes(contour)
-            if sside < self.min_size:
-                continue
-            points = np.array(points)
+            bounding_box = cv2.minAreaRect(contour)
             if self.score_mode == "fast":
-                score = self.box_score_fast(pred, points.reshape(-1, 2))
-            else:
-                score = self.box_score_slow(pred, contour)
-            if self.box_thresh > score:
-                continue
+                rect = self.get_axis_aligned_rect(bounding_box)
+                if rect is not None:
+                    fast_index_list.append(index)
+                    fast_rect_list.append(rect)
+                    continue
 
-            box = self.unclip(points, self.unclip_ratio).reshape(-1, 1, 2)
-            box, sside = self.get_mini_boxes(box)
-            if sside < self.min_size + 2:
-                continue
-            box = np.array(box)
+            result = self.box_from_contour(pred, contour, bounding_box,
+                                           width, height, dest_width, dest_height)
+            if result is not None:
+                box_list.append((index, result[0], result[1]))
 
-            box[:, 0] = np.clip(
-                np.round(box[:, 0] / width * dest_width), 0, dest_width)
-            box[:, 1] = np.clip(
-                np.round(box[:, 1] / height * dest_height), 0, dest_height)
-            boxes.append(box.astype("int32"))
-            scores.append(score)
+        if len(fast_rect_list) > 0:
+            box_list.extend(self.boxes_from_axis_aligned_rects(
+                pred, fast_index_list, np.array(fast_rect_list, dtype=np.float64),
+                width, height, dest_width, dest_height))
+            box_list.sort(key=lambda x: x[0])
+
+        boxes = [i[1] for i in box_list]
+        scores = [i[2] for i in box_list]
         return np.array(boxes, dtype="int32"), scores
 
+    def box_from_contour(self, pred, contour, bounding_box, width, height, dest_width, dest_height):
+        """
+        单个轮廓计算文本框 原来的逐个处理方法
+        :return: (框, 分数) 被过滤时返回None
+        """
+        points, sside = self.get_mini_boxes(contour, bounding_box)
+        if sside < self.min_size:
+            return None
+        points = np.array(points)
+        if self.score_mode == "fast":
+            score = self.box_score_fast(pred, points.reshape(-1, 2))
+        else:
+            score = self.box_score_slow(pred, contour)
+        if self.box_thresh > score:
+            return None
+
+        box = self.unclip(points, self.unclip_ratio).reshape(-1, 1, 2)
+        box, sside = self.get_mini_boxes(box)
+        if sside < self.min_size + 2:
+            return None
+        box = np.array(box)
+
+        box[:, 0] = np.clip(
+            np.round(box[:, 0] / width * dest_width), 0, dest_width)
+        box[:, 1] = np.clip(
+            np.round(box[:, 1] / height * dest_height), 0, dest_height)
+        return box.astype("int32"), score
+
+    @staticmethod
+    def get_axis_aligned_rect(bounding_box):
+        """
+        最小外接矩形是轴对齐 且顶点都是整数时 返回 [x0, y0, x1, y1] 否则返回None
+        """
+        (cx, cy), (w, h), angle = bounding_box
+        if angle == 90 or angle == -90:
+            w, h = h, w
+        elif angle != 0:
+            return None
+        x0 = cx - w / 2
+        y0 = cy - h / 2
+        if not x0.is_integer() or not y0.is_integer() or not w.is_integer() or not h.is_integer():
+            return None
+        return [x0, y0, x0 + w, y0 + h]
+
+    def boxes_from_axis_aligned_rects(self, pred, index_list, rects, width, height, dest_width, dest_height):
+        """
+        批量处理轴对齐的矩形 与 box_from_contour 的差别只在于
+        原方法对扩张后的多边形再求最小外接矩形时 boxPoints 有浮点误差 缩放后恰好在0.5边界时会差1像素
+        :param pred: 概率图
+        :param index_list: 每个矩形对应的轮廓下标
+        :param rects: 矩形 [[x0, y0, x1, y1]]
+        :return: [(轮廓下标, 框, 分数)]
+        """
+        rect_w = rects[:, 2] - rects[:, 0]
+        rect_h = rects[:, 3] - rects[:, 1]
+        keep_idx = np.flatnonzero(np.minimum(rect_w, rect_h) >= self.min_size)
+
+        # 整数顶点的轴对齐矩形 填充后的掩码就是闭区间内的整个矩形 直接对切片求平均 不需要掩码
+        # 积分图需要整张图计算一次 只有框的数量上百时才比逐个切片快
+        h, w = pred.shape[:2]
+        clipped = np.empty_like(rects, dtype=np.int64)
+        clipped[:, 0::2] = np.clip(rects[:, 0::2], 0, w - 1)
+        clipped[:, 1::2] = np.clip(rects[:, 1::2], 0, h - 1)
+        score_list = []
+        score_keep_idx = []
+        for i in keep_idx:
+            xmin, ymin, xmax, ymax = clipped[i]
+            score = cv2.mean(pred[ymin:ymax + 1, xmin:xmax + 1])[0]
+            if score >= self.box_thresh:
+                score_list.append(score)
+                score_keep_idx.append(i)
+        if len(score_keep_idx) == 0:
+            return []
+        keep_idx = np.array(score_keep_idx)
+        rects = rects[keep_idx]
+        rect_w = rect_w[keep_idx]
+        rect_h = rect_h[keep_idx]
+
+        # 与 unclip 的计算顺序保持一致 保证浮点结果相同
+        area = rect_w * rect_h
+        length = rect_w + rect_h + rect_w + rect_h
+        distance = area * self.unclip_ratio / length
+        # pyclipper 圆角扩张后 最远的点在四条边上 坐标按 Clipper 的规则四舍五入(远离0)
+        ex0 = self.clipper_round(rects[:, 0] - distance)
+        ey0 = self.clipper_round(rects[:, 1] - distance)
+        ex1 = self.clipper_round(rects[:, 2] + distance)
+        ey1 = self.clipper_round(rects[:, 3] + distance)
+        sside_keep = np.minimum(ex1 - ex0, ey1 - ey0) >= self.min_size + 2
+
+        # 顺序与 get_mini_boxes 一致 左上 右上 右下 左下 使用相同的 float32 类型做缩放
+        box_arr = np.stack([
+            np.stack([ex0, ey0], axis=1),
+            np.stack([ex1, ey0], axis=1),
+            np.stack([ex1, ey1], axis=1),
+            np.stack([ex0, ey1], axis=1),
+        ], axis=1).astype(np.float32)
+        box_arr[:, :, 0] = np.clip(
+            np.round(box_arr[:, :, 0] / width * dest_width), 0, dest_width)
+        box_arr[:, :, 1] = np.clip(
+            np.round(box_arr[:, :, 1] / height * dest_height), 0, dest_height)
+        box_arr = box_arr.astype("int32")
+
+        return [(index_list[keep_idx[i]], box_arr[i], score_list[i]) for i in np.flatnonzero(sside_keep)]
+
+    @staticmethod
+    def clipper_round(value):
+        """
+        Clipper 内部的取整 0.5时远离0
+        """
+        return np.where(value < 0, np.ceil(value - 0.5), np.floor(value + 0.5))
+
     def unclip(self, box, unclip_ratio):
         poly = Polygon(box)
         distance = poly.area * unclip_ratio / poly.length
@@ -156,8 +271,9 @@ class DBPostProcess(object):
         expanded = np.array(offset.Execute(distance))
         return expanded
 
-    def get_mini_boxes(self, contour):
-        bounding_box = cv2.minAreaRect(contour)
+    def get_mini_boxes(self, contour, bounding_box=None):
+        if bounding_box is None:
+            bounding_box = cv2.minAreaRect(contour)
         points = sorted(list(cv2.boxPoints(bounding_box)), key=lambda x: x[0])
 
         index_1, index_2, index_3, index_4 = 0, 1, 2, 3
@@ -60,6 +60,36 @@ class ONNXPaddleOcr(TextSystem):
                 return cls_res
             return ocr_res
 
+    def ocr_batch(self, img_list, det=True, cls=True, ratio_scale=2.0):
+        """
+        多张图片一起识别 识别模型按宽高比分组批量运行
+        :param img_list: 图片列表
+        :param det: 是否使用检测模型 不使用时每张图片视为一行文本
+        :param cls: 是否使用方向分类
+        :param ratio_scale: 同一批内允许的宽高比倍数
+        :return: 每张图片的结果 det=True 时格式与 ocr(img)[0] 一致 det=False 时为 [text, score]
+        """
+        if len(img_list) == 0:
+            return []
+
+        if det:
+            ocr_res = []
+            for dt_boxes, rec_res in self.batch_call(img_list, cls, ratio_scale=ratio_scale):
+                if dt_boxes is None:
+                    ocr_res.append([])
+                else:
+                    ocr_res.append([[box.tolist(), res] for box, res in zip(dt_boxes, rec_res)])
+            return ocr_res
+        else:
+            img_list = list(img_list)
+            if self.use_angle_cls and cls:
+                img_list, cls_res_tmp = self.text_classifier(img_list)
+            return self.text_recognizer(
+                img_list,
+                batch_num=max(self.text_recognizer.rec_batch_num, len(img_list)),
+                ratio_scale=ratio_scale,
+            )
+
 
 def sav2Img(org_img, result, name="draw_ocr.jpg"):
     # 显示结果
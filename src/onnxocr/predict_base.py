@@ -1,17 +1,18 @@
-import onnxruntime
+from one_dragon.yolo import onnx_session_registry
 
 class PredictBase(object):
     def __init__(self):
         pass
 
-    def get_onnx_session(self, model_dir, use_gpu):
+    def get_onnx_session(self, model_dir, use_gpu, session_name=None):
         # 使用gpu
         if use_gpu:
             providers =[('CUDAExecutionProvider',{"cudnn_conv_algo_search": "DEFAULT"}),'CPUExecutionProvider']
         else:
             providers =['CPUExecutionProvider']
 
-        onnx_session = onnxruntime.InferenceSession(model_dir, None,providers=providers)
+        # 会话统一管理 按 session_name 配置线程数 多个实例共享同一个会话
+        onnx_session = onnx_session_registry.get_registry().get_session(model_dir, providers, session_name=session_name)
 
         # print("providers:", onnxruntime.get_device())
         return onnx_session
@@ -18,7 +18,7 @@ class TextRecognizer(PredictBase):
         )
 
         # 初始化模型
-        self.rec_onnx_session = self.get_onnx_session(args.rec_model_dir, args.use_gpu)
+        self.rec_onnx_session = self.get_onnx_session(args.rec_model_dir, args.use_gpu, session_name='ocr_rec')
         self.rec_input_name = self.get_input_name(self.rec_onnx_session)
         self.rec_output_name = self.get_output_name(self.rec_onnx_session)
 
@@ -276,7 +276,12 @@ class TextRecognizer(PredictBase):
 
         return img
 
-    def __call__(self, img_list):
+    def __call__(self, img_list, batch_num=None, ratio_scale=None):
+        """
+        :param img_list: 待识别的文本图片
+        :param batch_num: 每批最多的图片数量 默认使用 rec_batch_num
+        :param ratio_scale: 传入时按宽高比分组 同一批内补齐后的宽高比不超过批内最小值的这个倍数 避免窄图补齐到很宽
+        """
         img_num = len(img_list)
         # Calculate the aspect ratio of all text bars
         width_list = []
@@ -285,12 +290,23 @@ class TextRecognizer(PredictBase):
         # Sorting can speed up the recognition process
         indices = np.argsort(np.array(width_list))
         rec_res = [["", 0.0]] * img_num
-        batch_num = self.rec_batch_num
+        if batch_num is None:
+            batch_num = self.rec_batch_num
+
+        imgC, imgH, imgW = self.rec_image_shape[:3]
+        if ratio_scale is None:
+            batch_range_list = [
+                (beg_img_no, min(img_num, beg_img_no + batch_num))
+                for beg_img_no in range(0, img_num, batch_num)
+            ]
+        else:
+            batch_range_list = get_batch_ranges(
+                [width_list[i] for i in indices], batch_num,
+                min_ratio=imgW / imgH, ratio_scale=ratio_scale
+            )
 
-        for beg_img_no in range(0, img_num, batch_num):
-            end_img_no = min(img_num, beg_img_no + batch_num)
+        for beg_img_no, end_img_no in batch_range_list:
             norm_img_batch = []
-            imgC, imgH, imgW = self.rec_image_shape[:3]
             max_wh_ratio = imgW / imgH
             # max_wh_ratio = 0
             for ino in range(beg_img_no, end_img_no):
@@ -323,3 +339,28 @@ class TextRecognizer(PredictBase):
                 rec_res[indices[beg_img_no + rno]] = rec_result[rno]
 
         return rec_res
+
+
+def get_batch_ranges(sorted_ratio_list, batch_num, min_ratio, ratio_scale):
+    """
+    将按宽高比升序排列的图片划分成批次
+    每批补齐到批内最大的宽高比(不小于 min_ratio) 当补齐后的宽高比超过批内第一张的 ratio_scale 倍时 开始新的一批
+    :param sorted_ratio_list: 升序排列的宽高比
+    :param batch_num: 每批最多的图片数量
+    :param min_ratio: 模型输入的最小宽高比 小于它的图片都会补齐到这个宽高比
+    :param ratio_scale: 同一批内允许的宽高比倍数
+    :return: 每批的 [开始下标, 结束下标)
+    """
+    batch_range_list = []
+    img_num = len(sorted_ratio_list)
+    beg_img_no = 0
+    while beg_img_no < img_num:
+        limit_ratio = max(min_ratio, sorted_ratio_list[beg_img_no]) * ratio_scale
+        end_img_no = beg_img_no + 1
+        while (end_img_no < img_num
+               and end_img_no - beg_img_no < batch_num
+               and sorted_ratio_list[end_img_no] <= limit_ratio):
+            end_img_no += 1
+        batch_range_list.append((beg_img_no, end_img_no))
+        beg_img_no = end_img_no
+    return batch_range_list
@@ -1,6 +1,5 @@
 import os
 import cv2
-import copy
 import onnxocr.predict_det as predict_det
 import onnxocr.predict_cls as predict_cls
 import onnxocr.predict_rec as predict_rec
@@ -33,7 +32,28 @@ class TextSystem(object):
         self.crop_image_res_index += bbox_num
 
     def __call__(self, img, cls=True):
-        ori_im = img.copy()
+        dt_boxes, img_crop_list = self.detect_and_crop(img)
+        if dt_boxes is None:
+            return None, None
+
+        # 方向分类
+        if self.use_angle_cls and cls:
+            img_crop_list, angle_list = self.text_classifier(img_crop_list)
+
+        # 图像识别
+        rec_res = self.text_recognizer(img_crop_list)
+
+        if self.args.save_crop_res:
+            self.draw_crop_rec_res(self.args.crop_res_save_dir, img_crop_list, rec_res)
+        return self.filter_by_drop_score(dt_boxes, rec_res)
+
+    def detect_and_crop(self, img):
+        """
+        文字检测并裁剪出每个文本框
+        :param img: 图片
+        :return: 排序后的文本框 和 对应的裁剪图片 检测失败时文本框为None
+        """
+        # 检测和裁剪都不会修改原图 轴对齐的框直接使用原图的切片 不需要复制
         # 文字检测
         dt_boxes = self.text_detector(img)
 
@@ -45,23 +65,16 @@ class TextSystem(object):
         dt_boxes = sorted_boxes(dt_boxes)
 
         # 图片裁剪
-        for bno in range(len(dt_boxes)):
-            tmp_box = copy.deepcopy(dt_boxes[bno])
+        for box in dt_boxes:
             if self.args.det_box_type == "quad":
-                img_crop = get_rotate_crop_image(ori_im, tmp_box)
+                img_crop = get_rotate_crop_image(img, box)
             else:
-                img_crop = get_minarea_rect_crop(ori_im, tmp_box)
+                img_crop = get_minarea_rect_crop(img, box)
             img_crop_list.append(img_crop)
 
-        # 方向分类
-        if self.use_angle_cls and cls:
-            img_crop_list, angle_list = self.text_classifier(img_crop_list)
+        return dt_boxes, img_crop_list
 
-        # 图像识别
-        rec_res = self.text_recognizer(img_crop_list)
-
-        if self.args.save_crop_res:
-            self.draw_crop_rec_res(self.args.crop_res_save_dir, img_crop_list, rec_res)
+    def filter_by_drop_score(self, dt_boxes, rec_res):
         filter_boxes, filter_rec_res = [], []
         for box, rec_result in zip(dt_boxes, rec_res):
             text, score = rec_result
@@ -71,6 +84,44 @@ class TextSystem(object):
 
         return filter_boxes, filter_rec_res
 
+    def batch_call(self, img_list, cls=True, ratio_scale=2.0):
+        """
+        对多张图片识别 检测模型逐张运行 所有文本框合并后按宽高比分组 一起送入识别模型
+        多个小区域时 识别模型的调用次数从每张图片至少一次 减少到按宽高比分组的批次数
+        :param img_list: 图片列表
+        :param cls: 是否使用方向分类
+        :param ratio_scale: 同一批内允许的宽高比倍数 见 TextRecognizer.__call__
+        :return: 每张图片的 (文本框, 识别结果) 检测失败时为 (None, None)
+        """
+        det_result_list = []
+        all_crop_list = []
+        for img in img_list:
+            dt_boxes, img_crop_list = self.detect_and_crop(img)
+            det_result_list.append((dt_boxes, len(all_crop_list)))
+            if img_crop_list is not None:
+                all_crop_list.extend(img_crop_list)
+
+        if len(all_crop_list) > 0:
+            if self.use_angle_cls and cls:
+                all_crop_list, angle_list = self.text_classifier(all_crop_list)
+            all_rec_res = self.text_recognizer(
+                all_crop_list,
+                batch_num=max(self.text_recognizer.rec_batch_num, len(all_crop_list)),
+                ratio_scale=ratio_scale,
+            )
+        else:
+            all_rec_res = []
+
+        result_list = []
+        for dt_boxes, crop_start in det_result_list:
+            if dt_boxes is None:
+                result_list.append((None, None))
+                continue
+            rec_res = all_rec_res[crop_start:crop_start + len(dt_boxes)]
+            result_list.append(self.filter_by_drop_score(dt_boxes, rec_res))
+
+        return result_list
+
 
 def sorted_boxes(dt_boxes):
     """
@@ -21,6 +21,13 @@ def get_rotate_crop_image(img, points):
     points[:, 1] = points[:, 1] - top
     """
     assert len(points) == 4, "shape of points must be 4*2"
+    dst_img = get_axis_aligned_crop(img, points)
+    if dst_img is not None:
+        dst_img_height, dst_img_width = dst_img.shape[0:2]
+        if dst_img_height * 1.0 / dst_img_width >= 1.5:
+            dst_img = np.rot90(dst_img)
+        return dst_img
+
     img_crop_width = int(
         max(
             np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])
@@ -53,6 +60,25 @@ def get_rotate_crop_image(img, points):
     return dst_img
 
 
+def get_axis_aligned_crop(img, points):
+    """
+    points 按 左上 右上 右下 左下 排列 是图片内的轴对齐整数矩形时
+    透视变换只是整数平移 结果与直接切片相同 这时返回切片 否则返回None
+    """
+    x0, y0 = points[0]
+    x1, y1 = points[2]
+    if not (points[1][0] == x1 and points[1][1] == y0 and points[3][0] == x0 and points[3][1] == y1):
+        return None
+    if not (float(x0).is_integer() and float(y0).is_integer()
+            and float(x1).is_integer() and float(y1).is_integer()):
+        return None
+    x0, y0, x1, y1 = int(x0), int(y0), int(x1), int(y1)
+    img_height, img_width = img.shape[0:2]
+    if x0 < 0 or y0 < 0 or x1 <= x0 or y1 <= y0 or x1 > img_width or y1 > img_height:
+        return None
+    return img[y0:y1, x0:x1]
+
+
 def get_minarea_rect_crop(img, points):
     bounding_box = cv2.minAreaRect(np.array(points).astype(np.int32))
     points = sorted(list(cv2.boxPoints(bounding_box)), key=lambda x: x[0])
@@ -149,6 +149,8 @@ class BattleDodgeContext4Recording(AutoBattleDodgeContext):
         # self.auto_op: ConditionalOperator = auto_op  # 重写部分,取消auto_op
 
         if self._flash_model is None or self._flash_model.gpu != use_gpu:
+            if self._flash_model is not None:  # 换用其他配置 释放旧的会话
+                self._flash_model.release()
             self._flash_model = FlashClassifier(
                 model_name=self.ctx.model_config.flash_classifier,
                 backup_model_name=self.ctx.model_config.flash_classifier_backup,
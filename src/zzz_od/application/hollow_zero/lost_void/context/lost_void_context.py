@@ -9,6 +9,7 @@ from one_dragon.base.matcher.match_result import MatchResult
 from one_dragon.base.screen import screen_utils
 from one_dragon.base.screen.screen_utils import FindAreaResultEnum
 from one_dragon.utils import os_utils, str_utils, cv2_utils
+from one_dragon.utils.entity_index import EntityIndex
 from one_dragon.utils.i18_utils import gt
 from one_dragon.utils.log_utils import log
 from one_dragon.yolo.detect_utils import DetectFrameResult
@@ -25,6 +26,8 @@ from zzz_od.auto_battle.auto_battle_operator import AutoBattleOperator
 from zzz_od.context.zzz_context import ZContext
 from zzz_od.game_data.agent import CommonAgentStateEnum
 
+ARTIFACT_TITLE_LIST: List[str] = ['有同流派武备', '已选择', '齿轮硬币不足', 'NEW!']  # 藏品上方的标识
+
 
 class LostVoidContext:
 
@@ -38,6 +41,10 @@ class LostVoidContext:
         self.all_artifact_list: List[LostVoidArtifact] = []  # 武备 + 鸣徽
         self.gear_by_name: dict[str, LostVoidArtifact] = {}  # key=名称 value=武备
         self.cate_2_artifact: dict[str, List[LostVoidArtifact]] = {}  # key=分类 value=藏品
+        self.cate_index: EntityIndex[str] = EntityIndex([])  # 藏品分类
+        self.artifact_name_index: EntityIndex[LostVoidArtifact] = EntityIndex([])  # 按名称匹配藏品
+        self.artifact_display_name_index: EntityIndex[LostVoidArtifact] = EntityIndex([])  # 按完整名称匹配藏品
+        self.artifact_title_index: EntityIndex[str] = EntityIndex([])  # 藏品完整名称 + 其它标识
 
         self.investigation_strategy_list: list[LostVoidInvestigationStrategy] = []  # 调查战略
 
@@ -75,6 +82,12 @@ class LostVoidContext:
                 self.cate_2_artifact[artifact.category] = []
             self.cate_2_artifact[artifact.category].append(artifact)
 
+        self.cate_index = EntityIndex(list(self.cate_2_artifact.keys()))
+        self.artifact_name_index = EntityIndex(self.all_artifact_list, name_getter=lambda i: i.name, ignore_case=True)
+        self.artifact_display_name_index = EntityIndex(self.all_artifact_list, name_getter=lambda i: i.display_name)
+        # 其它标识也要一起匹配 防止部分鸣徽名称和这些很相似
+        self.artifact_title_index = EntityIndex([i.display_name for i in self.all_artifact_list] + ARTIFACT_TITLE_LIST)
+
     def load_investigation_strategy(self) -> None:
         """
         加载调查策略
@@ -93,6 +106,8 @@ class LostVoidContext:
     def init_lost_void_det_model(self):
         use_gpu = self.ctx.model_config.lost_void_det_gpu
         if self.detector is None or self.detector.gpu != use_gpu:
+            if self.detector is not None:  # 换用其他配置 释放旧的会话
+                self.detector.release()
             self.detector = LostVoidDetector(
                 model_name=self.ctx.model_config.lost_void_det,
                 backup_model_name=self.ctx.model_config.lost_void_det_backup,
@@ -238,12 +253,7 @@ class LostVoidContext:
         :param name_full_str: 识别的文本 [类型]名称
         :return:
         """
-        for artifact in self.all_artifact_list:
-            artifact_full_name = artifact.display_name
-            if artifact_full_name == name_full_str:
-                return artifact
-
-        return None
+        return self.artifact_display_name_index.get_by_name(name_full_str)
 
     def match_artifact_by_ocr_full(self, name_full_str: str) -> Optional[LostVoidArtifact]:
         """
@@ -260,8 +270,8 @@ class LostVoidContext:
         to_sort_list = []
 
         # 取出与分类名称长度一致的前缀 用LCS来判断对应的cate分类
-        for cate in self.cate_2_artifact.keys():
-            cate_name = gt(cate, 'game')
+        for cate_idx, cate in enumerate(self.cate_index.entity_list):
+            cate_name = self.cate_index.get_text(cate_idx)
 
             if cate not in ['卡牌', '无详情']:
                 if len(name_full_str) < len(cate_name):
@@ -274,12 +284,21 @@ class LostVoidContext:
         to_sort_list.sort(key=lambda x: x[1], reverse=True)
         sorted_cate_list = [x[0] for x in to_sort_list] + ['卡牌', '无详情']
 
+        # 共有字符不足的藏品 后缀一定不匹配
+        candidate_map: dict[LostVoidArtifact, int] = {
+            self.artifact_name_index.entity_list[i]: i
+            for i in self.artifact_name_index.get_lcs_candidates(name_full_str, 0.5)
+        }
+
         # 按排序后的cate去匹配对应的藏品
         for cate in sorted_cate_list:
             art_list = self.cate_2_artifact[cate]
             # 符合分类的情况下 判断后缀和藏品名字是否一致
             for art in art_list:
-                art_name = gt(art.name, 'game')
+                art_idx = candidate_map.get(art)
+                if art_idx is None:
+                    continue
+                art_name = self.artifact_name_index.get_text(art_idx)
                 suffix = name_full_str[-len(art_name):]
                 if str_utils.find_by_lcs(art_name, suffix, percent=0.5):
                     return art
@@ -363,25 +382,13 @@ class LostVoidContext:
         :param to_choose_gear_branch: 是否识别战术棱镜
         :return:
         """
-        artifact_name_list: list[str] = []
-        for art in self.ctx.lost_void.all_artifact_list:
-            artifact_name_list.append(gt(art.display_name, 'game'))
-
         # 识别其它标识
-        title_word_list = [
-            gt('有同流派武备', 'game'),
-            gt('已选择', 'game'),
-            gt('齿轮硬币不足', 'game'),
-            gt('NEW!', 'game')
-        ]
-
-        # 其它标识也要一起匹配 防止部分鸣徽名称和这些很相似
-        artifact_name_list.extend(title_word_list)
+        title_word_list = [gt(i, 'game') for i in ARTIFACT_TITLE_LIST]
 
         artifact_pos_list: list[LostVoidArtifactPos] = []
         ocr_result_map = self.ctx.ocr.run_ocr(screen)
         for ocr_result, mrl in ocr_result_map.items():
-            title_idx: int = str_utils.find_best_match_by_difflib(ocr_result, artifact_name_list)
+            title_idx: int = self.artifact_title_index.find_best_match_by_difflib(ocr_result)
             if title_idx is None or title_idx < 0:
                 continue
 
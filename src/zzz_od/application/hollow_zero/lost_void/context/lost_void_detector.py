@@ -1,5 +1,8 @@
 from typing import Optional, Union, List, Tuple, ClassVar
 
+from cv2.typing import MatLike
+
+from one_dragon.base.operation import operation_profiler
 from one_dragon.utils import yolo_config_utils
 from one_dragon.yolo.detect_utils import DetectFrameResult, DetectObjectResult
 from one_dragon.yolo.yolo_utils import ZZZ_MODEL_DOWNLOAD_URL
@@ -38,9 +41,20 @@ class LostVoidDetector(Yolov8Detector):
             gh_proxy_url=gh_proxy_url,
             personal_proxy=personal_proxy,
             gpu=gpu,
-            keep_result_seconds=keep_result_seconds
+            keep_result_seconds=keep_result_seconds,
+            session_name='lost_void_detector',
         )
 
+    def run(self, image: MatLike, conf: float = 0.6, iou: float = 0.5, run_time: Optional[float] = None,
+            label_list: Optional[List[str]] = None,
+            category_list: Optional[List[str]] = None) -> DetectFrameResult:
+        """
+        对图片进行识别 记录耗时
+        """
+        with operation_profiler.get_profiler().section('yolo', 'lost_void_detector'):
+            return Yolov8Detector.run(self, image, conf=conf, iou=iou, run_time=run_time,
+                                      label_list=label_list, category_list=category_list)
+
     def is_frame_with_all(self, frame_result: Optional[DetectFrameResult] = None) -> Tuple[bool, bool, bool]:
         """
         判断某帧的识别结果里 是否存在 感叹号、距离、入口
@@ -1,3 +1,4 @@
+import cv2
 from cv2.typing import MatLike
 
 from one_dragon.base.geometry.point import Point
@@ -5,11 +6,35 @@ from one_dragon.base.geometry.rectangle import Rect
 from one_dragon.base.matcher.match_result import MatchResult
 from one_dragon.utils import cv2_utils
 
+PYRAMID_SCALE: int = 4  # 粗定位时的缩小倍数
+MIN_PYRAMID_TEMPLATE_SIZE: int = 16  # 缩小后的小地图至少要有这么大 否则粗定位不可靠
+PYRAMID_AREA_RATIO: int = 16  # 搜索范围比小地图大这么多倍时 才使用粗定位
+
+
+def downsample(image: MatLike, scale: int) -> MatLike:
+    """
+    缩小图片
+
+    Args:
+        image: 图片
+        scale: 缩小倍数
+
+    Returns:
+        MatLike: 缩小后的图片
+    """
+    return cv2.resize(
+        image,
+        (max(1, image.shape[1] // scale), max(1, image.shape[0] // scale)),
+        interpolation=cv2.INTER_AREA,
+    )
+
 
 def cal_pos(
         large_map: MatLike,
         mini_map: MatLike,
         last_pos: Point | None = None,
+        large_map_small: MatLike | None = None,
+        scale: int = PYRAMID_SCALE,
 ) -> MatchResult | None:
     """
     计算小地图在大地图上的坐标
@@ -17,22 +42,29 @@ def cal_pos(
     Args:
         large_map: 大地图
         mini_map: 小地图
-        last_pos: 上一次的坐标
+        last_pos: 上一次的坐标 为空时在整张大地图上先粗后细地搜索
+        large_map_small: 缩小 scale 倍后的大地图 不传时现场缩小
+        scale: 粗定位的缩小倍数
 
     Returns:
         MatchResult: 计算坐标
     """
     if last_pos is None:
-        source = large_map
-        rect = None
-    else:
-        rect = Rect(
-            last_pos.x - mini_map.shape[1] * 2,
-            last_pos.y - mini_map.shape[0] * 2,
-            last_pos.x + mini_map.shape[1] * 2,
-            last_pos.y + mini_map.shape[0] * 2,
+        candidate_list = cal_pos_candidates(
+            large_map,
+            mini_map,
+            large_map_small=large_map_small,
+            scale=scale,
         )
-        source, rect = cv2_utils.crop_image(large_map, rect)
+        return candidate_list[0] if len(candidate_list) > 0 else None
+
+    rect = Rect(
+        last_pos.x - mini_map.shape[1] * 2,
+        last_pos.y - mini_map.shape[0] * 2,
+        last_pos.x + mini_map.shape[1] * 2,
+        last_pos.y + mini_map.shape[0] * 2,
+    )
+    source, rect = cv2_utils.crop_image(large_map, rect)
 
     mrl = cv2_utils.match_template(
         source=source,
@@ -45,3 +77,102 @@ def cal_pos(
         mrl.add_offset(rect.left_top)
 
     return mrl.max
+
+
+def cal_pos_candidates(
+        large_map: MatLike,
+        mini_map: MatLike,
+        rect: Rect | None = None,
+        large_map_small: MatLike | None = None,
+        scale: int = PYRAMID_SCALE,
+        top_n: int = 1,
+        threshold: float = 0.1,
+) -> list[MatchResult]:
+    """
+    先在缩小的大地图上找出候选位置 再在原尺寸的小范围内精确匹配
+    搜索范围不够大 或者小地图缩小后太小时 直接使用原尺寸匹配
+
+    Args:
+        large_map: 大地图
+        mini_map: 小地图
+        rect: 大地图上的搜索范围 为空时搜索整张图
+        large_map_small: 缩小 scale 倍后的大地图 不传时现场缩小
+        scale: 缩小倍数
+        top_n: 最多返回多少个候选
+        threshold: 原尺寸匹配的阈值
+
+    Returns:
+        list[MatchResult]: 按置信度倒序的候选位置 坐标为大地图上的坐标
+    """
+    source, rect = cv2_utils.crop_image(large_map, rect)
+    offset = Point(0, 0) if rect is None else rect.left_top
+
+    mh, mw = mini_map.shape[:2]
+    use_pyramid = (
+            scale > 1
+            and mh // scale >= MIN_PYRAMID_TEMPLATE_SIZE
+            and mw // scale >= MIN_PYRAMID_TEMPLATE_SIZE
+            and source.shape[0] * source.shape[1] >= mh * mw * PYRAMID_AREA_RATIO
+    )
+
+    result_list: list[MatchResult] = []
+    if use_pyramid:
+        if large_map_small is None:
+            source_small = downsample(source, scale)
+            small_offset = Point(0, 0)
+        else:
+            # 直接在缓存的缩小图上裁剪 起点向上取整保证不超出搜索范围
+            sx = (offset.x + scale - 1) // scale
+            sy = (offset.y + scale - 1) // scale
+            source_small = large_map_small[
+                           sy:(offset.y + source.shape[0]) // scale,
+                           sx:(offset.x + source.shape[1]) // scale,
+                           ]
+            small_offset = Point(sx * scale - offset.x, sy * scale - offset.y)  # 缩小图原点在搜索范围中的位置
+
+        mini_map_small = downsample(mini_map, scale)
+        if source_small.shape[0] >= mini_map_small.shape[0] and source_small.shape[1] >= mini_map_small.shape[1]:
+            coarse = cv2.matchTemplate(source_small, mini_map_small, cv2.TM_CCOEFF_NORMED)
+            peak_list = cv2_utils.find_peaks_with_nms(
+                coarse,
+                threshold=0,
+                w=mini_map_small.shape[1],
+                h=mini_map_small.shape[0],
+                merge_distance=max(mini_map_small.shape[:2]) / 2,
+                max_result_cnt=max(top_n * 3, 5),  # 粗定位的排序不太准 多留一些候选
+            )
+
+            # 在原尺寸上 候选位置附近精确匹配
+            margin = scale * 2
+            for peak in peak_list:
+                x = int(peak['x']) * scale + small_offset.x
+                y = int(peak['y']) * scale + small_offset.y
+                window, window_rect = cv2_utils.crop_image(
+                    source,
+                    Rect(x - margin, y - margin, x + mw + margin, y + mh + margin),
+                )
+                if window.shape[0] < mh or window.shape[1] < mw:
+                    continue
+                mr = cv2_utils.match_template(window, mini_map, threshold, ignore_inf=True).max
+                if mr is None:
+                    continue
+                mr.add_offset(window_rect.left_top)
+                result_list.append(mr)
+
+    if len(result_list) == 0:
+        # 不使用粗定位 或者粗定位没有结果时 使用原尺寸匹配
+        mrl = cv2_utils.match_template(
+            source=source,
+            template=mini_map,
+            threshold=threshold,
+            only_best=top_n == 1,
+            ignore_inf=True,
+            max_result_cnt=top_n,
+        )
+        result_list = list(mrl)
+
+    result_list.sort(key=lambda i: i.confidence, reverse=True)
+    result_list = result_list[:top_n]
+    for mr in result_list:
+        mr.add_offset(offset)
+    return result_list
@@ -1,10 +1,13 @@
 import os
 from functools import cached_property
 
+import numpy as np
 from cv2.typing import MatLike
 
 from one_dragon.base.geometry.point import Point
+from one_dragon.base.geometry.rectangle import Rect
 from one_dragon.utils import os_utils
+from zzz_od.application.world_patrol import cal_pos_utils
 
 
 class WorldPatrolEntry:
@@ -69,6 +72,105 @@ class WorldPatrolLargeMapIcon:
         }
 
 
+class WorldPatrolLargeMapIconIndex:
+
+    def __init__(self, icon_list: list[WorldPatrolLargeMapIcon], cell_size: int = 256):
+        """
+        大地图图标的网格索引 用于快速找出某个范围内的图标
+
+        Args:
+            icon_list: 图标列表 返回的下标都是这个列表中的下标
+            cell_size: 网格边长
+        """
+        self.cell_size: int = cell_size
+
+        self.template_id_list: list[str] = []  # 所有出现过的图标模板
+        template_id_2_idx: dict[str, int] = {}
+        template_idx_list: list[int] = []
+        for icon in icon_list:
+            if icon.template_id not in template_id_2_idx:
+                template_id_2_idx[icon.template_id] = len(self.template_id_list)
+                self.template_id_list.append(icon.template_id)
+            template_idx_list.append(template_id_2_idx[icon.template_id])
+        self.template_id_2_idx: dict[str, int] = template_id_2_idx
+
+        self.x: np.ndarray = np.array([i.lm_pos.x for i in icon_list], dtype=np.int32)
+        self.y: np.ndarray = np.array([i.lm_pos.y for i in icon_list], dtype=np.int32)
+        self.template_idx: np.ndarray = np.array(template_idx_list, dtype=np.int32)
+
+        # key=网格坐标 value=网格内的图标下标 升序
+        self.grid: dict[tuple[int, int], np.ndarray] = {}
+        if len(icon_list) > 0:
+            cell_x = self.x // cell_size
+            cell_y = self.y // cell_size
+            order = np.lexsort((cell_x, cell_y))
+            cell_key = np.stack([cell_x[order], cell_y[order]], axis=1)
+            split_at = np.flatnonzero(np.any(np.diff(cell_key, axis=0) != 0, axis=1)) + 1
+            for group in np.split(order, split_at):
+                self.grid[(int(cell_x[group[0]]), int(cell_y[group[0]]))] = np.sort(group)
+
+    def query_rect(self, rect: Rect) -> np.ndarray:
+        """
+        找出范围内的图标 包含边界
+
+        Args:
+            rect: 大地图上的范围
+
+        Returns:
+            np.ndarray: 图标下标 按原列表顺序
+        """
+        cx1, cx2 = rect.x1 // self.cell_size, rect.x2 // self.cell_size
+        cy1, cy2 = rect.y1 // self.cell_size, rect.y2 // self.cell_size
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self.grid):
+            # 范围比整张图的网格还多 直接全部过滤
+            candidate = np.arange(len(self.x))
+        else:
+            group_list = [
+                self.grid[(cx, cy)]
+                for cx in range(cx1, cx2 + 1)
+                for cy in range(cy1, cy2 + 1)
+                if (cx, cy) in self.grid
+            ]
+            if len(group_list) == 0:
+                return np.empty(0, dtype=np.int64)
+            candidate = np.sort(np.concatenate(group_list))
+
+        x = self.x[candidate]
+        y = self.y[candidate]
+        in_rect = (x >= rect.x1) & (x <= rect.x2) & (y >= rect.y1) & (y <= rect.y2)
+        return candidate[in_rect]
+
+    @staticmethod
+    def cluster_by_radius(points: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        按顺序聚类 每个点归入第一个距离小于半径的已有类别 否则自己成为新类别的代表点
+
+        Args:
+            points: (n, 2) 坐标
+            radius: 半径
+
+        Returns:
+            labels, representative: 每个点所属类别的下标 每个类别代表点在 points 中的下标
+        """
+        n = len(points)
+        labels = np.full(n, -1, dtype=np.int32)
+        representative: list[int] = []
+        if n == 0:
+            return labels, np.array(representative, dtype=np.int32)
+
+        diff = points[:, np.newaxis, :].astype(np.int64) - points[np.newaxis, :, :]
+        near = (diff ** 2).sum(axis=2) < radius ** 2
+        for i in range(n):
+            if labels[i] != -1:
+                continue
+            labels[i] = len(representative)
+            later = slice(i + 1, None)
+            labels[later][near[i, later] & (labels[later] == -1)] = len(representative)
+            representative.append(i)
+
+        return labels, np.array(representative, dtype=np.int32)
+
+
 class WorldPatrolLargeMap:
 
     def __init__(
@@ -78,8 +180,42 @@ class WorldPatrolLargeMap:
             icon_list: list[WorldPatrolLargeMapIcon],
     ):
         self.area_full_id: str = area_full_id
-        self.road_mask: MatLike = road_mask
-        self.icon_list: list[WorldPatrolLargeMapIcon] = icon_list
+        self.road_mask = road_mask
+        self.icon_list = icon_list
+
+    @property
+    def road_mask(self) -> MatLike:
+        return self._road_mask
+
+    @road_mask.setter
+    def road_mask(self, value: MatLike) -> None:
+        self._road_mask: MatLike = value
+        self._road_mask_pyramid: dict[int, MatLike] = {}  # key=缩小倍数 value=缩小后的道路掩码
+
+    def get_road_mask_pyramid(self, scale: int) -> MatLike:
+        """
+        获取缩小后的道路掩码 用于先粗后细的定位 第一次获取时生成并缓存
+
+        Args:
+            scale: 缩小倍数
+
+        Returns:
+            MatLike: 缩小后的道路掩码
+        """
+        small = self._road_mask_pyramid.get(scale)
+        if small is None:
+            small = cal_pos_utils.downsample(self._road_mask, scale)
+            self._road_mask_pyramid[scale] = small
+        return small
+
+    @property
+    def icon_list(self) -> list[WorldPatrolLargeMapIcon]:
+        return self._icon_list
+
+    @icon_list.setter
+    def icon_list(self, value: list[WorldPatrolLargeMapIcon]) -> None:
+        self._icon_list: list[WorldPatrolLargeMapIcon] = value
+        self.icon_index: WorldPatrolLargeMapIconIndex = WorldPatrolLargeMapIconIndex(value)
 
     def to_dict(self) -> dict:
         return {
@@ -9,8 +9,9 @@ from one_dragon.base.config.yaml_operator import YamlOperator
 from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
 from one_dragon.base.matcher.match_result import MatchResult
-from one_dragon.utils import os_utils, cv2_utils, cal_utils
+from one_dragon.utils import os_utils, cv2_utils
 from one_dragon.utils.log_utils import log
+from zzz_od.application.world_patrol import cal_pos_utils
 from zzz_od.application.world_patrol.mini_map_wrapper import MiniMapWrapper
 from zzz_od.application.world_patrol.world_patrol_area import WorldPatrolArea, WorldPatrolEntry, WorldPatrolLargeMap, \
     road_mask_path, icon_yaml_path, WorldPatrolLargeMapIcon
@@ -425,26 +426,19 @@ class WorldPatrolService:
         Returns:
             Point: 坐标
         """
-        x1 = lm_rect.x1
-        x2 = lm_rect.x2
-        y1 = lm_rect.y1
-        y2 = lm_rect.y2
+        icon_index = large_map.icon_index
 
         # 找到大地图指定范围有哪些图标
-        lm_icon_set: set[str] = set()
-        for large_map_icon in large_map.icon_list:
-            if large_map_icon.lm_pos.x < x1 or large_map_icon.lm_pos.x > x2:
-                continue
-            if large_map_icon.lm_pos.y < y1 or large_map_icon.lm_pos.y > y2:
-                continue
-            lm_icon_set.add(large_map_icon.template_id)
-
-        if len(lm_icon_set) == 0:
+        lm_icon_idx = icon_index.query_rect(lm_rect)
+        if len(lm_icon_idx) == 0:
             return None
+        lm_template_idx = icon_index.template_idx[lm_icon_idx]
 
         # 找到小地图能匹配哪些图标
-        mm_icon_list: list[tuple[str, Point]] = []
-        for icon_template_id in lm_icon_set:
+        mm_template_idx_list: list[int] = []
+        mm_point_list: list[tuple[int, int]] = []
+        for template_idx in dict.fromkeys(lm_template_idx.tolist()):
+            icon_template_id = icon_index.template_id_list[template_idx]
             template = self.ctx.template_loader.get_template('map', icon_template_id)
             if template is None:
                 break
@@ -461,35 +455,32 @@ class WorldPatrolService:
                 # 计算图标中心点坐标
                 center_x = mr.left_top.x + template.raw.shape[1] // 2
                 center_y = mr.left_top.y + template.raw.shape[0] // 2
-                mm_icon_list.append((template.template_id, Point(center_x, center_y)))
+                mm_template_idx_list.append(template_idx)
+                mm_point_list.append((center_x, center_y))
 
-        # 使用小坐标来匹配
-        match_list: list[MatchResult] = []
-        for large_map_icon in large_map.icon_list:
-            if large_map_icon.lm_pos.x < x1 or large_map_icon.lm_pos.x > x2:
-                continue
-            if large_map_icon.lm_pos.y < y1 or large_map_icon.lm_pos.y > y2:
-                continue
-            for mini_map_icon_name, mini_map_icon_point in mm_icon_list:
-                if mini_map_icon_name != large_map_icon.template_id:
-                    continue
-                new_point = large_map_icon.lm_pos - mini_map_icon_point
-                new_mr = MatchResult(
-                    1,
-                    new_point.x,
-                    new_point.y,
-                    mini_map.road_mask.shape[1],
-                    mini_map.road_mask.shape[0],
-                )
+        if len(mm_point_list) == 0:
+            return None
 
-                merged = False
-                for old_mr in match_list:
-                    if cal_utils.distance_between(new_mr.left_top, old_mr.left_top) < 10:
-                        old_mr.confidence += 1
-                        merged = True
-                        break
-                if not merged:
-                    match_list.append(new_mr)
+        # 使用小坐标来匹配 每一对相同的图标 都能推算出一个小地图左上角的位置
+        mm_template_idx = np.array(mm_template_idx_list, dtype=np.int32)
+        mm_point = np.array(mm_point_list, dtype=np.int32)
+        lm_pair_idx, mm_pair_idx = np.nonzero(lm_template_idx[:, np.newaxis] == mm_template_idx[np.newaxis, :])
+        lm_point = np.stack([icon_index.x[lm_icon_idx[lm_pair_idx]], icon_index.y[lm_icon_idx[lm_pair_idx]]], axis=1)
+        candidate_point = lm_point - mm_point[mm_pair_idx]
+
+        # 距离相近的位置合并 票数作为置信度
+        labels, representative = icon_index.cluster_by_radius(candidate_point, 10)
+        vote = np.bincount(labels, minlength=len(representative))
+        match_list: list[MatchResult] = [
+            MatchResult(
+                vote[i],
+                candidate_point[rep_idx, 0],
+                candidate_point[rep_idx, 1],
+                mini_map.road_mask.shape[1],
+                mini_map.road_mask.shape[0],
+            )
+            for i, rep_idx in enumerate(representative)
+        ]
 
         if len(match_list) == 0:
             return None
@@ -530,17 +521,12 @@ class WorldPatrolService:
         Returns:
             Point: 坐标
         """
-        source, rect = cv2_utils.crop_image(large_map.road_mask, lm_rect)
-        template = mini_map.road_mask
-
-        mrl = cv2_utils.match_template(
-            source=source,
-            template=template,
-            threshold=0.1,
-            ignore_inf=True,
+        candidate_list = cal_pos_utils.cal_pos_candidates(
+            large_map.road_mask,
+            mini_map.road_mask,
+            rect=lm_rect,
+            large_map_small=large_map.get_road_mask_pyramid(cal_pos_utils.PYRAMID_SCALE),
+            scale=cal_pos_utils.PYRAMID_SCALE,
         )
 
-        if rect is not None:
-            mrl.add_offset(rect.left_top)
-
-        return None if mrl.max is None else mrl.max.center
+        return None if len(candidate_list) == 0 else candidate_list[0].center
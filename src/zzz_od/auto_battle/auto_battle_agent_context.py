@@ -443,10 +443,11 @@ class AutoBattleAgentContext:
         :return:
         """
         prefix = 'avatar_1_' if is_front else 'avatar_2_'
+        # 构建一个带优先级的待检查模板列表
+        # 1. 优先使用上次成功匹配的ID
+        # 2. 然后使用该角色所有可用的模板
+        template_2_agent: dict[str, Tuple[Agent, str]] = {}
         for agent, specific_template_id in possible_agents:
-            # 构建一个带优先级的待检查模板列表
-            # 1. 优先使用上次成功匹配的ID
-            # 2. 然后使用该角色所有可用的模板
             templates_to_check = []
             if specific_template_id:
                 templates_to_check.append(specific_template_id)
@@ -455,12 +456,15 @@ class AutoBattleAgentContext:
                 if t_id not in templates_to_check:
                     templates_to_check.append(t_id)
 
-            # 按优先级顺序进行匹配
             for template_id in templates_to_check:
                 template_name = prefix + template_id
-                mrl = self.ctx.tm.match_template(img, 'battle', template_name, threshold=0.8)
-                if mrl.max is not None:
-                    return agent, template_id  # 匹配成功，返回实际命中的模板ID
+                if template_name not in template_2_agent:
+                    template_2_agent[template_name] = (agent, template_id)
+
+        # 按优先级顺序进行批量匹配
+        template_name, _ = self.ctx.tm.match_best_of(img, 'battle', list(template_2_agent.keys()), threshold=0.8)
+        if template_name is not None:
+            return template_2_agent[template_name]  # 匹配成功，返回实际命中的模板ID
 
         return None, None
 
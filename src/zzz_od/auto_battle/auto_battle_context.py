@@ -506,20 +506,20 @@ class AutoBattleContext:
         :return:
         """
         prefix = 'avatar_chain_'
+        template_2_agent: dict[str, Agent] = {}
         for agent, specific_template_id in possible_agents:
             # 上次识别过的模板 ID，接着用
             if specific_template_id:
-                template_to_check = prefix + specific_template_id
-                mrl = self.ctx.tm.match_template(img, 'battle', template_to_check, threshold=0.8)
-                if mrl.max is not None:
-                    return agent
+                template_id_list = [specific_template_id]
             # 没有上次识别过的模板 ID，匹配所有可能的模板 ID
             else:
-                for template_id in agent.template_id_list:
-                    template_to_check = prefix + template_id
-                    mrl = self.ctx.tm.match_template(img, 'battle', template_to_check, threshold=0.8)
-                    if mrl.max is not None:
-                        return agent
+                template_id_list = agent.template_id_list
+            for template_id in template_id_list:
+                template_2_agent.setdefault(prefix + template_id, agent)
+
+        template_name, _ = self.ctx.tm.match_best_of(img, 'battle', list(template_2_agent.keys()), threshold=0.8)
+        if template_name is not None:
+            return template_2_agent[template_name]
 
         return None
 
@@ -560,20 +560,20 @@ class AutoBattleContext:
         :return:
         """
         prefix = 'avatar_quick_'
+        template_2_agent: dict[str, Agent] = {}
         for agent, specific_template_id in possible_agents:
             # 上次识别过的模板 ID，接着用
             if specific_template_id:
-                template_to_check = prefix + specific_template_id
-                mrl = self.ctx.tm.match_template(img, 'battle', template_to_check, threshold=0.8)
-                if mrl.max is not None:
-                    return agent
+                template_id_list = [specific_template_id]
             # 没有上次识别过的模板 ID，匹配所有可能的模板 ID
             else:
-                for template_id in agent.template_id_list:
-                    template_to_check = prefix + template_id
-                    mrl = self.ctx.tm.match_template(img, 'battle', template_to_check, threshold=0.8)
-                    if mrl.max is not None:
-                        return agent
+                template_id_list = agent.template_id_list
+            for template_id in template_id_list:
+                template_2_agent.setdefault(prefix + template_id, agent)
+
+        template_name, _ = self.ctx.tm.match_best_of(img, 'battle', list(template_2_agent.keys()), threshold=0.8)
+        if template_name is not None:
+            return template_2_agent[template_name]
 
         return None
 
@@ -101,6 +101,72 @@ class AudioRecorder:
             self.latest_audio = np.zeros(int(self._sample_rate // 2))
 
 
+class OfflineAudioRecorder(AudioRecorder):
+    """
+    离线音频录制类，用于回放录制好的音频，不依赖声卡。
+    每次识别前通过 seek 将截图时间对应的最近一段音频放入 latest_audio。
+    """
+
+    def __init__(self, audio: Optional[np.ndarray] = None, audio_start_time: float = 0):
+        """
+        :param audio: 单声道音频数据 采样率需要和录制时一致 为空时始终为静音
+        :param audio_start_time: 音频第一个采样点对应的时间
+        """
+        AudioRecorder.__init__(self)
+        self.audio: np.ndarray = audio if audio is not None else np.empty(shape=(0,), dtype=np.float64)
+        self.audio_start_time: float = audio_start_time
+        self._cleared_time: Optional[float] = None  # 上次清除录音的时间 在这之前的音频不再放入
+        self._current_time: float = audio_start_time
+
+    @staticmethod
+    def from_file(file_path: str, audio_start_time: float = 0) -> 'OfflineAudioRecorder':
+        """
+        从音频文件创建
+        :param file_path: 音频文件路径
+        :param audio_start_time: 音频第一个采样点对应的时间
+        """
+        recorder = OfflineAudioRecorder(audio_start_time=audio_start_time)
+        recorder.audio, _ = librosa.load(file_path, sr=recorder._sample_rate, mono=True)
+        return recorder
+
+    def start_running_async(self) -> None:
+        """
+        离线回放不需要录制线程
+        """
+        with self._run_lock:
+            self.running = True
+        self.latest_audio = np.zeros(int(self._sample_rate // 2))
+
+    def seek(self, current_time: float) -> None:
+        """
+        将当前时间之前 0.5秒 的音频放入 latest_audio
+        :param current_time: 当前时间 通常为截图时间
+        """
+        window_len = int(self._sample_rate // 2)
+        end_idx = int(round((current_time - self.audio_start_time) * self._sample_rate))
+        start_idx = end_idx - window_len
+        if self._cleared_time is not None:
+            start_idx = max(start_idx, int(round((self._cleared_time - self.audio_start_time) * self._sample_rate)))
+
+        window = np.zeros(window_len)
+        src_start = max(start_idx, 0)
+        src_end = min(end_idx, self.audio.shape[0])
+        if src_end > src_start:
+            window[window_len - (end_idx - src_start):window_len - (end_idx - src_end)] = self.audio[src_start:src_end]
+
+        with self._update_audio_lock:
+            self._current_time = current_time
+            self.latest_audio = window
+
+    def clear_audio(self) -> None:
+        """
+        清除当前录音 之后的 seek 只会放入清除时间之后的音频
+        """
+        with self._update_audio_lock:
+            self._cleared_time = self._current_time
+            self.latest_audio = np.zeros(int(self._sample_rate // 2))
+
+
 class YoloStateEventEnum(Enum):
     """
     YOLO状态事件枚举类，定义不同的闪避识别事件。
@@ -155,6 +221,8 @@ class AutoBattleDodgeContext:
         self.auto_op = auto_op
 
         if self._flash_model is None or self._flash_model.gpu != use_gpu:
+            if self._flash_model is not None:  # 换用其他配置 释放旧的会话
+                self._flash_model.release()
             self._flash_model = FlashClassifier(
                 model_name=self.ctx.model_config.flash_classifier,
                 backup_model_name=self.ctx.model_config.flash_classifier_backup,
@@ -300,6 +368,14 @@ class AutoBattleDodgeContext:
                       x)
         return wx
 
+    def set_audio_recorder(self, audio_recorder: AudioRecorder) -> None:
+        """
+        替换音频录制器 用于离线回放
+        :param audio_recorder: 音频录制器
+        """
+        self._audio_recorder.stop_running()
+        self._audio_recorder = audio_recorder
+
     def start_context(self) -> None:
         """
         启动上下文，启动音频录制。
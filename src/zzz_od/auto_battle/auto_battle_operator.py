@@ -9,7 +9,8 @@ from one_dragon.base.conditional_operation.conditional_operator import Condition
 from one_dragon.base.conditional_operation.operation_def import OperationDef
 from one_dragon.base.conditional_operation.operation_template import OperationTemplate
 from one_dragon.base.conditional_operation.state_handler_template import StateHandlerTemplate
-from one_dragon.base.conditional_operation.state_recorder import StateRecorder
+from one_dragon.base.conditional_operation.state_recorder import StateRecorder, StateRecord
+from one_dragon.base.conditional_operation.state_store import StateStore, StateStoreRecorder
 from one_dragon.utils import os_utils, thread_utils
 from one_dragon.utils.log_utils import log
 from zzz_od.auto_battle.atomic_op.btn_chain_left import AtomicBtnChainLeft
@@ -70,7 +71,8 @@ class AutoBattleOperator(ConditionalOperator):
             is_mock=is_mock
         )
 
-        self.state_recorders: dict[str, StateRecorder] = {}
+        self.state_store: StateStore = StateStore()  # 所有状态的值都存放在这里 state_recorders 只是视图
+        self.state_recorders: dict[str, StateStoreRecorder] = {}
         self._mutex_list: dict[str, List[str]] = {}
 
         self.auto_battle_context: AutoBattleContext = AutoBattleContext(ctx)
@@ -235,16 +237,41 @@ class AutoBattleOperator(ConditionalOperator):
         :param state_name:
         :return:
         """
+        r = self.state_recorders.get(state_name)
+        if r is not None:
+            return r
+
         if AutoBattleOperator.is_valid_state(state_name):
-            if state_name in self.state_recorders:
-                return self.state_recorders[state_name]
-            else:
-                r = StateRecorder(state_name, mutex_list=self._mutex_list.get(state_name, None))
-                self.state_recorders[state_name] = r
-                return r
+            r = StateStoreRecorder(self.state_store, state_name, mutex_list=self._mutex_list.get(state_name, None))
+            self.state_recorders[state_name] = r
+            return r
         else:
             return None
 
+    def _update_state_recorders(self, state_records: List[StateRecord]) -> List[Optional[StateRecorder]]:
+        """
+        批量更新状态记录 在状态存储中一次完成 包括互斥状态的清除
+        :param state_records: 状态记录列表
+        :return: 每个状态记录对应的状态记录器 不存在时为None
+        """
+        recorder_list: List[Optional[StateRecorder]] = []
+        state_id_list: List[int] = []
+        valid_record_list: List[StateRecord] = []
+        for record in state_records:
+            recorder = self.get_state_recorder(record.state_name)
+            recorder_list.append(recorder)
+            if recorder is not None:
+                state_id_list.append(recorder.state_id)
+                valid_record_list.append(record)
+
+        changed_state_ids = self.state_store.batch_update(state_id_list, valid_record_list)
+        for state_id in changed_state_ids:
+            recorder = self.state_recorders.get(self.state_store.state_names[state_id])
+            if recorder is not None:
+                self._invalidate_state_handlers(recorder)
+
+        return recorder_list
+
     @staticmethod
     def is_valid_state(state_name: str) -> bool:
         """
@@ -384,6 +411,7 @@ class AutoBattleOperator(ConditionalOperator):
         for sr in self.state_recorders.values():
             sr.dispose()
         self.state_recorders.clear()
+        self.state_store = StateStore()
 
     def stop_running(self) -> None:
         """
@@ -0,0 +1,462 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from functools import wraps
+
+import numpy as np
+from cv2.typing import MatLike
+from typing import Callable, Dict, List, Optional, Tuple
+
+from one_dragon.base.conditional_operation.state_recorder import StateRecord
+from one_dragon.base.controller.controller_base import ControllerBase, ScreenshotWithTime
+from one_dragon.base.cv_process.cv_service import CvService
+from one_dragon.base.geometry.point import Point
+from one_dragon.base.matcher.ocr.ocr_layout_cache import OcrLayoutCache
+from one_dragon.base.matcher.ocr.ocr_matcher import OcrMatcher
+from one_dragon.base.matcher.ocr.ocr_service import OcrService
+from one_dragon.base.matcher.ocr.onnx_ocr_matcher import OnnxOcrMatcher, OnnxOcrParam
+from one_dragon.base.matcher.template_matcher import TemplateMatcher
+from one_dragon.base.operation.one_dragon_env_context import OneDragonEnvContext
+from one_dragon.base.screen.screen_loader import ScreenContext
+from one_dragon.base.screen.template_loader import TemplateLoader
+from one_dragon.utils import cv2_utils
+from one_dragon.utils.log_utils import log
+from zzz_od.auto_battle.auto_battle_context import AutoBattleContext
+from zzz_od.auto_battle.auto_battle_dodge_context import OfflineAudioRecorder
+from zzz_od.auto_battle.auto_battle_operator import AutoBattleOperator
+from zzz_od.config.model_config import ModelConfig
+from zzz_od.context.zzz_context import ZContext
+
+_IMAGE_SUFFIX_LIST = ['.png', '.jpg', '.jpeg', '.webp', '.bmp']
+_FRAME_TIME_PATTERN = re.compile(r'(\d+(?:\.\d+)?)$')
+
+
+class ReplayFrame:
+
+    def __init__(self, file_path: str, create_time: float):
+        """
+        一帧录制好的截图
+        :param file_path: 图片路径
+        :param create_time: 截图时间
+        """
+        self.file_path: str = file_path
+        self.create_time: float = create_time
+
+
+def load_replay_frames(frame_dir: str, fps: float = 10) -> List[ReplayFrame]:
+    """
+    读取截图目录
+    时间优先从 frames.json 中读取 格式为 [{"file": "xx.png", "time": 1.23}, ...]
+    否则使用文件名末尾的数字作为时间 与 debug_utils.save_debug_image 一致 超过1e11时视为毫秒
+    都没有时按文件名顺序 以 fps 生成时间
+    :param frame_dir: 截图目录
+    :param fps: 文件名没有时间时使用的帧率
+    :return: 按时间排序的帧
+    """
+    index_path = os.path.join(frame_dir, 'frames.json')
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as file:
+            index_list = json.load(file)
+        frame_list = [ReplayFrame(os.path.join(frame_dir, i['file']), float(i['time'])) for i in index_list]
+        frame_list.sort(key=lambda x: x.create_time)
+        return frame_list
+
+    file_name_list = sorted(
+        i for i in os.listdir(frame_dir)
+        if os.path.splitext(i)[1].lower() in _IMAGE_SUFFIX_LIST
+    )
+
+    frame_list: List[ReplayFrame] = []
+    for idx, file_name in enumerate(file_name_list):
+        stem = os.path.splitext(file_name)[0]
+        match = _FRAME_TIME_PATTERN.search(stem)
+        if match is not None:
+            create_time = float(match.group(1))
+            if create_time > 1e11:
+                create_time = create_time / 1000
+        else:
+            create_time = idx / fps
+        frame_list.append(ReplayFrame(os.path.join(frame_dir, file_name), create_time))
+
+    frame_list.sort(key=lambda x: x.create_time)
+    return frame_list
+
+
+class ReplayController(ControllerBase):
+
+    def __init__(self, frame_list: List[ReplayFrame]):
+        """
+        按顺序返回录制好的截图 用于离线回放
+        不做任何按键操作 截图时间使用录制时的时间
+        :param frame_list: 截图帧
+        """
+        ControllerBase.__init__(self)
+        self.frame_list: List[ReplayFrame] = frame_list
+        self.frame_idx: int = -1  # 当前帧的下标
+
+    def init_before_context_run(self) -> bool:
+        self.frame_idx = -1
+        return True
+
+    @property
+    def is_game_window_ready(self) -> bool:
+        return True
+
+    @property
+    def has_next_frame(self) -> bool:
+        return self.frame_idx + 1 < len(self.frame_list)
+
+    @property
+    def current_frame(self) -> Optional[ReplayFrame]:
+        if 0 <= self.frame_idx < len(self.frame_list):
+            return self.frame_list[self.frame_idx]
+        return None
+
+    def screenshot(self, independent: bool = False) -> tuple[float, MatLike | None]:
+        """
+        读取下一帧
+        :return: 录制时的截图时间 和 截图
+        """
+        if not self.has_next_frame:
+            return time.time(), None
+        self.frame_idx += 1
+        frame = self.frame_list[self.frame_idx]
+        screen = self.get_screenshot(independent)
+        if screen is not None and self.max_screenshot_cnt > 0:
+            self.screenshot_history.append(ScreenshotWithTime(screen, frame.create_time))
+        return frame.create_time, screen
+
+    def get_screenshot(self, independent: bool = False) -> MatLike | None:
+        frame = self.current_frame
+        if frame is None:
+            return None
+        return cv2_utils.read_image(frame.file_path)
+
+    def click(self, pos: Point = None, press_time: float = 0, pc_alt: bool = False) -> bool:
+        return True
+
+    def dodge(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def switch_next(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def switch_prev(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def normal_attack(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def special_attack(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def ultimate(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def chain_left(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def chain_right(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def chain_cancel(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def move_w(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def move_s(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def move_a(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def move_d(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def lock(self, press: bool = False, press_time: Optional[float] = None, release: bool = False) -> None:
+        pass
+
+    def turn_by_distance(self, d: float) -> None:
+        pass
+
+
+class ReplayContext(OneDragonEnvContext):
+
+    def __init__(self, controller: Optional[ControllerBase] = None):
+        """
+        回放使用的上下文 只包含自动战斗识别需要的部分
+        不创建游戏窗口控制器 不监听按键 不上报遥测
+        :param controller: 控制器 通常为 ReplayController
+        """
+        OneDragonEnvContext.__init__(self)
+
+        self.screen_loader: ScreenContext = ScreenContext()
+        self.template_loader: TemplateLoader = TemplateLoader()
+        self.tm: TemplateMatcher = TemplateMatcher(self.template_loader)
+        self.ocr: OcrMatcher = OnnxOcrMatcher(
+            OnnxOcrParam(
+                det_limit_side_len=max(self.project_config.screen_standard_width, self.project_config.screen_standard_height),
+            )
+        )
+        self.ocr_service: OcrService | None = None  # 延迟初始化
+        self.ocr_layout_cache: OcrLayoutCache = OcrLayoutCache(ocr_matcher=self.ocr)
+        self.controller: ControllerBase = controller
+
+        self.model_config: ModelConfig = ModelConfig()
+        self.cv_service: CvService = CvService(self)
+
+    def init_ocr(self) -> None:
+        """
+        初始化OCR 与 OneDragonContext.init_ocr 一致
+        """
+        self.ocr.init_model(
+            ghproxy_url=self.env_config.gh_proxy_url if self.env_config.is_gh_proxy else None,
+            proxy_url=self.env_config.personal_proxy if self.env_config.is_personal_proxy else None,
+        )
+        if self.ocr_service is None:
+            self.ocr_service = OcrService(ocr_matcher=self.ocr)
+        else:
+            self.ocr_service.ocr_matcher = self.ocr
+        self.ocr_layout_cache.ocr_matcher = self.ocr
+
+
+class CheckerLatencyRecorder:
+
+    def __init__(self):
+        """
+        记录各个识别方法的耗时
+        """
+        self._lock = threading.Lock()
+        self.cost_ms: Dict[str, List[float]] = {}
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """
+        包装一个方法 每次调用记录耗时
+        :param name: 记录的名称
+        :param func: 原方法
+        :return: 包装后的方法
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(name, (time.perf_counter() - start) * 1000)
+
+        return wrapper
+
+    def add(self, name: str, cost_ms: float) -> None:
+        with self._lock:
+            if name not in self.cost_ms:
+                self.cost_ms[name] = []
+            self.cost_ms[name].append(cost_ms)
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        :return: 每个识别方法的 调用次数 平均值 p50 p95 p99 最大值 (毫秒)
+        """
+        result: Dict[str, dict] = {}
+        with self._lock:
+            for name, cost_list in self.cost_ms.items():
+                arr = np.asarray(cost_list, dtype=np.float64)
+                p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+                result[name] = {
+                    'cnt': int(arr.shape[0]),
+                    'mean': float(arr.mean()),
+                    'p50': float(p50),
+                    'p95': float(p95),
+                    'p99': float(p99),
+                    'max': float(arr.max()),
+                }
+        return result
+
+
+class AutoBattleReplay:
+
+    def __init__(self, ctx: ZContext | ReplayContext, auto_op: AutoBattleOperator,
+                 frame_list: List[ReplayFrame],
+                 audio_recorder: Optional[OfflineAudioRecorder] = None):
+        """
+        离线回放录制好的截图 走完整的 check_battle_state 识别流程
+        记录每个识别方法的耗时 以及产生的状态记录
+        :param ctx: 上下文 其中的控制器会被替换成 ReplayController
+        :param auto_op: 已经完成 init_before_running 的自动战斗指令
+        :param frame_list: 截图帧
+        :param audio_recorder: 离线音频 为空时使用静音
+        """
+        self.ctx: ZContext | ReplayContext = ctx
+        self.auto_op: AutoBattleOperator = auto_op
+        self.battle_context: AutoBattleContext = auto_op.auto_battle_context
+        self.controller: ReplayController = ReplayController(frame_list)
+        self.audio_recorder: OfflineAudioRecorder = audio_recorder if audio_recorder is not None else OfflineAudioRecorder(
+            audio_start_time=frame_list[0].create_time if len(frame_list) > 0 else 0
+        )
+        self.latency: CheckerLatencyRecorder = CheckerLatencyRecorder()
+
+        self._record_lock = threading.Lock()
+        self.state_record_list: List[Tuple[int, StateRecord]] = []  # (帧下标, 状态记录)
+        self.frame_result_list: List[dict] = []
+
+        self._hook()
+
+    def _hook(self) -> None:
+        """
+        替换控制器和音频 并包装识别方法 只修改实例属性 不影响其他实例
+        """
+        self.ctx.controller = self.controller
+        self.battle_context.dodge_context.set_audio_recorder(self.audio_recorder)
+        self.audio_recorder.start_running_async()
+
+        bc = self.battle_context
+        checker_list = [
+            (bc, 'is_normal_attack_btn_available', '战斗画面'),
+            (bc.dodge_context, 'check_dodge_audio', '闪避-声音'),
+            (bc.dodge_context, 'check_dodge_flash', '闪避-闪光'),
+            (bc.agent_context, 'check_agent_related', '角色状态'),
+            (bc.target_context, 'run_all_checks', '目标状态'),
+            (bc, 'check_quick_assist', '快速支援'),
+            (bc, '_check_distance_with_lock', '距离'),
+            (bc, 'check_chain_attack', '连携技'),
+            (bc, '_check_battle_end', '战斗结束'),
+        ]
+        for obj, method_name, name in checker_list:
+            setattr(obj, method_name, self.latency.wrap(name, getattr(obj, method_name)))
+
+        update_state = self.auto_op.update_state
+        batch_update_states = self.auto_op.batch_update_states
+
+        def update_state_wrapper(state_record: StateRecord) -> None:
+            self._add_state_records([state_record])
+            update_state(state_record)
+
+        def batch_update_states_wrapper(state_records: List[StateRecord]) -> None:
+            self._add_state_records(state_records)
+            batch_update_states(state_records)
+
+        self.auto_op.update_state = update_state_wrapper
+        self.auto_op.batch_update_states = batch_update_states_wrapper
+
+    def _add_state_records(self, state_records: List[StateRecord]) -> None:
+        with self._record_lock:
+            frame_idx = self.controller.frame_idx
+            for i in state_records:
+                self.state_record_list.append((frame_idx, i))
+
+    def run(self,
+            check_battle_end_normal_result: bool = False,
+            check_battle_end_hollow_result: bool = False,
+            check_battle_end_defense_result: bool = False,
+            check_distance: bool = False) -> None:
+        """
+        逐帧回放 每帧同步等待全部识别完成
+        """
+        self.controller.init_before_context_run()
+        while self.controller.has_next_frame:
+            screenshot_time, screen = self.controller.screenshot()
+            frame = self.controller.current_frame
+            if screen is None:
+                log.warning('读取截图失败 %s', frame.file_path)
+                continue
+
+            self.audio_recorder.seek(screenshot_time)
+
+            start = time.perf_counter()
+            in_battle = self.battle_context.check_battle_state(
+                screen, screenshot_time,
+                check_battle_end_normal_result=check_battle_end_normal_result,
+                check_battle_end_hollow_result=check_battle_end_hollow_result,
+                check_battle_end_defense_result=check_battle_end_defense_result,
+                check_distance=check_distance,
+                sync=True
+            )
+            cost_ms = (time.perf_counter() - start) * 1000
+            self.latency.add('总计', cost_ms)
+
+            self.frame_result_list.append({
+                'idx': self.controller.frame_idx,
+                'file': os.path.basename(frame.file_path),
+                'time': screenshot_time,
+                'in_battle': in_battle,
+                'cost_ms': cost_ms,
+            })
+
+    def to_json(self) -> dict:
+        """
+        :return: 回放结果 包括每帧结果、各识别方法耗时、状态记录流
+        """
+        with self._record_lock:
+            state_records = [
+                {
+                    'frame_idx': frame_idx,
+                    'state_name': i.state_name,
+                    'trigger_time': i.trigger_time,
+                    'value': i.value,
+                    'value_add': i.value_add,
+                    'trigger_time_add': i.trigger_time_add,
+                    'is_clear': i.is_clear,
+                }
+                for frame_idx, i in self.state_record_list
+            ]
+
+        return {
+            'frame_cnt': len(self.frame_result_list),
+            'checker_latency': self.latency.summary(),
+            'frames': self.frame_result_list,
+            'state_records': state_records,
+        }
+
+    def save(self, file_path: str) -> None:
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_json(), file, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线回放截图 测试自动战斗的识别')
+    parser.add_argument('frame_dir', help='截图目录')
+    parser.add_argument('-o', '--output', default='auto_battle_replay.json', help='结果输出路径')
+    parser.add_argument('--template', default='全配队通用', help='自动战斗配置')
+    parser.add_argument('--audio', default=None, help='录制的音频文件 开始时间与第一帧对齐')
+    parser.add_argument('--audio-start-time', type=float, default=None, help='音频开始的时间 默认为第一帧的时间')
+    parser.add_argument('--fps', type=float, default=10, help='截图文件名没有时间时使用的帧率')
+    parser.add_argument('--check-distance', action='store_true', help='是否识别距离')
+    parser.add_argument('--check-end', action='store_true', help='是否识别战斗结束')
+    args = parser.parse_args()
+
+    frame_list = load_replay_frames(args.frame_dir, fps=args.fps)
+    if len(frame_list) == 0:
+        log.error('没有找到截图 %s', args.frame_dir)
+        return
+
+    audio_recorder: Optional[OfflineAudioRecorder] = None
+    if args.audio is not None:
+        audio_start_time = args.audio_start_time if args.audio_start_time is not None else frame_list[0].create_time
+        audio_recorder = OfflineAudioRecorder.from_file(args.audio, audio_start_time=audio_start_time)
+
+    ctx = ReplayContext()
+    ctx.init_ocr()
+
+    auto_op = AutoBattleOperator(ctx, 'auto_battle', args.template)
+    success, msg = auto_op.init_before_running()
+    if not success:
+        log.error('自动战斗初始化失败 %s', msg)
+        return
+    auto_op.auto_battle_context.dodge_context.init_audio_template()
+
+    replay = AutoBattleReplay(ctx, auto_op, frame_list, audio_recorder=audio_recorder)
+    replay.run(
+        check_battle_end_normal_result=args.check_end,
+        check_distance=args.check_distance,
+    )
+    replay.save(args.output)
+    log.info('回放完成 共 %d 帧 结果保存到 %s', len(replay.frame_result_list), args.output)
+
+    auto_op.dispose()
+
+
+if __name__ == '__main__':
+    main()
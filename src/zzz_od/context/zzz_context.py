@@ -235,6 +235,7 @@ class ZContext(OneDragonContext):
             )
 
         self.run_context.set_controller(self.controller)
+        self.cv_service.warmup()
         self.hollow.data_service.reload()
         self.init_hollow_config()
         if self.agent_outfit_config.compatibility_mode:
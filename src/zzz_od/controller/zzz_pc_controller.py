@@ -45,7 +45,7 @@ class ZPcController(PcControllerBase):
 
     def fill_uid_black(self, screen: MatLike) -> MatLike:
         """
-        遮挡UID 由子类实现
+        遮挡UID 截图是每次新生成的 直接在原图上修改 不再复制整张图片
         """
         rect = ScreenNormalWorldEnum.UID.value.rect
 
@@ -53,7 +53,7 @@ class ZPcController(PcControllerBase):
             screen,
             pos=[rect.x1, rect.y1, rect.width, rect.height],
             color=game_const.YOLO_DEFAULT_COLOR,
-            new_image=True
+            new_image=False
         )
 
     def enable_keyboard(self):
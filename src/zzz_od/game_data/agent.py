@@ -2,6 +2,7 @@ from cv2.typing import MatLike
 from enum import Enum
 from typing import Optional, List, Union, Tuple
 
+from one_dragon.utils.entity_index import EntityIndex
 from one_dragon.utils.i18_utils import gt
 
 
@@ -358,3 +359,17 @@ class AgentEnum(Enum):
                                       hsv_color=(90,255,255), hsv_color_diff=(89,55,55),
                                       max_length=150)
                     ])
+
+
+_agent_name_index: Optional[EntityIndex[Agent]] = None
+
+
+def get_agent_name_index() -> EntityIndex[Agent]:
+    """
+    代理人名称的索引 用于OCR结果匹配代理人
+    :return:
+    """
+    global _agent_name_index
+    if _agent_name_index is None:
+        _agent_name_index = EntityIndex([i.value for i in AgentEnum], name_getter=lambda i: i.agent_name)
+    return _agent_name_index
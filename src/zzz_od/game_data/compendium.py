@@ -4,6 +4,7 @@ from typing import List, Optional
 
 from one_dragon.base.config.config_item import ConfigItem
 from one_dragon.utils import os_utils
+from one_dragon.utils.entity_index import EntityIndex
 from one_dragon.utils.log_utils import log
 
 
@@ -116,6 +117,7 @@ class CompendiumService:
         self.coffee_list: List[Coffee] = []
         self.name_2_coffee: dict[str, Coffee] = {}
         self.coffee_schedule: dict[int, List[Coffee]] = {}
+        self._category_2_mission_type_index: dict[tuple[str, str], EntityIndex[CompendiumMissionType]] = {}
 
         self.reload()
 
@@ -126,6 +128,7 @@ class CompendiumService:
         """
         self._load_all_compendium()
         self._load_coffee()
+        self._category_2_mission_type_index = {}
 
     def _load_all_compendium(self) -> None:
         """
@@ -259,6 +262,22 @@ class CompendiumService:
 
         return None
 
+    def get_same_category_mission_type_index(self, mission_type_name: str) -> Optional[EntityIndex[CompendiumMissionType]]:
+        """
+        获取与副本相同分类的全部副本 的名称索引 每个分类只构建一次
+        """
+        mission_type_list = self.get_same_category_mission_type_list(mission_type_name)
+        if mission_type_list is None:
+            return None
+
+        category = mission_type_list[0].category
+        key = (category.tab.tab_name, category.category_name)
+        index = self._category_2_mission_type_index.get(key)
+        if index is None:
+            index = EntityIndex(mission_type_list, name_getter=lambda i: i.mission_type_name)
+            self._category_2_mission_type_index[key] = index
+        return index
+
     def get_notorious_hunt_plan_mission_type_list(self, category_name: str) -> List[ConfigItem]:
         config_list: List[ConfigItem] = []
 
@@ -11,7 +11,7 @@ from one_dragon.utils import cv2_utils, str_utils
 from one_dragon.utils.i18_utils import gt
 from one_dragon.utils.log_utils import log
 from zzz_od.context.zzz_context import ZContext
-from zzz_od.game_data.agent import Agent, AgentEnum
+from zzz_od.game_data.agent import Agent, get_agent_name_index
 from zzz_od.hollow_zero.game_data.hollow_zero_event import HollowZeroSpecialEvent
 from zzz_od.hollow_zero.event import hollow_event_utils
 from zzz_od.hollow_zero.event.event_ocr_result_handler import EventOcrResultHandler
@@ -98,14 +98,11 @@ class CallForSupport(ZOperation):
         else:  # 默认情况只取前面3个字匹配
             to_match = ocr_result[:3]
 
-        agent_list: List[Agent] = [agent.value for agent in AgentEnum]
-        target_list: List[str] = [gt(agent.value.agent_name, 'game') for agent in AgentEnum]
+        agent_index = get_agent_name_index()
+        idx = agent_index.find_best_match_by_difflib(to_match, cutoff=0.1)
 
-        results = difflib.get_close_matches(to_match, target_list, n=1, cutoff=0.1)
-
-        if results is not None and len(results) > 0:
-            idx = target_list.index(results[0])
-            return agent_list[idx]
+        if idx is not None:
+            return agent_index.entity_list[idx]
         else:
             return None
 
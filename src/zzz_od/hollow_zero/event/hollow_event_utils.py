@@ -271,10 +271,10 @@ def check_bottom_choose(ctx: ZContext, screen: MatLike) -> Optional[str]:
         HollowZeroSpecialEvent.SWIFT_SUPPLY_PRESS.value
     ]
 
+    ocr_result_list = list(ocr_result_map.keys())
     for event in event_list:
-        for ocr_result in ocr_result_map.keys():
-            if str_utils.find_by_lcs(gt(event.event_name, 'game'), ocr_result, percent=event.lcs_percent):
-                return event.event_name
+        if any(str_utils.find_by_lcs_list(gt(event.event_name, 'game'), ocr_result_list, percent=event.lcs_percent)):
+            return event.event_name
 
 
 def check_bottom_remove(ctx: ZContext, screen: MatLike) -> Optional[str]:
@@ -287,9 +287,8 @@ def check_bottom_remove(ctx: ZContext, screen: MatLike) -> Optional[str]:
     ocr_result_map = ctx.ocr.run_ocr(part)
 
     event = HollowZeroSpecialEvent.CORRUPTION_REMOVE.value
-    for ocr_result in ocr_result_map.keys():
-        if str_utils.find_by_lcs(gt(event.event_name, 'game'), ocr_result, percent=event.lcs_percent):
-            return event.event_name
+    if any(str_utils.find_by_lcs_list(gt(event.event_name, 'game'), list(ocr_result_map.keys()), percent=event.lcs_percent)):
+        return event.event_name
 
 
 def check_full_in_bag(ctx: ZContext, screen: MatLike) -> Optional[str]:
@@ -0,0 +1,69 @@
+from typing import List
+
+from one_dragon.base.geometry.rectangle import Rect
+
+
+class HollowMapGrid:
+
+    def __init__(self, cell_size: int = 64):
+        """
+        按节点中心点所在的格子 对节点下标进行分桶
+        查找某个节点附近的节点时 只需要检查附近几个格子里的节点 不需要遍历全部节点
+        :param cell_size: 格子的边长 不影响查找结果 只影响速度 接近节点大小时最快
+        """
+        self.cell_size: int = max(1, int(cell_size))
+        self._cell_2_idx: dict[tuple[int, int], List[int]] = {}
+        self._idx_2_cell: dict[int, tuple[int, int]] = {}
+
+    def _get_cell(self, pos: Rect) -> tuple[int, int]:
+        center = pos.center
+        return center.x // self.cell_size, center.y // self.cell_size
+
+    def add(self, idx: int, pos: Rect) -> None:
+        """
+        加入一个节点
+        :param idx: 节点下标
+        :param pos: 节点位置
+        """
+        cell = self._get_cell(pos)
+        self._idx_2_cell[idx] = cell
+        if cell not in self._cell_2_idx:
+            self._cell_2_idx[cell] = [idx]
+        else:
+            self._cell_2_idx[cell].append(idx)
+
+    def update(self, idx: int, pos: Rect) -> None:
+        """
+        节点位置变化后 重新分桶
+        :param idx: 节点下标
+        :param pos: 节点的新位置
+        """
+        old_cell = self._idx_2_cell.get(idx)
+        if old_cell is not None:
+            if old_cell == self._get_cell(pos):
+                return
+            self._cell_2_idx[old_cell].remove(idx)
+        self.add(idx, pos)
+
+    def query(self, pos: Rect, radius_x: float, radius_y: float) -> List[int]:
+        """
+        获取中心点距离在范围内的节点 结果可能包含范围外的节点 需要调用方再判断
+        :param pos: 位置
+        :param radius_x: 横向的中心点距离
+        :param radius_y: 纵向的中心点距离
+        :return: 从小到大排序的节点下标
+        """
+        center = pos.center
+        col_1 = int((center.x - radius_x) // self.cell_size)
+        col_2 = int((center.x + radius_x) // self.cell_size)
+        row_1 = int((center.y - radius_y) // self.cell_size)
+        row_2 = int((center.y + radius_y) // self.cell_size)
+
+        result: List[int] = []
+        for col in range(col_1, col_2 + 1):
+            for row in range(row_1, row_2 + 1):
+                idx_list = self._cell_2_idx.get((col, row))
+                if idx_list is not None:
+                    result.extend(idx_list)
+        result.sort()
+        return result
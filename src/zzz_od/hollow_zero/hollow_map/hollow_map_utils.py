@@ -5,6 +5,7 @@ from one_dragon.utils import cal_utils
 from one_dragon.yolo.detect_utils import DetectFrameResult
 from zzz_od.context.zzz_context import ZContext
 from zzz_od.hollow_zero.game_data.hollow_zero_event import HollowZeroEntry
+from zzz_od.hollow_zero.hollow_map.hollow_map_grid import HollowMapGrid
 from zzz_od.hollow_zero.hollow_map.hollow_zero_map import HollowZeroMap, HollowZeroMapNode
 
 
@@ -17,6 +18,7 @@ def construct_map_from_yolo_result(
     根据识别结果构造地图
     """
     nodes: List[HollowZeroMapNode] = []
+    grid = HollowMapGrid()
     unknown = name_2_entry['未知']
 
     for result in detect_result.results:
@@ -34,14 +36,10 @@ def construct_map_from_yolo_result(
             pos = Rect(result.x1, result.y1, result.x2, result.y2 + height // 3)
 
         # 判断与已有的节点是否重复
-        to_merge: Optional[HollowZeroMapNode] = None
-        for existed in nodes:
-            min_dis = min(pos.height, pos.width, existed.pos.height, existed.pos.width) // 2
-            if cal_utils.distance_between(pos.center, existed.pos.center) < min_dis:
-                to_merge = existed
-                break
+        to_merge_idx = _find_same_pos_node(grid, nodes, pos)
 
-        if to_merge is not None:
+        if to_merge_idx is not None:
+            to_merge = nodes[to_merge_idx]
             if to_merge.entry.is_base and not entry.is_base:  # 旧的是底座 那么将新的类型赋值上去
                 to_merge.entry = entry
                 to_merge.pos.y1 = pos.y1  # 使用具体类型的坐标
@@ -51,10 +49,12 @@ def construct_map_from_yolo_result(
                 to_merge.pos.y2 = pos.y2
             else:
                 pass
+            grid.update(to_merge_idx, to_merge.pos)
         else:
             node = HollowZeroMapNode(pos, entry,
                                      check_time=detect_result.run_time,
                                      confidence=result.score)
+            grid.add(len(nodes), pos)
             nodes.append(node)
 
     for node in nodes:
@@ -67,11 +67,75 @@ def construct_map_from_yolo_result(
         return None
 
 
+def _find_same_pos_node(grid: HollowMapGrid, nodes: List[HollowZeroMapNode], pos: Rect) -> Optional[int]:
+    """
+    在已有的节点中 找到第一个与该位置重复的节点 结果与按顺序遍历全部节点一致
+    :param grid: 已有节点的分桶
+    :param nodes: 已有节点
+    :param pos: 位置
+    :return: 节点下标 没有时返回None
+    """
+    # 重复的距离不超过两者最短边的一半 因此只需要查找这个位置最短边一半的范围
+    radius = max(0, min(pos.height, pos.width) // 2)
+    for idx in grid.query(pos, radius, radius):
+        existed = nodes[idx]
+        min_dis = min(pos.height, pos.width, existed.pos.height, existed.pos.width) // 2
+        if cal_utils.distance_between(pos.center, existed.pos.center) < min_dis:
+            return idx
+    return None
+
+
+# 节点之间的相对位置
+_DIRECTION_LEFT: int = 1  # 1在2左边
+_DIRECTION_RIGHT: int = 2  # 1在2右边
+_DIRECTION_ABOVE: int = 4  # 1在2上边
+_DIRECTION_UNDER: int = 8  # 1在2下边
+
+# 轨道的方向限制 key=相对位置 value=(不能作为目标的轨道, 不能作为起点的轨道)
+_TRACK_RULES: dict[int, tuple[List[str], List[str]]] = {
+    _DIRECTION_LEFT: (['轨道-左'], ['轨道-上', '轨道-下', '轨道-左']),
+    _DIRECTION_RIGHT: (['轨道-右'], ['轨道-上', '轨道-下', '轨道-右']),
+    _DIRECTION_ABOVE: (['轨道-上'], ['轨道-左', '轨道-右', '轨道-上']),
+    _DIRECTION_UNDER: (['轨道-下'], ['轨道-左', '轨道-右', '轨道-下']),
+}
+
+
+def _build_track_mask(rule_idx: int) -> dict[str, int]:
+    """
+    将轨道的方向限制 转化成 格子名称 -> 不能通行的相对位置
+    """
+    mask: dict[str, int] = {}
+    for direction, rule in _TRACK_RULES.items():
+        for entry_name in rule[rule_idx]:
+            mask[entry_name] = mask.get(entry_name, 0) | direction
+    return mask
+
+
+_TRACK_TARGET_MASK: dict[str, int] = _build_track_mask(0)
+_TRACK_SOURCE_MASK: dict[str, int] = _build_track_mask(1)
+
+
+def get_node_signature(node: HollowZeroMapNode) -> tuple:
+    """
+    影响节点连通关系的信息 两个节点的信息都不变时 它们之间的边不变
+    """
+    return node.pos.x1, node.pos.y1, node.pos.x2, node.pos.y2, node.entry.entry_name, node.entry.can_go
+
+
 def construct_map_from_nodes(
         ctx: ZContext,
         nodes: List[HollowZeroMapNode],
-        check_time: float
+        check_time: float,
+        reuse_map: Optional[HollowZeroMap] = None
 ) -> HollowZeroMap:
+    """
+    根据节点构造地图
+    :param ctx: 上下文
+    :param nodes: 节点
+    :param check_time: 识别时间
+    :param reuse_map: 可复用的旧地图 两个节点在旧地图中都存在且没有变化时 直接使用旧地图中的边
+    :return: 地图
+    """
     current_idx: Optional[int] = None
     for i in range(len(nodes)):
         if nodes[i].entry.entry_name == '当前':
@@ -86,59 +150,78 @@ def construct_map_from_nodes(
             else:
                 current_idx = i
 
-    edges: dict[int, List[int]] = {}
-
+    signatures: List[tuple] = [get_node_signature(node) for node in nodes]
+
+    # 没有变化的节点 在旧地图中的下标
+    reuse_idx_map: dict[int, int] = {}
+    if reuse_map is not None and reuse_map.node_signatures is not None:
+        old_id_2_idx: dict[int, int] = {id(node): idx for idx, node in enumerate(reuse_map.nodes)}
+        for i in range(len(nodes)):
+            old_idx = old_id_2_idx.get(id(nodes[i]))
+            if old_idx is not None and reuse_map.node_signatures[old_idx] == signatures[i]:
+                reuse_idx_map[i] = old_idx
+    reuse_edges: dict[int, set[int]] = {}
+    if len(reuse_idx_map) > 0:
+        reuse_edges = {k: set(v) for k, v in reuse_map.edges.items()}
+
+    screen_width = ctx.project_config.screen_standard_width
+    screen_height = ctx.project_config.screen_standard_height
+    valid_idx_list: List[int] = []
+    max_width: int = 0
+    max_height: int = 0
     for i in range(len(nodes)):
-        node_1 = nodes[i]
-        if (node_1.pos.x1 < 0
-                or node_1.pos.y1 < 0
-                or node_1.pos.x2 >= ctx.project_config.screen_standard_width
-                or node_1.pos.y2 >= ctx.project_config.screen_standard_height
-        ):
+        pos = nodes[i].pos
+        if pos.x1 < 0 or pos.y1 < 0 or pos.x2 >= screen_width or pos.y2 >= screen_height:
             continue
+        if not nodes[i].entry.can_go:
+            continue
+        valid_idx_list.append(i)
+        max_width = max(max_width, abs(pos.width))
+        max_height = max(max_height, abs(pos.height))
 
-        for j in range(len(nodes)):
-            node_2 = nodes[j]
-            if (node_2.pos.x1 < 0
-                    or node_2.pos.y1 < 0
-                    or node_2.pos.x2 >= ctx.project_config.screen_standard_width
-                    or node_2.pos.y2 >= ctx.project_config.screen_standard_height
-            ):
-                continue
-
-            if not node_1.entry.can_go or not node_2.entry.can_go:
-                continue
+    # 相邻节点的中心点距离 不会超过最大边长的1.25倍 加上中心点取整的误差
+    radius_x = max_width * 1.25 + 2
+    radius_y = max_height * 1.25 + 2
+    grid = HollowMapGrid(max(max_width, max_height))
+    for i in valid_idx_list:
+        grid.add(i, nodes[i].pos)
 
-            if _at_left(node_1, node_2):  # 1在2左边
-                if node_2.entry.entry_name in ['轨道-左']:
-                    pass
-                elif node_1.entry.entry_name in ['轨道-上', '轨道-下', '轨道-左']:
-                    pass
-                else:
-                    _add_directed_edge(edges, i, j)
-            elif _at_right(node_1, node_2):  # 1在2右边
-                if node_2.entry.entry_name in ['轨道-右']:
-                    pass
-                elif node_1.entry.entry_name in ['轨道-上', '轨道-下', '轨道-右']:
-                    pass
-                else:
-                    _add_directed_edge(edges, i, j)
-            elif _above(node_1, node_2):  # 1在2上边
-                if node_2.entry.entry_name in ['轨道-上']:
-                    pass
-                elif node_1.entry.entry_name in ['轨道-左', '轨道-右', '轨道-上']:
-                    pass
-                else:
-                    _add_directed_edge(edges, i, j)
-            elif _under(node_1, node_2):  # 1在2下边
-                if node_2.entry.entry_name in ['轨道-下']:
-                    pass
-                elif node_1.entry.entry_name in ['轨道-左', '轨道-右', '轨道-下']:
-                    pass
-                else:
+    edges: dict[int, List[int]] = {}
+    for i in valid_idx_list:
+        node_1 = nodes[i]
+        old_i = reuse_idx_map.get(i)
+        old_i_edges = reuse_edges.get(old_i) if old_i is not None else None
+        for j in grid.query(node_1.pos, radius_x, radius_y):
+            old_j = reuse_idx_map.get(j) if old_i is not None else None
+            if old_j is not None:
+                if old_i_edges is not None and old_j in old_i_edges:
                     _add_directed_edge(edges, i, j)
+            elif _can_go_directly(node_1, nodes[j]):
+                _add_directed_edge(edges, i, j)
+
+    return HollowZeroMap(nodes, current_idx, edges, check_time=check_time, node_signatures=signatures)
 
-    return HollowZeroMap(nodes, current_idx, edges, check_time=check_time)
+
+def _can_go_directly(node_1: HollowZeroMapNode, node_2: HollowZeroMapNode) -> bool:
+    """
+    两个可通行的节点 是否可以从1直接走到2
+    """
+    if _at_left(node_1, node_2):  # 1在2左边
+        direction = _DIRECTION_LEFT
+    elif _at_right(node_1, node_2):  # 1在2右边
+        direction = _DIRECTION_RIGHT
+    elif _above(node_1, node_2):  # 1在2上边
+        direction = _DIRECTION_ABOVE
+    elif _under(node_1, node_2):  # 1在2下边
+        direction = _DIRECTION_UNDER
+    else:
+        return False
+
+    if _TRACK_TARGET_MASK.get(node_2.entry.entry_name, 0) & direction:
+        return False
+    if _TRACK_SOURCE_MASK.get(node_1.entry.entry_name, 0) & direction:
+        return False
+    return True
 
 
 def _at_left(node_1: HollowZeroMapNode, node_2: HollowZeroMapNode) -> bool:
@@ -228,10 +311,15 @@ def is_same_map(map_1: HollowZeroMap, map_2: HollowZeroMap) -> bool:
     elif node_cnt_1 == 0 or node_cnt_2 == 0:
         return False
 
+    grid = HollowMapGrid()
+    for idx, node_2 in enumerate(map_2.nodes):
+        grid.add(idx, node_2.pos)
+
     same_node_cnt = 0
     for node_1 in map_1.nodes:
-        for node_2 in map_2.nodes:
-            if is_same_node(node_1, node_2):
+        radius = max(0, min(node_1.pos.height, node_1.pos.width) // 2)
+        for idx in grid.query(node_1.pos, radius, radius):
+            if is_same_node(node_1, map_2.nodes[idx]):
                 same_node_cnt += 1
                 break
 
@@ -246,22 +334,21 @@ def merge_map(ctx: ZContext, map_list: List[HollowZeroMap]):
     将多个地图合并成一个
     """
     nodes: List[HollowZeroMapNode] = []
+    grid = HollowMapGrid()
     max_check_time: Optional[float] = None
 
     # 每个地图的节点取出来后去重合并
     for m in map_list:
         for node in m.nodes:
-            to_merge: Optional[HollowZeroMapNode] = None
-            for existed in nodes:
-                if is_same_node_pos(node, existed):
-                    to_merge = existed
-                    break
+            to_merge_idx = _find_same_pos_node(grid, nodes, node.pos)
 
-            if to_merge is not None:
+            if to_merge_idx is not None:
+                to_merge = nodes[to_merge_idx]
                 if to_merge.entry.is_base:  # 旧的是底座 那么将新的类型赋值上去
                     to_merge.entry = node.entry
                 elif node.entry.is_base:  # 旧的是格子类型 新的是底座 将底座范围赋值上去
                     to_merge.pos = node.pos
+                    grid.update(to_merge_idx, to_merge.pos)
                 elif to_merge.entry.entry_name == '未知' and node.entry.entry_name != '未知':  # 新旧都是格子类型 旧的是未知 将新的类型赋值上去
                     to_merge.entry = node.entry
                 elif to_merge.entry.entry_name != '未知' and node.entry.entry_name == '未知':  # 新旧都是格子类型 新的是未知 保持不变
@@ -274,12 +361,19 @@ def merge_map(ctx: ZContext, map_list: List[HollowZeroMap]):
                 elif to_merge.check_time < node.check_time:  # 新旧都是格子类型 新的识别时间更晚 将新的类型赋值上去
                     to_merge.entry = node.entry
             else:
+                grid.add(len(nodes), node.pos)
                 nodes.append(node)
 
         if max_check_time is None or m.check_time > max_check_time:
             max_check_time = m.check_time
 
-    return construct_map_from_nodes(ctx, nodes, max_check_time)
+    # 节点最多的通常是内存中累积的地图 只有新识别到或变化的节点需要重新计算边
+    reuse_map: Optional[HollowZeroMap] = None
+    for m in map_list:
+        if reuse_map is None or len(m.nodes) > len(reuse_map.nodes):
+            reuse_map = m
+
+    return construct_map_from_nodes(ctx, nodes, max_check_time, reuse_map=reuse_map)
 
 
 def is_same_node_pos(x: HollowZeroMapNode, y: HollowZeroMapNode) -> bool:
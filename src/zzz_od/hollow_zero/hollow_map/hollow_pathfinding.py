@@ -1,3 +1,6 @@
+import heapq
+from collections import OrderedDict
+
 from cv2.typing import MatLike
 from typing import Optional, List
 
@@ -7,6 +10,45 @@ from zzz_od.hollow_zero.hollow_map.hollow_map_utils import is_same_node
 from zzz_od.hollow_zero.hollow_map.hollow_zero_map import HollowZeroMapNode, HollowZeroMap
 
 
+class _SearchResult:
+
+    def __init__(self, node_cnt: int):
+        """
+        一次搜索的结果 按节点下标保存 可以应用到拓扑一致的地图上
+        节点下标为-1时 代表None
+        """
+        self.path_first_idx: List[int] = [-1] * node_cnt
+        self.path_first_need_step_idx: List[int] = [-1] * node_cnt
+        self.path_last_idx: List[int] = [-1] * node_cnt
+        self.path_step_cnt: List[int] = [-1] * node_cnt
+        self.path_node_cnt: List[int] = [-1] * node_cnt
+
+
+# 最近的搜索结果 key=地图拓扑
+# 同一步内会对同一个地图多次搜索(例如调试画图) 没有移动成功时 下一步的地图拓扑也不变
+_search_cache: OrderedDict[tuple, _SearchResult] = OrderedDict()
+_SEARCH_CACHE_SIZE: int = 16
+
+
+def _get_move_cost(current_map: HollowZeroMap, avoid_entry_list: Optional[set[str]]) -> List[int]:
+    """
+    前往每个节点需要的步数
+    :param current_map: 地图
+    :param avoid_entry_list: 避免途经点
+    :return: 按节点下标 -1代表不能前往
+    """
+    cost: List[int] = []
+    for node in current_map.nodes:
+        entry = node.entry
+        if not entry.can_go:  # 无法移动
+            cost.append(-1)
+        elif avoid_entry_list is not None and entry.entry_name in avoid_entry_list:  # 避免途经点
+            cost.append(-1)
+        else:
+            cost.append(entry.need_step)
+    return cost
+
+
 def search_map(current_map: HollowZeroMap, avoid_entry_list: set[str], visited_nodes: List[HollowZeroMapNode]) -> None:
     """
     对当前地图进行搜索 获取前往每个节点的路径
@@ -22,108 +64,119 @@ def search_map(current_map: HollowZeroMap, avoid_entry_list: set[str], visited_n
     if not current_map.is_valid_map:
         return
 
-    # 先避开部分节点进行搜索 例如战斗的节点
-    result_1 = _bfs_search_map(current_map, [current_map.current_idx], avoid_entry_list, visited_nodes)
+    cost_with_avoid = _get_move_cost(current_map, avoid_entry_list)
+    cost = _get_move_cost(current_map, None)
+
+    # 地图拓扑一致时 搜索结果一致
+    key = (current_map.current_idx, tuple(cost_with_avoid), tuple(cost),
+           tuple((k, tuple(v)) for k, v in current_map.edges.items()))
+    result = _search_cache.get(key)
+    if result is not None:
+        _search_cache.move_to_end(key)
+    else:
+        result = _SearchResult(len(current_map.nodes))
+        result.path_step_cnt[current_map.current_idx] = 0
+        result.path_node_cnt[current_map.current_idx] = 0
 
-    # 可能存在部分节点 一定要经过[避免途经点]才能到达
-    # 因此 在上述搜索结果上 继续搜索剩余节点的路径
-    start_idx_list = []
-    for idx in range(len(current_map.nodes)):
-        node = current_map.nodes[idx]
-        if node.path_step_cnt >= 0:
-            start_idx_list.append(idx)
+        # 先避开部分节点进行搜索 例如战斗的节点
+        _search_map(current_map.edges, cost_with_avoid, result, [current_map.current_idx])
 
-    result_2 = _bfs_search_map(current_map, start_idx_list, None, visited_nodes)
+        # 可能存在部分节点 一定要经过[避免途经点]才能到达
+        # 因此 在上述搜索结果上 继续搜索剩余节点的路径
+        start_idx_list = [idx for idx in range(len(current_map.nodes)) if result.path_step_cnt[idx] >= 0]
+        _search_map(current_map.edges, cost, result, start_idx_list)
 
-    return result_2
+        _search_cache[key] = result
+        if len(_search_cache) > _SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
 
+    _apply_search_result(current_map, result)
 
-def _bfs_search_map(
-        current_map: HollowZeroMap,
-        start_idx_list: List[int],
-        avoid_entry_list: Optional[set[str]] = None,
-        visited_nodes: List[HollowZeroMapNode] = None
+
+def _search_map(
+        edges: dict[int, List[int]],
+        cost: List[int],
+        result: _SearchResult,
+        start_idx_list: List[int]
 ) -> None:
     """
-    使用宽度搜索 找到达地图上每一个节点的最短路径
-    :param current_map: 识别到的地图信息
+    使用优先队列 找到达地图上每一个节点的最短路径
+    优先步数最少 步数一致时 经过格子数量最少
+    :param edges: 地图的边
+    :param cost: 前往每个节点需要的步数 -1代表不能前往
+    :param result: 搜索结果 起始节点需要已有结果
     :param start_idx_list: 起始的节点下标列表：在第1次搜索时，只有当前节点；第2次搜索时，会包含第1次搜索的路径结果
-    :param avoid_entry_list: 避免途经点
-    :param: visited_nodes: 已经去过的节点 这些在后续再经过时不需要步数
     :return:
     """
-    bfs_queue: List[int] = []  # 当前层的节点下标
-    searched: set[int] = set()  # 已经搜索过的节点下标
+    step_cnt = result.path_step_cnt
+    node_cnt = result.path_node_cnt
+    first_idx = result.path_first_idx
+    first_need_step_idx = result.path_first_need_step_idx
+    last_idx = result.path_last_idx
+
+    searched: List[bool] = [False] * len(cost)  # 已经确定最短路径的节点
+    queue: List[tuple[int, int, int]] = []
     for idx in start_idx_list:
-        bfs_queue.append(idx)
-        searched.add(idx)
-
-    # 宽度搜索 每层先搜索不需要移动步数的；再搜索需要移动步数的
-    while len(bfs_queue) > 0:
-        next_bfs_queue: List[int] = []  # 下一层
-        bfs_idx = 0  # 遍历当前层的节点
-        while bfs_idx < len(bfs_queue):  # 注意当前层bfs_queue会不断加入不需要步数的节点 因此用这个while
-            current_idx = bfs_queue[bfs_idx]
-            current_node = current_map.nodes[current_idx]
-            searched.add(current_idx)
-            bfs_idx += 1  # 标记这个节点已经处理 下一次循环需要处理下一个节点的
-
-            if current_idx not in current_map.edges:  # 这个节点没有边 即没有可以移动的节点
+        searched[idx] = True  # 起始节点的路径已经确定 不再更新
+        queue.append((step_cnt[idx], node_cnt[idx], idx))
+    heapq.heapify(queue)
+
+    while queue:
+        current_step_cnt, current_node_cnt, current_idx = heapq.heappop(queue)
+        if current_step_cnt != step_cnt[current_idx] or current_node_cnt != node_cnt[current_idx]:
+            continue  # 已经有更短的路径
+        searched[current_idx] = True
+
+        next_idx_list = edges.get(current_idx)
+        if next_idx_list is None:  # 这个节点没有边 即没有可以移动的节点
+            continue
+
+        next_node_cnt = current_node_cnt + 1
+        for next_idx in next_idx_list:  # 遍历这个节点的边 找到可以移动的节点
+            need_step = cost[next_idx]
+            if need_step < 0 or searched[next_idx]:
                 continue
 
-            for next_idx in current_map.edges[current_idx]:  # 遍历这个节点的边 找到可以移动的节点
-                if next_idx in searched:  # 这个可以移动的节点 已经被搜索过
-                    continue
-
-                next_node = current_map.nodes[next_idx]
-                next_entry = next_node.entry
-
-                if not next_entry.can_go:  # 无法移动
-                    continue
-                if avoid_entry_list is not None and next_entry.entry_name in avoid_entry_list:  # 避免途经点
-                    continue
-
-                need_step = next_entry.need_step  # 前往这个节点是否需要步数
-
-                # 已经去过 且还是存在的节点 还是需要先路过
-                # 否则 依赖直接点击终点 游戏内的自动寻路有几率选择另一条更短但无法通行的路 例如是危机节点
-                # 这时候就会卡死
-                # 参考 https://github.com/OneDragon-Anything/ZenlessZoneZero-OneDragon/issues/382
-                # 已经去过的节点 在 hollow_runner 中判断，不再触发对应的事件指令
-                # if (next_entry.entry_name == '邦布商人'  # 当前只有商人不会消失
-                #         and visited_nodes is not None
-                #         and had_been_visited(next_node, visited_nodes)):  # 已经去过的节点 不需要步数
-                #     need_step = 0
-
-                # 根据节点类型 计算前往下一个节点的步数
-                next_step_cnt = current_node.path_step_cnt + need_step
-                # 判断这条路径上 第一个需要步数的节点是哪个 即需要点击的节点
-                if next_step_cnt <= 1 and next_entry.need_step > 0:
-                    first_need_step_node = next_node
-                else:
-                    first_need_step_node = current_node.path_first_need_step_node
-
-                # 设置下一个节点的寻路信息
-                next_node.path_first_node = next_node if current_node.path_first_node is None else current_node.path_first_node
-                next_node.path_first_need_step_node = first_need_step_node
-                next_node.path_last_node = current_node
-                next_node.path_step_cnt = next_step_cnt
-                next_node.path_node_cnt = current_node.path_node_cnt + 1
-                # 构建前往下一个节点的路径
-
-                if next_step_cnt == current_node.path_step_cnt:  # 相同步数 就加入当前层 继续搜索
-                    if next_idx in bfs_queue:  # 已经在当前队列
-                        pass
-                    elif next_idx in next_bfs_queue:  # 在下一层的队列 移动
-                        next_bfs_queue.remove(next_idx)
-                        bfs_queue.append(next_idx)
-                    else:  # 都不在 放入当前的队列
-                        bfs_queue.append(next_idx)
-                else:  # 步数增加的 就加入下一层 等待后续搜索
-                    if next_idx not in next_bfs_queue:
-                        next_bfs_queue.append(next_idx)
-
-        bfs_queue = next_bfs_queue
+            # 已经去过 且还是存在的节点 还是需要先路过
+            # 否则 依赖直接点击终点 游戏内的自动寻路有几率选择另一条更短但无法通行的路 例如是危机节点
+            # 这时候就会卡死
+            # 参考 https://github.com/OneDragon-Anything/ZenlessZoneZero-OneDragon/issues/382
+            next_step_cnt = current_step_cnt + need_step
+            old_step_cnt = step_cnt[next_idx]
+            if old_step_cnt != -1 and (old_step_cnt < next_step_cnt or
+                                       (old_step_cnt == next_step_cnt and node_cnt[next_idx] <= next_node_cnt)):
+                continue
+
+            # 判断这条路径上 第一个需要步数的节点是哪个 即需要点击的节点
+            if next_step_cnt <= 1 and need_step > 0:
+                first_need_step_idx[next_idx] = next_idx
+            else:
+                first_need_step_idx[next_idx] = first_need_step_idx[current_idx]
+
+            # 设置下一个节点的寻路信息
+            first_idx[next_idx] = next_idx if first_idx[current_idx] == -1 else first_idx[current_idx]
+            last_idx[next_idx] = current_idx
+            step_cnt[next_idx] = next_step_cnt
+            node_cnt[next_idx] = next_node_cnt
+            heapq.heappush(queue, (next_step_cnt, next_node_cnt, next_idx))
+
+
+def _apply_search_result(current_map: HollowZeroMap, result: _SearchResult) -> None:
+    """
+    将搜索结果设置到地图的节点上
+    """
+    nodes = current_map.nodes
+    for idx, node in enumerate(nodes):
+        if result.path_step_cnt[idx] == -1:
+            continue
+        first_idx = result.path_first_idx[idx]
+        first_need_step_idx = result.path_first_need_step_idx[idx]
+        last_idx = result.path_last_idx[idx]
+        node.path_first_node = None if first_idx == -1 else nodes[first_idx]
+        node.path_first_need_step_node = None if first_need_step_idx == -1 else nodes[first_need_step_idx]
+        node.path_last_node = None if last_idx == -1 else nodes[last_idx]
+        node.path_step_cnt = result.path_step_cnt[idx]
+        node.path_node_cnt = result.path_node_cnt[idx]
 
 
 def get_route_in_1_step(current_map: HollowZeroMap,
@@ -164,12 +217,25 @@ def get_route_by_entry(current_map: HollowZeroMap,
     :param visited_nodes: 已经尝试去过的格子
     :return:
     """
+    return get_route_by_entry_list(current_map, [entry_name], visited_nodes)
+
+
+def get_route_by_entry_list(current_map: HollowZeroMap,
+                            entry_name_list: List[str],
+                            visited_nodes: List[HollowZeroMapNode]) -> Optional[HollowZeroMapNode]:
+    """
+    找一条最短的 能到达任意一种目标类型格子的 路径
+    :param current_map: 当前的地图
+    :param entry_name_list: 需要前往的格子类型
+    :param visited_nodes: 已经尝试去过的格子
+    :return:
+    """
     target: Optional[HollowZeroMapNode] = None
     for node in current_map.nodes:
         if node.path_step_cnt == -1:  # 不可前往的
             continue
         entry = node.entry
-        if entry is None or entry.entry_name != entry_name:
+        if entry is None or entry.entry_name not in entry_name_list:
             continue
 
         if had_been_visited(node, visited_nodes):
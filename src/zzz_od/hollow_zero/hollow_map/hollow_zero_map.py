@@ -40,12 +40,16 @@ class HollowZeroMap:
     def __init__(self, nodes: List[HollowZeroMapNode],
                  current_idx: int,
                  edges: dict[int, List[int]],
-                 check_time: Optional[float] = None):
+                 check_time: Optional[float] = None,
+                 node_signatures: Optional[List[tuple]] = None):
         self.nodes: List[HollowZeroMapNode] = nodes
         self.current_idx: int = current_idx
         self.edges: dict[int, List[int]] = edges
         self.check_time: float = time.time() if check_time is None else check_time  # 识别时间
 
+        # 构造边时每个节点的信息 之后合并地图时 用于判断节点是否变化 没有变化的节点之间可以复用边
+        self.node_signatures: Optional[List[tuple]] = node_signatures
+
         # 不是当前识别到的地图的次数 过多之后 就认为该地图已经失效
         self.not_current_map_times: int = 0
 
@@ -23,6 +23,8 @@ class HollowZeroMapService:
     def init_event_yolo(self) -> None:
         use_gpu = self.ctx.model_config.hollow_zero_event_gpu
         if self.event_model is None or self.event_model.gpu != use_gpu:
+            if self.event_model is not None:  # 换用其他配置 释放旧的会话
+                self.event_model.release()
             self.event_model = HollowEventDetector(
                 model_name=self.ctx.model_config.hollow_zero_event,
                 backup_model_name=self.ctx.model_config.hollow_zero_event_backup,
@@ -1,10 +1,9 @@
-import difflib
 import os
 import yaml
 from typing import List, Optional, Tuple
 
 from one_dragon.utils import os_utils
-from one_dragon.utils.i18_utils import gt
+from one_dragon.utils.entity_index import EntityIndex
 from one_dragon.utils.log_utils import log
 from zzz_od.hollow_zero.game_data.hollow_zero_event import HallowZeroEvent, HollowZeroEntry
 from zzz_od.hollow_zero.game_data.hollow_zero_resonium import Resonium
@@ -15,6 +14,7 @@ class HallowZeroDataService:
     def __init__(self):
         # 事件
         self.normal_events: List[HallowZeroEvent] = []
+        self.normal_event_index: EntityIndex[HallowZeroEvent] = EntityIndex([])
         self.entry_list: List[HollowZeroEntry] = []
         self.name_2_entry: dict[str, HollowZeroEntry] = {}
 
@@ -22,6 +22,8 @@ class HallowZeroDataService:
         self.resonium_list: List[Resonium] = []
         self.resonium_cate_list: List[str] = []
         self.cate_2_resonium: dict[str, List[Resonium]] = {}
+        self.resonium_cate_index: EntityIndex[str] = EntityIndex([])
+        self.cate_2_resonium_index: dict[str, EntityIndex[Resonium]] = {}
 
         self.reload()
 
@@ -49,13 +51,13 @@ class HallowZeroDataService:
             except Exception:
                 log.error(f'文件读取失败 {file_path}', exc_info=True)
 
+        self.normal_event_index = EntityIndex(self.normal_events, name_getter=lambda i: i.event_name)
+
     def get_normal_event_by_name(self, event_name: str) -> Optional[HallowZeroEvent]:
         """
         通过事件名称获取事件
         """
-        for event in self.normal_events:
-            if event.event_name == event_name:
-                return event
+        return self.normal_event_index.get_by_name(event_name)
 
     def _load_entry_list(self):
         self.entry_list = []
@@ -82,6 +84,8 @@ class HallowZeroDataService:
         self.resonium_list = []
         self.resonium_cate_list = []
         self.cate_2_resonium = {}
+        self.resonium_cate_index = EntityIndex([])
+        self.cate_2_resonium_index = {}
 
         file_path = os_utils.get_path_under_work_dir('assets', 'game_data', 'hollow_zero', 'resonium.yml')
         if not os.path.exists(file_path):
@@ -101,43 +105,46 @@ class HallowZeroDataService:
         except Exception:
             log.error(f'文件读取失败 {file_path}', exc_info=True)
 
+        self.resonium_cate_index = EntityIndex(self.resonium_cate_list)
+        self.cate_2_resonium_index = {
+            cate: EntityIndex(resonium_list, name_getter=lambda i: i.name)
+            for cate, resonium_list in self.cate_2_resonium.items()
+        }
+
     def match_resonium_by_ocr(self, cate_ocr: str, name_ocr: str) -> Optional[Resonium]:
         log.info('当前识别 %s %s', cate_ocr, name_ocr)
-        category_list = [gt(i, 'game') for i in self.resonium_cate_list]
-        results = difflib.get_close_matches(cate_ocr, category_list, n=2, cutoff=0.5)
+        cate_index = self.resonium_cate_index
+        results = cate_index.get_close_matches(cate_ocr, n=2, cutoff=0.5)
 
-        if results is None or len(results) == 0:
+        if len(results) == 0:
             log.info('匹配结果 无')
             return None
 
         # 强x会同时匹配到强袭和顽强 这里用字符顺序顺序额外判断一下
         if len(results) == 2:
             if len(cate_ocr) > 1 and cate_ocr[1] == '_':
-                if results[0].startswith(cate_ocr[0]):
-                    category_idx = category_list.index(results[0])
+                if cate_index.get_text(results[0]).startswith(cate_ocr[0]):
+                    category_idx = results[0]
                 else:
-                    category_idx = category_list.index(results[1])
+                    category_idx = results[1]
             elif cate_ocr[0] == '_':
-                if results[0].endswith(cate_ocr[1]):
-                    category_idx = category_list.index(results[0])
+                if cate_index.get_text(results[0]).endswith(cate_ocr[1]):
+                    category_idx = results[0]
                 else:
-                    category_idx = category_list.index(results[1])
+                    category_idx = results[1]
             else:
-                category_idx = category_list.index(results[0])
+                category_idx = results[0]
         else:
-            category_idx = category_list.index(results[0])
-
-        resonium_list = self.cate_2_resonium[self.resonium_cate_list[category_idx]]
+            category_idx = results[0]
 
-        resonium_name_list = [gt(i.name, 'game') for i in resonium_list]
-        results = difflib.get_close_matches(name_ocr, resonium_name_list, n=1)
+        resonium_index = self.cate_2_resonium_index[self.resonium_cate_list[category_idx]]
+        resonium_idx = resonium_index.find_best_match_by_difflib(name_ocr)
 
-        if results is None or len(results) == 0:
+        if resonium_idx is None:
             log.info('匹配结果 无')
             return None
 
-        resonium_idx = resonium_name_list.index(results[0])
-        r = resonium_list[resonium_idx]
+        r = resonium_index.entity_list[resonium_idx]
         log.info('匹配结果 %s %s', r.category, r.name)
         return r
 
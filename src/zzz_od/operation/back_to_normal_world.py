@@ -6,7 +6,7 @@ from one_dragon.base.operation.operation_round_result import OperationRoundResul
 from one_dragon.utils import cv2_utils, str_utils
 from one_dragon.utils.i18_utils import gt
 from zzz_od.context.zzz_context import ZContext
-from zzz_od.game_data.agent import AgentEnum
+from zzz_od.game_data.agent import get_agent_name_index
 from zzz_od.hollow_zero.event import hollow_event_utils
 from zzz_od.hollow_zero.hollow_exit_by_menu import HollowExitByMenu
 from zzz_od.operation.zzz_operation import ZOperation
@@ -117,8 +117,7 @@ class BackToNormalWorld(ZOperation):
         part = cv2_utils.crop_image_only(screen, area.rect)
         ocr_result_map = self.ctx.ocr.run_ocr(part)
         ocr_result_list = [i for i in ocr_result_map.keys()]
-        agent_name_list = [gt(i.value.agent_name, 'game') for i in AgentEnum]
-        idx1, idx2 = str_utils.find_most_similar(ocr_result_list, agent_name_list)
+        idx1, idx2 = get_agent_name_index().find_most_similar(ocr_result_list)
         return idx1 is not None and idx2 is not None
 
     def _handle_agent_dialog(self, screen: MatLike) -> OperationRoundResult:
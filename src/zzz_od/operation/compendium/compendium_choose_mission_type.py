@@ -1,5 +1,4 @@
-import difflib
-from typing import Optional, ClassVar, List
+from typing import Optional, ClassVar
 
 from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
@@ -7,6 +6,7 @@ from one_dragon.base.operation.operation_edge import node_from
 from one_dragon.base.operation.operation_node import operation_node
 from one_dragon.base.operation.operation_round_result import OperationRoundResult
 from one_dragon.utils import cv2_utils, str_utils
+from one_dragon.utils.entity_index import EntityIndex
 from one_dragon.utils.i18_utils import gt
 from one_dragon.utils.log_utils import log
 from zzz_od.context.zzz_context import ZContext
@@ -49,17 +49,15 @@ class CompendiumChooseMissionType(ZOperation):
         area = self.ctx.screen_loader.get_area('快捷手册', '副本列表')
         part = cv2_utils.crop_image_only(self.last_screenshot, area.rect)
 
-        mission_type_list: List[CompendiumMissionType] = self.ctx.compendium_service.get_same_category_mission_type_list(self.mission_type.mission_type_name)
-        if mission_type_list is None:
+        mission_type_index: Optional[EntityIndex[CompendiumMissionType]] = self.ctx.compendium_service.get_same_category_mission_type_index(self.mission_type.mission_type_name)
+        if mission_type_index is None:
             return self.round_fail('非法的副本分类 %s' % self.mission_type.mission_type_name)
 
         before_target_cnt: int = 0  # 在目标副本前面的数量
         target_idx: int = -1
-        target_list = []
-        for idx, mission_type in enumerate(mission_type_list):
+        for idx, mission_type in enumerate(mission_type_index.entity_list):
             if mission_type.mission_type_name == self.mission_type.mission_type_name:
                 target_idx = idx
-            target_list.append(gt(mission_type.mission_type_name, 'game'))
 
         if target_idx == -1:
             return self.round_fail('非法的副本分类 %s' % self.mission_type.mission_type_name)
@@ -70,12 +68,10 @@ class CompendiumChooseMissionType(ZOperation):
             if mrl.max is None:
                 continue
 
-            results = difflib.get_close_matches(ocr_result, target_list, n=1)
-
-            if results is None or len(results) == 0:
+            idx = mission_type_index.find_best_match_by_difflib(ocr_result)
+            if idx is None:
                 continue
 
-            idx = target_list.index(results[0])
             if idx == target_idx:
                 target_point = area.left_top + mrl.max
                 break
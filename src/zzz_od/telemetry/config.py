@@ -93,6 +93,10 @@ class TelemetryConfigLoader:
                 performance = telemetry_config.get('performance', {})
                 config.flush_interval = performance.get('flush_interval', config.flush_interval)
                 config.max_queue_size = performance.get('max_queue_size', config.max_queue_size)
+                config.compression = performance.get('compression', config.compression)
+                config.max_batch_bytes = performance.get('max_batch_bytes', config.max_batch_bytes)
+                config.spool_dir = performance.get('spool_dir', config.spool_dir)
+                config.max_spool_mb = performance.get('max_spool_mb', config.max_spool_mb)
 
                 # 调试设置
                 debug = telemetry_config.get('debug', {})
@@ -180,7 +184,11 @@ class TelemetryConfigLoader:
                     },
                     'performance': {
                         'flush_interval': config.flush_interval,
-                        'max_queue_size': config.max_queue_size
+                        'max_queue_size': config.max_queue_size,
+                        'compression': config.compression,
+                        'max_batch_bytes': config.max_batch_bytes,
+                        'spool_dir': config.spool_dir,
+                        'max_spool_mb': config.max_spool_mb
                     },
                     'debug': {
                         'enabled': config.debug_mode
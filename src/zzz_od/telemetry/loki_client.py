@@ -1,25 +1,32 @@
 """
 Loki客户端包装器
-提供与Loki服务的通信接口，包括本地队列、批量发送和重试机制
+提供与Loki服务的通信接口，包括本地队列、按大小自适应的批量发送和磁盘缓冲
 """
-import os
 import time
 import json
 import logging
 import threading
-import requests
 import platform
 import uuid
-from queue import Queue, Empty
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+from queue import Queue, Empty, Full
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
 from collections import defaultdict
 
+from .loki_spool import LokiSpool
+from .loki_transport import LokiTransport, PushResult
 from .models import TelemetryConfig
 
 
 logger = logging.getLogger(__name__)
 
+# 一条待发送的日志 (标签, 纳秒时间戳, 日志行)
+LokiEntry = Tuple[Dict[str, str], str, str]
+
+_MIN_BATCH_BYTES = 16 * 1024
+_MAX_BACKOFF_SECONDS = 60
+_SPOOL_SEGMENTS_PER_FLUSH = 8  # 每次刷新最多补发的磁盘分段数量 避免积压太多时一次刷新太久
+
 
 class LokiClient:
     """Loki客户端包装器"""
@@ -43,11 +50,24 @@ class LokiClient:
         # 本地队列
         self._event_queue = Queue(maxsize=config.max_queue_size)
         self._flush_thread: Optional[threading.Thread] = None
+        self._wake_event = threading.Event()
+        self._send_lock = threading.Lock()
         self._last_flush_time = datetime.now()
 
+        # 传输
+        self.transport: Optional[LokiTransport] = None
+        self.spool: Optional[LokiSpool] = None
+        self.performance_monitor = None
+        self._batch_bytes = config.max_batch_bytes  # 当前的批量大小 按发送结果自适应调整
+        self._backoff_seconds = 0.0
+        self._retry_at = 0.0  # 发送失败后 这个时间前只写入磁盘缓冲
+
         # 统计信息
         self.events_sent = 0
         self.events_failed = 0
+        self.events_dropped = 0
+        self.bytes_sent = 0
+        self.bytes_uncompressed = 0
         self.queue_size = 0
 
         # 基础标签
@@ -58,6 +78,10 @@ class LokiClient:
             **config.loki_labels
         }
 
+    def set_performance_monitor(self, monitor) -> None:
+        """设置性能监控器 用于上报队列深度、发送字节数和丢弃数量"""
+        self.performance_monitor = monitor
+
     def initialize(self) -> bool:
         """初始化Loki客户端"""
         try:
@@ -67,6 +91,27 @@ class LokiClient:
 
             logger.debug(f"Initializing Loki client with URL: {self.config.loki_url}")
 
+            self.transport = LokiTransport(
+                self.loki_url,
+                {k: v for k, v in self.headers.items() if k != 'Content-Type'},
+                compression=self.config.compression,
+            )
+            if self.config.spool_dir:
+                try:
+                    self.spool = LokiSpool(
+                        self.config.spool_dir,
+                        max_bytes=self.config.max_spool_mb * 1024 * 1024,
+                        segment_bytes=self.config.max_batch_bytes,
+                    )
+                except OSError as e:
+                    logger.warning(f"Failed to create telemetry spool, events may be dropped: {e}")
+                    self.spool = None
+
+            # 启动后台刷新线程
+            self._start_flush_thread()
+
+            self._initialized = True
+
             # 发送应用启动事件
             logger.debug("Sending app startup event...")
             try:
@@ -88,15 +133,11 @@ class LokiClient:
             except Exception as e:
                 logger.warning(f"Failed to send app startup event: {e}")
 
-            # 启动后台刷新线程
-            self._start_flush_thread()
-
-            self._initialized = True
             logger.debug(f"Loki client initialized successfully with URL: {self.config.loki_url}")
             return True
 
         except Exception as e:
-            logger.error(f"Failed to initialize Loent: {e}")
+            logger.error(f"Failed to initialize Loki client: {e}")
             import traceback
             logger.error(traceback.format_exc())
             return False
@@ -115,8 +156,11 @@ class LokiClient:
         """后台刷新工作线程"""
         while not self._shutdown:
             try:
-                # 等待刷新间隔或队列满
-                time.sleep(1)  # 每秒检查一次
+                # 等待刷新间隔或队列快满时被唤醒
+                self._wake_event.wait(1)
+                self._wake_event.clear()
+                if self._shutdown:
+                    break
 
                 current_time = datetime.now()
                 time_since_last_flush = (current_time - self._last_flush_time).total_seconds()
@@ -135,104 +179,171 @@ class LokiClient:
                 time.sleep(5)  # 错误后等待5秒
 
     def _flush_queue(self) -> None:
-        """刷新事件队列"""
-        if self._event_queue.empty():
-            return
+        """
+        刷新事件队列
+        先补发磁盘缓冲中的事件 再按批量大小发送队列中的全部事件
+        网络不可用时 事件写入磁盘缓冲 不在这里等待重试
+        """
+        with self._send_lock:
+            entries = self._drain_queue()
+
+            if self.transport is None or time.monotonic() < self._retry_at:
+                self._spool_entries(entries)
+            elif self._send_spool():
+                self._send_entries(entries)
+            else:
+                # 磁盘缓冲还没发完 新的事件排在后面 保持顺序
+                self._spool_entries(entries)
 
-        events_to_send = []
+            self._last_flush_time = datetime.now()
+            self._report_status()
 
-        # 从队列中取出事件
-        while not self._event_queue.empty() and len(events_to_send) < 100:  # 批量大小限制
+    def _drain_queue(self) -> List[LokiEntry]:
+        """取出队列中的全部事件 并格式化"""
+        entries: List[LokiEntry] = []
+        while True:
             try:
                 event = self._event_queue.get_nowait()
-                events_to_send.append(event)
             except Empty:
                 break
+            try:
+                entries.append(self._format_entry(event))
+            except Exception as e:
+                logger.debug(f"Failed to format event: {e}")
+                self.events_failed += 1
+        self.queue_size = self._event_queue.qsize()
+        return entries
+
+    def _format_entry(self, event: Dict[str, Any]) -> LokiEntry:
+        """将事件格式化为一条待发送的日志"""
+        ts = event.get('ts_ns') or self._get_timestamp_ns()
+        return self._generate_labels(event), ts, self._format_log_line_from_event(event)
+
+    def _send_spool(self) -> bool:
+        """
+        补发磁盘缓冲中的事件 每个分段作为一批发送
+
+        Returns:
+            磁盘缓冲是否已经发完
+        """
+        if self.spool is None:
+            return True
 
-        if not events_to_send:
-            return
+        for _ in range(_SPOOL_SEGMENTS_PER_FLUSH):
+            segment = self.spool.peek_oldest()
+            if segment is None:
+                return True
+            seq, lines = segment
+
+            entries: List[LokiEntry] = []
+            for line in lines:
+                try:
+                    labels, ts, log_line = json.loads(line)
+                    entries.append((labels, ts, log_line))
+                except (ValueError, TypeError):
+                    # 上次运行中断时可能留下写了一半的行
+                    self._record_dropped(1)
+
+            if entries:
+                result = self._push(entries)
+                if not result.success and result.retryable:
+                    return False
+            self.spool.remove(seq)
+
+        return self.spool.is_empty()
+
+    def _send_entries(self, entries: List[LokiEntry]) -> None:
+        """按当前的批量大小分批发送 失败时剩余的事件写入磁盘缓冲"""
+        start = 0
+        while start < len(entries):
+            end = start
+            batch_bytes = 0
+            while end < len(entries) and (end == start or batch_bytes < self._batch_bytes):
+                batch_bytes += len(entries[end][2]) + len(entries[end][1])
+                end += 1
+
+            result = self._push(entries[start:end])
+            if not result.success and result.retryable:
+                self._spool_entries(entries[start:])
+                return
+            start = end
+
+    def _push(self, entries: List[LokiEntry]) -> PushResult:
+        """发送一批事件 并根据结果调整批量大小和重试时间"""
+        # 按标签分组事件（优化Loki存储）
+        streams = defaultdict(list)
+        for labels, ts, line in entries:
+            streams[tuple(sorted(labels.items()))].append([ts, line])
+
+        payload = {
+            "streams": [
+                {"stream": dict(labels), "values": values}
+                for labels, values in streams.items()
+            ]
+        }
 
-        # 批量发送到Loki
-        try:
-            success = self._send_batch_to_loki(events_to_send)
-            if success:
-                self.events_sent += len(events_to_send)
-                logger.debug(f"Successfully sent {len(events_to_send)} events to Loki")
+        result = self.transport.push(payload)
+        if self.performance_monitor is not None:
+            self.performance_monitor.record_network_request(result.duration_ms, result.success)
+
+        if result.success:
+            self.events_sent += len(entries)
+            self.bytes_sent += result.sent_bytes
+            self.bytes_uncompressed += result.raw_bytes
+            if self.performance_monitor is not None:
+                self.performance_monitor.record_bytes_sent(result.sent_bytes, result.raw_bytes)
+            self._backoff_seconds = 0
+            self._retry_at = 0
+            # 响应快时逐渐增大批量 减少请求次数
+            if result.duration_ms < self.transport.timeout * 1000 / 4:
+                self._batch_bytes = min(self.config.max_batch_bytes, int(self._batch_bytes * 1.5))
             else:
-                self.events_failed += len(events_to_send)
-                logger.debug(f"Failed to send {len(events_to_send)} events to Loki")
-        except Exception as e:
-            # 静默失败，不影响应用运行
-            logger.debug(f"Error sending batch to Loki: {e}")
-            self.events_failed += len(events_to_send)
+                self._batch_bytes = max(_MIN_BATCH_BYTES, self._batch_bytes // 2)
+            logger.debug(f"Successfully sent {len(entries)} events to Loki")
+        elif result.retryable:
+            # 网络慢或服务端繁忙 减小批量 一段时间内不再尝试
+            self._batch_bytes = max(_MIN_BATCH_BYTES, self._batch_bytes // 2)
+            self._backoff_seconds = min(_MAX_BACKOFF_SECONDS, max(1.0, self._backoff_seconds * 2))
+            self._retry_at = time.monotonic() + self._backoff_seconds
+            logger.debug(f"Failed to send {len(entries)} events to Loki, retry in {self._backoff_seconds}s")
+        else:
+            # 请求本身有问题 重试也不会成功
+            self.events_failed += len(entries)
+            self._record_dropped(len(entries))
+            logger.debug(f"Loki rejected {len(entries)} events with status {result.status_code}")
 
-        self._last_flush_time = datetime.now()
+        return result
 
-    def _send_batch_to_loki(self, events: list) -> bool:
-        """批量发送事件到Loki（集成pushtoloki.py逻辑）"""
+    def _spool_entries(self, entries: List[LokiEntry]) -> None:
+        """写入磁盘缓冲 没有磁盘缓冲时丢弃"""
+        if not entries:
+            return
+        if self.spool is None:
+            self.events_failed += len(entries)
+            self._record_dropped(len(entries))
+            return
         try:
-            # 按标签分组事件（优化Loki存储）
-            streams = defaultdict(list)
-
-            for event in events:
-                # 生成时间戳
-                ts = self._get_timestamp_ns()
-
-                # 格式化日志行
-                line = self._format_log_line_from_event(event)
-
-                # 生成标签
-                labels = self._generate_labels(event)
-                labels_tuple = tuple(sorted(labels.items()))
-
-                streams[labels_tuple].append([ts, line])
-
-            # 构建Loki payload
-            payload = {
-                "streams": [
-                    {"stream": dict(labels), "values": values}
-                    for labels, values in streams.items()
-                ]
-            }
-
-            # 使用重试机制发送到Loki
-            return self._send_with_retry(payload)
-
-        except Exception as e:
-            # 静默失败，不影响应用运行
-            logger.debug(f"Error in _send_batch_to_loki: {e}")
-            return False
-
-    def _send_with_retry(self, payload: Dict[str, Any], max_retries: int = 3) -> bool:
-        """带重试机制的发送方法"""
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    self.loki_url,
-                    json=payload,
-                    headers=self.headers,
-                    timeout=10
-                )
-
-                if response.status_code == 204:
-                    return True
-                else:
-                    logger.debug(f"Loki returned status {response.status_code}, attempt {attempt + 1}/{max_retries}")
-
-            except requests.exceptions.RequestException as e:
-                logger.debug(f"Network error sending to Loki, attempt {attempt + 1}/{max_retries}: {e}")
-
-            except Exception as e:
-                logger.debug(f"Unexpected error sending to Loki, attempt {attempt + 1}/{max_retries}: {e}")
-
-            # 指数退避
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                time.sleep(wait_time)
+            lines = [json.dumps(list(i), ensure_ascii=False) for i in entries]
+            self._record_dropped(self.spool.append(lines))
+        except OSError as e:
+            logger.debug(f"Failed to write telemetry spool: {e}")
+            self.events_failed += len(entries)
+            self._record_dropped(len(entries))
+
+    def _record_dropped(self, count: int) -> None:
+        if count <= 0:
+            return
+        self.events_dropped += count
+        if self.performance_monitor is not None:
+            self.performance_monitor.record_dropped_events(count)
 
-        # 所有重试都失败，静默失败
-        logger.debug(f"Failed to send to Loki after {max_retries} attempts, silently failing")
-        return False
+    def _report_status(self) -> None:
+        """上报队列深度和磁盘缓冲大小"""
+        if self.performance_monitor is None:
+            return
+        self.performance_monitor.record_queue_status(self._event_queue.qsize())
+        if self.spool is not None:
+            self.performance_monitor.record_spool_status(self.spool.size_bytes, self.spool.segment_count)
 
     def _get_timestamp_ns(self) -> str:
         """获取纳秒时间戳"""
@@ -347,10 +458,24 @@ class LokiClient:
         self.identify(distinct_id, properties)
 
     def _enqueue_event(self, event_data: Dict[str, Any]) -> None:
-        """将事件加入队列"""
+        """将事件加入队列 队列已满时写入磁盘缓冲"""
+        # 入队时记录时间戳 避免积压后发送的时间不准
+        event_data.setdefault('ts_ns', self._get_timestamp_ns())
         try:
             self._event_queue.put_nowait(event_data)
             self.queue_size = self._event_queue.qsize()
+            if self.queue_size >= self.config.max_queue_size * 0.8:
+                self._wake_event.set()
+        except Full:
+            if self.performance_monitor is not None:
+                self.performance_monitor.record_queue_status(self._event_queue.qsize(), is_full=True)
+            try:
+                entry = self._format_entry(event_data)
+            except Exception as e:
+                logger.error(f"Failed to enqueue event: {e}")
+                self.events_failed += 1
+                return
+            self._spool_entries([entry])
         except Exception as e:
             logger.error(f"Failed to enqueue event: {e}")
             self.events_failed += 1
@@ -361,11 +486,12 @@ class LokiClient:
             self._flush_queue()
 
     def shutdown(self) -> None:
-        """关闭Loki客户端"""
+        """关闭Loki客户端 没能发送的事件留在磁盘缓冲 下次启动后继续发送"""
         logger.debug("Shutting down Loki client...")
 
         try:
             self._shutdown = True
+            self._wake_event.set()
 
             # 停止刷新线程
             if self._flush_thread and self._flush_thread.is_alive():
@@ -373,9 +499,15 @@ class LokiClient:
 
             # 强制刷新所有剩余事件
             logger.debug("Flushing all remaining events...")
-            self._flush_queue()
+            if self._initialized:
+                self._flush_queue()
+
+            if self.spool is not None:
+                self.spool.close()
+            if self.transport is not None:
+                self.transport.close()
 
-            logger.debug(f"Loki client shutdown complete. Events sent: {self.events_sent}, failed: {self.events_failed}")
+            logger.debug(f"Loki client shutdown complete. Events sent: {self.events_sent}, failed: {self.events_failed}, dropped: {self.events_dropped}")
 
         except Exception as e:
             logger.debug(f"Error during Loki client shutdown: {e}")
@@ -386,7 +518,12 @@ class LokiClient:
             'initialized': self._initialized,
             'events_sent': self.events_sent,
             'events_failed': self.events_failed,
+            'events_dropped': self.events_dropped,
             'queue_size': self.queue_size,
+            'bytes_sent': self.bytes_sent,
+            'bytes_uncompressed': self.bytes_uncompressed,
+            'batch_bytes': self._batch_bytes,
+            'spool_bytes': self.spool.size_bytes if self.spool is not None else 0,
             'last_flush': self._last_flush_time.isoformat() if self._last_flush_time else None,
             'health': 'healthy' if self.events_failed < 10 else 'degraded'
         }
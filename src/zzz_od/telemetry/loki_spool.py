@@ -0,0 +1,160 @@
+"""
+Loki事件的磁盘缓冲
+网络不可用或内存队列已满时 事件追加写入分段文件 恢复后或重启后按顺序继续发送
+"""
+import logging
+import os
+import re
+import threading
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_PATTERN = re.compile(r'^segment-(\d{12})\.jsonl$')
+
+
+class LokiSpool:
+    """追加写入的分段文件缓冲 总大小有上限"""
+
+    def __init__(self, spool_dir: str, max_bytes: int = 50 * 1024 * 1024, segment_bytes: int = 256 * 1024):
+        """
+        Args:
+            spool_dir: 分段文件所在的文件夹
+            max_bytes: 所有分段文件的总大小上限 超过后删除最旧的分段
+            segment_bytes: 单个分段文件的大小 达到后开始写入新的分段
+        """
+        self.spool_dir = spool_dir
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+
+        self._lock = threading.Lock()
+        self._segments: List[Tuple[int, int]] = []  # 已写完的分段 (序号, 大小) 从旧到新
+        self._active_seq: Optional[int] = None  # 正在写入的分段
+        self._active_size = 0
+        self._active_file = None
+        self._next_seq = 0
+
+        self.dropped_events = 0  # 超出上限被删除的事件数量
+
+        os.makedirs(spool_dir, exist_ok=True)
+        for file_name in sorted(os.listdir(spool_dir)):
+            match = _SEGMENT_PATTERN.match(file_name)
+            if match is None:
+                continue
+            seq = int(match.group(1))
+            # 上次运行留下的分段 都当作已写完 新的事件写入新的分段
+            self._segments.append((seq, os.path.getsize(self._get_path(seq))))
+            self._next_seq = seq + 1
+
+    def _get_path(self, seq: int) -> str:
+        return os.path.join(self.spool_dir, f'segment-{seq:012d}.jsonl')
+
+    @property
+    def size_bytes(self) -> int:
+        """所有分段的总大小"""
+        with self._lock:
+            return sum(i[1] for i in self._segments) + self._active_size
+
+    @property
+    def segment_count(self) -> int:
+        """分段数量 包括正在写入的"""
+        with self._lock:
+            return len(self._segments) + (1 if self._active_seq is not None else 0)
+
+    def is_empty(self) -> bool:
+        return self.segment_count == 0
+
+    def append(self, lines: List[str]) -> int:
+        """
+        追加事件
+
+        Args:
+            lines: 每个事件序列化后的一行 不包含换行符
+
+        Returns:
+            因为超出总大小上限 被删除的事件数量
+        """
+        if not lines:
+            return 0
+        with self._lock:
+            for line in lines:
+                data = (line + '\n').encode('utf-8')
+                if self._active_file is None:
+                    self._active_seq = self._next_seq
+                    self._next_seq += 1
+                    self._active_size = 0
+                    self._active_file = open(self._get_path(self._active_seq), 'ab')
+                self._active_file.write(data)
+                self._active_size += len(data)
+                if self._active_size >= self.segment_bytes:
+                    self._seal_active()
+            if self._active_file is not None:
+                self._active_file.flush()
+            return self._trim()
+
+    def _seal_active(self) -> None:
+        """结束正在写入的分段"""
+        if self._active_file is None:
+            return
+        self._active_file.close()
+        self._segments.append((self._active_seq, self._active_size))
+        self._active_file = None
+        self._active_seq = None
+        self._active_size = 0
+
+    def _trim(self) -> int:
+        """超出总大小上限时 删除最旧的分段"""
+        dropped = 0
+        total = sum(i[1] for i in self._segments) + self._active_size
+        while total > self.max_bytes and self._segments:
+            seq, size = self._segments.pop(0)
+            path = self._get_path(seq)
+            try:
+                with open(path, 'rb') as file:
+                    dropped += file.read().count(b'\n')
+                os.remove(path)
+            except OSError as e:
+                logger.debug(f"Failed to remove spool segment {path}: {e}")
+            total -= size
+        self.dropped_events += dropped
+        return dropped
+
+    def peek_oldest(self) -> Optional[Tuple[int, List[str]]]:
+        """
+        读取最旧的分段 发送成功后需要调用 remove 删除
+
+        Returns:
+            (分段序号, 事件行列表) 没有分段时返回None
+        """
+        with self._lock:
+            if not self._segments:
+                self._seal_active()
+            if not self._segments:
+                return None
+            seq = self._segments[0][0]
+        try:
+            with open(self._get_path(seq), 'r', encoding='utf-8', errors='replace') as file:
+                lines = [i.rstrip('\n') for i in file if i.strip()]
+        except OSError as e:
+            logger.debug(f"Failed to read spool segment {seq}: {e}")
+            lines = []
+        return seq, lines
+
+    def remove(self, seq: int) -> None:
+        """
+        删除已发送的分段
+
+        Args:
+            seq: 分段序号
+        """
+        with self._lock:
+            self._segments = [i for i in self._segments if i[0] != seq]
+            try:
+                os.remove(self._get_path(seq))
+            except OSError as e:
+                logger.debug(f"Failed to remove spool segment {seq}: {e}")
+
+    def close(self) -> None:
+        """关闭正在写入的分段 下次启动时继续发送"""
+        with self._lock:
+            self._seal_active()
@@ -0,0 +1,105 @@
+"""
+Loki推送的HTTP传输
+复用保持连接的会话 请求体使用gzip压缩
+"""
+import gzip
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PushResult:
+    """一次推送的结果"""
+    success: bool
+    retryable: bool  # 失败时是否值得稍后重试 例如网络错误、429、5xx
+    status_code: int
+    raw_bytes: int  # 压缩前的大小
+    sent_bytes: int  # 实际发送的大小
+    duration_ms: float
+
+
+class LokiTransport:
+    """Loki推送的HTTP传输"""
+
+    def __init__(self, url: str, headers: Dict[str, str], compression: str = 'gzip', timeout: float = 10):
+        """
+        Args:
+            url: push接口地址
+            headers: 额外的请求头 例如认证信息
+            compression: 压缩方式 gzip 或 none
+            timeout: 单次请求的超时时间 秒
+        """
+        self.url = url
+        self.compression = compression if compression in ('gzip', 'none') else 'gzip'
+        self.timeout = timeout
+
+        # 只有一个后台线程在发送 一个连接足够 保持连接避免每次都重新握手
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(headers)
+        self.session.headers['Content-Type'] = 'application/json'
+        if self.compression == 'gzip':
+            self.session.headers['Content-Encoding'] = 'gzip'
+
+    def encode(self, payload: Dict[str, Any]) -> tuple[bytes, int]:
+        """
+        序列化并压缩请求体
+
+        Args:
+            payload: Loki的push请求体
+
+        Returns:
+            (请求体, 压缩前的大小)
+        """
+        raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if self.compression == 'gzip':
+            return gzip.compress(raw, compresslevel=6), len(raw)
+        return raw, len(raw)
+
+    def push(self, payload: Dict[str, Any]) -> PushResult:
+        """
+        发送一次 不在这里重试 失败的由调用方写入磁盘缓冲后稍后再发
+
+        Args:
+            payload: Loki的push请求体
+
+        Returns:
+            推送结果
+        """
+        body, raw_bytes = self.encode(payload)
+        start = time.perf_counter()
+        try:
+            response = self.session.post(self.url, data=body, timeout=self.timeout)
+            status_code = response.status_code
+            success = 200 <= status_code < 300
+            retryable = status_code == 429 or status_code >= 500
+            if not success:
+                logger.debug(f"Loki returned status {status_code}: {response.text[:200]}")
+        except requests.exceptions.RequestException as e:
+            logger.debug(f"Network error sending to Loki: {e}")
+            status_code = 0
+            success = False
+            retryable = True
+
+        return PushResult(
+            success=success,
+            retryable=retryable,
+            status_code=status_code,
+            raw_bytes=raw_bytes,
+            sent_bytes=len(body),
+            duration_ms=(time.perf_counter() - start) * 1000,
+        )
+
+    def close(self) -> None:
+        """关闭会话"""
+        self.session.close()
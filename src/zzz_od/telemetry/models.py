@@ -52,6 +52,12 @@ class TelemetryConfig:
     max_queue_size: int = 1000
     debug_mode: bool = False
 
+    # 传输配置
+    compression: str = "gzip"  # 请求体压缩方式 gzip 或 none
+    max_batch_bytes: int = 256 * 1024  # 单次请求的最大大小 网络不好时会自动减小
+    spool_dir: str = ""  # 发送失败的事件写入的文件夹 为空时不写入磁盘
+    max_spool_mb: int = 50  # 磁盘缓冲的大小上限
+
     # 后端配置（现在只支持Loki）
     backend_type: str = "loki"
 
@@ -5,9 +5,11 @@
 import time
 import threading
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Optional, Set
 from dataclasses import dataclass, field
-from collections import defaultdict, deque
+from collections import deque
+
+from .quantile_sketch import DDSketch, WindowedSketch
 
 
 @dataclass
@@ -30,6 +32,13 @@ class PerformanceMetrics:
     avg_response_time_ms: float = 0.0
     max_response_time_ms: float = 0.0
 
+    # 传输
+    bytes_sent: int = 0
+    bytes_uncompressed: int = 0
+    events_dropped: int = 0
+    spool_size_bytes: int = 0
+    spool_segments: int = 0
+
     # 内存使用
     memory_usage_mb: float = 0.0
     max_memory_usage_mb: float = 0.0
@@ -58,28 +67,34 @@ class PerformanceMetrics:
         return ((self.network_requests - self.network_failures) / self.network_requests) * 100
 
 
-@dataclass
-class TimingRecord:
-    """时间记录"""
-    timestamp: datetime
-    duration_ms: float
-    operation: str
-    success: bool
-
-
 class PerformanceMonitor:
     """性能监控器"""
 
-    def __init__(self, telemetry_client=None, privacy_controller=None, window_size_minutes: int = 5):
+    def __init__(self, telemetry_client=None, privacy_controller=None, window_size_minutes: int = 5,
+                 snapshot_interval_seconds: float = 60):
+        """
+        Args:
+            telemetry_client: 发送事件的客户端
+            privacy_controller: 隐私控制
+            window_size_minutes: 耗时分布的统计窗口
+            snapshot_interval_seconds: 操作耗时的汇总事件最短发送间隔 操作耗时不再逐次发送
+        """
         self.telemetry_client = telemetry_client
         self.privacy_controller = privacy_controller
         self.window_size = timedelta(minutes=window_size_minutes)
+        self.snapshot_interval_seconds = snapshot_interval_seconds
         self.metrics = PerformanceMetrics()
 
-        # 时间窗口数据
-        self._timing_records: deque = deque()
-        self._event_timestamps: deque = deque()
-        self._network_records: deque = deque()
+        # 时间窗口内的耗时分布 记录时只持有各自的锁
+        window_seconds = self.window_size.total_seconds()
+        self._processing_sketch = WindowedSketch(window_seconds)  # 成功的事件处理耗时
+        self._network_sketch = WindowedSketch(window_seconds)  # 成功的网络请求耗时
+        self._operation_sketches: Dict[str, WindowedSketch] = {}  # 按操作名称区分的耗时
+
+        # 上次发送汇总事件后 有新记录的操作 以及失败次数
+        self._dirty_operations: Set[str] = set()
+        self._operation_failures: Dict[str, int] = {}
+        self._last_snapshot_time = time.monotonic()
 
         # 线程安全锁
         self._lock = threading.RLock()
@@ -92,21 +107,12 @@ class PerformanceMonitor:
 
     def record_event_processing(self, duration_ms: float, success: bool = True) -> None:
         """记录事件处理性能"""
-        with self._lock:
-            current_time = datetime.now()
-
-            # 记录时间数据
-            record = TimingRecord(
-                timestamp=current_time,
-                duration_ms=duration_ms,
-                operation='event_processing',
-                success=success
-            )
-            self._timing_records.append(record)
+        if success:
+            self._processing_sketch.add(duration_ms)
 
+        with self._lock:
             if success:
                 self.metrics.events_processed += 1
-                self._event_timestamps.append(current_time)
             else:
                 self.metrics.total_errors += 1
 
@@ -114,25 +120,12 @@ class PerformanceMonitor:
             if duration_ms > self.metrics.max_processing_time_ms:
                 self.metrics.max_processing_time_ms = duration_ms
 
-            # 清理过期数据
-            self._cleanup_old_records()
-
-            # 更新统计
-            self._update_processing_stats()
-
     def record_network_request(self, duration_ms: float, success: bool = True) -> None:
         """记录网络请求性能"""
-        with self._lock:
-            current_time = datetime.now()
-
-            record = TimingRecord(
-                timestamp=current_time,
-                duration_ms=duration_ms,
-                operation='network_request',
-                success=success
-            )
-            self._network_records.append(record)
+        if success:
+            self._network_sketch.add(duration_ms)
 
+        with self._lock:
             self.metrics.network_requests += 1
             if not success:
                 self.metrics.network_failures += 1
@@ -143,11 +136,23 @@ class PerformanceMonitor:
             if duration_ms > self.metrics.max_response_time_ms:
                 self.metrics.max_response_time_ms = duration_ms
 
-            # 清理过期数据
-            self._cleanup_old_records()
-
-            # 更新网络统计
-            self._update_network_stats()
+    def record_operation_time(self, operation: str, duration_ms: float) -> None:
+        """
+        记录某个操作的耗时 只更新耗时分布 可以每帧调用
+
+        Args:
+            operation: 操作名称
+            duration_ms: 耗时 毫秒
+        """
+        sketch = self._operation_sketches.get(operation)
+        if sketch is None:
+            with self._lock:
+                sketch = self._operation_sketches.setdefault(
+                    operation, WindowedSketch(self.window_size.total_seconds())
+                )
+        sketch.add(duration_ms)
+        # 不加锁 与发送汇总同时发生时可能漏标 该操作下次记录时会再标记
+        self._dirty_operations.add(operation)
 
     def record_queue_status(self, current_size: int, is_full: bool = False) -> None:
         """记录队列状态"""
@@ -160,6 +165,23 @@ class PerformanceMonitor:
             if is_full:
                 self.metrics.queue_full_count += 1
 
+    def record_bytes_sent(self, sent_bytes: int, raw_bytes: int) -> None:
+        """记录发送的字节数 以及压缩前的字节数"""
+        with self._lock:
+            self.metrics.bytes_sent += sent_bytes
+            self.metrics.bytes_uncompressed += raw_bytes
+
+    def record_dropped_events(self, count: int) -> None:
+        """记录无法发送而被丢弃的事件数量"""
+        with self._lock:
+            self.metrics.events_dropped += count
+
+    def record_spool_status(self, size_bytes: int, segment_count: int) -> None:
+        """记录磁盘缓冲的大小"""
+        with self._lock:
+            self.metrics.spool_size_bytes = size_bytes
+            self.metrics.spool_segments = segment_count
+
     def record_format_error(self) -> None:
         """记录格式化错误"""
         with self._lock:
@@ -206,45 +228,35 @@ class PerformanceMonitor:
     def get_current_metrics(self) -> PerformanceMetrics:
         """获取当前性能指标"""
         with self._lock:
+            self._update_window_stats()
             # 更新时间戳
             self.metrics.last_updated = datetime.now()
             return self.metrics
 
     def get_detailed_stats(self) -> Dict[str, Any]:
         """获取详细统计信息"""
+        processing = self._processing_sketch.snapshot()
+        network = self._network_sketch.snapshot()
+
         with self._lock:
             current_time = datetime.now()
             uptime = current_time - self._start_time
-
-            # 计算时间窗口内的统计
-            recent_processing_times = [
-                r.duration_ms for r in self._timing_records
-                if r.operation == 'event_processing' and r.success
-            ]
-
-            recent_network_times = [
-                r.duration_ms for r in self._network_records
-                if r.success
-            ]
+            self._update_window_stats()
 
             return {
                 'uptime_seconds': uptime.total_seconds(),
                 'current_metrics': self.metrics,
-                'processing_stats': {
-                    'recent_count': len(recent_processing_times),
-                    'recent_avg_ms': sum(recent_processing_times) / len(recent_processing_times) if recent_processing_times else 0,
-                    'recent_min_ms': min(recent_processing_times) if recent_processing_times else 0,
-                    'recent_max_ms': max(recent_processing_times) if recent_processing_times else 0,
-                    'percentile_95_ms': self._calculate_percentile(recent_processing_times, 95),
-                    'percentile_99_ms': self._calculate_percentile(recent_processing_times, 99)
-                },
-                'network_stats': {
-                    'recent_count': len(recent_network_times),
-                    'recent_avg_ms': sum(recent_network_times) / len(recent_network_times) if recent_network_times else 0,
-                    'recent_min_ms': min(recent_network_times) if recent_network_times else 0,
-                    'recent_max_ms': max(recent_network_times) if recent_network_times else 0,
-                    'percentile_95_ms': self._calculate_percentile(recent_network_times, 95),
-                    'percentile_99_ms': self._calculate_percentile(recent_network_times, 99)
+                'processing_stats': self._get_sketch_stats(processing),
+                'network_stats': self._get_sketch_stats(network),
+                'operation_stats': self.get_operation_stats(),
+                'transport_stats': {
+                    'bytes_sent': self.metrics.bytes_sent,
+                    'bytes_uncompressed': self.metrics.bytes_uncompressed,
+                    'compression_ratio': self.metrics.bytes_sent / self.metrics.bytes_uncompressed if self.metrics.bytes_uncompressed else 0,
+                    'events_dropped': self.metrics.events_dropped,
+                    'queue_size': self.metrics.queue_size,
+                    'spool_size_bytes': self.metrics.spool_size_bytes,
+                    'spool_segments': self.metrics.spool_segments
                 },
                 'memory_stats': {
                     'current_mb': self.metrics.memory_usage_mb,
@@ -326,66 +338,100 @@ class PerformanceMonitor:
         """重置所有指标"""
         with self._lock:
             self.metrics = PerformanceMetrics()
-            self._timing_records.clear()
-            self._event_timestamps.clear()
-            self._network_records.clear()
+            self._processing_sketch.clear()
+            self._network_sketch.clear()
+            self._operation_sketches.clear()
+            self._dirty_operations = set()
+            self._operation_failures.clear()
             self._memory_samples.clear()
             self._start_time = datetime.now()
 
-    def _cleanup_old_records(self) -> None:
-        """清理过期记录"""
-        cutoff_time = datetime.now() - self.window_size
-
-        # 清理时间记录
-        while self._timing_records and self._timing_records[0].timestamp < cutoff_time:
-            self._timing_records.popleft()
-
-        # 清理事件时间戳
-        while self._event_timestamps and self._event_timestamps[0] < cutoff_time:
-            self._event_timestamps.popleft()
-
-        # 清理网络记录
-        while self._network_records and self._network_records[0].timestamp < cutoff_time:
-            self._network_records.popleft()
-
-    def _update_processing_stats(self) -> None:
-        """更新处理统计"""
-        # 计算事件处理速率
-        if len(self._event_timestamps) >= 2:
-            time_span = (self._event_timestamps[-1] - self._event_timestamps[0]).total_seconds()
-            if time_span > 0:
-                self.metrics.events_per_second = len(self._event_timestamps) / time_span
-
-        # 计算平均处理时间
-        processing_times = [
-            r.duration_ms for r in self._timing_records
-            if r.operation == 'event_processing' and r.success
-        ]
-
-        if processing_times:
-            self.metrics.avg_processing_time_ms = sum(processing_times) / len(processing_times)
-
-    def _update_network_stats(self) -> None:
-        """更新网络统计"""
-        # 计算平均响应时间
-        response_times = [
-            r.duration_ms for r in self._network_records
-            if r.success
-        ]
-
-        if response_times:
-            self.metrics.avg_response_time_ms = sum(response_times) / len(response_times)
-
-    def _calculate_percentile(self, values: List[float], percentile: int) -> float:
-        """计算百分位数"""
-        if not values:
-            return 0.0
-
-        sorted_values = sorted(values)
-        index = int((percentile / 100) * len(sorted_values))
-        index = min(index, len(sorted_values) - 1)
-
-        return sorted_values[index]
+    def _update_window_stats(self) -> None:
+        """按时间窗口内的耗时分布 更新处理速率和平均耗时"""
+        processing = self._processing_sketch.snapshot()
+        span = self._processing_sketch.span_seconds()
+        if span > 0:
+            self.metrics.events_per_second = processing.count / span
+        if processing.count > 0:
+            self.metrics.avg_processing_time_ms = processing.avg
+
+        network = self._network_sketch.snapshot()
+        if network.count > 0:
+            self.metrics.avg_response_time_ms = network.avg
+
+    @staticmethod
+    def _get_sketch_stats(sketch: DDSketch) -> Dict[str, Any]:
+        """耗时分布的统计"""
+        return {
+            'recent_count': sketch.count,
+            'recent_avg_ms': sketch.avg,
+            'recent_min_ms': sketch.min if sketch.count > 0 else 0,
+            'recent_max_ms': sketch.max if sketch.count > 0 else 0,
+            'percentile_50_ms': sketch.quantile(0.5),
+            'percentile_95_ms': sketch.quantile(0.95),
+            'percentile_99_ms': sketch.quantile(0.99)
+        }
+
+    def get_operation_snapshot(self, operation: str) -> Optional[DDSketch]:
+        """
+        获取某个操作在时间窗口内的耗时分布
+
+        Args:
+            operation: 操作名称
+
+        Returns:
+            耗时分布的快照 可以与其他快照合并 没有记录过该操作时返回None
+        """
+        sketch = self._operation_sketches.get(operation)
+        return sketch.snapshot() if sketch is not None else None
+
+    def get_operation_stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取每个操作在时间窗口内的耗时统计"""
+        with self._lock:
+            operation_items = list(self._operation_sketches.items())
+        return {
+            operation: self._get_sketch_stats(sketch.snapshot())
+            for operation, sketch in operation_items
+        }
+
+    def send_operation_snapshots(self) -> None:
+        """
+        发送操作耗时的汇总事件
+        每个上次发送后有新记录的操作 发送一个时间窗口内的耗时分布
+        """
+        with self._lock:
+            self._last_snapshot_time = time.monotonic()
+            dirty_operations, self._dirty_operations = self._dirty_operations, set()
+            failures, self._operation_failures = self._operation_failures, {}
+            operation_items = [
+                (operation, self._operation_sketches.get(operation))
+                for operation in dirty_operations | failures.keys()
+            ]
+
+        window_seconds = self.window_size.total_seconds()
+        for operation, sketch in sorted(operation_items, key=lambda x: x[0]):
+            stats = self._get_sketch_stats(sketch.snapshot() if sketch is not None else DDSketch())
+            self.send_performance_event(
+                f"operation_stats_{operation}",
+                stats['recent_avg_ms'],
+                {
+                    'operation': operation,
+                    'window_seconds': window_seconds,
+                    'failure_count': failures.get(operation, 0),
+                    **stats,
+                    'event_type': 'operation_performance_snapshot'
+                }
+            )
+
+    def _send_operation_snapshots_if_due(self) -> None:
+        """距离上次发送汇总事件超过间隔时 发送一次"""
+        if time.monotonic() - self._last_snapshot_time < self.snapshot_interval_seconds:
+            return
+        with self._lock:
+            if time.monotonic() - self._last_snapshot_time < self.snapshot_interval_seconds:
+                return  # 其他线程已经发送
+            self._last_snapshot_time = time.monotonic()
+        self.send_operation_snapshots()
 
     def start_system_monitoring(self, interval: float = 30.0) -> None:
         """开始系统监控（占位方法）"""
@@ -394,21 +440,24 @@ class PerformanceMonitor:
         pass
 
     def track_operation_time(self, operation: str, duration: float, success: bool, metadata: Dict[str, Any] = None) -> None:
-        """跟踪操作执行时间"""
+        """
+        跟踪操作执行时间 只更新耗时分布 按间隔发送汇总事件
+
+        Args:
+            operation: 操作名称
+            duration: 耗时 秒
+            success: 是否成功
+            metadata: 兼容旧接口 汇总事件中不包含
+        """
         duration_ms = duration * 1000  # 转换为毫秒
         self.record_event_processing(duration_ms, success)
+        if success:
+            self.record_operation_time(operation, duration_ms)
+        else:
+            with self._lock:
+                self._operation_failures[operation] = self._operation_failures.get(operation, 0) + 1
 
-        # 发送性能事件
-        self.send_performance_event(
-            f"operation_time_{operation}",
-            duration,
-            {
-                'operation': operation,
-                'success': success,
-                'duration_ms': duration_ms,
-                **(metadata or {})
-            }
-        )
+        self._send_operation_snapshots_if_due()
 
     def track_startup_time(self, startup_duration: float, components: Dict[str, float] = None) -> None:
         """跟踪应用启动时间"""
@@ -439,18 +488,11 @@ class PerformanceMonitor:
 
     def track_image_recognition_performance(self, processing_time: float, accuracy: float = None,
                                           algorithm: str = None, image_size: str = None) -> None:
-        """跟踪图像识别性能"""
-        self.send_performance_event(
-            "image_recognition_performance",
-            processing_time,
-            {
-                'processing_time': processing_time,
-                'accuracy': accuracy,
-                'algorithm': algorithm,
-                'image_size': image_size,
-                'event_type': 'image_recognition_performance'
-            }
-        )
+        """跟踪图像识别性能 processing_time 单位为秒 只更新耗时分布 按间隔发送汇总事件"""
+        operation = f'image_recognition:{algorithm}' if algorithm else 'image_recognition'
+        self.record_operation_time(operation, processing_time * 1000)
+
+        self._send_operation_snapshots_if_due()
 
     def start_timer(self, timer_name: str, metadata: Dict[str, Any] = None) -> None:
         """开始计时器"""
@@ -490,6 +532,9 @@ class PerformanceMonitor:
         if hasattr(self, '_timers'):
             self._timers.clear()
 
+        # 发送最后一次汇总
+        self.send_operation_snapshots()
+
         # 重置指标
         self.reset_metrics()
 
@@ -0,0 +1,231 @@
+"""
+流式分位数统计
+使用对数分桶的 DDSketch 记录耗时 内存占用固定 可以合并 分位数的相对误差有上限
+"""
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+class DDSketch:
+    """
+    DDSketch 分位数草图
+    正数按 ceil(log_gamma(x)) 分桶 每个桶只记录数量 估算值与真实值的相对误差不超过 relative_accuracy
+    非正数单独计数 桶数量超过上限时合并最小的桶 只影响最低的分位数
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        """
+        Args:
+            relative_accuracy: 分位数的相对误差
+            max_bins: 桶数量上限
+        """
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        """
+        记录一个值
+
+        Args:
+            value: 值
+        """
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        if value <= 0:
+            self.zero_count += 1
+            return
+
+        key = math.ceil(math.log(value) / self._log_gamma)
+        bins = self.bins
+        bins[key] = bins.get(key, 0) + 1
+        if len(bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        """合并最小的两个桶"""
+        lowest, second = sorted(self.bins)[:2]
+        self.bins[second] += self.bins.pop(lowest)
+
+    def merge(self, other: 'DDSketch') -> None:
+        """
+        合并另一个草图 两者的精度需要一致
+
+        Args:
+            other: 另一个草图
+        """
+        if other.gamma != self.gamma:
+            raise ValueError('无法合并精度不同的草图')
+        if other.count == 0:
+            return
+
+        for key, cnt in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + cnt
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def copy(self) -> 'DDSketch':
+        sketch = DDSketch(self.relative_accuracy, self.max_bins)
+        sketch.merge(self)
+        return sketch
+
+    @property
+    def avg(self) -> float:
+        return self.sum / self.count if self.count > 0 else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        估算分位数
+
+        Args:
+            q: 分位 0~1
+
+        Returns:
+            估算值 没有数据时返回0
+        """
+        if self.count == 0:
+            return 0.0
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return self.min
+
+        cumulative = self.zero_count
+        value = self.max
+        for key in sorted(self.bins):
+            cumulative += self.bins[key]
+            if cumulative > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                break
+        return min(max(value, self.min), self.max)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化 用于跨进程合并"""
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'bins': {str(k): v for k, v in self.bins.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min if self.count > 0 else None,
+            'max': self.max if self.count > 0 else None,
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> 'DDSketch':
+        sketch = DDSketch(data.get('relative_accuracy', 0.01))
+        sketch.bins = {int(k): v for k, v in data.get('bins', {}).items()}
+        sketch.zero_count = data.get('zero_count', 0)
+        sketch.count = data.get('count', 0)
+        sketch.sum = data.get('sum', 0.0)
+        if sketch.count > 0:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        return sketch
+
+
+class WindowedSketch:
+    """
+    按时间分段的草图 只统计最近一段时间内的值
+    每个时间段一个草图 过期的时间段整个丢弃 查询时合并未过期的时间段
+    记录时只持有自己的锁 不同指标之间互不影响
+    """
+
+    def __init__(self, window_seconds: float = 300, bucket_seconds: float = 10, relative_accuracy: float = 0.01):
+        """
+        Args:
+            window_seconds: 统计窗口的长度
+            bucket_seconds: 每个时间段的长度 窗口过期的粒度
+            relative_accuracy: 分位数的相对误差
+        """
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.relative_accuracy = relative_accuracy
+
+        self._lock = threading.Lock()
+        self._buckets: Deque[Tuple[float, DDSketch]] = deque()  # (时间段开始时间, 草图) 从旧到新
+
+    def add(self, value: float, now: Optional[float] = None) -> None:
+        """
+        记录一个值
+
+        Args:
+            value: 值
+            now: 当前时间 默认为 time.monotonic()
+        """
+        if now is None:
+            now = time.monotonic()
+        start = now - now % self.bucket_seconds
+        with self._lock:
+            if not self._buckets or self._buckets[-1][0] != start:
+                self._buckets.append((start, DDSketch(self.relative_accuracy)))
+                self._expire(now)
+            self._buckets[-1][1].add(value)
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._buckets and self._buckets[0][0] + self.bucket_seconds <= cutoff:
+            self._buckets.popleft()
+
+    def snapshot(self, now: Optional[float] = None) -> DDSketch:
+        """
+        合并窗口内的时间段
+
+        Args:
+            now: 当前时间 默认为 time.monotonic()
+
+        Returns:
+            新的草图 之后的记录不影响它
+        """
+        if now is None:
+            now = time.monotonic()
+        sketch = DDSketch(self.relative_accuracy)
+        with self._lock:
+            self._expire(now)
+            for _, bucket in self._buckets:
+                sketch.merge(bucket)
+        return sketch
+
+    def span_seconds(self, now: Optional[float] = None) -> float:
+        """
+        窗口内实际有数据的时长 用于计算速率
+
+        Args:
+            now: 当前时间 默认为 time.monotonic()
+        """
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if not self._buckets:
+                return 0.0
+            return min(now - self._buckets[0][0], self.window_seconds)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
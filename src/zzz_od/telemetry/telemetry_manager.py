@@ -80,6 +80,8 @@ class TelemetryManager:
 
             # 初始化Loki客户端
             logger.debug("Initializing Loki client...")
+            if not self.config.spool_dir:
+                self.config.spool_dir = str(Path(os_utils.get_work_dir()) / ".log" / "telemetry_spool")
             self.loki_client = LokiClient(self.config)
             if not self.loki_client.initialize():
                 logger.warning("Failed to initialize Loki client")
@@ -95,6 +97,7 @@ class TelemetryManager:
             self.event_collector = EventCollector(self.loki_client, self.privacy_controller, self._user_id)
             self.error_tracker = ErrorTracker(self.loki_client, self.privacy_controller)
             self.performance_monitor = PerformanceMonitor(self.loki_client, self.privacy_controller)
+            self.loki_client.set_performance_monitor(self.performance_monitor)
 
             # 设置全局异常处理器
             self.error_tracker.setup_exception_handler()
@@ -1,8 +1,11 @@
 import os
 from typing import Optional
 
+from cv2.typing import MatLike
+
+from one_dragon.base.operation import operation_profiler
 from one_dragon.yolo.yolo_utils import ZZZ_MODEL_DOWNLOAD_URL
-from one_dragon.yolo.yolov8_onnx_cls import Yolov8Classifier
+from one_dragon.yolo.yolov8_onnx_cls import ClassificationResult, Yolov8Classifier
 
 
 class FlashClassifier(Yolov8Classifier):
@@ -34,9 +37,17 @@ class FlashClassifier(Yolov8Classifier):
             gh_proxy_url=gh_proxy_url,
             personal_proxy=personal_proxy,
             gpu=gpu,
-            keep_result_seconds=keep_result_seconds
+            keep_result_seconds=keep_result_seconds,
+            session_name='flash_classifier',
         )
 
+    def run(self, image: MatLike, conf: float = 0.9, run_time: Optional[float] = None) -> ClassificationResult:
+        """
+        对图片进行识别 记录耗时
+        """
+        with operation_profiler.get_profiler().section('yolo', 'flash_classifier'):
+            return Yolov8Classifier.run(self, image, conf=conf, run_time=run_time)
+
 
 def __debug():
     from one_dragon.utils import os_utils
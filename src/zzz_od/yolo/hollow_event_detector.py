@@ -1,6 +1,10 @@
-from typing import Optional
+from typing import List, Optional
 
+from cv2.typing import MatLike
+
+from one_dragon.base.operation import operation_profiler
 from one_dragon.utils import yolo_config_utils
+from one_dragon.yolo.detect_utils import DetectFrameResult
 from one_dragon.yolo.yolo_utils import ZZZ_MODEL_DOWNLOAD_URL
 from one_dragon.yolo.yolov8_onnx_det import Yolov8Detector
 
@@ -33,5 +37,16 @@ class HollowEventDetector(Yolov8Detector):
             gh_proxy_url=gh_proxy_url,
             personal_proxy=personal_proxy,
             gpu=gpu,
-            keep_result_seconds=keep_result_seconds
+            keep_result_seconds=keep_result_seconds,
+            session_name='hollow_event_detector',
         )
+
+    def run(self, image: MatLike, conf: float = 0.6, iou: float = 0.5, run_time: Optional[float] = None,
+            label_list: Optional[List[str]] = None,
+            category_list: Optional[List[str]] = None) -> DetectFrameResult:
+        """
+        对图片进行识别 记录耗时
+        """
+        with operation_profiler.get_profiler().section('yolo', 'hollow_event_detector'):
+            return Yolov8Detector.run(self, image, conf=conf, iou=iou, run_time=run_time,
+                                      label_list=label_list, category_list=category_list)
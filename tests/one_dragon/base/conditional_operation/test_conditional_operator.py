@@ -398,4 +398,81 @@ class TestConditionalOperator:
         
         # 停止运行
         conditional_operator.stop_running()
-        assert conditional_operator.is_running is False
\ No newline at end of file
+        assert conditional_operator.is_running is False
+    
+    def test_trigger_scene_by_update_state(self, conditional_operator, mock_op_getter,
+                                           mock_scene_handler_getter, mock_operation_template_getter):
+        """测试状态更新后 调度线程立刻触发对应场景"""
+        recorders = {}
+        
+        def get_state_recorder(state_name):
+            if state_name not in recorders:
+                recorders[state_name] = StateRecorder(state_name)
+            return recorders[state_name]
+        
+        conditional_operator.get_state_recorder = get_state_recorder
+        conditional_operator.update('scenes', [
+            {
+                'triggers': ['trigger_state'],
+                'interval': 0,
+                'handlers': [
+                    {
+                        'states': '[trigger_state, 0, 1]',
+                        'operations': [
+                            {'op_name': 'test_op'}
+                        ]
+                    }
+                ]
+            }
+        ])
+        conditional_operator.init(
+            mock_op_getter,
+            mock_scene_handler_getter,
+            mock_operation_template_getter
+        )
+        conditional_operator.start_running_async()
+        
+        conditional_operator.update_state(StateRecord('trigger_state', time.time()))
+        
+        for _ in range(100):
+            if conditional_operator.running_task is not None:
+                break
+            time.sleep(0.005)
+        assert conditional_operator.running_task is not None
+        assert conditional_operator.running_task.trigger == 'trigger_state'
+    
+    def test_normal_scene_wake_at_time_boundary(self, conditional_operator, mock_op_getter,
+                                                mock_scene_handler_getter, mock_operation_template_getter):
+        """测试无触发器场景 在状态时间区间边界到达时被唤醒"""
+        recorder = StateRecorder('test_state')
+        conditional_operator.get_state_recorder = Mock(return_value=recorder)
+        conditional_operator.update('scenes', [
+            {
+                'interval': 0,
+                'handlers': [
+                    {
+                        'states': '[test_state, 0.1, 1]',
+                        'operations': [
+                            {'op_name': 'test_op'}
+                        ]
+                    }
+                ]
+            }
+        ])
+        conditional_operator.init(
+            mock_op_getter,
+            mock_scene_handler_getter,
+            mock_operation_template_getter
+        )
+        
+        # 状态刚记录 需要0.1秒后才满足条件
+        recorder.last_record_time = time.time()
+        conditional_operator.start_running_async()
+        time.sleep(0.05)
+        assert conditional_operator.running_task is None
+        
+        for _ in range(40):
+            if conditional_operator.running_task is not None:
+                break
+            time.sleep(0.01)
+        assert conditional_operator.running_task is not None
@@ -279,4 +279,88 @@ class TestStateCalTree:
         )
         
         states = and_node.get_usage_states()
-        assert mock_state_recorder.state_name in states
\ No newline at end of file
+        assert mock_state_recorder.state_name in states
+    
+    def test_get_next_change_time(self, mock_state_recorder):
+        """测试计算下一次可能变化的时间"""
+        node = StateCalNode(
+            node_type=StateCalNodeType.STATE,
+            state_recorder=mock_state_recorder,
+            state_time_range_min=0.5,
+            state_time_range_max=2
+        )
+        
+        # 上次记录时间为100 区间边界为 100.5 和 102
+        assert node.get_next_change_time(100.2) == 100.5
+        assert node.get_next_change_time(101) == 102
+        assert node.get_next_change_time(103) is None
+        
+        # 没有触发过的状态 只有新记录才会变化
+        mock_state_recorder.last_record_time = -1
+        assert node.get_next_change_time(100.2) is None
+    
+    def test_get_next_change_time_op(self, mock_state_recorder):
+        """测试运算节点取子节点中最早的边界"""
+        other_recorder = Mock(spec=StateRecorder)
+        other_recorder.state_name = 'other_state'
+        other_recorder.last_record_time = 100.0
+        other_recorder.last_value = None
+        
+        left_node = StateCalNode(
+            node_type=StateCalNodeType.STATE,
+            state_recorder=mock_state_recorder,
+            state_time_range_min=0,
+            state_time_range_max=3
+        )
+        right_node = StateCalNode(
+            node_type=StateCalNodeType.STATE,
+            state_recorder=other_recorder,
+            state_time_range_min=0,
+            state_time_range_max=1
+        )
+        and_node = StateCalNode(
+            node_type=StateCalNodeType.OP,
+            op_type=StateCalOpType.AND,
+            left_child=left_node,
+            right_child=right_node
+        )
+        not_node = StateCalNode(
+            node_type=StateCalNodeType.OP,
+            op_type=StateCalOpType.NOT,
+            left_child=and_node
+        )
+        
+        assert not_node.get_next_change_time(100.5) == 101
+        assert not_node.get_next_change_time(102) == 103
+        assert StateCalNode(StateCalNodeType.TRUE).get_next_change_time(100) is None
+
+    
+    def test_compiled_tree_equivalent(self):
+        """测试编译后的判断结果与逐节点判断一致"""
+        recorders = {
+            'a': StateRecorder('a'),
+            'b': StateRecorder('b'),
+            'c': StateRecorder('c'),
+        }
+        recorders['a'].last_record_time = 100.0
+        recorders['b'].last_record_time = 99.0
+        recorders['b'].last_value = 2
+        recorders['c'].last_record_time = 0
+        
+        node = construct_state_cal_tree(
+            '( [a, 0, 1] | [b, 0, 2]{1, 3} ) & ![c, 0, 5]',
+            lambda name: recorders[name]
+        )
+        
+        def expected(now):
+            a = 0 <= now - 100.0 <= 1
+            b = 0 <= now - 99.0 <= 2 and 1 <= recorders['b'].last_value <= 3
+            c = 0 <= now - 0 <= 5
+            return (a or b) and not c
+        
+        for now in [99.5, 100.0, 100.5, 101.0, 101.5, 102.0]:
+            assert node.in_time_range(now) == expected(now)
+        
+        # 状态值变化后 编译的函数读取的是最新值
+        recorders['b'].last_value = 5
+        assert node.in_time_range(101.5) is False
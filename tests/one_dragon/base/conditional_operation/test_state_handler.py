@@ -1,4 +1,7 @@
 """状态处理器测试"""
+import sys
+import threading
+
 import pytest
 from unittest.mock import Mock
 
@@ -169,4 +172,104 @@ class TestStateHandler:
         handler.dispose()
         
         # 验证子处理器的dispose方法被调用
-        mock_sub_handler.dispose.assert_called_once()
\ No newline at end of file
+        mock_sub_handler.dispose.assert_called_once()
+    
+    def test_verdict_cache(self, mock_atomic_op):
+        """测试判断结果缓存 在依赖状态变化或到达时间边界前复用结果"""
+        recorder = StateRecorder('test_state')
+        recorder.last_record_time = 100.0
+        state_cal_tree = StateCalNode(
+            node_type=StateCalNodeType.STATE,
+            state_recorder=recorder,
+            state_time_range_min=0,
+            state_time_range_max=1
+        )
+        handler = StateHandler(
+            expr='[test_state, 0, 1]',
+            state_cal_tree=state_cal_tree,
+            operations=[mock_atomic_op]
+        )
+        handler.enable_verdict_cache()
+        
+        assert handler.get_operations(100.5) is not None
+        
+        # 没有通知状态变化 边界(101)之前复用缓存
+        recorder.last_record_time = -1
+        assert handler.get_operations(100.8) is not None
+        
+        # 通知状态变化后 重新判断
+        handler.invalidate_verdict()
+        assert handler.get_operations(100.8) is None
+        
+        # 到达时间边界后 重新判断
+        recorder.last_record_time = 100.0
+        handler.invalidate_verdict()
+        assert handler.get_operations(100.9) is not None
+        assert handler.get_operations(101.1) is None
+
+    def test_verdict_cache_invalidate_during_evaluation(self, mock_atomic_op):
+        """测试判断过程中状态发生变化 旧的判断结果不会写入缓存"""
+        evaluating = threading.Event()
+        invalidated = threading.Event()
+        results = [True, False]
+
+        def in_time_range(now: float) -> bool:
+            result = results.pop(0)
+            if result:  # 第一次判断时 等待另一个线程使缓存失效
+                evaluating.set()
+                invalidated.wait(5)
+            return result
+
+        state_cal_tree = Mock(spec=StateCalNode)
+        state_cal_tree.in_time_range = Mock(side_effect=in_time_range)
+        state_cal_tree.get_next_change_time = Mock(return_value=None)
+        handler = StateHandler(expr='test', state_cal_tree=state_cal_tree, operations=[mock_atomic_op])
+        handler.enable_verdict_cache()
+
+        worker = threading.Thread(target=handler._in_time_range, args=(1,))
+        worker.start()
+        assert evaluating.wait(5)
+        handler.invalidate_verdict()
+        invalidated.set()
+        worker.join(5)
+
+        assert handler._in_time_range(1) is False
+        assert state_cal_tree.in_time_range.call_count == 2
+
+    def test_verdict_cache_concurrent(self, mock_atomic_op):
+        """测试并发判断和使缓存失效 失效之后的判断一定反映最新的状态"""
+        recorder = StateRecorder('test_state')
+        recorder.last_record_time = 100.0
+        state_cal_tree = StateCalNode(
+            node_type=StateCalNodeType.STATE,
+            state_recorder=recorder,
+            state_time_range_min=0,
+            state_time_range_max=1
+        )
+        handler = StateHandler(expr='[test_state, 0, 1]', state_cal_tree=state_cal_tree, operations=[mock_atomic_op])
+        handler.enable_verdict_cache()
+
+        stop = threading.Event()
+
+        def evaluate():
+            while not stop.is_set():
+                handler._in_time_range(100.5)
+
+        # 频繁切换线程 让 比较版本 和 写入缓存 之间更容易被打断
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        worker_list = [threading.Thread(target=evaluate) for _ in range(4)]
+        for worker in worker_list:
+            worker.start()
+
+        try:
+            for i in range(2000):
+                expected = i % 2 == 0
+                recorder.last_record_time = 100.0 if expected else -1
+                handler.invalidate_verdict()
+                assert handler._in_time_range(100.5) is expected
+        finally:
+            stop.set()
+            for worker in worker_list:
+                worker.join()
+            sys.setswitchinterval(switch_interval)
@@ -0,0 +1,125 @@
+"""列式状态存储测试"""
+import random
+
+import numpy as np
+import pytest
+
+from one_dragon.base.conditional_operation.state_cal_tree import construct_state_cal_tree
+from one_dragon.base.conditional_operation.state_recorder import StateRecord, StateRecorder
+from one_dragon.base.conditional_operation.state_store import StateStore, StateStoreRecorder
+
+
+class TestStateStore:
+
+    @pytest.fixture
+    def mutex_map(self):
+        """互斥关系 a/b/c 两两互斥 d 没有互斥"""
+        return {
+            'a': ['b', 'c'],
+            'b': ['a', 'c'],
+            'c': ['a', 'b'],
+            'd': None,
+        }
+
+    def test_view_same_as_recorder(self):
+        """测试视图的单个更新与 StateRecorder 一致"""
+        store = StateStore()
+        view = StateStoreRecorder(store, 'a')
+        recorder = StateRecorder('a')
+
+        for record in [
+            StateRecord('a', 10),
+            StateRecord('a', 11, value=3),
+            StateRecord('a', 12, value_to_add=2),
+            StateRecord('a', 0, trigger_time_add=1),
+        ]:
+            view.update_state_record(record)
+            recorder.update_state_record(record)
+            assert view.last_record_time == recorder.last_record_time
+            assert view.last_value == recorder.last_value
+
+        view.clear_state_record()
+        recorder.clear_state_record()
+        assert view.last_record_time == recorder.last_record_time == 0
+        assert view.last_value is None and recorder.last_value is None
+
+    def test_clear_not_triggered(self):
+        """测试没有触发过的状态 清除后保持未触发"""
+        store = StateStore()
+        view = StateStoreRecorder(store, 'a')
+        view.clear_state_record()
+        assert view.last_record_time == -1
+
+    def test_mutex_registered_later(self):
+        """测试先作为互斥状态登记 之后再带互斥列表登记"""
+        store = StateStore()
+        b = StateStoreRecorder(store, 'b', mutex_list=['a'])
+        a = StateStoreRecorder(store, 'a', mutex_list=['b'])
+        store.batch_update([b.state_id], [StateRecord('b', 10)])
+        store.batch_update([a.state_id], [StateRecord('a', 11)])
+        assert a.last_record_time == 11
+        assert b.last_record_time == 0
+
+    def test_to_numpy(self):
+        """测试获取快照"""
+        store = StateStore()
+        views = [StateStoreRecorder(store, 'state_%d' % i) for i in range(3)]
+        views[1].update_state_record(StateRecord('state_1', 10, value=2))
+        record_time, value = store.to_numpy()
+        assert record_time.tolist() == [-1, 10, -1]
+        assert value[1] == 2
+        assert np.isnan(value[0])
+
+    def test_compiled_tree_reads_store(self):
+        """测试状态判断树直接读取状态存储"""
+        store = StateStore()
+        recorders = {'a': StateStoreRecorder(store, 'a'), 'b': StateStoreRecorder(store, 'b', mutex_list=['a'])}
+        node = construct_state_cal_tree('[a, 0, 1]{1, 2}', lambda name: recorders[name])
+        assert node.in_time_range(10) is False
+
+        store.batch_update([recorders['a'].state_id], [StateRecord('a', 10, value=1)])
+        assert node.in_time_range(10.5) is True
+
+        store.batch_update([recorders['b'].state_id], [StateRecord('b', 10.6)])
+        assert node.in_time_range(10.7) is False
+
+    @pytest.mark.parametrize('seed', range(20))
+    def test_batch_update_same_as_sequential(self, mutex_map, seed):
+        """测试批量更新与逐个更新+清除互斥状态的结果一致"""
+        rnd = random.Random(seed)
+        store = StateStore()
+        views = {name: StateStoreRecorder(store, name, mutex_list=mutex) for name, mutex in mutex_map.items()}
+        recorders = {name: StateRecorder(name, mutex_list=mutex) for name, mutex in mutex_map.items()}
+
+        for round_idx in range(30):
+            records = []
+            for _ in range(rnd.randint(1, 4)):
+                name = rnd.choice(list(mutex_map.keys()))
+                kind = rnd.random()
+                if kind < 0.5:
+                    record = StateRecord(name, round_idx + rnd.random())
+                elif kind < 0.75:
+                    record = StateRecord(name, round_idx + rnd.random(), value=rnd.randint(0, 5))
+                elif kind < 0.85:
+                    record = StateRecord(name, round_idx, value_to_add=rnd.randint(-2, 2))
+                elif kind < 0.95:
+                    record = StateRecord(name, round_idx, is_clear=True)
+                else:
+                    record = StateRecord(name, 0, trigger_time_add=0.5)
+                records.append(record)
+
+            store.batch_update([views[i.state_name].state_id for i in records], records)
+
+            for record in records:
+                recorder = recorders[record.state_name]
+                if record.is_clear:
+                    recorder.clear_state_record()
+                    continue
+                recorder.update_state_record(record)
+                if recorder.mutex_list is not None:
+                    for mutex_state in recorder.mutex_list:
+                        recorders[mutex_state].clear_state_record()
+
+            for name in mutex_map.keys():
+                assert views[name].last_record_time == pytest.approx(recorders[name].last_record_time)
+                assert views[name].last_value == recorders[name].last_value
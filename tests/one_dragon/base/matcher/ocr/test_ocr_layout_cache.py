@@ -0,0 +1,188 @@
+"""OCR布局缓存测试"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pytest
+from cv2.typing import MatLike
+
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.base.matcher.match_result import MatchResult, MatchResultList
+from one_dragon.base.matcher.ocr.ocr_layout_cache import OcrLayoutCache
+from one_dragon.base.matcher.ocr.ocr_matcher import OcrMatcher
+
+
+class Area:
+    """模拟画面区域 作为缓存的键"""
+    pass
+
+
+class FakeOcrMatcher(OcrMatcher):
+    """
+    图片中的文本由 texts 决定 每个文本占一行 高度10
+    识别置信度由 score 决定
+    """
+
+    def __init__(self):
+        OcrMatcher.__init__(self)
+        self.texts: List[str] = ['开始']
+        self.score: float = 0.99
+        self.detect_cnt: int = 0
+        self.rec_cnt: int = 0
+
+    def run_ocr_batch(self, image_list: List[MatLike], threshold: float = 0,
+                      merge_line_distance: float = -1) -> List[dict[str, MatchResultList]]:
+        self.detect_cnt += len(image_list)
+        result_list = []
+        for _ in image_list:
+            result_map = {}
+            for idx, text in enumerate(self.texts):
+                mrl = MatchResultList(only_best=False)
+                mrl.append(MatchResult(self.score, 0, idx * 10, 50, 10, data=text))
+                result_map[text] = mrl
+            result_list.append(result_map)
+        return result_list
+
+    def run_ocr_in_rects_batch(self, image_list: List[MatLike],
+                               rect_list_list: List[List[Rect]]) -> Optional[List[List[Tuple[str, float]]]]:
+        self.rec_cnt += 1
+        result_list = []
+        for rect_list in rect_list_list:
+            result = []
+            for rect in rect_list:
+                idx = rect.y1 // 10
+                text = self.texts[idx] if idx < len(self.texts) else ''
+                result.append((text, self.score))
+            result_list.append(result)
+        return result_list
+
+
+def _contains(word: str):
+    return lambda result_map: word in result_map
+
+
+class TestOcrLayoutCache:
+
+    @pytest.fixture
+    def matcher(self) -> FakeOcrMatcher:
+        return FakeOcrMatcher()
+
+    @pytest.fixture
+    def image(self) -> MatLike:
+        return np.zeros((50, 100, 3), dtype=np.uint8)
+
+    def test_skip_detect(self, matcher, image):
+        """测试判断成功后 之后跳过检测"""
+        cache = OcrLayoutCache(matcher)
+        area = Area()
+        for _ in range(3):
+            result_map = cache.run_ocr(area, image, _contains('开始'))
+            assert '开始' in result_map
+            assert result_map['开始'].max.rect.y1 == 0
+
+        assert matcher.detect_cnt == 1
+        stats = cache.get_stats()
+        assert stats.skip == 2
+        assert stats.detect == 1
+        assert stats.entry_cnt == 1
+
+    def test_not_valid_not_cached(self, matcher, image):
+        """测试判断不成功时 不记录布局"""
+        cache = OcrLayoutCache(matcher)
+        area = Area()
+        for _ in range(2):
+            cache.run_ocr(area, image, _contains('结束'))
+        assert matcher.detect_cnt == 2
+        assert cache.get_stats().entry_cnt == 0
+
+    def test_fallback_low_confidence(self, matcher, image):
+        """测试识别置信度下降后 回退到检测"""
+        cache = OcrLayoutCache(matcher, min_confidence=0.8)
+        area = Area()
+        cache.run_ocr(area, image, _contains('开始'))
+        matcher.score = 0.5
+        result_map = cache.run_ocr(area, image, lambda result_map: True)
+        assert '开始' in result_map
+        assert matcher.detect_cnt == 2
+        assert cache.get_stats().fallback == 1
+
+    def test_confident_miss(self, matcher, image):
+        """测试识别结果可信但不满足判断时 直接作为不匹配返回 不再检测"""
+        cache = OcrLayoutCache(matcher)
+        area = Area()
+        cache.run_ocr(area, image, _contains('开始'))
+
+        matcher.texts = ['结束']
+        result_map = cache.run_ocr(area, image, _contains('开始'))
+        assert '开始' not in result_map
+        assert '结束' in result_map
+        assert matcher.detect_cnt == 1
+
+        stats = cache.get_stats()
+        assert stats.confident_miss == 1
+        assert stats.fallback == 0
+
+        # 画面恢复后 继续使用原有布局
+        matcher.texts = ['开始']
+        assert '开始' in cache.run_ocr(area, image, _contains('开始'))
+        assert matcher.detect_cnt == 1
+        assert cache.get_stats().skip == 1
+
+    def test_fallback_text_moved(self, matcher, image):
+        """测试文本位置变化后 连续多次不匹配 回退到检测并更新布局"""
+        cache = OcrLayoutCache(matcher, recheck_after_miss=3)
+        area = Area()
+        cache.run_ocr(area, image, _contains('开始'))
+
+        matcher.texts = ['其它', '开始']
+        for _ in range(2):
+            assert '开始' not in cache.run_ocr(area, image, _contains('开始'))
+        assert matcher.detect_cnt == 1
+        assert cache.get_stats().confident_miss == 2
+
+        result_map = cache.run_ocr(area, image, _contains('开始'))
+        assert result_map['开始'].max.rect.y1 == 10
+        assert matcher.detect_cnt == 2
+        assert cache.get_stats().fallback == 1
+
+        cache.run_ocr(area, image, _contains('开始'))
+        assert matcher.detect_cnt == 2
+        assert cache.get_stats().skip == 1
+
+    def test_shape_changed(self, matcher, image):
+        """测试图片尺寸变化后 布局失效"""
+        cache = OcrLayoutCache(matcher)
+        area = Area()
+        cache.run_ocr(area, image, _contains('开始'))
+        cache.run_ocr(area, np.zeros((60, 100, 3), dtype=np.uint8), _contains('开始'))
+        assert matcher.detect_cnt == 2
+
+    def test_batch(self, matcher, image):
+        """测试批量识别 有布局的区域一起识别 其余一起检测"""
+        cache = OcrLayoutCache(matcher)
+        area_list = [Area(), Area(), Area()]
+        cache.run_ocr(area_list[0], image, _contains('开始'))
+        cache.run_ocr(area_list[1], image, _contains('开始'))
+
+        result_list = cache.run_ocr_batch(area_list, [image] * 3, [_contains('开始')] * 3)
+        assert all('开始' in i for i in result_list)
+        assert matcher.rec_cnt == 1
+        assert matcher.detect_cnt == 3
+
+    def test_unsupported_matcher(self, image):
+        """测试不支持跳过检测的匹配器 每次都检测"""
+        matcher = FakeOcrMatcher()
+        matcher.run_ocr_in_rects_batch = lambda image_list, rect_list_list: None
+        cache = OcrLayoutCache(matcher)
+        area = Area()
+        cache.run_ocr(area, image, _contains('开始'))
+        cache.run_ocr(area, image, _contains('开始'))
+        assert matcher.detect_cnt == 2
+
+    def test_release_with_area(self, matcher, image):
+        """测试区域释放后 布局也释放"""
+        cache = OcrLayoutCache(matcher)
+        area = Area()
+        cache.run_ocr(area, image, _contains('开始'))
+        assert cache.get_stats().entry_cnt == 1
+        del area
+        assert cache.get_stats().entry_cnt == 0
@@ -0,0 +1,166 @@
+"""OCR服务缓存测试"""
+from typing import List
+
+import numpy as np
+from cv2.typing import MatLike
+
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.base.matcher.ocr.ocr_match_result import OcrMatchResult
+from one_dragon.base.matcher.ocr.ocr_matcher import OcrMatcher
+from one_dragon.base.matcher.ocr.ocr_service import OcrService
+
+
+class CountingOcrMatcher(OcrMatcher):
+    """每次识别返回固定结果 记录识别次数"""
+
+    def __init__(self):
+        OcrMatcher.__init__(self)
+        self.ocr_cnt: int = 0
+
+    def ocr(self, image: MatLike, threshold: float = 0,
+            merge_line_distance: float = -1) -> List[OcrMatchResult]:
+        self.ocr_cnt += 1
+        return [
+            OcrMatchResult(0.9, 10, 10, 50, 20, data='开始'),
+            OcrMatchResult(0.9, 200, 200, 50, 20, data='结束'),
+        ]
+
+
+def _new_image(value: int = 0) -> MatLike:
+    return np.full((360, 640, 3), value, dtype=np.uint8)
+
+
+def test_cache_hit():
+    matcher = CountingOcrMatcher()
+    service = OcrService(matcher)
+    image = _new_image()
+
+    service.get_ocr_result_list(image)
+    service.get_ocr_result_list(image)
+    service.get_ocr_result_list(image.copy())  # 内容相同的不同对象
+    assert matcher.ocr_cnt == 1
+
+    # 颜色范围不同 不能命中
+    service.get_ocr_result_list(image, color_range=[[0, 0, 0], [10, 10, 10]])
+    assert matcher.ocr_cnt == 2
+
+    stats = service.get_cache_stats()
+    assert (stats.hit, stats.miss) == (2, 2)
+
+
+def test_digest_memo():
+    service = OcrService(CountingOcrMatcher())
+    image = _new_image()
+
+    digest = service._get_image_digest(image)
+    service._cal_image_digest = lambda _: b'should not recalculate'
+    assert service._get_image_digest(image) == digest
+
+    # 不同对象 即使内容相同也重新计算
+    assert service._get_image_digest(image.copy()) == b'should not recalculate'
+
+
+def test_digest_stride():
+    full = OcrService(CountingOcrMatcher(), digest_stride=1)
+    sampled = OcrService(CountingOcrMatcher(), digest_stride=4)
+    image = _new_image()
+
+    on_grid = image.copy()
+    on_grid[100, 100] = 255
+    assert full._cal_image_digest(image) != full._cal_image_digest(on_grid)
+    assert sampled._cal_image_digest(image) != sampled._cal_image_digest(on_grid)
+
+    # 降采样会跳过不在采样点上的像素
+    off_grid = image.copy()
+    off_grid[101, 101] = 255
+    assert full._cal_image_digest(image) != full._cal_image_digest(off_grid)
+    assert sampled._cal_image_digest(image) == sampled._cal_image_digest(off_grid)
+
+
+def test_default_digest_full_frame():
+    """默认使用全图摘要 采样点之间的变化也不会命中缓存"""
+    matcher = CountingOcrMatcher()
+    service = OcrService(matcher)
+    image = _new_image()
+    off_grid = image.copy()
+    off_grid[101, 101] = 255
+
+    service.get_ocr_result_list(image)
+    service.get_ocr_result_list(off_grid)
+    assert matcher.ocr_cnt == 2
+
+
+def test_lru_evict():
+    matcher = CountingOcrMatcher()
+    service = OcrService(matcher, max_cache_size=2)
+    image_list = [_new_image(i * 10) for i in range(3)]
+
+    service.get_ocr_result_list(image_list[0])
+    service.get_ocr_result_list(image_list[1])
+    service.get_ocr_result_list(image_list[0])  # 0最近使用 1最久未使用
+    service.get_ocr_result_list(image_list[2])  # 淘汰1
+    assert matcher.ocr_cnt == 3
+
+    service.get_ocr_result_list(image_list[0])
+    assert matcher.ocr_cnt == 3
+    service.get_ocr_result_list(image_list[1])
+    assert matcher.ocr_cnt == 4
+
+    stats = service.get_cache_stats()
+    assert stats.entry_cnt == 2
+    assert stats.evict == 2
+
+
+def test_lru_evict_by_bytes():
+    image = _new_image()
+    service = OcrService(CountingOcrMatcher(), max_cache_bytes=image.nbytes * 2)
+
+    for i in range(3):
+        service.get_ocr_result_list(_new_image(i * 10))
+
+    stats = service.get_cache_stats()
+    assert stats.entry_cnt == 2
+    assert stats.total_bytes == image.nbytes * 2
+
+
+def test_sub_rect_reuse():
+    matcher = CountingOcrMatcher()
+    service = OcrService(matcher)
+    rect = Rect(0, 0, 100, 50)
+
+    first = _new_image()
+    result_list = service.get_ocr_result_list(first, rect=rect)
+    assert [i.data for i in result_list] == ['开始']
+
+    # 区域外变化 复用上一帧结果
+    second = first.copy()
+    second[300:, 500:] = 255
+    result_list = service.get_ocr_result_list(second, rect=rect)
+    assert [i.data for i in result_list] == ['开始']
+    assert matcher.ocr_cnt == 1
+    assert service.get_cache_stats().sub_rect_hit == 1
+
+    # 区域内变化 需要重新识别
+    third = first.copy()
+    third[10:20, 10:20] = 255
+    service.get_ocr_result_list(third, rect=rect)
+    assert matcher.ocr_cnt == 2
+
+    # 不指定区域时不复用
+    fourth = first.copy()
+    fourth[300:, 400:] = 128
+    service.get_ocr_result_list(fourth)
+    assert matcher.ocr_cnt == 3
+
+
+def test_sub_rect_reuse_disabled():
+    matcher = CountingOcrMatcher()
+    service = OcrService(matcher, reuse_sub_rect=False)
+    rect = Rect(0, 0, 100, 50)
+
+    first = _new_image()
+    service.get_ocr_result_list(first, rect=rect)
+    second = first.copy()
+    second[300:, 500:] = 255
+    service.get_ocr_result_list(second, rect=rect)
+    assert matcher.ocr_cnt == 2
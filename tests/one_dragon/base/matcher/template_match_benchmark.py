@@ -0,0 +1,376 @@
+"""
+模板匹配性能基准
+
+加载 assets/template 下所有模板 在 1920x1080 的画面上计时
+- cv2_utils.match_template
+- TemplateMatcher.match_template
+- TemplateMatcher.match_one_by_feature (需要 --feature)
+
+按模板尺寸和掩码类型汇总 输出 p50/p95/p99 与吞吐量到 JSON 并可以对比两次结果
+
+运行
+    python tests/one_dragon/base/matcher/template_match_benchmark.py run -o base.json
+    python tests/one_dragon/base/matcher/template_match_benchmark.py compare base.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'src'))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+from cv2.typing import MatLike  # noqa: E402
+
+from one_dragon.base.matcher.template_matcher import TemplateMatcher  # noqa: E402
+from one_dragon.base.screen.template_info import TemplateInfo  # noqa: E402
+from one_dragon.base.screen.template_loader import TemplateLoader  # noqa: E402
+from one_dragon.utils import cv2_utils  # noqa: E402
+
+SCREEN_WIDTH: int = 1920
+SCREEN_HEIGHT: int = 1080
+
+METHOD_CV2 = 'cv2_utils.match_template'
+METHOD_TM = 'TemplateMatcher.match_template'
+METHOD_FEATURE = 'TemplateMatcher.match_one_by_feature'
+
+
+def get_size_bucket(template: MatLike) -> str:
+    """
+    按模板最长边分桶
+    :param template: 模板图片
+    :return: 分桶名称
+    """
+    max_side = max(template.shape[0], template.shape[1])
+    for limit in [32, 64, 128, 256, 512]:
+        if max_side <= limit:
+            return f'<={limit}'
+    return '>512'
+
+
+def get_mask_type(mask: Optional[MatLike]) -> str:
+    """
+    掩码类型
+    :param mask: 掩码
+    :return: none=无掩码 full=掩码全选 partial=部分掩码
+    """
+    if mask is None:
+        return 'none'
+    if np.all(mask > 0):
+        return 'full'
+    return 'partial'
+
+
+def cal_stats(cost_list: List[float]) -> Dict[str, float]:
+    """
+    计算耗时统计
+    :param cost_list: 每次的耗时 秒
+    :return: 毫秒为单位的统计 以及每秒可执行次数
+    """
+    arr = np.array(cost_list, dtype=np.float64) * 1000
+    mean = float(arr.mean())
+    return {
+        'cnt': int(arr.size),
+        'mean': mean,
+        'p50': float(np.percentile(arr, 50)),
+        'p95': float(np.percentile(arr, 95)),
+        'p99': float(np.percentile(arr, 99)),
+        'throughput': 1000.0 / mean if mean > 0 else 0.0,
+    }
+
+
+def load_screens(screen_dir: Optional[str], screen_cnt: int, seed: int) -> List[MatLike]:
+    """
+    加载用于匹配的画面 没有指定文件夹时使用随机噪声合成
+    :param screen_dir: 截图文件夹
+    :param screen_cnt: 合成画面的数量
+    :param seed: 随机种子
+    :return: RGB 画面列表 统一为 1920x1080
+    """
+    screen_list: List[MatLike] = []
+    if screen_dir is not None:
+        for file_name in sorted(os.listdir(screen_dir)):
+            if not file_name.lower().endswith(('.png', '.jpg', '.webp')):
+                continue
+            screen = cv2_utils.read_image(os.path.join(screen_dir, file_name))
+            if screen is None or screen.ndim != 3:
+                continue
+            if screen.shape[0] != SCREEN_HEIGHT or screen.shape[1] != SCREEN_WIDTH:
+                screen = cv2.resize(screen, (SCREEN_WIDTH, SCREEN_HEIGHT))
+            screen_list.append(screen)
+
+    if len(screen_list) == 0:
+        rng = np.random.default_rng(seed)
+        for _ in range(screen_cnt):
+            # 低频噪声 比纯白噪声更接近游戏画面 也不会让特征点数量失真
+            small = rng.integers(0, 256, (SCREEN_HEIGHT // 8, SCREEN_WIDTH // 8, 3), dtype=np.uint8)
+            screen_list.append(cv2.resize(small, (SCREEN_WIDTH, SCREEN_HEIGHT), interpolation=cv2.INTER_LINEAR))
+
+    return screen_list
+
+
+def make_source(screen: MatLike, template: MatLike, rng: random.Random) -> MatLike:
+    """
+    把模板贴到画面的随机位置 保证每次都存在一个匹配结果
+    :param screen: 画面
+    :param template: 模板
+    :param rng: 随机
+    :return: 新画面
+    """
+    source = screen.copy()
+    th, tw = template.shape[:2]
+    if th > SCREEN_HEIGHT or tw > SCREEN_WIDTH:
+        return source
+    x = rng.randint(0, SCREEN_WIDTH - tw)
+    y = rng.randint(0, SCREEN_HEIGHT - th)
+    source[y:y + th, x:x + tw] = template
+    return source
+
+
+def time_method(func: Callable[[], Any], repeat: int) -> List[float]:
+    """
+    计时 第一次运行作为预热不计入
+    :param func: 需要计时的方法
+    :param repeat: 计时次数
+    :return: 每次的耗时
+    """
+    func()
+    cost_list: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        cost_list.append(time.perf_counter() - start)
+    return cost_list
+
+
+def run_benchmark(
+        screen_dir: Optional[str] = None,
+        sub_dir_list: Optional[List[str]] = None,
+        repeat: int = 5,
+        limit: int = 0,
+        with_feature: bool = False,
+        seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    运行基准测试
+    :param screen_dir: 截图文件夹 为空时合成画面
+    :param sub_dir_list: 只测试这些模板子文件夹
+    :param repeat: 每个模板每个方法的计时次数
+    :param limit: 最多测试多少个模板 0为不限制
+    :param with_feature: 是否测试特征匹配
+    :param seed: 随机种子
+    :return: 结果
+    """
+    rng = random.Random(seed)
+    template_loader = TemplateLoader()
+    tm = TemplateMatcher(template_loader)
+
+    template_list: List[TemplateInfo] = template_loader.get_all_template_info_from_disk(need_raw=True)
+    template_list = [t for t in template_list if t.raw is not None]
+    if sub_dir_list:
+        template_list = [t for t in template_list if t.sub_dir in sub_dir_list]
+    template_list.sort(key=lambda t: (t.sub_dir, t.template_id))
+    if limit > 0:
+        template_list = template_list[:limit]
+
+    screen_list = load_screens(screen_dir, screen_cnt=3, seed=seed)
+
+    method_list = [METHOD_CV2, METHOD_TM]
+    if with_feature:
+        method_list.append(METHOD_FEATURE)
+
+    template_result_list: List[Dict[str, Any]] = []
+    group_cost: Dict[str, Dict[str, List[float]]] = {}
+    method_cost: Dict[str, List[float]] = {method: [] for method in method_list}
+
+    for template in template_list:
+        raw = template.raw
+        if raw.shape[0] > SCREEN_HEIGHT or raw.shape[1] > SCREEN_WIDTH:
+            continue
+        source = make_source(rng.choice(screen_list), raw, rng)
+        size_bucket = get_size_bucket(raw)
+        mask_type = get_mask_type(template.mask)
+        group_key = f'{size_bucket}|{mask_type}'
+
+        def _cv2_match():
+            cv2_utils.match_template(source, raw, 0.7, mask=template.mask, only_best=True, ignore_inf=True)
+
+        def _tm_match():
+            tm.match_template(source, template.sub_dir, template.template_id, threshold=0.7)
+
+        def _feature_match():
+            tm.match_one_by_feature(source, template.sub_dir, template.template_id)
+
+        method_2_func = {
+            METHOD_CV2: _cv2_match,
+            METHOD_TM: _tm_match,
+            METHOD_FEATURE: _feature_match,
+        }
+
+        method_stats: Dict[str, Dict[str, float]] = {}
+        for method in method_list:
+            try:
+                cost_list = time_method(method_2_func[method], repeat)
+            except cv2.error:
+                continue
+            method_stats[method] = cal_stats(cost_list)
+            method_cost[method].extend(cost_list)
+            group_cost.setdefault(group_key, {}).setdefault(method, []).extend(cost_list)
+
+        template_result_list.append({
+            'key': f'{template.sub_dir}/{template.template_id}',
+            'width': int(raw.shape[1]),
+            'height': int(raw.shape[0]),
+            'size_bucket': size_bucket,
+            'mask_type': mask_type,
+            'methods': method_stats,
+        })
+
+    return {
+        'meta': {
+            'create_time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'screen_dir': screen_dir,
+            'screen_size': [SCREEN_WIDTH, SCREEN_HEIGHT],
+            'repeat': repeat,
+            'seed': seed,
+            'template_cnt': len(template_result_list),
+        },
+        'methods': {method: cal_stats(cost) for method, cost in method_cost.items() if len(cost) > 0},
+        'groups': {
+            group_key: {method: cal_stats(cost) for method, cost in method_2_cost.items()}
+            for group_key, method_2_cost in sorted(group_cost.items())
+        },
+        'templates': template_result_list,
+    }
+
+
+def compare_result(
+        base: Dict[str, Any],
+        current: Dict[str, Any],
+        metric: str = 'p50',
+        tolerance: float = 0.2,
+        min_ms: float = 0.5,
+) -> List[Dict[str, Any]]:
+    """
+    对比两次结果 找出变慢的模板
+    :param base: 基准结果
+    :param current: 本次结果
+    :param metric: 对比的指标
+    :param tolerance: 允许变慢的比例
+    :param min_ms: 基准耗时低于这个值的不判断 避免计时噪声
+    :return: 变慢的项 按变慢比例倒序
+    """
+    base_map = {t['key']: t for t in base.get('templates', [])}
+    regression_list: List[Dict[str, Any]] = []
+    for template in current.get('templates', []):
+        base_template = base_map.get(template['key'])
+        if base_template is None:
+            continue
+        for method, stats in template['methods'].items():
+            base_stats = base_template['methods'].get(method)
+            if base_stats is None or base_stats[metric] < min_ms:
+                continue
+            ratio = stats[metric] / base_stats[metric]
+            if ratio > 1 + tolerance:
+                regression_list.append({
+                    'key': template['key'],
+                    'method': method,
+                    'base': base_stats[metric],
+                    'current': stats[metric],
+                    'ratio': ratio,
+                })
+
+    regression_list.sort(key=lambda i: i['ratio'], reverse=True)
+    return regression_list
+
+
+def print_summary(result: Dict[str, Any], top: int = 20) -> None:
+    """
+    打印汇总 以及最耗时的模板
+    :param result: 结果
+    :param top: 打印多少个最耗时的模板
+    """
+    for method, stats in result['methods'].items():
+        print(f"{method}: p50={stats['p50']:.3f}ms p95={stats['p95']:.3f}ms p99={stats['p99']:.3f}ms "
+              f"throughput={stats['throughput']:.1f}/s")
+
+    for group_key, method_2_stats in result['groups'].items():
+        for method, stats in method_2_stats.items():
+            print(f"[{group_key}] {method}: p50={stats['p50']:.3f}ms p95={stats['p95']:.3f}ms")
+
+    slowest = sorted(
+        result['templates'],
+        key=lambda t: t['methods'].get(METHOD_TM, {}).get('p50', 0),
+        reverse=True,
+    )
+    for template in slowest[:top]:
+        stats = template['methods'].get(METHOD_TM)
+        if stats is None:
+            continue
+        print(f"{template['key']} {template['width']}x{template['height']} {template['mask_type']}: "
+              f"p50={stats['p50']:.3f}ms")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='模板匹配性能基准')
+    sub_parsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub_parsers.add_parser('run', help='运行基准测试')
+    run_parser.add_argument('-o', '--output', required=True, help='结果JSON路径')
+    run_parser.add_argument('--screen-dir', default=None, help='截图文件夹 不传时合成画面')
+    run_parser.add_argument('--sub-dir', action='append', default=None, help='只测试某个模板子文件夹 可传多次')
+    run_parser.add_argument('--repeat', type=int, default=5, help='每个模板的计时次数')
+    run_parser.add_argument('--limit', type=int, default=0, help='最多测试多少个模板')
+    run_parser.add_argument('--feature', action='store_true', help='同时测试特征匹配')
+    run_parser.add_argument('--seed', type=int, default=0, help='随机种子')
+
+    compare_parser = sub_parsers.add_parser('compare', help='对比两次结果')
+    compare_parser.add_argument('base', help='基准结果JSON')
+    compare_parser.add_argument('current', help='本次结果JSON')
+    compare_parser.add_argument('--metric', default='p50', choices=['mean', 'p50', 'p95', 'p99'])
+    compare_parser.add_argument('--tolerance', type=float, default=0.2, help='允许变慢的比例')
+    compare_parser.add_argument('--min-ms', type=float, default=0.5, help='基准耗时低于这个值的不判断')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        result = run_benchmark(
+            screen_dir=args.screen_dir,
+            sub_dir_list=args.sub_dir,
+            repeat=args.repeat,
+            limit=args.limit,
+            with_feature=args.feature,
+            seed=args.seed,
+        )
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+        print_summary(result)
+        return 0
+
+    with open(args.base, encoding='utf-8') as file:
+        base = json.load(file)
+    with open(args.current, encoding='utf-8') as file:
+        current = json.load(file)
+    regression_list = compare_result(base, current, metric=args.metric,
+                                     tolerance=args.tolerance, min_ms=args.min_ms)
+    for item in regression_list:
+        print(f"{item['key']} {item['method']}: {item['base']:.3f}ms -> {item['current']:.3f}ms "
+              f"({item['ratio']:.2f}x)")
+    print(f'变慢 {len(regression_list)} 项')
+    return 1 if len(regression_list) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
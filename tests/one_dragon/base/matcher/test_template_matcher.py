@@ -0,0 +1,122 @@
+"""模板批量匹配测试"""
+from typing import Optional
+
+import cv2
+import numpy as np
+import pytest
+from cv2.typing import MatLike
+
+from one_dragon.base.matcher.template_matcher import TemplateMatcher, _TemplateGroup
+from one_dragon.base.screen.template_info import TemplateInfo
+from one_dragon.base.screen.template_loader import TemplateLoader
+
+SUB_DIR = '_test_template_matcher'
+
+
+def _random_image(rng: np.random.Generator, h: int, w: int) -> MatLike:
+    return rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+
+
+def _circle_mask(h: int, w: int) -> MatLike:
+    mask = np.zeros((h, w), dtype=np.uint8)
+    cv2.circle(mask, (w // 2, h // 2), min(h, w) // 2 - 1, 255, -1)
+    return mask
+
+
+def _new_matcher(template_map: dict[str, tuple[MatLike, Optional[MatLike]]]) -> TemplateMatcher:
+    """模板只放在内存中 不读写硬盘"""
+    loader = TemplateLoader()
+    for template_id, (raw, mask) in template_map.items():
+        template = TemplateInfo(SUB_DIR, template_id)
+        template.raw = raw
+        template.mask = mask
+        loader.template['%s:%s' % (SUB_DIR, template_id)] = template
+    return TemplateMatcher(loader)
+
+
+@pytest.mark.parametrize('use_mask', [False, True])
+def test_group_match_equals_cv2(use_mask: bool):
+    rng = np.random.default_rng(0)
+    source = _random_image(rng, 120, 160)
+    template_list = [_random_image(rng, 24, 32) for _ in range(3)]
+    template_list[1] = source[50:74, 70:102].copy()  # 第2个模板在原图中
+    mask = _circle_mask(24, 32) if use_mask else None
+
+    group = _TemplateGroup([0, 1, 2], [], template_list, mask)
+    best_score, best_x, best_y = group.match(source.astype(np.float32))
+
+    for i, template in enumerate(template_list):
+        result = cv2.matchTemplate(source, template, cv2.TM_CCOEFF_NORMED, mask=mask)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        assert best_score[i] == pytest.approx(max_val, abs=1e-3)
+        assert (best_x[i], best_y[i]) == max_loc
+
+    assert best_score[1] == pytest.approx(1, abs=1e-3)
+    assert (best_x[1], best_y[1]) == (70, 50)
+
+
+def test_match_best_of_priority():
+    rng = np.random.default_rng(1)
+    source = _random_image(rng, 120, 160)
+    not_in_source = _random_image(rng, 24, 32)
+    in_source_1 = source[10:34, 10:42].copy()
+    in_source_2 = source[60:84, 100:132].copy()
+    tm = _new_matcher({
+        'a': (not_in_source, None),
+        'b': (in_source_1, None),
+        'c': (in_source_2, _circle_mask(24, 32)),
+    })
+
+    assert tm.match_best_of(source, SUB_DIR, ['a', 'c', 'b'], threshold=0.9)[0] == 'c'
+    assert tm.match_best_of(source, SUB_DIR, ['a', 'b', 'c'], threshold=0.9)[0] == 'b'
+    assert tm.match_best_of(source, SUB_DIR, ['a'], threshold=0.9) == (None, None)
+    assert tm.match_best_of(source, SUB_DIR, [], threshold=0.9) == (None, None)
+
+    template_id, mr = tm.match_best_of(source, SUB_DIR, ['a', 'c', 'b'], threshold=0.9, first_over_threshold=False)
+    assert template_id in ('b', 'c')
+    assert mr.confidence == pytest.approx(1, abs=1e-3)
+
+
+def test_match_best_of_first_hit_without_batch(monkeypatch):
+    rng = np.random.default_rng(2)
+    source = _random_image(rng, 120, 160)
+    tm = _new_matcher({
+        'a': (source[10:34, 10:42].copy(), None),
+        'b': (_random_image(rng, 24, 32), None),
+    })
+
+    def no_batch(*args, **kwargs):
+        raise AssertionError('第一个模板命中时不需要批量匹配')
+
+    monkeypatch.setattr(tm, '_match_batch', no_batch)
+    template_id, mr = tm.match_best_of(source, SUB_DIR, ['a', 'b'], threshold=0.9)
+    assert template_id == 'a'
+    assert (mr.x, mr.y) == (10, 10)
+
+
+def test_match_best_of_last_hit():
+    rng = np.random.default_rng(3)
+    source = _random_image(rng, 120, 160)
+    tm = _new_matcher({
+        'a': (_random_image(rng, 24, 32), None),
+        'b': (_random_image(rng, 24, 32), None),
+        'c': (source[60:84, 100:132].copy(), None),
+    })
+    template_id_list = ['a', 'b', 'c']
+    key = (SUB_DIR, tuple(template_id_list), 'raw', False)
+
+    assert tm.match_best_of(source, SUB_DIR, template_id_list, threshold=0.9)[0] == 'c'
+    assert tm._last_hit_idx[key] == 2
+
+    # 上次命中的模板先单独匹配 依然需要确认更高优先级的模板没有命中
+    assert tm.match_best_of(source, SUB_DIR, template_id_list, threshold=0.9)[0] == 'c'
+    tm.template_loader.template['%s:a' % SUB_DIR].raw = source[10:34, 10:42].copy()
+    tm._group_cache.clear()
+    assert tm.match_best_of(source, SUB_DIR, template_id_list, threshold=0.9)[0] == 'a'
+    assert tm._last_hit_idx[key] == 0
+
+    # 上次命中的模板这次没有命中 批量匹配其余模板
+    tm.template_loader.template['%s:a' % SUB_DIR].raw = _random_image(rng, 24, 32)
+    tm._group_cache.clear()
+    assert tm.match_best_of(source, SUB_DIR, template_id_list, threshold=0.9)[0] == 'c'
+    assert tm._last_hit_idx[key] == 2
@@ -0,0 +1,115 @@
+"""推送分发测试"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('requests')
+
+from one_dragon.base.notify import push_dispatcher as dispatcher_module  # noqa: E402
+from one_dragon.base.notify.push import Push  # noqa: E402
+from one_dragon.base.notify.push_dispatcher import PushDispatcher, PushImage, TokenCache  # noqa: E402
+
+
+def test_coalesce():
+    dispatcher = PushDispatcher(coalesce_seconds=0.2, executor=ThreadPoolExecutor(max_workers=2))
+    sent = []
+
+    def channel_a(title, content, image):
+        sent.append(('a', title, content, image))
+
+    def channel_b(title, content, image):
+        raise ValueError('失败')
+
+    image1 = PushImage(b'1')
+    f1 = dispatcher.submit(('a',), channel_a, 't', 'm1', None)
+    f2 = dispatcher.submit(('a',), channel_a, 't', 'm2', image1)
+    f3 = dispatcher.submit(('a',), channel_a, 't', 'm3', image1)
+    f4 = dispatcher.submit(('b',), channel_b, 't', 'm1', None)
+
+    assert f1 is f2 is f3
+    f1.result(timeout=5)
+    assert sent == [('a', 't', 'm1\nm2\nm3', image1)]
+    with pytest.raises(ValueError):
+        f4.result(timeout=5)
+
+    # 窗口结束后的消息 是新的一批
+    f5 = dispatcher.submit(('a',), channel_a, 't', 'm4', None)
+    assert f5 is not f1
+    f5.result(timeout=5)
+    assert sent[-1] == ('a', 't', 'm4', None)
+
+
+def test_coalesce_keep_images():
+    """带不同图片的消息不合并 不能丢失任何一张图片"""
+    dispatcher = PushDispatcher(coalesce_seconds=0.2, executor=ThreadPoolExecutor(max_workers=1))
+    sent = []
+
+    def channel(title, content, image):
+        sent.append((content, image))
+
+    image1 = PushImage(b'1')
+    image2 = PushImage(b'2')
+    f1 = dispatcher.submit(('a',), channel, 't', 'm1', image1)
+    f2 = dispatcher.submit(('a',), channel, 't', 'm2', image2)
+    f3 = dispatcher.submit(('a',), channel, 't', 'm3', None)  # 合并到最后一批
+    f4 = dispatcher.submit(('a',), channel, 't', 'm4', image1)
+
+    assert f2 is f3
+    assert len({id(f1), id(f2), id(f4)}) == 3
+    for f in (f1, f2, f4):
+        f.result(timeout=5)
+    assert sent == [('m1', image1), ('m2\nm3', image2), ('m4', image1)]
+
+
+def test_token_cache():
+    cache = TokenCache(margin_seconds=0)
+    fetch_cnt = [0]
+
+    def fetcher():
+        fetch_cnt[0] += 1
+        return f'token{fetch_cnt[0]}', 0.1
+
+    assert cache.get(('k',), fetcher) == 'token1'
+    assert cache.get(('k',), fetcher) == 'token1'
+    time.sleep(0.15)
+    assert cache.get(('k',), fetcher) == 'token2'
+    cache.invalidate(('k',))
+    assert cache.get(('k',), fetcher) == 'token3'
+
+
+def test_push_image():
+    assert PushImage.of(None) is None
+    image = PushImage.of(BytesIO(b'abc'))
+    assert PushImage.of(image) is image
+    assert image.base64 == 'YWJj'
+    assert image.getvalue() == b'abc'
+
+
+def test_session_per_host():
+    session = dispatcher_module.get_session('https://example.com/a')
+    assert dispatcher_module.get_session('https://example.com/b?x=1') is session
+    assert dispatcher_module.get_session('https://example.org/a') is not session
+
+
+def test_push_send_coalesce(capsys, monkeypatch):
+    monkeypatch.setattr(dispatcher_module.push_dispatcher, 'coalesce_seconds', 0.3)
+    push_config = SimpleNamespace(custom_push_title='标题', console=True, data={'console': True})
+    ctx = SimpleNamespace(push_config=push_config, telemetry=None)
+
+    # 两个实例同时推送 合并成一条
+    thread_list = [
+        threading.Thread(target=Push(ctx).send, args=(f'消息{i}',))
+        for i in range(2)
+    ]
+    for t in thread_list:
+        t.start()
+    for t in thread_list:
+        t.join()
+
+    out = capsys.readouterr().out
+    assert out.count('标题') == 1
+    assert '消息0' in out and '消息1' in out
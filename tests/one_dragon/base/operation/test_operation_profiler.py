@@ -0,0 +1,154 @@
+"""指令性能记录测试"""
+import json
+import threading
+
+import pytest
+
+from one_dragon.base.operation.operation_profiler import OperationProfiler
+from one_dragon.base.operation.operation_round_result import OperationRoundResult, OperationRoundResultEnum
+
+
+@pytest.fixture
+def profiler() -> OperationProfiler:
+    profiler = OperationProfiler()
+    profiler.start('test')
+    return profiler
+
+
+def run_nested(profiler: OperationProfiler) -> None:
+    """外层节点截图后 运行一个嵌套指令 嵌套指令的节点中进行OCR和模板匹配"""
+    with profiler.node_round('外层指令', '节点1') as outer:
+        with profiler.section('screenshot'):
+            pass
+        with profiler.node_round('内层指令', '节点A') as inner:
+            with profiler.section('ocr'):
+                pass
+            with profiler.section('template', 'match_best_of'):
+                with profiler.section('template', 'match_template'):  # 同类型嵌套只统计外层
+                    pass
+            inner.set_result(OperationRoundResult(OperationRoundResultEnum.SUCCESS))
+        outer.set_result(OperationRoundResult(OperationRoundResultEnum.RETRY, status='重试'))
+
+
+def test_disabled():
+    profiler = OperationProfiler()
+    with profiler.node_round('指令', '节点') as frame:
+        frame.set_result(OperationRoundResult(OperationRoundResultEnum.WAIT))
+        with profiler.section('ocr'):
+            pass
+
+    assert profiler.get_node_stats() == []
+    assert profiler.to_chrome_trace()['traceEvents'] == []
+
+
+def test_node_stats(profiler: OperationProfiler):
+    run_nested(profiler)
+    run_nested(profiler)
+    profiler.stop()
+
+    stats_map = {(i.op_name, i.node_name): i for i in profiler.get_node_stats()}
+    outer = stats_map[('外层指令', '节点1')]
+    inner = stats_map[('内层指令', '节点A')]
+
+    assert outer.round_cnt == 2
+    assert outer.retry_cnt == 2
+    assert outer.screenshot_time > 0
+    assert outer.ocr_time == 0  # 嵌套指令中的耗时统计在嵌套指令的节点上
+    assert outer.wall_time >= inner.wall_time
+
+    assert inner.round_cnt == 2
+    assert inner.retry_cnt == 0
+    assert inner.ocr_time > 0
+    assert inner.template_time > 0
+
+
+def test_other_thread(profiler: OperationProfiler):
+    """其它线程中没有节点 不记录事件 只做汇总统计"""
+    def run():
+        for _ in range(3):
+            with profiler.section('yolo', 'detector'):
+                with profiler.section('yolo', 'inner'):  # 同类型嵌套只统计外层
+                    pass
+
+    with profiler.node_round('指令', '节点'):
+        t = threading.Thread(target=run)
+        t.start()
+        t.join()
+    profiler.stop()
+
+    stats = profiler.get_node_stats()[0]
+    assert stats.yolo_time == 0
+    events = [i for i in profiler.to_chrome_trace()['traceEvents'] if i['ph'] == 'X']
+    assert [i['name'] for i in events] == ['节点']
+
+    off_node_stats = profiler.get_off_node_stats()
+    assert len(off_node_stats) == 1
+    assert (off_node_stats[0].category, off_node_stats[0].name, off_node_stats[0].cnt) == ('yolo', 'detector', 3)
+    assert off_node_stats[0].total_time > 0
+
+
+def test_max_events():
+    """超过最大数量后丢弃最早的事件 统计不受影响"""
+    profiler = OperationProfiler(max_events=4)
+    profiler.start('test')
+    for i in range(3):
+        with profiler.node_round('指令', f'节点{i}'):
+            with profiler.section('ocr'):
+                pass
+    profiler.stop()
+
+    assert profiler.dropped_event_cnt == 2
+    data = profiler.to_chrome_trace()
+    assert data['otherData']['dropped_event_cnt'] == 2
+    events = [i for i in data['traceEvents'] if i['ph'] == 'X']
+    assert [i['name'] for i in events] == ['ocr', '节点1', 'ocr', '节点2']
+    assert sum(i.round_cnt for i in profiler.get_node_stats()) == 3
+
+    profiler.start('test')
+    assert profiler.dropped_event_cnt == 0
+
+
+def test_chrome_trace(profiler: OperationProfiler, tmp_path):
+    run_nested(profiler)
+    profiler.stop()
+
+    file_path = tmp_path / 'profile' / 'test.trace.json'
+    profiler.export_chrome_trace(str(file_path))
+    with open(file_path, encoding='utf-8') as file:
+        data = json.load(file)
+
+    events = [i for i in data['traceEvents'] if i['ph'] == 'X']
+    assert len(events) == 6
+    outer = next(i for i in events if i['name'] == '节点1')
+    assert outer['cat'] == 'node'
+    assert outer['args'] == {'op': '外层指令', 'result': 'RETRY', 'status': '重试'}
+    for event in events:  # 所有事件都在外层节点的时间范围内
+        assert outer['ts'] <= event['ts']
+        assert event['ts'] + event['dur'] <= outer['ts'] + outer['dur'] + 0.2
+
+
+def test_speedscope(profiler: OperationProfiler):
+    run_nested(profiler)
+    run_nested(profiler)
+    profiler.stop()
+
+    data = profiler.to_speedscope()
+    frame_name_list = [i['name'] for i in data['shared']['frames']]
+    assert '外层指令 节点1' in frame_name_list
+    assert len(frame_name_list) == len(set(frame_name_list))
+
+    assert len(data['profiles']) == 1
+    profile = data['profiles'][0]
+    # 开始和结束成对出现 且严格嵌套
+    stack = []
+    last_at = 0
+    for event in profile['events']:
+        assert event['at'] >= last_at
+        last_at = event['at']
+        if event['type'] == 'O':
+            stack.append(event['frame'])
+        else:
+            assert stack.pop() == event['frame']
+    assert stack == []
+    assert len(profile['events']) == 24
+    assert profile['endValue'] >= last_at
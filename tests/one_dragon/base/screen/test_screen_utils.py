@@ -0,0 +1,93 @@
+"""画面判断测试"""
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.base.matcher.match_result import MatchResultList
+from one_dragon.base.screen import screen_utils
+from one_dragon.base.screen.screen_area import ScreenArea
+from one_dragon.base.screen.screen_info import ScreenInfo
+
+
+class TestIsTargetScreen:
+
+    @pytest.fixture
+    def ctx(self):
+        """OCR结果由区域左上角决定 不使用OCR缓存"""
+        ctx = Mock()
+        ctx.env_config.ocr_cache = False
+        ctx.env_config.ocr_layout_cache = False
+        text_map = {0: '开始', 100: '结束'}
+
+        def run_ocr(image):
+            return {text_map.get(int(image[0, 0, 0]), ''): MatchResultList()}
+
+        ctx.ocr.run_ocr = Mock(side_effect=run_ocr)
+        ctx.ocr.run_ocr_batch = Mock(side_effect=lambda image_list: [run_ocr(i) for i in image_list])
+        return ctx
+
+    @pytest.fixture
+    def screen(self):
+        screen = np.zeros((200, 200, 3), dtype=np.uint8)
+        screen[100:, :, :] = 100
+        return screen
+
+    def _screen_info(self, *area_list: ScreenArea) -> ScreenInfo:
+        screen_info = ScreenInfo(create_new=True)
+        screen_info.area_list = list(area_list)
+        return screen_info
+
+    def test_multiple_text_area_batch(self, ctx, screen):
+        """测试第一个文本区域匹配后 其余文本区域一起识别"""
+        screen_info = self._screen_info(
+            ScreenArea('a', Rect(0, 0, 50, 50), text='开始', id_mark=True),
+            ScreenArea('b', Rect(0, 100, 50, 150), text='结束', id_mark=True),
+            ScreenArea('c', Rect(50, 100, 100, 150), text='结束', id_mark=True),
+            ScreenArea('d', Rect(0, 100, 50, 150), text='开始', id_mark=False),
+        )
+        assert screen_utils.is_target_screen(ctx, screen, screen_info=screen_info)
+        assert ctx.ocr.run_ocr.call_count == 1
+        assert ctx.ocr.run_ocr_batch.call_count == 1
+        assert len(ctx.ocr.run_ocr_batch.call_args[0][0]) == 2
+
+        screen_info.area_list[1].text = '开始'
+        assert not screen_utils.is_target_screen(ctx, screen, screen_info=screen_info)
+
+    def test_first_text_area_not_matched(self, ctx, screen):
+        """测试第一个文本区域不匹配时 直接返回 不识别其余区域"""
+        screen_info = self._screen_info(
+            ScreenArea('a', Rect(0, 0, 50, 50), text='结束', id_mark=True),
+            ScreenArea('b', Rect(0, 100, 50, 150), text='结束', id_mark=True),
+            ScreenArea('c', Rect(50, 100, 100, 150), text='结束', id_mark=True),
+        )
+        assert not screen_utils.is_target_screen(ctx, screen, screen_info=screen_info)
+        assert ctx.ocr.run_ocr.call_count == 1
+        ctx.ocr.run_ocr_batch.assert_not_called()
+
+    def test_two_text_area(self, ctx, screen):
+        """测试两个文本区域时 逐个识别"""
+        screen_info = self._screen_info(
+            ScreenArea('a', Rect(0, 0, 50, 50), text='开始', id_mark=True),
+            ScreenArea('b', Rect(0, 100, 50, 150), text='结束', id_mark=True),
+        )
+        assert screen_utils.is_target_screen(ctx, screen, screen_info=screen_info)
+        assert ctx.ocr.run_ocr.call_count == 2
+        ctx.ocr.run_ocr_batch.assert_not_called()
+
+    def test_single_text_area(self, ctx, screen):
+        """测试只有一个文本区域时 不使用批量识别"""
+        screen_info = self._screen_info(
+            ScreenArea('a', Rect(0, 0, 50, 50), text='开始', id_mark=True),
+        )
+        assert screen_utils.is_target_screen(ctx, screen, screen_info=screen_info)
+        ctx.ocr.run_ocr_batch.assert_not_called()
+
+    def test_no_id_mark(self, ctx, screen):
+        """测试没有标识区域"""
+        screen_info = self._screen_info(
+            ScreenArea('a', Rect(0, 0, 50, 50), text='开始', id_mark=False),
+        )
+        assert not screen_utils.is_target_screen(ctx, screen, screen_info=screen_info)
+        ctx.ocr.run_ocr.assert_not_called()
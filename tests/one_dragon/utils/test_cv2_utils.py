@@ -0,0 +1,50 @@
+"""模板匹配结果的峰值提取测试"""
+import numpy as np
+
+from one_dragon.utils import cv2_utils
+
+
+def make_result(peak_list) -> np.ndarray:
+    result = np.zeros((60, 60), dtype=np.float32)
+    for x, y, conf in peak_list:
+        result[y, x] = conf
+    return result
+
+
+def to_tuple_list(data: np.ndarray):
+    return [(int(i['x']), int(i['y']), round(float(i['confidence']), 4)) for i in data]
+
+
+def test_diagonal_peaks():
+    # 对角线距离 12.7 超过合并距离 两个都要保留
+    result = make_result([(10, 10, 0.9), (19, 19, 0.8)])
+    data = cv2_utils.find_peaks_with_nms(result, 0.5, 5, 5, merge_distance=10)
+    assert to_tuple_list(data) == [(10, 10, 0.9), (19, 19, 0.8)]
+
+
+def test_chain_peaks():
+    # 中间的点被最高点抑制后 不应再抑制更远处的点
+    result = make_result([(10, 30, 0.9), (18, 30, 0.85), (26, 30, 0.8)])
+    data = cv2_utils.find_peaks_with_nms(result, 0.5, 5, 5, merge_distance=10)
+    assert to_tuple_list(data) == [(10, 30, 0.9), (26, 30, 0.8)]
+
+
+def test_order():
+    # 按置信度倒序 置信度相同时按先行后列
+    result = make_result([(40, 5, 0.7), (5, 40, 0.95), (20, 5, 0.7), (50, 50, 0.8)])
+    data = cv2_utils.find_peaks_with_nms(result, 0.5, 5, 5, merge_distance=10)
+    assert to_tuple_list(data) == [(5, 40, 0.95), (50, 50, 0.8), (20, 5, 0.7), (40, 5, 0.7)]
+
+    data = cv2_utils.find_peaks_with_nms(result, 0.5, 5, 5, merge_distance=10, max_result_cnt=2)
+    assert to_tuple_list(data) == [(5, 40, 0.95), (50, 50, 0.8)]
+
+
+def test_match_template_multi():
+    rng = np.random.default_rng(0)
+    template = rng.integers(0, 255, (8, 8, 3), dtype=np.uint8)
+    source = np.zeros((60, 60, 3), dtype=np.uint8)
+    for x, y in [(5, 5), (14, 14), (40, 20)]:
+        source[y:y + 8, x:x + 8] = template
+
+    result_list = cv2_utils.match_template(source, template, 0.99, only_best=False)
+    assert sorted((i.x, i.y) for i in result_list) == [(5, 5), (14, 14), (40, 20)]
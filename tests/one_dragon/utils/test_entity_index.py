@@ -0,0 +1,65 @@
+"""实体名称索引测试 与直接遍历全部名称的结果对比"""
+import difflib
+import random
+from typing import List
+
+import pytest
+
+from one_dragon.utils import str_utils
+from one_dragon.utils.entity_index import EntityIndex
+
+ALPHABET = '零号空洞旧都列车战斗aAbB'
+
+
+def random_text(rng: random.Random, max_len: int) -> str:
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_len)))
+
+
+def random_name_list(rng: random.Random) -> List[str]:
+    name_list = [random_text(rng, 8) for _ in range(rng.randint(1, 60))]
+    name_list.append(rng.choice(name_list))  # 重复的名称
+    return name_list
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_difflib(seed):
+    rng = random.Random(seed)
+    name_list = random_name_list(rng)
+    index = EntityIndex(name_list, gt_model=None)
+
+    for _ in range(20):
+        word = random_text(rng, 8)
+        cutoff = rng.choice([0, 0.1, 0.5, 0.6, 1])
+        expected = [name_list.index(i) for i in difflib.get_close_matches(word, name_list, n=2, cutoff=cutoff)]
+        assert index.get_close_matches(word, n=2, cutoff=cutoff) == expected
+        assert index.find_best_match_by_difflib(word, cutoff=cutoff) == str_utils.find_best_match_by_difflib(word, name_list, cutoff=cutoff)
+
+    word_list = [random_text(rng, 8) for _ in range(5)] + [rng.choice(name_list)]
+    assert index.find_most_similar(word_list) == str_utils.find_most_similar(word_list, name_list)
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_lcs_candidates(seed):
+    rng = random.Random(seed)
+    name_list = random_name_list(rng)
+    index = EntityIndex(name_list, gt_model=None, ignore_case=True)
+
+    for _ in range(20):
+        text = random_text(rng, 12)
+        percent = rng.choice([0.3, 0.5, 1])
+        candidate_set = set(index.get_lcs_candidates(text, percent))
+        for idx, name in enumerate(name_list):
+            # 候选以外的实体 与文本的任何后缀都不匹配
+            suffix = text[-len(name):]
+            if str_utils.find_by_lcs(name, text, percent=percent) or str_utils.find_by_lcs(name, suffix, percent=percent):
+                assert idx in candidate_set
+
+
+def test_exact():
+    entity_list = [('A', '零号空洞'), ('B', '旧都列车'), ('C', '零号空洞')]
+    index = EntityIndex(entity_list, name_getter=lambda i: i[1], gt_model=None)
+
+    assert index.get_by_name('零号空洞') is entity_list[0]
+    assert index.get_by_name('不存在') is None
+    assert index.get_idx_by_text('旧都列车') == 1
+    assert index.get_text(2) == '零号空洞'
@@ -0,0 +1,92 @@
+"""位并行文本匹配测试 与原来的动态规划实现逐个对比"""
+import random
+from typing import List
+
+import pytest
+
+from one_dragon.utils import str_utils, text_match_utils
+
+ALPHABET_LIST = ['ab', 'abc', 'aAbB', '零号空洞aA1', 'İiIı']
+
+
+def dp_lcs_length(str1: str, str2: str) -> int:
+    """原来的最长公共子序列实现"""
+    m = len(str1)
+    n = len(str2)
+    dp = [[0] * (n + 1) for _ in range(m + 1)]
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            if str1[i - 1] == str2[j - 1]:
+                dp[i][j] = dp[i - 1][j - 1] + 1
+            else:
+                dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
+    return dp[m][n]
+
+
+def dp_levenshtein_distance(s1: str, s2: str) -> int:
+    """原来的编辑距离实现"""
+    if len(s1) < len(s2):
+        return dp_levenshtein_distance(s2, s1)
+    if len(s2) == 0:
+        return len(s1)
+    previous_row = range(len(s2) + 1)
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            current_row.append(min(previous_row[j + 1] + 1, current_row[j] + 1, previous_row[j] + (c1 != c2)))
+        previous_row = current_row
+    return previous_row[-1]
+
+
+def random_text(rng: random.Random, alphabet: str, max_len: int) -> str:
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_len)))
+
+
+def random_case(seed: int) -> tuple[str, List[str]]:
+    """随机的查询文本和目标文本列表 目标文本长度覆盖64位上下"""
+    rng = random.Random(seed)
+    alphabet = rng.choice(ALPHABET_LIST)
+    query = random_text(rng, alphabet, 40)
+    text_list = [random_text(rng, alphabet, rng.choice([5, 20, 100])) for _ in range(rng.randint(0, 8))]
+    return query, text_list
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_matcher(seed):
+    query, text_list = random_case(seed)
+
+    matcher = text_match_utils.TextMatcher(text_list)
+    assert matcher.lcs_length_list(query) == [dp_lcs_length(query, i) for i in text_list]
+    assert matcher.levenshtein_distance_list(query) == [dp_levenshtein_distance(query, i) for i in text_list]
+
+    matcher = text_match_utils.TextMatcher(text_list, ignore_case=True)
+    assert matcher.lcs_length_list(query) == [dp_lcs_length(query.lower(), i.lower()) for i in text_list]
+    assert matcher.levenshtein_distance_list(query) == [dp_levenshtein_distance(query.lower(), i.lower()) for i in text_list]
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_pair(seed):
+    query, text_list = random_case(seed)
+    for text in text_list + ['']:
+        assert text_match_utils.lcs_length(query, text) == dp_lcs_length(query, text)
+        assert text_match_utils.lcs_length(text, query) == dp_lcs_length(text, query)
+        assert text_match_utils.levenshtein_distance(query, text) == dp_levenshtein_distance(query, text)
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_find_by_lcs_list(seed):
+    query, text_list = random_case(seed)
+    percent = random.Random(seed).choice([0.3, 0.5, 1])
+    text_list.append(None)
+
+    expected = [str_utils.find_by_lcs(query, i, percent=percent) for i in text_list]
+    assert str_utils.find_by_lcs_list(query, text_list, percent=percent) == expected
+
+
+def test_find_best_match():
+    assert str_utils.find_best_match_by_lcs('零号空洞', ['零号', '空洞零号', '旧都列车']) == 0
+    assert str_utils.find_best_match_by_lcs('零号空洞', ['旧都列车', '空']) == 1
+    assert str_utils.find_best_match_by_lcs('零号空洞', ['旧都列车', '空'], lcs_percent_threshold=1.1) is None
+
+    assert str_utils.find_best_match_by_similarity('攻击', ['', '攻击力', '攻击']) == ('攻击', 1.0)
+    assert str_utils.find_best_match_by_similarity('防御', ['攻击力', '攻击']) == (None, 0.0)
@@ -0,0 +1,255 @@
+"""
+文本匹配性能基准
+
+模拟 一个OCR目标 对 一张画面的多个OCR结果 的匹配 计时
+- dp: 原来逐对计算的动态规划实现
+- pair: 逐对调用位并行实现
+- batch: TextMatcher 一次计算所有OCR结果
+
+分别统计 最长公共子序列长度 和 编辑距离 输出 p50/p95/p99 与吞吐量到 JSON 并可以对比两次结果
+
+运行
+    python tests/one_dragon/utils/text_match_benchmark.py run -o base.json
+    python tests/one_dragon/utils/text_match_benchmark.py compare base.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'src'))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+import numpy as np  # noqa: E402
+
+from one_dragon.utils import text_match_utils  # noqa: E402
+
+ALPHABET = '零号空洞旧都列车战斗前往确认选择领取已挑战开始结束奖励商店购买攻击防御生命ABCDEabcde0123456789'
+
+
+def dp_lcs_length(str1: str, str2: str) -> int:
+    """原来的最长公共子序列实现"""
+    m = len(str1)
+    n = len(str2)
+    dp = [[0] * (n + 1) for _ in range(m + 1)]
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            if str1[i - 1] == str2[j - 1]:
+                dp[i][j] = dp[i - 1][j - 1] + 1
+            else:
+                dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
+    return dp[m][n]
+
+
+def dp_levenshtein_distance(s1: str, s2: str) -> int:
+    """原来的编辑距离实现"""
+    if len(s1) < len(s2):
+        return dp_levenshtein_distance(s2, s1)
+    if len(s2) == 0:
+        return len(s1)
+    previous_row = range(len(s2) + 1)
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            current_row.append(min(previous_row[j + 1] + 1, current_row[j] + 1, previous_row[j] + (c1 != c2)))
+        previous_row = current_row
+    return previous_row[-1]
+
+
+def cal_stats(cost_list: List[float]) -> Dict[str, float]:
+    """
+    计算耗时统计
+    :param cost_list: 每次的耗时 秒
+    :return: 微秒为单位的统计 以及每秒可执行次数
+    """
+    arr = np.array(cost_list, dtype=np.float64) * 1e6
+    mean = float(arr.mean())
+    return {
+        'cnt': int(arr.size),
+        'mean': mean,
+        'p50': float(np.percentile(arr, 50)),
+        'p95': float(np.percentile(arr, 95)),
+        'p99': float(np.percentile(arr, 99)),
+        'throughput': 1e6 / mean if mean > 0 else 0.0,
+    }
+
+
+def make_case_list(case_cnt: int, ocr_cnt: int, max_len: int, seed: int) -> List[tuple[str, List[str]]]:
+    """
+    生成 (OCR目标, OCR结果列表)
+    :param case_cnt: 画面数量
+    :param ocr_cnt: 每张画面的OCR结果数量
+    :param max_len: OCR结果的最大长度
+    :param seed: 随机种子
+    :return:
+    """
+    rng = random.Random(seed)
+    case_list = []
+    for _ in range(case_cnt):
+        query = ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(2, 10)))
+        text_list = [''.join(rng.choice(ALPHABET) for _ in range(rng.randint(1, max_len))) for _ in range(ocr_cnt)]
+        case_list.append((query, text_list))
+    return case_list
+
+
+def time_method(func: Callable[[str, List[str]], Any], case_list: List[tuple[str, List[str]]]) -> List[float]:
+    """
+    计时 第一个画面先运行一次作为预热不计入
+    :param func: 需要计时的方法
+    :param case_list: 画面列表
+    :return: 每个画面的耗时
+    """
+    func(*case_list[0])
+    cost_list: List[float] = []
+    for query, text_list in case_list:
+        start = time.perf_counter()
+        func(query, text_list)
+        cost_list.append(time.perf_counter() - start)
+    return cost_list
+
+
+def run_benchmark(
+        case_cnt: int = 2000,
+        ocr_cnt_list: Optional[List[int]] = None,
+        max_len: int = 20,
+        seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    运行基准测试
+    :param case_cnt: 每组的画面数量
+    :param ocr_cnt_list: 每张画面的OCR结果数量 每个数量一组
+    :param max_len: OCR结果的最大长度
+    :param seed: 随机种子
+    :return: 结果
+    """
+    if ocr_cnt_list is None:
+        ocr_cnt_list = [1, 10, 40]
+
+    method_2_func: Dict[str, Callable[[str, List[str]], Any]] = {
+        'lcs.dp': lambda q, tl: [dp_lcs_length(q, t) for t in tl],
+        'lcs.pair': lambda q, tl: [text_match_utils.lcs_length(q, t) for t in tl],
+        'lcs.batch': lambda q, tl: text_match_utils.TextMatcher(tl).lcs_length_list(q),
+        'levenshtein.dp': lambda q, tl: [dp_levenshtein_distance(q, t) for t in tl],
+        'levenshtein.pair': lambda q, tl: [text_match_utils.levenshtein_distance(q, t) for t in tl],
+        'levenshtein.batch': lambda q, tl: text_match_utils.TextMatcher(tl).levenshtein_distance_list(q),
+    }
+
+    groups: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for ocr_cnt in ocr_cnt_list:
+        case_list = make_case_list(case_cnt, ocr_cnt, max_len, seed)
+        groups[f'ocr_cnt={ocr_cnt}'] = {
+            method: cal_stats(time_method(func, case_list))
+            for method, func in method_2_func.items()
+        }
+
+    return {
+        'env': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'params': {
+            'case_cnt': case_cnt,
+            'ocr_cnt_list': ocr_cnt_list,
+            'max_len': max_len,
+            'seed': seed,
+        },
+        'groups': groups,
+    }
+
+
+def compare_result(
+        base: Dict[str, Any],
+        current: Dict[str, Any],
+        metric: str = 'p50',
+        tolerance: float = 0.2,
+) -> List[Dict[str, Any]]:
+    """
+    对比两次结果 找出变慢的项
+    :param base: 基准结果
+    :param current: 本次结果
+    :param metric: 对比的指标
+    :param tolerance: 允许变慢的比例
+    :return: 变慢的项 按变慢比例倒序
+    """
+    regression_list: List[Dict[str, Any]] = []
+    for group_key, method_2_stats in current.get('groups', {}).items():
+        base_group = base.get('groups', {}).get(group_key, {})
+        for method, stats in method_2_stats.items():
+            base_stats = base_group.get(method)
+            if base_stats is None or base_stats[metric] <= 0:
+                continue
+            ratio = stats[metric] / base_stats[metric]
+            if ratio > 1 + tolerance:
+                regression_list.append({
+                    'key': group_key,
+                    'method': method,
+                    'base': base_stats[metric],
+                    'current': stats[metric],
+                    'ratio': ratio,
+                })
+
+    regression_list.sort(key=lambda i: i['ratio'], reverse=True)
+    return regression_list
+
+
+def print_summary(result: Dict[str, Any]) -> None:
+    """
+    打印汇总
+    :param result: 结果
+    """
+    for group_key, method_2_stats in result['groups'].items():
+        for method, stats in method_2_stats.items():
+            print(f"[{group_key}] {method}: p50={stats['p50']:.1f}us p95={stats['p95']:.1f}us "
+                  f"throughput={stats['throughput']:.0f}/s")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='文本匹配性能基准')
+    sub_parsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub_parsers.add_parser('run', help='运行基准测试')
+    run_parser.add_argument('-o', '--output', required=True, help='结果JSON路径')
+    run_parser.add_argument('--case-cnt', type=int, default=2000, help='每组的画面数量')
+    run_parser.add_argument('--ocr-cnt', type=int, action='append', default=None, help='每张画面的OCR结果数量 可传多次')
+    run_parser.add_argument('--max-len', type=int, default=20, help='OCR结果的最大长度')
+    run_parser.add_argument('--seed', type=int, default=0, help='随机种子')
+
+    compare_parser = sub_parsers.add_parser('compare', help='对比两次结果')
+    compare_parser.add_argument('base', help='基准结果JSON')
+    compare_parser.add_argument('current', help='本次结果JSON')
+    compare_parser.add_argument('--metric', default='p50', choices=['mean', 'p50', 'p95', 'p99'])
+    compare_parser.add_argument('--tolerance', type=float, default=0.2, help='允许变慢的比例')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        result = run_benchmark(
+            case_cnt=args.case_cnt,
+            ocr_cnt_list=args.ocr_cnt,
+            max_len=args.max_len,
+            seed=args.seed,
+        )
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+        print_summary(result)
+        return 0
+
+    with open(args.base, encoding='utf-8') as file:
+        base = json.load(file)
+    with open(args.current, encoding='utf-8') as file:
+        current = json.load(file)
+    regression_list = compare_result(base, current, metric=args.metric, tolerance=args.tolerance)
+    for item in regression_list:
+        print(f"[{item['key']}] {item['method']}: {item['base']:.1f}us -> {item['current']:.1f}us "
+              f"({item['ratio']:.2f}x)")
+    print(f'变慢 {len(regression_list)} 项')
+    return 1 if len(regression_list) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
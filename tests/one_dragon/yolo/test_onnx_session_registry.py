@@ -0,0 +1,137 @@
+"""onnx会话管理测试"""
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from one_dragon.yolo.onnx_session_registry import OnnxSessionBudget, OnnxSessionRegistry
+
+onnx = pytest.importorskip('onnx')
+
+
+@pytest.fixture
+def model_path(tmp_path) -> str:
+    """一个简单的模型 y = relu(x + 1)"""
+    from onnx import TensorProto, helper
+
+    one = helper.make_tensor('one', TensorProto.FLOAT, [1], [1.0])
+    graph = helper.make_graph(
+        [helper.make_node('Add', ['x', 'one'], ['t']), helper.make_node('Relu', ['t'], ['y'])],
+        'test',
+        [helper.make_tensor_value_info('x', TensorProto.FLOAT, [None, 3])],
+        [helper.make_tensor_value_info('y', TensorProto.FLOAT, [None, 3])],
+        initializer=[one],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8
+    path = os.path.join(tmp_path, 'model.onnx')
+    onnx.save(model, path)
+    return path
+
+
+class TestOnnxSessionRegistry:
+
+    def test_reuse_session(self, model_path):
+        """测试相同模型和配置的会话只创建一次"""
+        registry = OnnxSessionRegistry()
+        session_1 = registry.get_session(model_path, ['CPUExecutionProvider'], session_name='ocr_det')
+        session_2 = registry.get_session(model_path, ['CPUExecutionProvider'], session_name='ocr_det')
+        assert session_1 is session_2
+        assert registry.session_cnt == 1
+
+        session_3 = registry.get_session(model_path, ['CPUExecutionProvider'], session_name='flash_classifier')
+        assert session_3 is not session_1
+        assert registry.session_cnt == 2
+
+        registry.release(model_path)
+        assert registry.session_cnt == 0
+
+    def test_budget(self, model_path):
+        """测试按名称配置线程数"""
+        registry = OnnxSessionRegistry()
+        registry.set_budget('test', OnnxSessionBudget(intra_op_threads=1, allow_spinning=False))
+        assert registry.get_budget('test').intra_op_threads == 1
+        assert registry.get_budget('not_existed').intra_op_threads == 0
+
+        session = registry.get_session(model_path, ['CPUExecutionProvider'], session_name='test')
+        result = session.run(['y'], {'x': np.array([[-3, 0, 1]], dtype=np.float32)})[0]
+        assert result.tolist() == [[0, 1, 2]]
+
+    def test_save_optimized_model(self, model_path):
+        """测试保存优化后的模型 第二次直接加载"""
+        optimized_path = OnnxSessionRegistry.get_optimized_model_path(model_path)
+        assert not os.path.exists(optimized_path)
+
+        OnnxSessionRegistry().get_session(model_path, ['CPUExecutionProvider'])
+        assert os.path.exists(optimized_path)
+
+        session = OnnxSessionRegistry().get_session(model_path, ['CPUExecutionProvider'])
+        result = session.run(['y'], {'x': np.array([[-3, 0, 1]], dtype=np.float32)})[0]
+        assert result.tolist() == [[0, 1, 2]]
+
+    def test_optimized_model_path_changed(self, model_path):
+        """测试原模型变化后 使用新的优化模型路径"""
+        path_1 = OnnxSessionRegistry.get_optimized_model_path(model_path)
+        with open(model_path, 'ab') as f:
+            f.write(b'')
+        os.utime(model_path, ns=(1, 1))
+        path_2 = OnnxSessionRegistry.get_optimized_model_path(model_path)
+        assert path_1 != path_2
+        assert OnnxSessionRegistry.get_optimized_model_path(model_path + '.not_existed') is None
+
+    def test_remove_stale_optimized_model(self, model_path):
+        """测试删除同一个模型过期的优化模型 不影响其他模型"""
+        model_dir = os.path.dirname(model_path)
+        stale_path = os.path.join(model_dir, 'model.optimized-000000000000.onnx')
+        other_path = os.path.join(model_dir, 'other.optimized-000000000000.onnx')
+        for path in [stale_path, other_path]:
+            with open(path, 'wb') as f:
+                f.write(b'stale')
+
+        OnnxSessionRegistry().get_session(model_path, ['CPUExecutionProvider'])
+        assert not os.path.exists(stale_path)
+        assert os.path.exists(other_path)
+        assert os.path.exists(OnnxSessionRegistry.get_optimized_model_path(model_path))
+
+    def test_create_session_outside_lock(self, model_path, tmp_path):
+        """测试创建会话时不阻塞其他模型 同一个会话并发获取时只创建一次"""
+        other_path = os.path.join(tmp_path, 'other.onnx')
+        with open(model_path, 'rb') as src, open(other_path, 'wb') as dst:
+            dst.write(src.read())
+
+        registry = OnnxSessionRegistry()
+        create_session = registry._create_session
+        creating = threading.Event()
+        can_finish = threading.Event()
+        created_path_list = []
+
+        def slow_create_session(path, providers, budget):
+            created_path_list.append(path)
+            if path == model_path:
+                creating.set()
+                can_finish.wait(5)
+            return create_session(path, providers, budget)
+
+        registry._create_session = slow_create_session
+
+        result_list = []
+        worker_list = [
+            threading.Thread(target=lambda: result_list.append(registry.get_session(model_path, ['CPUExecutionProvider'])))
+            for _ in range(4)
+        ]
+        for worker in worker_list:
+            worker.start()
+        assert creating.wait(5)
+
+        # 第一个模型还在创建 不影响其他模型
+        registry.get_session(other_path, ['CPUExecutionProvider'])
+
+        can_finish.set()
+        for worker in worker_list:
+            worker.join(5)
+
+        assert len(result_list) == 4
+        assert all(i is result_list[0] for i in result_list)
+        assert created_path_list.count(model_path) == 1
+        assert registry.session_cnt == 2
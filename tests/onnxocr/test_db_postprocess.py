@@ -0,0 +1,51 @@
+"""DB后处理测试"""
+import numpy as np
+import pytest
+
+from onnxocr.db_postprocess import DBPostProcess
+
+
+class SlowDBPostProcess(DBPostProcess):
+    """所有框都使用逐个处理的方法"""
+
+    @staticmethod
+    def get_axis_aligned_rect(bounding_box):
+        return None
+
+
+def _random_pred(rnd: np.random.Generator, height: int, width: int, rect_cnt: int) -> np.ndarray:
+    pred = rnd.uniform(0, 0.2, (height, width)).astype(np.float32)
+    for _ in range(rect_cnt):
+        x = int(rnd.integers(0, width - 5))
+        y = int(rnd.integers(0, height - 5))
+        w = int(rnd.integers(1, min(200, width - x)))
+        h = int(rnd.integers(1, min(40, height - y)))
+        pred[y:y + h, x:x + w] = rnd.uniform(0.5, 1.0)
+    return pred
+
+
+class TestDBPostProcess:
+
+    def test_axis_aligned_rect(self):
+        assert DBPostProcess.get_axis_aligned_rect(((35.0, 25.0), (10.0, 50.0), -90.0)) == [10, 20, 60, 30]
+        assert DBPostProcess.get_axis_aligned_rect(((35.0, 25.0), (50.0, 10.0), 0.0)) == [10, 20, 60, 30]
+        assert DBPostProcess.get_axis_aligned_rect(((35.5, 25.0), (10.0, 50.0), -90.0)) is None
+        assert DBPostProcess.get_axis_aligned_rect(((35.0, 25.0), (10.0, 50.0), -45.0)) is None
+
+    @pytest.mark.parametrize('seed', range(10))
+    def test_same_as_slow(self, seed):
+        """测试快速路径与逐个处理的结果一致 坐标最多差1像素"""
+        rnd = np.random.default_rng(seed)
+        height, width = [(736, 1280), (96, 320)][seed % 2]
+        pred = _random_pred(rnd, height, width, int(rnd.integers(1, 60)))
+        dest_height, dest_width = height * np.float64(1.5), width * np.float64(1.5)
+
+        fast = DBPostProcess(thresh=0.3, box_thresh=0.6, unclip_ratio=1.5)
+        slow = SlowDBPostProcess(thresh=0.3, box_thresh=0.6, unclip_ratio=1.5)
+        fast_boxes, fast_scores = fast.boxes_from_bitmap(pred, pred > 0.3, dest_width, dest_height)
+        slow_boxes, slow_scores = slow.boxes_from_bitmap(pred, pred > 0.3, dest_width, dest_height)
+
+        assert len(slow_boxes) > 0
+        assert fast_boxes.shape == slow_boxes.shape
+        assert np.abs(fast_boxes - slow_boxes).max() <= 1
+        assert fast_scores == pytest.approx(slow_scores)
@@ -0,0 +1,83 @@
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+auto_battle_replay = pytest.importorskip('zzz_od.auto_battle.auto_battle_replay')
+
+
+def _write_frames(frame_dir: str, name_list: list[str]) -> None:
+    for idx, name in enumerate(name_list):
+        screen = np.full((1080, 1920, 3), idx * 10, dtype=np.uint8)
+        cv2.imwrite(os.path.join(frame_dir, name), screen)
+
+
+def test_load_replay_frames_by_file_name(tmp_path):
+    _write_frames(str(tmp_path), ['b_1700000000200.png', 'a_1700000000100.png', 'c_1700000000300.png'])
+
+    frame_list = auto_battle_replay.load_replay_frames(str(tmp_path))
+    assert [os.path.basename(i.file_path) for i in frame_list] == [
+        'a_1700000000100.png', 'b_1700000000200.png', 'c_1700000000300.png'
+    ]
+    assert [i.create_time for i in frame_list] == pytest.approx([1700000000.1, 1700000000.2, 1700000000.3])
+
+
+def test_load_replay_frames_by_index(tmp_path):
+    _write_frames(str(tmp_path), ['x.png', 'y.png'])
+    with open(os.path.join(tmp_path, 'frames.json'), 'w', encoding='utf-8') as file:
+        json.dump([{'file': 'y.png', 'time': 2.5}, {'file': 'x.png', 'time': 1.5}], file)
+
+    frame_list = auto_battle_replay.load_replay_frames(str(tmp_path))
+    assert [os.path.basename(i.file_path) for i in frame_list] == ['x.png', 'y.png']
+    assert [i.create_time for i in frame_list] == [1.5, 2.5]
+
+
+def test_replay_controller(tmp_path):
+    _write_frames(str(tmp_path), ['f_1.png', 'f_2.png'])
+    controller = auto_battle_replay.ReplayController(auto_battle_replay.load_replay_frames(str(tmp_path)))
+
+    controller.init_before_context_run()
+    t1, screen1 = controller.screenshot()
+    t2, screen2 = controller.screenshot()
+    assert (t1, t2) == (1, 2)
+    assert screen1[0, 0, 0] == 0 and screen2[0, 0, 0] == 10
+    assert not controller.has_next_frame
+    assert controller.screenshot()[1] is None
+
+    # 按键操作不做任何事
+    controller.dodge(press=True, press_time=0.1)
+    controller.switch_next()
+    controller.turn_by_distance(100)
+
+    # 未实现的接口直接报错 不能静默返回
+    with pytest.raises(AttributeError):
+        controller.not_exists_method()
+
+
+def test_auto_battle_replay(tmp_path):
+    _write_frames(str(tmp_path), ['f_1.png', 'f_2.png', 'f_3.png'])
+    frame_list = auto_battle_replay.load_replay_frames(str(tmp_path))
+
+    ctx = auto_battle_replay.ReplayContext()
+    auto_op = auto_battle_replay.AutoBattleOperator(ctx, 'auto_battle', '全配队通用')
+    success, msg = auto_op.init_before_running()
+    if not success:
+        pytest.skip(f'自动战斗初始化失败 缺少模型或资源 {msg}')
+
+    try:
+        replay = auto_battle_replay.AutoBattleReplay(ctx, auto_op, frame_list)
+        assert ctx.controller is replay.controller
+        replay.run()
+
+        result = replay.to_json()
+        assert result['frame_cnt'] == 3
+        assert [i['file'] for i in result['frames']] == ['f_1.png', 'f_2.png', 'f_3.png']
+        assert [i['time'] for i in result['frames']] == [1, 2, 3]
+        assert result['checker_latency']['总计']['cnt'] == 3
+
+        replay.save(os.path.join(tmp_path, 'result.json'))
+        assert os.path.exists(os.path.join(tmp_path, 'result.json'))
+    finally:
+        auto_op.dispose()
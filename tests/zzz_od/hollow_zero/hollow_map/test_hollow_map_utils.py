@@ -0,0 +1,107 @@
+"""空洞地图构造测试"""
+import copy
+import random
+from typing import List
+from unittest.mock import Mock
+
+import pytest
+
+from one_dragon.base.geometry.rectangle import Rect
+from zzz_od.hollow_zero.game_data.hollow_zero_event import HollowZeroEntry
+from zzz_od.hollow_zero.hollow_map.hollow_zero_map import HollowZeroMapNode
+
+# 依赖 ZContext 需要完整的运行环境
+hollow_map_utils = pytest.importorskip('zzz_od.hollow_zero.hollow_map.hollow_map_utils')
+
+ENTRY_NAMES = ['0000-未知', '0001-当前', '0002-空白已通行', '0003-轨道-左', '0004-轨道-右',
+               '0005-轨道-上', '0006-轨道-下', '0007-不可通行']
+
+
+@pytest.fixture
+def name_2_entry() -> dict[str, HollowZeroEntry]:
+    return {i[5:]: HollowZeroEntry(i, can_go=i[5:] != '不可通行') for i in ENTRY_NAMES}
+
+
+@pytest.fixture
+def ctx(name_2_entry):
+    ctx = Mock()
+    ctx.project_config.screen_standard_width = 1920
+    ctx.project_config.screen_standard_height = 1080
+    ctx.hollow.data_service.name_2_entry = name_2_entry
+    return ctx
+
+
+def random_nodes(rng: random.Random, name_2_entry: dict[str, HollowZeroEntry], cnt: int) -> List[HollowZeroMapNode]:
+    """在网格附近随机生成节点 包含部分超出画面的节点"""
+    width = rng.choice([60, 100, 130])
+    height = width * 4 // 5
+    entry_list = list(name_2_entry.values())
+    nodes = []
+    for _ in range(cnt):
+        x = rng.randint(-2, 20) * width + rng.randint(-width // 5, width // 5)
+        y = rng.randint(-2, 14) * height + rng.randint(-height // 5, height // 5)
+        w = width + rng.randint(-width // 6, width // 6)
+        h = height + rng.randint(-height // 6, height // 6)
+        nodes.append(HollowZeroMapNode(Rect(x, y, x + w, y + h), rng.choice(entry_list),
+                                       check_time=rng.random(), confidence=rng.random()))
+    return nodes
+
+
+def brute_force_edges(ctx, nodes: List[HollowZeroMapNode]) -> dict[int, List[int]]:
+    """逐对比较所有节点的原始实现"""
+    def in_screen(node: HollowZeroMapNode) -> bool:
+        return (node.pos.x1 >= 0 and node.pos.y1 >= 0
+                and node.pos.x2 < ctx.project_config.screen_standard_width
+                and node.pos.y2 < ctx.project_config.screen_standard_height)
+
+    edges: dict[int, List[int]] = {}
+    for i, node_1 in enumerate(nodes):
+        if not in_screen(node_1):
+            continue
+        for j, node_2 in enumerate(nodes):
+            if not in_screen(node_2) or not node_1.entry.can_go or not node_2.entry.can_go:
+                continue
+            name_1 = node_1.entry.entry_name
+            name_2 = node_2.entry.entry_name
+            if hollow_map_utils._at_left(node_1, node_2):
+                ok = name_2 != '轨道-左' and name_1 not in ['轨道-上', '轨道-下', '轨道-左']
+            elif hollow_map_utils._at_right(node_1, node_2):
+                ok = name_2 != '轨道-右' and name_1 not in ['轨道-上', '轨道-下', '轨道-右']
+            elif hollow_map_utils._above(node_1, node_2):
+                ok = name_2 != '轨道-上' and name_1 not in ['轨道-左', '轨道-右', '轨道-上']
+            elif hollow_map_utils._under(node_1, node_2):
+                ok = name_2 != '轨道-下' and name_1 not in ['轨道-左', '轨道-右', '轨道-下']
+            else:
+                ok = False
+            if ok:
+                edges.setdefault(i, []).append(j)
+    return edges
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_construct_map_from_nodes(ctx, name_2_entry, seed):
+    rng = random.Random(seed)
+    nodes = random_nodes(rng, name_2_entry, rng.randint(1, 120))
+    expected_nodes = copy.deepcopy(nodes)
+
+    current_map = hollow_map_utils.construct_map_from_nodes(ctx, nodes, 1)
+
+    # 多个[当前]节点的处理 在构造边之前
+    hollow_map_utils.construct_map_from_nodes(ctx, expected_nodes, 1)
+    assert current_map.edges == brute_force_edges(ctx, expected_nodes)
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_merge_map_reuse_edges(ctx, name_2_entry, seed):
+    rng = random.Random(seed)
+    old_map = hollow_map_utils.construct_map_from_nodes(ctx, random_nodes(rng, name_2_entry, 80), 1)
+    # 构造后有节点变化 变化的节点不能复用旧的边
+    entry_list = list(name_2_entry.values())
+    for node in old_map.nodes:
+        if rng.random() < 0.2:
+            node.entry = rng.choice(entry_list)
+    current_map = hollow_map_utils.construct_map_from_nodes(ctx, random_nodes(rng, name_2_entry, 30), 2)
+
+    merged = hollow_map_utils.merge_map(ctx, [current_map, old_map])
+
+    assert merged.edges == brute_force_edges(ctx, merged.nodes)
@@ -0,0 +1,95 @@
+"""空洞寻路测试"""
+from typing import List
+
+import pytest
+
+from one_dragon.base.geometry.rectangle import Rect
+from zzz_od.hollow_zero.game_data.hollow_zero_event import HollowZeroEntry
+from zzz_od.hollow_zero.hollow_map.hollow_zero_map import HollowZeroMap, HollowZeroMapNode
+
+# 依赖 ZContext 需要完整的运行环境
+hollow_pathfinding = pytest.importorskip('zzz_od.hollow_zero.hollow_map.hollow_pathfinding')
+
+NAME_2_ENTRY: dict[str, HollowZeroEntry] = {
+    '当前': HollowZeroEntry('0000-当前', need_step=0),
+    '空白已通行': HollowZeroEntry('0001-空白已通行', need_step=0),
+    '未知': HollowZeroEntry('0002-未知'),
+    '战斗': HollowZeroEntry('0003-战斗'),
+    '守门人': HollowZeroEntry('0004-守门人'),
+    '传送点': HollowZeroEntry('0005-传送点'),
+}
+
+
+def line_map(entry_name_list: List[str]) -> HollowZeroMap:
+    """一行节点 相邻节点之间双向连通 第一个节点是[当前]"""
+    nodes = [HollowZeroMapNode(Rect(i * 100, 0, i * 100 + 100, 100), NAME_2_ENTRY[name])
+             for i, name in enumerate(entry_name_list)]
+    edges: dict[int, List[int]] = {}
+    for i in range(len(nodes)):
+        edges[i] = [j for j in (i - 1, i + 1) if 0 <= j < len(nodes)]
+    return HollowZeroMap(nodes, 0, edges)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    hollow_pathfinding._search_cache.clear()
+
+
+def test_search_map_zero_step():
+    current_map = line_map(['当前', '空白已通行', '空白已通行', '未知', '未知'])
+    hollow_pathfinding.search_map(current_map, set(), [])
+
+    nodes = current_map.nodes
+    assert [i.path_step_cnt for i in nodes] == [0, 0, 0, 1, 2]
+    assert [i.path_node_cnt for i in nodes] == [0, 1, 2, 3, 4]
+    assert nodes[4].path_first_node is nodes[1]
+    assert nodes[4].path_first_need_step_node is nodes[3]
+    assert nodes[4].path_last_node is nodes[3]
+
+
+def test_search_map_avoid():
+    # 0 - 1(战斗) - 2
+    # |             |
+    # 3 - 4  -  5 - 6
+    current_map = line_map(['当前', '战斗', '未知', '空白已通行', '空白已通行', '空白已通行', '空白已通行'])
+    current_map.edges = {0: [1, 3], 1: [0, 2], 2: [1, 6], 3: [0, 4], 4: [3, 5], 5: [4, 6], 6: [5, 2]}
+    hollow_pathfinding.search_map(current_map, {'战斗'}, [])
+
+    nodes = current_map.nodes
+    # 避开战斗后 步数一样 但要经过更多的格子
+    assert nodes[2].path_step_cnt == 1
+    assert nodes[2].path_node_cnt == 5
+    assert nodes[2].path_first_node is nodes[3]
+    # 战斗节点只能在第二次搜索中到达
+    assert nodes[1].path_step_cnt == 1
+    assert nodes[1].path_last_node is nodes[0]
+
+
+def test_search_map_cache():
+    entry_name_list = ['当前', '未知', '战斗', '守门人']
+    map_1 = line_map(entry_name_list)
+    hollow_pathfinding.search_map(map_1, {'战斗'}, [])
+    assert len(hollow_pathfinding._search_cache) == 1
+
+    # 拓扑一致的另一个地图 复用结果 但设置在自己的节点上
+    map_2 = line_map(entry_name_list)
+    hollow_pathfinding.search_map(map_2, {'战斗'}, [])
+    assert len(hollow_pathfinding._search_cache) == 1
+    assert [i.path_step_cnt for i in map_2.nodes] == [i.path_step_cnt for i in map_1.nodes]
+    assert map_2.nodes[3].path_last_node is map_2.nodes[2]
+
+    # 格子类型变化后 重新搜索
+    map_2.nodes[2].entry = NAME_2_ENTRY['空白已通行']
+    hollow_pathfinding.search_map(map_2, {'战斗'}, [])
+    assert len(hollow_pathfinding._search_cache) == 2
+    assert map_2.nodes[3].path_step_cnt == 2
+
+
+def test_get_route_by_entry_list():
+    current_map = line_map(['当前', '未知', '传送点', '未知', '守门人'])
+    hollow_pathfinding.search_map(current_map, set(), [])
+
+    assert hollow_pathfinding.get_route_by_entry(current_map, '守门人', []) is current_map.nodes[4]
+    target = hollow_pathfinding.get_route_by_entry_list(current_map, ['守门人', '传送点'], [])
+    assert target is current_map.nodes[2]
+    assert hollow_pathfinding.get_route_by_entry_list(current_map, ['战斗'], []) is None
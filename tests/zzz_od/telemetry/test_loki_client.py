@@ -0,0 +1,144 @@
+"""Loki客户端发送测试 使用本地HTTP服务模拟Loki"""
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+import pytest
+
+pytest.importorskip('requests')
+
+from zzz_od.telemetry.loki_client import LokiClient  # noqa: E402
+from zzz_od.telemetry.models import TelemetryConfig  # noqa: E402
+
+
+class FakeLoki:
+    """记录收到的日志行 status 控制返回的状态码"""
+
+    def __init__(self):
+        self.status = 204
+        self.lines: List[str] = []
+        self.encodings: List[str] = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                fake.encodings.append(self.headers.get('Content-Encoding', ''))
+                if fake.status == 204:
+                    if self.headers.get('Content-Encoding') == 'gzip':
+                        body = gzip.decompress(body)
+                    for stream in json.loads(body)['streams']:
+                        fake.lines.extend(i[1] for i in stream['values'])
+                self.send_response(fake.status)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def events(self) -> List[str]:
+        return [json.loads(i)['properties']['event_name'] for i in self.lines]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def loki():
+    fake = FakeLoki()
+    yield fake
+    fake.close()
+
+
+def new_client(url: str, spool_dir: str, max_queue_size: int = 1000) -> LokiClient:
+    config = TelemetryConfig(loki_url=url, spool_dir=spool_dir, max_queue_size=max_queue_size, flush_interval=3600)
+    client = LokiClient(config)
+    assert client.initialize()
+    return client
+
+
+def capture(client: LokiClient, names: List[str]) -> None:
+    for name in names:
+        client.capture(distinct_id='user', event=name, properties={'value': 'x' * 100})
+
+
+def test_gzip(loki, tmp_path):
+    client = new_client(loki.url, str(tmp_path))
+    capture(client, ['e1', 'e2'])
+    client.flush()
+
+    assert loki.events() == ['app_launched', 'e1', 'e2']
+    assert set(loki.encodings) == {'gzip'}
+    assert 0 < client.bytes_sent < client.bytes_uncompressed
+    client.shutdown()
+
+
+def test_server_error(loki, tmp_path):
+    client = new_client(loki.url, str(tmp_path))
+    loki.status = 500
+    capture(client, ['e1', 'e2'])
+    client.flush()
+
+    # 发送失败的事件写入磁盘 等待重试期间不再请求
+    assert client.spool.size_bytes > 0
+    request_cnt = len(loki.encodings)
+    capture(client, ['e3'])
+    client.flush()
+    assert len(loki.encodings) == request_cnt
+
+    # 恢复后按顺序补发
+    loki.status = 204
+    client._retry_at = 0
+    capture(client, ['e4'])
+    client.flush()
+    assert loki.events() == ['app_launched', 'e1', 'e2', 'e3', 'e4']
+    assert client.spool.is_empty()
+    assert client.events_dropped == 0
+    client.shutdown()
+
+
+def test_bad_request(loki, tmp_path):
+    client = new_client(loki.url, str(tmp_path))
+    loki.status = 400
+    capture(client, ['e1'])
+    client.flush()
+
+    # 重试也不会成功的请求 直接丢弃
+    assert client.events_dropped == 2
+    assert client.spool.is_empty()
+    client.shutdown()
+
+
+def test_restart(loki, tmp_path):
+    loki.close()
+    client = new_client(loki.url, str(tmp_path))
+    capture(client, ['e1'])
+    client.shutdown()
+
+    # 服务不可用时关闭 事件留在磁盘 下次启动后发送
+    loki2 = FakeLoki()
+    try:
+        client = new_client(loki2.url, str(tmp_path))
+        client.flush()
+        assert loki2.events() == ['app_launched', 'e1', 'app_launched']
+        client.shutdown()
+    finally:
+        loki2.close()
+
+
+def test_queue_full(loki, tmp_path):
+    client = new_client(loki.url, str(tmp_path), max_queue_size=2)
+    capture(client, [f'e{i}' for i in range(5)])
+
+    # 队列满了写入磁盘 不丢弃
+    assert client.events_dropped == 0
+    client.flush()
+    assert sorted(loki.events()) == sorted(['app_launched'] + [f'e{i}' for i in range(5)])
+    client.shutdown()
@@ -0,0 +1,53 @@
+"""Loki磁盘缓冲测试"""
+from zzz_od.telemetry.loki_spool import LokiSpool
+
+
+def test_append_and_peek(tmp_path):
+    spool = LokiSpool(str(tmp_path), segment_bytes=20)
+    assert spool.is_empty()
+    assert spool.peek_oldest() is None
+
+    spool.append(['a' * 15, 'b' * 15, 'c'])
+    assert spool.segment_count == 2  # 第一个分段已写满 第二个正在写入
+
+    seq, lines = spool.peek_oldest()
+    assert lines == ['a' * 15, 'b' * 15]
+    spool.remove(seq)
+
+    # 没有写完的分段时 结束正在写入的分段再读取
+    seq, lines = spool.peek_oldest()
+    assert lines == ['c']
+    spool.remove(seq)
+    assert spool.is_empty()
+    assert spool.size_bytes == 0
+
+
+def test_max_bytes(tmp_path):
+    spool = LokiSpool(str(tmp_path), max_bytes=50, segment_bytes=20)
+    dropped = spool.append([str(i) * 9 for i in range(10)])
+
+    assert spool.size_bytes <= 50
+    assert dropped == spool.dropped_events
+    assert dropped > 0
+
+    # 删除的是最旧的事件
+    remain = []
+    while (segment := spool.peek_oldest()) is not None:
+        remain.extend(segment[1])
+        spool.remove(segment[0])
+    assert remain == [str(i) * 9 for i in range(dropped, 10)]
+
+
+def test_reopen(tmp_path):
+    spool = LokiSpool(str(tmp_path))
+    spool.append(['a', 'b'])
+    spool.close()
+
+    # 重启后继续读取上次的分段 新事件写在后面
+    spool = LokiSpool(str(tmp_path))
+    spool.append(['c'])
+    lines = []
+    while (segment := spool.peek_oldest()) is not None:
+        lines.extend(segment[1])
+        spool.remove(segment[0])
+    assert lines == ['a', 'b', 'c']
@@ -0,0 +1,172 @@
+"""流式分位数统计测试 与排序后的精确分位数对比"""
+import random
+import threading
+
+import pytest
+
+from zzz_od.telemetry.performance_monitor import PerformanceMonitor
+from zzz_od.telemetry.quantile_sketch import DDSketch, WindowedSketch
+
+
+def exact_quantile(values, q: float) -> float:
+    sorted_values = sorted(values)
+    return sorted_values[int(q * (len(sorted_values) - 1))]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_relative_accuracy(seed):
+    rng = random.Random(seed)
+    values = [rng.lognormvariate(3, 1.5) for _ in range(5000)]
+    sketch = DDSketch(relative_accuracy=0.01)
+    for v in values:
+        sketch.add(v)
+
+    assert sketch.count == len(values)
+    assert sketch.min == min(values)
+    assert sketch.max == max(values)
+    for q in [0.01, 0.5, 0.9, 0.95, 0.99]:
+        expected = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - expected) <= expected * 0.01 + 1e-9
+
+
+def test_merge():
+    rng = random.Random(0)
+    values = [rng.uniform(0, 100) for _ in range(3000)] + [0] * 10
+    whole = DDSketch()
+    parts = [DDSketch() for _ in range(3)]
+    for idx, v in enumerate(values):
+        whole.add(v)
+        parts[idx % 3].add(v)
+
+    merged = DDSketch()
+    for part in parts:
+        merged.merge(DDSketch.from_dict(part.to_dict()))
+
+    assert merged.count == whole.count
+    assert merged.zero_count == 10
+    for q in [0.001, 0.5, 0.99]:
+        assert merged.quantile(q) == whole.quantile(q)
+
+
+def test_max_bins():
+    sketch = DDSketch(max_bins=32)
+    for i in range(1, 10000):
+        sketch.add(i * 1.1)
+    assert len(sketch.bins) <= 32
+    # 合并的是最小的桶 高分位数不受影响
+    assert abs(sketch.quantile(0.99) - 9899 * 1.1) <= 9899 * 1.1 * 0.01 + 1.1
+
+
+def test_window():
+    sketch = WindowedSketch(window_seconds=60, bucket_seconds=10)
+    for t in range(0, 100):
+        sketch.add(t, now=t)
+
+    snapshot = sketch.snapshot(now=100)
+    # 过期的时间段整个丢弃 保留最后一个跨越窗口边界的时间段
+    assert snapshot.min == 40
+    assert snapshot.max == 99
+    assert sketch.span_seconds(now=100) == 60
+
+    assert sketch.snapshot(now=1000).count == 0
+    assert sketch.span_seconds(now=1000) == 0
+
+
+def test_monitor_stats():
+    monitor = PerformanceMonitor()
+    for i in range(1, 101):
+        monitor.record_event_processing(float(i))
+        monitor.track_operation_time('battle', i / 1000, True)
+    monitor.record_event_processing(1000, success=False)
+    monitor.track_image_recognition_performance(0.02, algorithm='yolo')
+
+    stats = monitor.get_detailed_stats()
+    processing = stats['processing_stats']
+    assert processing['recent_count'] == 200  # 操作耗时也计入事件处理
+    assert processing['recent_max_ms'] == 100
+    assert abs(processing['percentile_95_ms'] - 95) <= 1
+
+    battle = stats['operation_stats']['battle']
+    assert battle['recent_count'] == 100
+    assert abs(battle['percentile_50_ms'] - 50) <= 1
+    assert monitor.get_operation_snapshot('image_recognition:yolo').count == 1
+    assert monitor.get_operation_snapshot('not_exist') is None
+
+    metrics = monitor.get_current_metrics()
+    assert metrics.events_processed == 200
+    assert metrics.total_errors == 1
+    assert metrics.max_processing_time_ms == 1000
+
+    monitor.reset_metrics()
+    assert monitor.get_detailed_stats()['processing_stats']['recent_count'] == 0
+
+
+class _EventCollector:
+    """记录发送的事件"""
+
+    def __init__(self):
+        self.events = []
+
+    def capture(self, distinct_id, event, properties):
+        self.events.append(properties)
+
+
+def test_monitor_snapshot_events():
+    client = _EventCollector()
+    monitor = PerformanceMonitor(client, snapshot_interval_seconds=3600)
+    for i in range(1, 101):
+        monitor.track_operation_time('battle', i / 1000, True)
+    monitor.track_operation_time('battle', 1, False)
+    monitor.track_image_recognition_performance(0.02, algorithm='yolo')
+    assert client.events == []  # 不再逐次发送
+
+    monitor.send_operation_snapshots()
+    event_map = {i['operation']: i for i in client.events}
+    assert len(client.events) == 2
+    assert event_map['battle']['recent_count'] == 100
+    assert event_map['battle']['failure_count'] == 1
+    assert abs(event_map['battle']['percentile_50_ms'] - 50) <= 1
+    assert event_map['image_recognition:yolo']['recent_count'] == 1
+
+    # 没有新记录的操作不重复发送
+    monitor.send_operation_snapshots()
+    assert len(client.events) == 2
+
+
+def test_monitor_snapshot_interval():
+    client = _EventCollector()
+    monitor = PerformanceMonitor(client, snapshot_interval_seconds=0)
+    for _ in range(3):
+        monitor.track_operation_time('battle', 0.01, True)
+    assert len(client.events) == 3
+    assert client.events[-1]['recent_count'] == 3
+
+    monitor = PerformanceMonitor(client, snapshot_interval_seconds=3600)
+    monitor.track_operation_time('battle', 0.01, True)
+    monitor.shutdown()  # 关闭前发送最后一次汇总
+    assert len(client.events) == 4
+
+
+def test_monitor_stats_during_reset():
+    monitor = PerformanceMonitor()
+    stop = threading.Event()
+    error_list = []
+
+    def reset():
+        while not stop.is_set():
+            monitor.reset_metrics()
+
+    worker = threading.Thread(target=reset)
+    worker.start()
+    try:
+        for i in range(2000):
+            monitor.record_operation_time(f'op_{i % 10}', 1)
+            try:
+                monitor.get_operation_stats()
+            except Exception as e:
+                error_list.append(e)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert error_list == []